@@ -14,78 +14,117 @@ from pathlib import Path
 import os
 import importlib.util
 import sys
+import heapq
 from typing import List, Dict, Any, Optional
 
+# Make the project root importable when this file is used from the ChatBots directory
+try:
+    from RegistryModule.parameter_validator import TYPE_MAPPING, compile_validator
+    from RegistryModule.argument_coercion import compile_coercer
+    from RegistryModule.result_cache import ResultCache
+    from RegistryModule.registry_cache import shared_registry_cache
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from RegistryModule.parameter_validator import TYPE_MAPPING, compile_validator
+    from RegistryModule.argument_coercion import compile_coercer
+    from RegistryModule.result_cache import ResultCache
+    from RegistryModule.registry_cache import shared_registry_cache
+
+# Simple fallback for basic string matching, used when rapidfuzz is not available
+class SimpleFuzz:
+    @staticmethod
+    def WRatio(a, b):
+        # Simple similarity based on common characters
+        if not a or not b:
+            return 0
+        a_lower = a.lower()
+        b_lower = b.lower()
+        if a_lower == b_lower:
+            return 100
+        # Count common characters
+        common = sum(1 for char in a_lower if char in b_lower)
+        return int((common / max(len(a_lower), len(b_lower))) * 100)
+
+
+class SimpleProcess:
+    @staticmethod
+    def extract(query, choices, scorer=None, limit=5):
+        # Simple extraction without rapidfuzz
+        results = []
+        for i, choice in enumerate(choices):
+            score = SimpleFuzz.WRatio(query, choice)
+            results.append((choice, score, i))
+        # Sort by score descending
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:limit]
+
+
 # Try to import rapidfuzz, use fallback if not available
 try:
     from rapidfuzz import fuzz, process
     RAPIDFUZZ_AVAILABLE = True
 except ImportError:
     RAPIDFUZZ_AVAILABLE = False
-    # Simple fallback for basic string matching
-    class SimpleFuzz:
-        @staticmethod
-        def WRatio(a, b):
-            # Simple similarity based on common characters
-            if not a or not b:
-                return 0
-            a_lower = a.lower()
-            b_lower = b.lower()
-            if a_lower == b_lower:
-                return 100
-            # Count common characters
-            common = sum(1 for char in a_lower if char in b_lower)
-            return int((common / max(len(a_lower), len(b_lower))) * 100)
-
-    class SimpleProcess:
-        @staticmethod
-        def extract(query, choices, scorer=None, limit=5):
-            # Simple extraction without rapidfuzz
-            results = []
-            for i, choice in enumerate(choices):
-                score = SimpleFuzz.WRatio(query, choice)
-                results.append((choice, score, i))
-            # Sort by score descending
-            results.sort(key=lambda x: x[1], reverse=True)
-            return results[:limit]
-
     fuzz = SimpleFuzz()
     process = SimpleProcess()
 
+# NumPy is used for vectorized batch search when rapidfuzz is not available
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Number of search targets per function: function name, module_name.function_name, module name
+TARGETS_PER_FUNCTION = 3
+
+# Project root directory (two levels up from this script)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Registry file names probed in order under RegistryModule/
+REGISTRY_FILE_NAMES = [
+    "RegistryModule/registry.json",
+    "RegistryModule/updated_registry.json",
+    "RegistryModule/Registration.json"
+]
+_REGISTRY_CANDIDATES = [(PROJECT_ROOT / file_name, str(PROJECT_ROOT / file_name)) for file_name in REGISTRY_FILE_NAMES]
+
+
+def find_registry_file() -> Optional[Path]:
+    """
+    Find the registry JSON file in the project root directory
+
+    Returns:
+        Optional[Path]: Path of the first existing registry file, None if there is none
+    """
+    for test_path, test_path_str in _REGISTRY_CANDIDATES:
+        if os.path.exists(test_path_str):
+            return test_path
+    return None
+
+
 def load_registry_json() -> bool:
     """
     Load the RegistryModule/registry.json file located in the project root directory
 
+    The parsed file is kept in the process-wide registry cache, so the FunctionRegistry
+    created afterwards reuses it instead of parsing the file again.
+
     Returns:
         bool: Returns True if successfully loaded and parsed JSON, otherwise False
     """
+    json_path = None
     try:
-        # Get current script path and calculate project root directory (two levels up)
-        current_script = Path(__file__).resolve()
-        project_root = current_script.parent.parent
-
-        # Try multiple possible registry file names
-        possible_files = [
-            "RegistryModule/registry.json",
-            "RegistryModule/updated_registry.json",
-            "RegistryModule/Registration.json"
-        ]
-
-        json_path = None
-        for file_name in possible_files:
-            test_path = project_root / file_name
-            if test_path.exists():
-                json_path = test_path
-                break
+        json_path = find_registry_file()
 
         if json_path is None:
-            print(f"Error: No registry JSON file found in {project_root}/RegistryModule/")
-            print(f"Project root directory: {project_root}")
-            print(f"Root directory contents: {[f.name for f in project_root.iterdir()]}")
+            print(f"Error: No registry JSON file found in {PROJECT_ROOT}/RegistryModule/")
+            print(f"Project root directory: {PROJECT_ROOT}")
+            print(f"Root directory contents: {[f.name for f in PROJECT_ROOT.iterdir()]}")
             return False
 
-        # Try to load and parse JSON
-        json.loads(json_path.read_text(encoding='utf-8'))
+        # Try to load and parse JSON (only parsed again when the file changed)
+        shared_registry_cache.load(json_path)
         return True
 
     except json.JSONDecodeError as e:
@@ -104,41 +143,36 @@ class FunctionRegistry:
     def __init__(self):
         self.registry_data = None
         self.function_index = []  # 存储所有函数的索引信息
+        self.search_corpus = []  # Fuzzy search targets, built once per registry load
+        self._corpus_char_table = None
         self.load_registry()
 
     def load_registry(self):
         """Load registry file with cross-platform path support"""
-        # Get current script path and calculate project root directory
-        current_script = Path(__file__).resolve()
-        project_root = current_script.parent.parent
-
-        # Try multiple possible registry file names
-        possible_files = [
-            "RegistryModule/registry.json",
-            "RegistryModule/updated_registry.json",
-            "RegistryModule/Registration.json"
-        ]
-
-        registry_path = None
-        for file_name in possible_files:
-            test_path = project_root / file_name
-            if test_path.exists():
-                registry_path = test_path
-                break
+        registry_path = find_registry_file()
 
         if registry_path is None:
-            raise FileNotFoundError(f"Registry file not found in {project_root}/RegistryModule/")
+            raise FileNotFoundError(f"Registry file not found in {PROJECT_ROOT}/RegistryModule/")
 
         try:
-            with open(registry_path, 'r', encoding='utf-8') as f:
-                self.registry_data = json.load(f)
-            self._build_function_index()
+            snapshot = shared_registry_cache.load(registry_path)
         except json.JSONDecodeError:
             raise ValueError("Invalid JSON format in registry file")
 
+        # The index is built once per registry file version and shared by all instances
+        self.registry_data = snapshot.data
+        self.function_index, self.search_corpus, self._corpus_char_table = snapshot.get_index(
+            "function_calling_router", self._build_shared_index)
+
+    def _build_shared_index(self):
+        """Build the function index and search corpus for the shared registry snapshot"""
+        self._build_function_index()
+        return (self.function_index, self.search_corpus, self._corpus_char_table)
+
     def _build_function_index(self):
         """Build function index for easy querying"""
         self.function_index = []
+        self.search_corpus = []
 
         if not self.registry_data or 'modules' not in self.registry_data:
             return
@@ -148,15 +182,59 @@ class FunctionRegistry:
             module_path = module.get('module_path', '')
 
             for function in module.get('functions', []):
+                parameters = function.get('parameters', [])
                 function_info = {
                     'module_name': module_name,
                     'module_path': module_path,
                     'function_name': function.get('function_name', ''),
-                    'parameters': function.get('parameters', []),
+                    'parameters': parameters,
+                    'validator': compile_validator(parameters),  # Compiled once per registry load
+                    'coercer': compile_coercer(parameters),  # Converts "25"/"二十五度"/"true" to declared types
+                    'cache': function.get('cache'),  # Optional TTL cache policy for read-only functions
                     'search_text': f"{module_name}.{function.get('function_name', '')}"  # Text for searching
                 }
                 self.function_index.append(function_info)
 
+        self._build_search_corpus()
+
+    def _build_search_corpus(self):
+        """
+        Build the fuzzy search corpus once per registry load
+
+        Target TARGETS_PER_FUNCTION * i + j belongs to function_index[i], so scores can be
+        reduced per function by reshaping the score matrix.
+        """
+        self.search_corpus = []
+        for func_info in self.function_index:
+            # Create multiple search targets to improve matching accuracy
+            self.search_corpus.extend([
+                func_info['function_name'],  # Function name
+                func_info['search_text'],  # Module name.function name
+                func_info['module_name']  # Module name
+            ])
+
+        # Character tables for the NumPy fallback scorer (mirrors SimpleFuzz.WRatio)
+        self._corpus_char_table = None
+        if not RAPIDFUZZ_AVAILABLE and NUMPY_AVAILABLE and self.search_corpus:
+            lowered = [target.lower() for target in self.search_corpus]
+            vocabulary = {}
+            rows, columns = [], []
+            for row, target in enumerate(lowered):
+                for char in set(target):
+                    rows.append(row)
+                    columns.append(vocabulary.setdefault(char, len(vocabulary)))
+            presence = np.zeros((len(lowered), len(vocabulary) + 1), dtype=np.float32)
+            presence[rows, columns] = 1.0
+            exact_matches = {}
+            for idx, target in enumerate(lowered):
+                exact_matches.setdefault(target, []).append(idx)
+            self._corpus_char_table = {
+                'vocabulary': vocabulary,
+                'presence': presence,
+                'lengths': np.array([len(target) for target in lowered], dtype=np.float64),
+                'exact_matches': exact_matches
+            }
+
     def semantic_search(self, query: str, limit: int = 1, threshold: float = 60.0) -> List[Dict[str, Any]]:
         """
         Use RapidFuzz for approximate semantic search
@@ -172,21 +250,10 @@ class FunctionRegistry:
         if not self.function_index:
             return []
 
-        # Prepare search target list
-        search_targets = []
-        for idx, func_info in enumerate(self.function_index):
-            # Create multiple search targets to improve matching accuracy
-            targets = [
-                (func_info['function_name'], idx),  # Function name
-                (func_info['search_text'], idx),  # Module name.function name
-                (func_info['module_name'], idx)  # Module name
-            ]
-            search_targets.extend(targets)
-
-        # Use RapidFuzz for fuzzy matching
+        # Use RapidFuzz for fuzzy matching over the precomputed corpus
         matches = process.extract(
             query,
-            [target[0] for target in search_targets],
+            self.search_corpus,
             scorer=fuzz.WRatio,  # Use weighted ratio algorithm
             limit=limit * 3  # Get more results for deduplication
         )
@@ -198,7 +265,7 @@ class FunctionRegistry:
                 continue
 
             # Get original function index
-            original_idx = search_targets[match_idx][1]
+            original_idx = match_idx // TARGETS_PER_FUNCTION
             func_info = self.function_index[original_idx]
 
             # Use function's unique identifier as key for deduplication
@@ -214,6 +281,100 @@ class FunctionRegistry:
         sorted_results = sorted(result_dict.values(), key=lambda x: x['score'], reverse=True)
         return [item['function_info'] for item in sorted_results[:limit]]
 
+    def batch_semantic_search(self, queries: List[str], limit: int = 1,
+                              threshold: float = 60.0) -> List[List[Dict[str, Any]]]:
+        """
+        Score many queries against all functions in one vectorized pass
+
+        Uses rapidfuzz cdist when available, a NumPy implementation of the fallback scorer
+        otherwise, and a plain Python loop when neither is installed.
+
+        Args:
+            queries (List[str]): User input query strings
+            limit (int): Number of results returned per query, default is 1
+            threshold (float): Matching threshold, results below this value will be filtered, default is 60.0
+
+        Returns:
+            List[List[Dict[str, Any]]]: For each query, matching functions sorted by similarity
+        """
+        if not queries:
+            return []
+        if not self.function_index:
+            return [[] for _ in queries]
+
+        function_count = len(self.function_index)
+        limit = max(1, min(limit, function_count))
+
+        if (RAPIDFUZZ_AVAILABLE and NUMPY_AVAILABLE) or self._corpus_char_table is not None:
+            if RAPIDFUZZ_AVAILABLE:
+                scores = np.asarray(process.cdist(queries, self.search_corpus, scorer=fuzz.WRatio,
+                                                   score_cutoff=min(max(threshold, 0), 100), workers=-1))
+            else:
+                scores = self._numpy_scores(queries)
+
+            # Best target score per function, then top-k functions per query
+            function_scores = scores.reshape(len(queries), function_count, TARGETS_PER_FUNCTION).max(axis=2)
+            if limit < function_count:
+                top = np.argpartition(-function_scores, limit - 1, axis=1)[:, :limit]
+            else:
+                top = np.tile(np.arange(function_count), (len(queries), 1))
+
+            ranked = []
+            for row, candidates in enumerate(top):
+                candidate_scores = function_scores[row, candidates]
+                # Highest score first, ties in registry order
+                order = np.lexsort((candidates, -candidate_scores))
+                ranked.append([(float(candidate_scores[i]), int(candidates[i])) for i in order])
+        else:
+            ranked = []
+            for query in queries:
+                function_scores = [
+                    max(fuzz.WRatio(query, target) for target in
+                        self.search_corpus[idx * TARGETS_PER_FUNCTION:(idx + 1) * TARGETS_PER_FUNCTION])
+                    for idx in range(function_count)
+                ]
+                ranked.append(heapq.nlargest(limit, ((score, idx) for idx, score in enumerate(function_scores)),
+                                             key=lambda item: item[0]))
+
+        return [
+            [self._format_function_result(self.function_index[idx]) for score, idx in query_ranked if score >= threshold]
+            for query_ranked in ranked
+        ]
+
+    def _numpy_scores(self, queries: List[str]):
+        """
+        Vectorized SimpleFuzz.WRatio for all (query, target) pairs
+
+        Character counts are small integers, exact in float32; the division is done in
+        float64 and in the same order as SimpleFuzz.WRatio (common / longest * 100,
+        truncated), so the scores are equal to the fallback scorer's.
+        """
+        table = self._corpus_char_table
+        vocabulary = table['vocabulary']
+        unknown_column = len(vocabulary)
+
+        lowered = [query.lower() for query in queries]
+        counts = np.zeros((len(queries), unknown_column + 1), dtype=np.float32)
+        for row, query in enumerate(lowered):
+            for char in query:
+                counts[row, vocabulary.get(char, unknown_column)] += 1.0
+        # Characters not in the corpus vocabulary never match a target
+        counts[:, unknown_column] = 0.0
+
+        # Lengths after lower(), which may change the length (e.g. "İ")
+        query_lengths = np.array([len(query) for query in lowered], dtype=np.float64)
+        common = (counts @ table['presence'].T).astype(np.float64)
+        longest = np.maximum(query_lengths[:, None], table['lengths'][None, :])
+        scores = np.floor(np.divide(common, longest, out=np.zeros_like(common), where=longest > 0) * 100.0)
+
+        # Empty strings score 0, case-insensitive exact matches score 100
+        scores[query_lengths == 0, :] = 0.0
+        for row, query in enumerate(lowered):
+            exact = table['exact_matches'].get(query) if query else None
+            if exact:
+                scores[row, exact] = 100.0
+        return scores
+
     def _format_function_result(self, func_info: Dict[str, Any]) -> Dict[str, Any]:
         """
         Format function result, only return content helpful for LLM parsing
@@ -244,19 +405,32 @@ class FunctionRegistry:
         return None
 
 class function_calling_interface:
-    def __init__(self):
+    def __init__(self, preload_modules: bool = False, embedding_index=None, coerce_arguments: bool = True):
+        """
+        Args:
+            preload_modules: Import all registry modules at startup instead of on first call
+            embedding_index: Optional RAGmodule.FunctionIndex.FunctionEmbeddingIndex used by
+                             search_functions instead of fuzzy name matching
+            coerce_arguments: Convert argument values such as "25", "二十五度" or "true" to the
+                              registry parameter types before validation
+        """
         load_registry_json()
         self.registry = FunctionRegistry()
-        self.type_mapping = {
-            'str': str,
-            'int': int,
-            'float': float,
-            'bool': bool,
-            'list': list,
-            'dict': dict,
-            'tuple': tuple,
-            'None': type(None)
-        }
+        self.embedding_index = embedding_index
+        self.type_mapping = TYPE_MAPPING
+        self.coerce_arguments = coerce_arguments
+        self.last_coercions = []  # Conversions applied to the arguments of the last call
+        self.validation_stats = {'calls': 0, 'coerced': 0, 'rejected': 0}
+        self.result_cache = ResultCache()
+        for func_info in self.registry.function_index:
+            if func_info.get('cache'):
+                self.result_cache.configure(func_info['search_text'], func_info['cache'])
+
+        # Resolved callables and loaded modules, invalidated when the module file changes
+        self._function_cache = {}  # (module_path, function_name) -> (mtime, function object)
+        self._module_cache = {}  # module_path -> (mtime, module)
+        if preload_modules:
+            self.preload_functions()
 
     def call_function(self, input_tuple):
         """
@@ -290,21 +464,61 @@ class function_calling_interface:
             if func_info is None:
                 return (False, f"Router: funtion {function_name} not found")
 
-            # Validate parameters
+            # Convert arguments to the declared types, then validate
+            params_dict = self._coerce_parameters(func_info, params_dict)
             validation_result = self._validate_parameters(func_info, params_dict)
+            self.validation_stats['calls'] += 1
             if not validation_result[0]:
+                # A rejected call is sent back to the LLM for another generation
+                self.validation_stats['rejected'] += 1
                 return validation_result
 
+            # Serve read-only functions from the result cache while the entry is fresh
+            full_name = func_info['search_text']
+            hit, cached_result, cache_generation = self.result_cache.lookup(full_name, params_dict)
+            if hit:
+                return (True, cached_result)
+
             # Dynamically import module and call function
             try:
                 result = self._execute_function(func_info, params_dict)
-                return (True, result)
             except Exception as e:
                 return (False, f"Router: execution error - {str(e)}")
+            finally:
+                # A (possibly partial) write makes dependent cached reads stale
+                self.result_cache.notify_executed(full_name)
+
+            self.result_cache.store(full_name, params_dict, result, cache_generation)
+            return (True, result)
 
         except Exception as e:
             return (False, f"Router: augment error - {str(e)}")
 
+    def _coerce_parameters(self, func_info, params_dict):
+        """
+        Convert argument values to the registry parameter types where it is unambiguous
+
+        Args:
+            func_info: Function information dictionary
+            params_dict: Input parameter dictionary
+
+        Returns:
+            dict: Coerced parameter dictionary (the input dictionary if nothing changed)
+        """
+        self.last_coercions = []
+        if not self.coerce_arguments:
+            return params_dict
+
+        coercer = func_info.get('coercer')
+        if coercer is None:
+            # Function info built outside FunctionRegistry, compile on demand
+            coercer = compile_coercer(func_info.get('parameters', []))
+
+        params_dict, self.last_coercions = coercer(params_dict)
+        if self.last_coercions:
+            self.validation_stats['coerced'] += 1
+        return params_dict
+
     def _validate_parameters(self, func_info, params_dict):
         """
         Validate function parameters
@@ -317,43 +531,14 @@ class function_calling_interface:
             tuple: (success: bool, error_message: str or None)
         """
         try:
-            expected_params = func_info.get('parameters', [])
-
-            # Get required and provided parameter names
-            required_param_names = {param['name'] for param in expected_params}
-            provided_param_names = set(params_dict.keys())
-
-            # Check for missing required parameters
-            missing_params = required_param_names - provided_param_names
-            if missing_params:
-                return (False, f"Router: augment error - Missing required parameters: {', '.join(missing_params)}")
-
-            # Check for unexpected parameters
-            unexpected_params = provided_param_names - required_param_names
-            if unexpected_params:
-                return (False, f"Router: augment error - Unexpected parameters: {', '.join(unexpected_params)}")
-
-            # Validate parameter types
-            for param in expected_params:
-                param_name = param['name']
-                expected_type = param['type']
-
-                if param_name in params_dict:
-                    provided_value = params_dict[param_name]
-
-                    # Get expected Python type
-                    if expected_type in self.type_mapping:
-                        expected_python_type = self.type_mapping[expected_type]
-
-                        # Special handling for None type
-                        if expected_type == 'None' and provided_value is not None:
-                            return (False, f"Router: augment error - Parameter '{param_name}' should be None, got {type(provided_value).__name__}")
-                        elif expected_type != 'None' and not isinstance(provided_value, expected_python_type):
-                            return (False, f"Router: augment error - Parameter '{param_name}' should be {expected_type}, got {type(provided_value).__name__}")
-                    else:
-                        # Unknown type, skip validation
-                        pass
-
+            validator = func_info.get('validator')
+            if validator is None:
+                # Function info built outside FunctionRegistry, compile on demand
+                validator = compile_validator(func_info.get('parameters', []))
+
+            valid, error_message = validator(params_dict)
+            if not valid:
+                return (False, f"Router: augment error - {error_message}")
             return (True, None)
 
         except Exception as e:
@@ -370,44 +555,11 @@ class function_calling_interface:
         Returns:
             Any: Function execution result
         """
-        module_path = func_info['module_path']
         module_name = func_info['module_name']
         function_name = func_info['function_name']
 
-        # Handle nested function calls (like weather.weather_search)
-        if '.' in function_name:
-            # This is a nested call, needs special handling
-            parts = function_name.split('.')
-            actual_function_name = parts[-1]
-            sub_module_path = '.'.join(parts[:-1])
-        else:
-            actual_function_name = function_name
-            sub_module_path = None
-
         try:
-            # Dynamically import module
-            if module_path.endswith('.py'):
-                # Import from file path
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                if spec is None:
-                    raise ImportError(f"Could not load module spec from {module_path}")
-
-                module = importlib.util.module_from_spec(spec)
-                sys.modules[module_name] = module
-                spec.loader.exec_module(module)
-            else:
-                # Import from module name
-                module = importlib.import_module(module_name)
-
-            # Get function object
-            if sub_module_path:
-                # Handle nested calls
-                target_obj = module
-                for part in sub_module_path.split('.'):
-                    target_obj = getattr(target_obj, part)
-                func_obj = getattr(target_obj, actual_function_name)
-            else:
-                func_obj = getattr(module, actual_function_name)
+            func_obj = self._resolve_function(func_info)
 
             # Call function
             if params_dict:
@@ -424,6 +576,107 @@ class function_calling_interface:
         except Exception as e:
             raise Exception(f"Function execution failed: {str(e)}")
 
+    def _resolve_function(self, func_info):
+        """
+        Get the function object for a registry entry, importing its module only when needed
+
+        Resolved callables are cached by (module_path, function_name). Modules loaded from
+        a .py file are re-executed only when the file's modification time changes.
+
+        Args:
+            func_info: Function information dictionary
+
+        Returns:
+            Callable: Function object
+        """
+        module_path = func_info['module_path']
+        function_name = func_info['function_name']
+        cache_key = (module_path, function_name)
+
+        mtime = os.stat(module_path).st_mtime_ns if module_path.endswith('.py') else None
+        cached = self._function_cache.get(cache_key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        module = self._load_module(func_info['module_name'], module_path, mtime)
+
+        # Handle nested function calls (like weather.weather_search)
+        target_obj = module
+        for part in function_name.split('.'):
+            target_obj = getattr(target_obj, part)
+
+        self._function_cache[cache_key] = (mtime, target_obj)
+        return target_obj
+
+    def _load_module(self, module_name, module_path, mtime):
+        """
+        Import a registry module, reusing the loaded module while its file is unchanged
+
+        Args:
+            module_name: Module name from the registry
+            module_path: File path (.py) or importable module name
+            mtime: File modification time in ns, None for modules imported by name
+
+        Returns:
+            module: Loaded module object
+        """
+        if mtime is None:
+            # Import from module name (cached by sys.modules)
+            return importlib.import_module(module_name)
+
+        cached = self._module_cache.get(module_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        # Import from file path
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        if spec is None:
+            raise ImportError(f"Could not load module spec from {module_path}")
+
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+
+        self._module_cache[module_path] = (mtime, module)
+        return module
+
+    def preload_functions(self):
+        """
+        Eagerly import all registry modules and resolve their functions
+
+        Returns:
+            Dict[str, Optional[str]]: Full function name mapped to None on success or the error message
+        """
+        results = {}
+        for func_info in self.registry.function_index:
+            try:
+                self._resolve_function(func_info)
+                results[func_info['search_text']] = None
+            except Exception as e:
+                results[func_info['search_text']] = f"{type(e).__name__}: {str(e)}"
+        return results
+
+    def get_cache_stats(self):
+        """
+        Get result cache metrics for functions with a cache policy in the registry
+
+        Returns:
+            Dict[str, Dict]: Hits, misses, hit_rate and invalidations per function
+        """
+        return self.result_cache.get_stats()
+
+    def get_validation_stats(self):
+        """
+        Get argument coercion and validation counters
+
+        Returns:
+            Dict[str, Any]: calls, coerced, rejected and retry_rate (share of calls rejected,
+                            each of which costs another LLM generation)
+        """
+        stats = dict(self.validation_stats)
+        stats['retry_rate'] = stats['rejected'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
     def get_available_functions(self):
         """
         Get all available function list
@@ -444,4 +697,21 @@ class function_calling_interface:
         Returns:
             List[Dict]: List of matching functions
         """
-        return self.registry.semantic_search(query, limit=limit)
\ No newline at end of file
+        if self.embedding_index is not None:
+            return self.embedding_index.search(query, limit=limit, callable_only=True)
+        return self.registry.semantic_search(query, limit=limit)
+
+    def batch_search_functions(self, queries, limit=5):
+        """
+        Search functions for many queries at once
+
+        Args:
+            queries: List of search query strings
+            limit: Limit on number of results returned per query
+
+        Returns:
+            List[List[Dict]]: List of matching functions for each query
+        """
+        if self.embedding_index is not None:
+            return self.embedding_index.search_batch(queries, limit=limit, callable_only=True)
+        return self.registry.batch_semantic_search(queries, limit=limit)
@@ -3,120 +3,187 @@ Here is a unified interface for all the chatbot models with the following framew
 A. transormers only
 B. llama_cpp + transformers
 C. TensorRT + transformers
+D. onnxruntime + transformers
+The transformers tokenizer formats prompts and parses thinking for every backend, see
+inference_backends.py for B and D (backend="llama_cpp" / "onnxruntime").
 """
+import asyncio
+import functools
 import os
+import threading
+import time
 import torch
 from abc import ABC
-from typing import Dict, Any, Optional, List, Union
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, List, Sequence, Tuple, Union
 from langchain_core.prompt_values import ChatPromptValue
-from pathlib import Path
 from langchain.schema.runnable import Runnable
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import LogitsProcessorList
+
+try:
+    from ChatBots.chat_session import ChatSession, SessionManager
+    from ChatBots.continuous_batching import ContinuousBatchingEngine
+    from ChatBots.function_call_grammar import (FunctionCallGrammar, FunctionCallProcessor, TokenVocabulary,
+                                                function_call_prompt, registry_functions)
+    from ChatBots.model_loader import load_causal_lm, quantize_dynamic_int8, resolve_model_path
+    from ChatBots.model_warmup import (DEFAULT_COMPILE_MAX_LENGTH, WARMUP_PROMPT_LENGTHS, compile_generate_kwargs,
+                                       enable_compile_cache, run_warmup)
+    from ChatBots.prefix_cache import PrefixKVCache, split_prefix, system_prefix_messages
+    from ChatBots.prompt_registry import DEFAULT_PROMPT, default_registry
+    from ChatBots.speculative_decoding import SpeculativeDecoder
+    from ChatBots.thinking_budget import INTENT_THINKING_BUDGETS, resolve_thinking_budget, thinking_budget_kwargs
+    from ChatBots.token_streaming import ThinkingStreamer, start_generation, think_end_token_id
+except ImportError:
+    from chat_session import ChatSession, SessionManager
+    from continuous_batching import ContinuousBatchingEngine
+    from function_call_grammar import (FunctionCallGrammar, FunctionCallProcessor, TokenVocabulary,
+                                       function_call_prompt, registry_functions)
+    from model_loader import load_causal_lm, quantize_dynamic_int8, resolve_model_path
+    from model_warmup import (DEFAULT_COMPILE_MAX_LENGTH, WARMUP_PROMPT_LENGTHS, compile_generate_kwargs,
+                              enable_compile_cache, run_warmup)
+    from prefix_cache import PrefixKVCache, split_prefix, system_prefix_messages
+    from prompt_registry import DEFAULT_PROMPT, default_registry
+    from speculative_decoding import SpeculativeDecoder
+    from thinking_budget import INTENT_THINKING_BUDGETS, resolve_thinking_budget, thinking_budget_kwargs
+    from token_streaming import ThinkingStreamer, start_generation, think_end_token_id
+
+# Chat template roles of LangChain message types
+MESSAGE_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+# invoke config keys overriding the model's generation config for one call
+SAMPLING_KEYS = ("do_sample", "temperature", "top_k", "top_p", "repetition_penalty")
+BATCH_MAX_PROMPT_TOKENS = 2048  # batch() keeps the first tokens of longer prompts
+FUNCTION_CALL_GRAMMAR_CACHE_SIZE = 16  # Compiled grammars kept per chatbot, least recently used dropped first
+
+
+def generation_options(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Options of an invoke/batch/stream config
+
+    Inside LangChain chains the config is a RunnableConfig, which carries the options set
+    through it (e.g. chain.invoke(x, {"max_tokens": 64})) in its "configurable" dict.
+    """
+    config = config or {}
+    configurable = config.get("configurable")
+    return {**configurable, **config} if isinstance(configurable, dict) else config
+
 
 def load_prompt(user_intent: str) -> str:
-    # Find the project root directory
-    def find_project_root(current_path, project_names=None):
-        if project_names is None:
-            project_names = ["Little_JARVIS", "your_actual_project_name"]
-            
-        current = Path(current_path)
-        # 先检查当前目录是否包含特定文件/目录，这是更可靠的方法
-        if (current / "ExtendMaterial" / "Prompts").exists():
-            return current
-            
-        # 然后检查目录名
-        if current.name in project_names:
-            return current
-            
-        # 向上递归
-        parent = current.parent
-        if parent == current:  # Reached root without finding project
-            # 如果到达根目录仍未找到，返回当前文件的父目录作为后备方案
-            return Path(__file__).resolve().parent.parent
-        return find_project_root(parent, project_names)
+    """
+    System prompt for an intent from ExtendMaterial/Prompts
 
-    try:
-        # Get current file's directory and find project root
-        current_file = Path(__file__).resolve()
-        current_dir = current_file.parent
-        project_root = find_project_root(current_dir)
-        
-        if project_root is None:
-            print("Warning: Could not find project root directory")
-            # 使用默认提示作为后备方案
-            return "You are a helpful AI assistant"
-            
-        # 打印调试信息
-        print(f"Project root: {project_root}")
-        
-        # Define paths relative to project root
-        prompts_dir = project_root / "ExtendMaterial" / "Prompts"
-        print(f"Prompts directory: {prompts_dir}")
-        print(f"Prompts directory exists: {prompts_dir.exists()}")
-        
-        # 检查目录内容
-        if prompts_dir.exists():
-            print(f"Directory contents: {[f.name for f in prompts_dir.iterdir()]}")
-
-        intent_types = {
-            "device_control": "",
-            "info_query": "",
-            "daily_chat": prompts_dir / "DailyChat.md",
-            # ...其他意图类型...
-        }
+    Served from memory by the process-wide PromptRegistry, which reloads edited prompt
+    files in the background.
 
-        prompt_path = intent_types.get(user_intent, prompts_dir / "DailyChat.md")
-        print(f"Selected prompt path: {prompt_path}")
-        print(f"File exists: {prompt_path.is_file() if isinstance(prompt_path, Path) else False}")
+    Args:
+        user_intent: "daily_chat", "device_control", "info_query" or a prompt file name
 
-        # Check if the value is a file path or a direct string
-        if isinstance(prompt_path, Path) and prompt_path.is_file():
-            try:
-                prompt = prompt_path.read_text(encoding="utf-8")
-                print(f"Successfully read prompt file: {len(prompt)} characters")
-            except UnicodeDecodeError:
-                # 尝试不同的编码
-                prompt = prompt_path.read_text(encoding="latin-1")
-                print("Used latin-1 encoding as fallback")
-        else:
-            prompt = str(prompt_path)  # Use the string directly
-            print("Using path as string directly")
-            
-        return prompt
-        
-    except FileNotFoundError as e:
-        print(f"Warning: File not found: {str(e)}")
-        print("In this scenario, system will use the default prompt.")
-        return "You are a helpful AI assistant"
-    except PermissionError as e:
-        print(f"Warning: Permission error: {str(e)}")
-        print("In this scenario, system will use the default prompt.")
-        return "You are a helpful AI assistant"
+    Returns:
+        str: The prompt ("You are a helpful AI assistant" if the prompt file is missing)
+    """
+    try:
+        return default_registry().get(user_intent)
     except Exception as e:
         print(f"Warning: Unexpected error: {type(e).__name__}: {str(e)}")
         print("In this scenario, system will use the default prompt.")
-        return "You are a helpful AI assistant"
+        return DEFAULT_PROMPT
 
 
 class LocalChatBot(Runnable):
-    def __init__(self, model_path:str):
+    def __init__(self, model_path:str, device: Optional[str] = None, dtype: Optional[str] = None,
+                 quantize: bool = False, num_threads: Optional[int] = None,
+                 quantized_checkpoint: Optional[str] = None,
+                 prefix_cache: Union[bool, PrefixKVCache] = True,
+                 session_memory_mb: float = 512,
+                 thinking_budgets: Optional[Dict[str, Optional[int]]] = None,
+                 backend: str = "transformers",
+                 model_file: Optional[str] = None,
+                 backend_options: Optional[Dict[str, Any]] = None,
+                 warmup: Union[bool, Sequence[int]] = False,
+                 torch_compile: bool = False,
+                 compile_cache_dir: Optional[str] = None,
+                 compile_max_length: int = DEFAULT_COMPILE_MAX_LENGTH):
+        """
+        Args:
+            model_path: Hugging Face model directory
+            device: "cuda", "mps" or "cpu"; detected when None
+            dtype: "auto", "bf16" or "fp32" (CPU defaults to fp32)
+            quantize: Dynamic int8 quantization of linear layers (CPU only)
+            num_threads: CPU threads used for inference (all available cores when None)
+            quantized_checkpoint: File caching the quantized model so startup skips quantization
+            prefix_cache: Reuse the prefilled system prompt across requests (True for a default
+                          PrefixKVCache, False to disable, or a configured PrefixKVCache)
+            session_memory_mb: KV cache budget of all chat sessions (see create_session)
+            thinking_budgets: Intent type -> most reasoning tokens in thinking mode
+                              (INTENT_THINKING_BUDGETS when None, see thinking_budget.py)
+            backend: "transformers", "llama_cpp" (GGUF file) or "onnxruntime" (ONNX export);
+                     prefix caching, sessions, continuous batching, speculative decoding and
+                     quantize need "transformers"
+            model_file: GGUF or ONNX file of the other backends (found in model_path when None)
+            backend_options: Passed to the llama_cpp or onnxruntime model (e.g. {"n_ctx": 8192})
+            warmup: Run dummy generations at load (True for WARMUP_PROMPT_LENGTHS, or the
+                    prompt token counts to warm up), see warm_up
+            torch_compile: Decode generate() requests with a static KV cache and a
+                           torch.compile'd forward pass (transformers backend; disables the
+                           prefix cache, see model_warmup.py)
+            compile_cache_dir: Directory keeping the compiled kernels across restarts
+            compile_max_length: Static KV cache length (prompt plus reply) of compiled decoding
+        """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model path not found: {model_path}")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        self.thinking = False
-        self.device = "cuda" # Not support mps or cpu on prototype, gonna to support this in next version
-        self.model = AutoModelForCausalLM.from_pretrained(
+        self.tokenizer, self.model, self.load_info = load_causal_lm(
             model_path,
-            torch_dtype="auto",
-            device_map=self.device
+            device=device,
+            dtype=dtype,
+            quantize=quantize,
+            num_threads=num_threads,
+            quantized_checkpoint=quantized_checkpoint,
+            backend=backend,
+            model_file=model_file,
+            backend_options=backend_options
         )
-    def _process_input(self, input_data: Union[str, Dict, List], enable_thinking:bool=False):
+        self.backend = self.load_info["backend"]
+        self.device = self.load_info["device"]
+        # Models loaded alongside (draft models) use the same settings
+        self._load_options = {"device": self.device, "dtype": dtype, "quantize": quantize, "num_threads": num_threads}
+        self.think_end_id = think_end_token_id(self.tokenizer)  # 151668 for Qwen3
+        self._last_streamer = None
+        self.prefix_cache = PrefixKVCache() if prefix_cache is True else (prefix_cache or None)
+        if self.backend != "transformers":
+            # llama.cpp reuses the KV cache of the common prompt prefix on its own
+            self.prefix_cache = None
+        self.sessions = SessionManager(self, max_memory_mb=session_memory_mb)
+        self.last_batch_stats = None
+        self.engine = None
+        self.async_engine = None  # Serves ainvoke/abatch/astream when engine is not enabled
+        self.speculative = None
+        self.thinking_budgets = dict(INTENT_THINKING_BUDGETS if thinking_budgets is None else thinking_budgets)
+        self._token_vocabulary = None  # Token bytes for function call grammars, built on first use
+        self._function_call_grammars = OrderedDict()   # function list key -> FunctionCallGrammar
+        self._grammar_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+
+        self._compile_kwargs = {}
+        if compile_cache_dir:
+            enable_compile_cache(compile_cache_dir)
+        if torch_compile:
+            self._require_transformers("torch_compile")
+            self._compile_kwargs = compile_generate_kwargs(self.device, compile_max_length)
+            # generate() allocates the static cache itself, it cannot start from a cached prefix
+            self.prefix_cache = None
+        self.warmup_stats = None
+        if warmup:
+            self.warm_up(WARMUP_PROMPT_LENGTHS if warmup is True else warmup)
+    def _to_messages(self, input_data: Union[str, Dict, List]) -> List[Any]:
         # Standard format of input process, make this function can handle multiple format of input
         # Support ChatPromptValue for now
         try:
 
             if isinstance(input_data, ChatPromptValue):
-                messages = input_data.to_messages()
+                # LangChain message objects to the role/content dicts of the chat template
+                messages = [{"role": MESSAGE_ROLES.get(message.type, message.type), "content": message.content}
+                            for message in input_data.to_messages()]
             elif isinstance(input_data, str):
                 messages = [{"role": "user", "content": input_data}]
             elif isinstance(input_data, dict):
@@ -144,62 +211,251 @@ class LocalChatBot(Runnable):
                 messages = input_data
             else:
                 raise ValueError(f"Unsupported input type: {type(input_data)}")
+        return messages
+    def _tokenize(self, input_data: Any, enable_thinking: bool = False):
+        """
+        Token ids of a request and the length of its cacheable system prompt prefix
 
-        # Now it is time to convert the user input into query
+        Returns:
+            tuple: (token ids, prefix length); the prefix length is 0 without a system
+                   prompt or when prefix caching is disabled
+        """
+        messages = self._to_messages(input_data)
         text = self.tokenizer.apply_chat_template(
             messages,
             tokenize=False,
             add_generation_prompt=True,
             enable_thinking=enable_thinking
         )
-        return text
-    def _parse_output(self, output_ids, input_length):
-        """Parse model output to extract thinking and content."""
-        # Get only the newly generated tokens
-        new_tokens = output_ids[0][input_length:].tolist()
-
-        # Parse thinking content if enabled
-        try:
-            # Look for </think> token, cause think chain will be covered with <think> in qwen series model
-            index = len(new_tokens) - new_tokens[::-1].index(151668)
-        except ValueError:
-            index = 0
-
-        if self.thinking:
-            thinking = self.tokenizer.decode(new_tokens[:index], skip_special_tokens=True).strip("\n")
-        else:
-            thinking = ""
-
-        content = self.tokenizer.decode(new_tokens[index:], skip_special_tokens=True).strip("\n")
+        system_messages = system_prefix_messages(messages) if self.prefix_cache is not None else None
+        if system_messages is None:
+            return self.tokenizer(text)["input_ids"], 0
+        # Registered prompts (load_prompt) are rendered and tokenized once per tokenizer
+        prefix_text, prefix_ids = default_registry().chat_prefix(self.tokenizer, system_messages[0]["content"])
+        return split_prefix(self.tokenizer, text, prefix_text, prefix_ids)
+    def _build_inputs(self, rows: List[List[int]], prefix_length: int = 0) -> Dict[str, Any]:
+        """
+        generate() inputs for token rows sharing their first prefix_length tokens
 
-        return thinking, content
+        The part after the prefix is left-padded, so the cached prefix keeps the same
+        positions in every row; position ids follow the attention mask and skip the padding.
+        """
+        pad_token_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        width = max(len(row) for row in rows)
+        input_ids, attention_mask = [], []
+        for row in rows:
+            padding = width - len(row)
+            input_ids.append(row[:prefix_length] + [pad_token_id] * padding + row[prefix_length:])
+            attention_mask.append([1] * prefix_length + [0] * padding + [1] * (len(row) - prefix_length))
+        model_inputs = {
+            "input_ids": torch.tensor(input_ids, device=self.model.device),
+            "attention_mask": torch.tensor(attention_mask, device=self.model.device)
+        }
+        if prefix_length:
+            model_inputs["past_key_values"] = self.prefix_cache.get(self.model, rows[0][:prefix_length], batch_size=len(rows))
+        return model_inputs
     def invoke(
         self,
         data_input: Any,  # noqa: A002
         config: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> Dict[str, Any]:
-        config = config or {} # Make this function work even there is no augment passed from calling
+        """
+        Generate a reply
+
+        Args:
+            data_input: Text, {"messages": [...]}, a message list or a ChatPromptValue
+            config: thinking, max_tokens; thinking_budget (most reasoning tokens) or intent
+                    (budget from self.thinking_budgets); do_sample, temperature, top_k, top_p
+                    override the model's generation config for this call; logprobs adds the
+                    mean log-probability of the generated tokens under this model;
+                    function_call (True or registry function names) constrains the reply to
+                    one call of those functions (see function_call_grammar.py), decoded with
+                    generate() even when continuous batching or speculative decoding is enabled
+
+        Returns:
+            dict: thinking and content (plus mean_logprob and new_tokens with logprobs)
+        """
+        config = generation_options(config) # Make this function work even there is no augment passed from calling
         thinking = config.get("thinking", False)
         max_tokens = config.get("max_tokens", 512) # Ofcourse we don't need too much tokens for output
-        uquery = self._process_input(data_input, thinking)
-        model_inputs = self.tokenizer([uquery], return_tensors="pt").to(self.model.device)
-        with torch.no_grad():
-            generated_ids = self.model.generate(
-                **model_inputs,
-                max_new_tokens=max_tokens,
-                use_cache=True
-            )
-        output_ids = generated_ids[0][len(model_inputs.input_ids[0]):].tolist()
+        overrides = {key: config[key] for key in SAMPLING_KEYS if key in config}
+        thinking_budget = resolve_thinking_budget(config, self.thinking_budgets)
+        grammar = self._function_call_grammar(config["function_call"]) if config.get("function_call") else None
+        logprobs = None
+        ids, prefix_length = self._tokenize(data_input, thinking)
+        if self.engine is not None and grammar is None:
+            # Decoded together with concurrent requests, sampling as model.generate would
+            output_ids = self._submit(ids, prefix_length, config).result()
+        elif self.speculative is not None and grammar is None:
+            output_ids = self.speculative.generate(ids, max_tokens, prefix_length, {**self._sampling_config(), **overrides},
+                                                   thinking_budget=thinking_budget, think_end_id=self.think_end_id)
+        else:
+            model_inputs = self._build_inputs([ids], prefix_length)
+            prompt_width = model_inputs["input_ids"].shape[1]
+            generate_kwargs = thinking_budget_kwargs(thinking_budget, self.think_end_id, prompt_width)
+            if grammar is not None:
+                generate_kwargs.setdefault("logits_processor", LogitsProcessorList()).append(FunctionCallProcessor(
+                    grammar, self._eos_token_ids(), prompt_width, self.think_end_id if thinking else None))
+            with torch.no_grad():
+                generated = self.model.generate(
+                    **model_inputs,
+                    max_new_tokens=max_tokens,
+                    use_cache=True,
+                    output_logits=bool(config.get("logprobs")),
+                    return_dict_in_generate=True,
+                    **generate_kwargs,
+                    **self._compile_kwargs,
+                    **overrides
+                )
+            output_ids = generated.sequences[0][len(model_inputs["input_ids"][0]):].tolist()
+            if config.get("logprobs"):
+                logprobs = self._token_logprobs(torch.stack(generated.logits, dim=1)[0], output_ids)
+        return self._reply(ids, output_ids, prefix_length, config, logprobs)
+
+    def _reply(self, ids: List[int], output_ids: List[int], prefix_length: int, config: Dict[str, Any],
+               logprobs: Optional[torch.Tensor] = None) -> Dict[str, Any]:
+        """invoke() result for the tokens generated after the prompt ids"""
         try:
-            index = len(output_ids) - output_ids[::-1].index(151668) # 151668 is the token id for </think>
+            index = len(output_ids) - output_ids[::-1].index(self.think_end_id) # token id of </think>
         except ValueError: # If thinking module is not enabled, use this to handle the error
             index = 0
         thinking_content = self.tokenizer.decode(output_ids[:index], skip_special_tokens=True).strip("\n")
         content = self.tokenizer.decode(output_ids[index:], skip_special_tokens=True).strip("\n")
         result = {"thinking": thinking_content, "content": content}
+        if config.get("logprobs"):
+            if logprobs is None:
+                logprobs = self._score(ids, output_ids, prefix_length)
+            result["mean_logprob"] = float(logprobs.mean()) if len(output_ids) else 0.0
+            result["new_tokens"] = len(output_ids)
         return result
 
+    async def ainvoke(
+        self,
+        data_input: Any,  # noqa: A002
+        config: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        Async version of invoke() that does not hold a thread while it waits
+
+        The request is queued on the generation worker, which decodes all concurrent awaits
+        in one batch: the continuous batching engine when enable_continuous_batching was
+        called (shared with sync invoke and batch calls), otherwise a separate engine for
+        async callers started by the first async call, so sync calls keep decoding with
+        generate(). Constrained replies (function_call), the llama_cpp and onnxruntime
+        backends and speculative decoding without the engine run invoke() in the default
+        executor instead.
+
+        Args:
+            data_input: As for invoke
+            config: As for invoke
+
+        Returns:
+            dict: As for invoke
+        """
+        config = generation_options(config)
+        loop = asyncio.get_running_loop()
+        worker = None if config.get("function_call") else self._generation_worker()
+        if worker is None:
+            return await loop.run_in_executor(None, functools.partial(self.invoke, data_input, config))
+        ids, prefix_length = self._tokenize(data_input, config.get("thinking", False))
+        output_ids = await asyncio.wrap_future(self._submit(ids, prefix_length, config, engine=worker))
+        if config.get("logprobs"):
+            # Scoring is a forward pass, kept off the event loop
+            return await loop.run_in_executor(None, self._reply, ids, output_ids, prefix_length, config)
+        return self._reply(ids, output_ids, prefix_length, config)
+
+    def _submit(self, ids: List[int], prefix_length: int, config: Dict[str, Any], on_token=None,
+                engine: Optional[ContinuousBatchingEngine] = None) -> Future:
+        """Queue a request on a continuous batching engine (self.engine if None), sampling as model.generate would"""
+        overrides = {key: config[key] for key in SAMPLING_KEYS if key in config}
+        return (engine or self.engine).submit(ids, config.get("max_tokens", 512), prefix_length,
+                                  {**self._sampling_config(), **overrides},
+                                  thinking_budget=resolve_thinking_budget(config, self.thinking_budgets),
+                                  think_end_id=self.think_end_id, on_token=on_token)
+
+    def _generation_worker(self) -> Optional[ContinuousBatchingEngine]:
+        """
+        Engine serving ainvoke, abatch and astream: the engine of enable_continuous_batching,
+        or else async_engine, started on first use (None when only generate() can drive the
+        model: other backends, speculative decoding)
+        """
+        with self._worker_lock:
+            if self.engine is not None:
+                return self.engine
+            if self.backend != "transformers" or self.speculative is not None:
+                return None
+            if self.async_engine is None:
+                self.async_engine = ContinuousBatchingEngine(self.model, self._eos_token_ids(),
+                                                             prefix_cache=self.prefix_cache)
+            return self.async_engine
+
+    def extract_function_call(self, user_query: str, functions: Union[bool, List[str]] = True,
+                              config: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Function call for a user request, decoded under the registry grammar
+
+        Args:
+            user_query: User request, e.g. "把空调调到22度"
+            functions: Registry function names the call may use (True: all of registry.json)
+            config: invoke config (max_tokens, thinking, ...)
+
+        Returns:
+            tuple: (function_name, arguments) for function_calling_interface.call_function
+
+        Raises:
+            ValueError: If the reply is not a complete call (e.g. cut off by max_tokens)
+        """
+        grammar = self._function_call_grammar(functions)
+        selected = [function for function in registry_functions() if function["name"] in grammar.functions]
+        messages = [{"role": "system", "content": function_call_prompt(selected)},
+                    {"role": "user", "content": user_query}]
+        reply = self.invoke({"messages": messages}, {"max_tokens": 256, **(config or {}), "function_call": functions})
+        return grammar.parse(reply["content"])
+
+    def _function_call_grammar(self, functions: Union[bool, List[str]]) -> FunctionCallGrammar:
+        """Grammar for registry functions (True: all), given as module_name.function_name or function_name"""
+        available = registry_functions()
+        if functions is not True:
+            names = set(functions)
+            available = [function for function in available
+                         if function["name"] in names or function["name"].split(".", 1)[-1] in names]
+            if not available:
+                raise ValueError(f"No registry function among {sorted(names)}")
+        # Keyed by the parameter lists too, so an edited registry compiles a new grammar
+        key = tuple((function["name"], repr(function["parameters"])) for function in available)
+        with self._grammar_lock:
+            grammar = self._function_call_grammars.get(key)
+            if grammar is None:
+                if self._token_vocabulary is None:
+                    self._token_vocabulary = TokenVocabulary(self.tokenizer)
+                grammar = FunctionCallGrammar(available, self._token_vocabulary)
+                self._function_call_grammars[key] = grammar
+            self._function_call_grammars.move_to_end(key)
+            while len(self._function_call_grammars) > FUNCTION_CALL_GRAMMAR_CACHE_SIZE:
+                self._function_call_grammars.popitem(last=False)
+        return grammar
+
+    @staticmethod
+    def _token_logprobs(logits: torch.Tensor, tokens: List[int]) -> torch.Tensor:
+        """Log-probability of each token under the logits of its position"""
+        logits = logits[:len(tokens)].float()
+        return torch.log_softmax(logits, dim=-1)[torch.arange(len(tokens)), torch.tensor(tokens, device=logits.device)]
+
+    def _score(self, ids: List[int], output_ids: List[int], prefix_length: int = 0) -> torch.Tensor:
+        """Log-probabilities of output_ids after the prompt ids, from one forward pass"""
+        model_inputs = self._build_inputs([ids + output_ids], prefix_length)
+        if prefix_length:
+            # Unlike generate(), a forward pass does not skip the tokens already in the cache:
+            # feed only the suffix, the attention mask keeps covering prefix plus suffix
+            model_inputs["input_ids"] = model_inputs["input_ids"][:, prefix_length:]
+        with torch.no_grad():
+            logits = self.model(**model_inputs, use_cache=True).logits[0]
+        # Logits at position i predict token i + 1; the cached prefix is not in the output
+        start = len(ids) - prefix_length - 1
+        return self._token_logprobs(logits[start:start + len(output_ids)], output_ids)
+
     def batch(self, inputs: List[Any], config: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Process multiple inputs in batch mode for improved efficiency.
@@ -207,9 +463,12 @@ class LocalChatBot(Runnable):
         Args:
             inputs: List of input data (strings, dicts, or lists)
             config: Optional configuration dictionary with batch-specific settings
+                    (thinking, max_tokens, thinking_budget or intent, batch_size, length_bucketing,
+                    max_padding_ratio)
 
         Returns:
-            List of dictionaries containing thinking and content for each input
+            List of dictionaries containing thinking and content for each input, in input order.
+            Padding and throughput of the call are kept in self.last_batch_stats.
         """
         if not inputs:
             return []
@@ -218,117 +477,539 @@ class LocalChatBot(Runnable):
         if not isinstance(inputs, list):
             raise ValueError("Inputs must be a list")
 
-        config = config or {}
+        config = generation_options(config)
         thinking = config.get("thinking", False)
         max_tokens = config.get("max_tokens", 512)
         batch_size = config.get("batch_size", len(inputs))  # Process all at once by default
+        thinking_budget = resolve_thinking_budget(config, self.thinking_budgets)
 
         # Ensure batch_size is reasonable
         batch_size = max(1, min(batch_size, len(inputs)))
 
-        results = []
-
-        # Process inputs in batches to manage memory usage
-        for i in range(0, len(inputs), batch_size):
-            batch_inputs = inputs[i:i + batch_size]
-            batch_results = []
+        results = [None] * len(inputs)
 
+        # Tokenize each input; an input that cannot be formatted only fails itself
+        encoded = {}
+        for j, input_data in enumerate(inputs):
             try:
-                # Process each input in the current batch using list comprehension
-                processed_texts = [
-                    self._process_input(input_data, thinking)
-                    for input_data in batch_inputs
-                ]
-
-                # Tokenize all inputs in the batch
-                model_inputs = self.tokenizer(
-                    processed_texts,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=2048  # Add explicit max_length to prevent warnings
-                ).to(self.model.device)
-
-                # Ensure pad_token_id is set properly
-                if self.tokenizer.pad_token_id is None:
-                    self.tokenizer.pad_token_id = self.tokenizer.eos_token_id
-
-                # Generate responses for the entire batch
-                with torch.no_grad():
-                    generated_ids = self.model.generate(
-                        input_ids=model_inputs.input_ids,
-                        attention_mask=model_inputs.attention_mask,
-                        max_new_tokens=max_tokens,
-                        use_cache=True,
-                        pad_token_id=self.tokenizer.pad_token_id,
-                        do_sample=False,  # Use greedy decoding for consistency
-                        eos_token_id=self.tokenizer.eos_token_id
-                    )
-
-                # Process outputs for each item in the batch
-                for j, input_data in enumerate(batch_inputs):
-                    try:
-                        # Get the actual input length for this specific sequence (excluding padding)
-                        attention_mask = model_inputs.attention_mask[j]
-                        input_length = attention_mask.sum().item()  # Count non-padded tokens
-                        output_ids = generated_ids[j]
-
-                        # Extract only the newly generated tokens
-                        new_tokens = output_ids[input_length:].tolist()
-
-                        # Parse thinking content if enabled
-                        thinking_index = 0
-                        try:
-                            # Look for </think> token (151668 for Qwen models)
-                            thinking_index = len(new_tokens) - new_tokens[::-1].index(151668)
-                        except ValueError:
-                            thinking_index = 0
-
-                        if thinking:
-                            thinking_content = self.tokenizer.decode(
-                                new_tokens[:thinking_index], skip_special_tokens=True
-                            ).strip()
-                        else:
-                            thinking_content = ""
-
-                        content = self.tokenizer.decode(
-                            new_tokens[thinking_index:], skip_special_tokens=True
-                        ).strip()
-
-                        batch_results.append({
-                            "thinking": thinking_content,
-                            "content": content
-                        })
-
-                    except Exception as e:
-                        # Handle individual item processing errors
-                        batch_results.append({
+                ids, prefix_length = self._tokenize(input_data, thinking)
+                # Truncated on the right as the tokenizer's truncation=True, max_length=2048 did;
+                # the prefix is only cached when something follows it
+                ids = ids[:BATCH_MAX_PROMPT_TOKENS]
+                encoded[j] = (ids, prefix_length if prefix_length < len(ids) else 0)
+            except Exception as e:
+                results[j] = {"thinking": "", "content": f"Item processing error: {str(e)}"}
+
+        # Ensure pad_token_id is set properly
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token_id = self.tokenizer.eos_token_id
+
+        stats = {"batches": 0, "prompt_tokens": 0, "padding_tokens": 0, "new_tokens": 0}
+        start = time.perf_counter()
+
+        # Process inputs in batches to manage memory usage
+        if self.engine is not None:
+            # Continuous batching: every input is scheduled on its own, no padding
+            # Greedy as the generate() branch, keeping the model's repetition penalty
+            sampling = dict(self._sampling_config(), do_sample=False)
+            futures = {j: self.engine.submit(ids, max_tokens, prefix_length, sampling, thinking_budget=thinking_budget,
+                                             think_end_id=self.think_end_id)
+                       for j, (ids, prefix_length) in encoded.items()}
+            if futures:
+                # The engine run counts as one batch
+                stats["batches"] += 1
+            for j, future in futures.items():
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = e
+                self._engine_batch_reply(results, stats, encoded[j], j, outcome, thinking)
+        else:
+            batches = self._plan_batches(encoded, batch_size, config.get("length_bucketing", True),
+                                         config.get("max_padding_ratio", 0.25))
+            for indices in batches:
+                prefix_length = encoded[indices[0]][1]
+                try:
+                    model_inputs = self._build_inputs([encoded[j][0] for j in indices], prefix_length)
+
+                    # Generate responses for the entire batch
+                    with torch.no_grad():
+                        generated_ids = self.model.generate(
+                            **model_inputs,
+                            max_new_tokens=max_tokens,
+                            use_cache=True,
+                            pad_token_id=self.tokenizer.pad_token_id,
+                            do_sample=False,  # Use greedy decoding for consistency
+                            eos_token_id=self.tokenizer.eos_token_id,
+                            **thinking_budget_kwargs(thinking_budget, self.think_end_id, model_inputs["input_ids"].shape[1]),
+                            **self._compile_kwargs
+                        )
+
+                    # Every row is left-padded to the same width, new tokens start after it
+                    input_width = model_inputs["input_ids"].shape[1]
+                    rows = len(indices)
+                    real_tokens = sum(len(encoded[j][0]) - prefix_length for j in indices)
+                    stats["batches"] += 1
+                    stats["prompt_tokens"] += real_tokens
+                    stats["padding_tokens"] += rows * (input_width - prefix_length) - real_tokens
+
+                    # Process outputs for each item in the batch
+                    for row, j in enumerate(indices):
+                        new_tokens = generated_ids[row][input_width:].tolist()
+                        stats["new_tokens"] += sum(1 for token in new_tokens if token != self.tokenizer.pad_token_id)
+                        results[j] = self._batch_reply(new_tokens, thinking)
+
+                except Exception as e:
+                    # Handle batch-level errors gracefully - create error responses for the batch
+                    error_message = f"Batch processing error: {str(e)}"
+                    for j in indices:
+                        results[j] = {
                             "thinking": "",
-                            "content": f"Item processing error: {str(e)}"
-                        })
+                            "content": error_message
+                        }
 
-            except Exception as e:
-                # Handle batch-level errors gracefully - create error responses for the batch
-                error_message = f"Batch processing error: {str(e)}"
-                batch_results = [
-                    {
-                        "thinking": "",
-                        "content": error_message
-                    }
-                    for _ in batch_inputs
-                ]
-
-            results.extend(batch_results)
+        self._finish_batch_stats(stats, start)
+        return results
+
+    async def abatch(self, inputs: List[Any], config: Union[Dict[str, Any], List[Dict[str, Any]], None] = None,
+                     **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Async version of batch()
+
+        Every input is queued on the generation worker (see ainvoke) and decoded with greedy
+        decoding, together with the requests of concurrent callers; the coroutine waits for
+        all of them without holding a thread.
 
+        Args:
+            inputs: List of input data (strings, dicts, or lists)
+            config: thinking, max_tokens, thinking_budget or intent for all inputs, or one
+                    config per input (as LangChain passes them)
+
+        Returns:
+            List of dictionaries containing thinking and content for each input, in input order.
+            Throughput of the call is kept in self.last_batch_stats.
+        """
+        if not inputs:
+            return []
+        if not isinstance(inputs, list):
+            raise ValueError("Inputs must be a list")
+        configs = ([generation_options(item) for item in config] if isinstance(config, list)
+                   else [generation_options(config)] * len(inputs))
+        worker = self._generation_worker()
+        if worker is None:
+            loop = asyncio.get_running_loop()
+            if not isinstance(config, list):
+                return await loop.run_in_executor(None, self.batch, inputs, configs[0])
+            replies = await asyncio.gather(*(loop.run_in_executor(None, self.batch, [input_data], item_config)
+                                             for input_data, item_config in zip(inputs, configs)))
+            return [reply[0] for reply in replies]
+
+        results = [None] * len(inputs)
+        stats = {"batches": 0, "prompt_tokens": 0, "padding_tokens": 0, "new_tokens": 0}
+        start = time.perf_counter()
+        sampling = dict(self._sampling_config(), do_sample=False)  # As batch()
+        encoded, futures = {}, {}
+        for j, (input_data, item_config) in enumerate(zip(inputs, configs)):
+            try:
+                encoded[j] = self._tokenize(input_data, item_config.get("thinking", False))
+            except Exception as e:
+                results[j] = {"thinking": "", "content": f"Item processing error: {str(e)}"}
+                continue
+            ids, prefix_length = encoded[j]
+            futures[j] = worker.submit(ids, item_config.get("max_tokens", 512), prefix_length, sampling,
+                                       thinking_budget=resolve_thinking_budget(item_config, self.thinking_budgets),
+                                       think_end_id=self.think_end_id)
+        outcomes = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures.values()),
+                                        return_exceptions=True)
+        for j, outcome in zip(futures, outcomes):
+            self._engine_batch_reply(results, stats, encoded[j], j, outcome, configs[j].get("thinking", False))
+        self._finish_batch_stats(stats, start)
         return results
 
+    def _engine_batch_reply(self, results: List[Any], stats: Dict[str, Any], encoded: Tuple[List[int], int],
+                            j: int, outcome: Union[List[int], BaseException], thinking: bool):
+        """Store the reply (or error) of batch input j decoded by the continuous batching engine"""
+        if isinstance(outcome, BaseException):
+            results[j] = {"thinking": "", "content": f"Batch processing error: {str(outcome)}"}
+            return
+        ids, prefix_length = encoded
+        stats["prompt_tokens"] += len(ids) - prefix_length
+        stats["new_tokens"] += len(outcome)
+        results[j] = self._batch_reply(outcome, thinking)
+
+    def _finish_batch_stats(self, stats: Dict[str, Any], start: float):
+        """Padding ratio and throughput of a batch call, kept in self.last_batch_stats"""
+        elapsed = time.perf_counter() - start
+        processed = stats["prompt_tokens"] + stats["padding_tokens"]
+        stats["padding_ratio"] = stats["padding_tokens"] / processed if processed else 0.0
+        stats["seconds"] = elapsed
+        stats["tokens_per_second"] = stats["new_tokens"] / elapsed if elapsed > 0 else 0.0
+        self.last_batch_stats = stats
+
+    def _batch_reply(self, new_tokens: List[int], thinking: bool) -> Dict[str, str]:
+        """Split the generated tokens of one batch item into thinking and content"""
+        try:
+            # Parse thinking content if enabled
+            thinking_index = 0
+            try:
+                # Look for </think> token (151668 for Qwen models)
+                thinking_index = len(new_tokens) - new_tokens[::-1].index(self.think_end_id)
+            except ValueError:
+                thinking_index = 0
+
+            if thinking:
+                thinking_content = self.tokenizer.decode(
+                    new_tokens[:thinking_index], skip_special_tokens=True
+                ).strip()
+            else:
+                thinking_content = ""
+
+            content = self.tokenizer.decode(
+                new_tokens[thinking_index:], skip_special_tokens=True
+            ).strip()
+
+            return {
+                "thinking": thinking_content,
+                "content": content
+            }
+
+        except Exception as e:
+            # Handle individual item processing errors
+            return {
+                "thinking": "",
+                "content": f"Item processing error: {str(e)}"
+            }
+
+    @staticmethod
+    def _plan_batches(encoded: Dict[int, Any], batch_size: int, length_bucketing: bool = True,
+                      max_padding_ratio: float = 0.25) -> List[List[int]]:
+        """
+        Group input indices into generate() batches
+
+        Rows of a batch share their cached system prompt prefix. With length bucketing the
+        inputs are sorted by prefix and length, and a batch is closed before its padding
+        would exceed max_padding_ratio of its tokens, so a single long prompt does not pad
+        every other row; otherwise batches follow the arrival order in slices of batch_size.
+
+        Args:
+            encoded: Input index -> (token ids, prefix length)
+            batch_size: Maximum rows per batch
+            length_bucketing: Sort into length buckets instead of keeping arrival order
+            max_padding_ratio: Largest share of padding tokens in a bucketed batch
+
+        Returns:
+            list: Index lists, one per batch
+        """
+        def prefix_of(j):
+            ids, prefix_length = encoded[j]
+            return tuple(ids[:prefix_length])
+
+        order = sorted(encoded)
+        if length_bucketing:
+            order.sort(key=lambda j: (prefix_of(j), len(encoded[j][0])))
+            slices = [order]
+        else:
+            slices = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+        batches = []
+        for indices in slices:
+            groups = {}
+            for j in indices:
+                groups.setdefault(prefix_of(j), []).append(j)
+            for group in groups.values():
+                if not length_bucketing:
+                    batches.extend(group[i:i + batch_size] for i in range(0, len(group), batch_size))
+                    continue
+                # Lengths ascend within the group, so the newest row sets the batch width
+                current, lengths = [], 0
+                for j in group:
+                    length = len(encoded[j][0]) - len(prefix_of(j))
+                    width = length * (len(current) + 1)
+                    if current and (len(current) == batch_size or (width - lengths - length) > max_padding_ratio * width):
+                        batches.append(current)
+                        current, lengths = [], 0
+                    current.append(j)
+                    lengths += length
+                batches.append(current)
+        return batches
+
+    def _start_stream(self, data_input: Any, config: Optional[Dict[str, Any]] = None):
+        """Tokenize the input and start generating in a background thread"""
+        config = generation_options(config)
+        thinking = config.get("thinking", False)
+        max_tokens = config.get("max_tokens", 512)
+        ids, prefix_length = self._tokenize(data_input, thinking)
+        model_inputs = self._build_inputs([ids], prefix_length)
+        streamer = start_generation(
+            self.model,
+            self.tokenizer,
+            model_inputs,
+            thinking=thinking,
+            think_end_id=self.think_end_id,
+            timeout=config.get("stream_timeout"),
+            max_new_tokens=max_tokens,
+            use_cache=True,
+            **thinking_budget_kwargs(resolve_thinking_budget(config, self.thinking_budgets), self.think_end_id,
+                                     model_inputs["input_ids"].shape[1]),
+            **self._compile_kwargs
+        )
+        self._last_streamer = streamer
+        return streamer
+
     def stream(
         self,
         data_input: Any,  # noqa: A002
         config: Optional[Dict[str, Any]] = None,
         **kwargs: Optional[Any],
     ) -> Any:
-        result = self.invoke(data_input, config, **kwargs)
-        if result["thinking"]:
-            yield {"thinking": result["thinking"], "content": ""}
-        yield {"thinking": "", "content": result["content"]}
+        """
+        Yield the reply token by token as {"thinking": str, "content": str} chunks.
+
+        Reasoning text arrives in "thinking" until the </think> token is generated, the
+        answer in "content". Timing of the last stream: get_stream_stats().
+        """
+        yield from self._start_stream(data_input, config)
+
+    async def astream(
+        self,
+        data_input: Any,  # noqa: A002
+        config: Optional[Dict[str, Any]] = None,
+        **kwargs: Optional[Any],
+    ) -> Any:
+        """
+        Async version of stream(), decoded by the generation worker (see ainvoke)
+
+        The reply is decoded in the same batch as concurrent requests and its chunks are
+        handed to the event loop as they arrive; leaving the loop early ends the sequence at
+        its next token. Models without the worker stream from generate() in a background thread.
+        """
+        worker = self._generation_worker()
+        if worker is None:
+            streamer = self._start_stream(data_input, config)
+        else:
+            streamer = self._start_worker_stream(worker, data_input, generation_options(config))
+        async for chunk in streamer:
+            yield chunk
+
+    def _start_worker_stream(self, worker: ContinuousBatchingEngine, data_input: Any,
+                             config: Dict[str, Any]) -> ThinkingStreamer:
+        """Queue a streamed request on the generation worker (called from the event loop)"""
+        thinking = config.get("thinking", False)
+        ids, prefix_length = self._tokenize(data_input, thinking)
+        streamer = ThinkingStreamer(self.tokenizer, thinking=thinking, think_end_id=self.think_end_id,
+                                    timeout=config.get("stream_timeout"), loop=asyncio.get_running_loop())
+        streamer.put(torch.tensor([ids]))  # The prompt, skipped as from generate()
+
+        def on_token(token: int) -> bool:
+            streamer.put(torch.tensor([token]))
+            return streamer.cancelled.is_set()
+
+        def finish(done: Future):
+            error = RuntimeError("The streamed request was cancelled") if done.cancelled() else done.exception()
+            if error is not None:
+                streamer.fail(error)
+            else:
+                streamer.end()
+
+        self._submit(ids, prefix_length, config, on_token, engine=worker).add_done_callback(finish)
+        self._last_streamer = streamer
+        return streamer
+
+    def get_stream_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Timing of the most recent stream
+
+        Returns:
+            dict: ttft_ms, first_content_ms, total_ms, tokens, tokens_per_second (None before any stream)
+        """
+        return self._last_streamer.get_stats() if self._last_streamer else None
+
+    def get_prefix_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        System prompt prefix cache counters
+
+        Returns:
+            dict: hits, misses, evictions, saved_prefill_ms, entries, cached_tokens (None when disabled)
+        """
+        return self.prefix_cache.get_stats() if self.prefix_cache is not None else None
+
+    def create_session(self, system_prompt: Optional[str] = None, session_id: Optional[str] = None) -> ChatSession:
+        """
+        Start a multi-turn conversation that keeps its KV cache between turns
+
+        Args:
+            system_prompt: System prompt, e.g. load_prompt("daily_chat")
+            session_id: Identifier (generated when None); an existing session with it is replaced
+
+        Returns:
+            ChatSession: call session.invoke(user_text, config) for each turn
+        """
+        self._require_transformers("Chat sessions")
+        return self.sessions.create(system_prompt=system_prompt, session_id=session_id)
+
+    def get_session(self, session_id: str) -> Optional[ChatSession]:
+        """Look up a session created by create_session"""
+        return self.sessions.get(session_id)
+
+    def close_session(self, session_id: str) -> bool:
+        """End a session and release its KV cache"""
+        return self.sessions.close(session_id)
+
+    def get_session_stats(self) -> Dict[str, Any]:
+        """
+        Session counters
+
+        Returns:
+            dict: sessions, cached_sessions, kv_mb, evictions, reprefills, closed
+        """
+        return self.sessions.get_stats()
+
+    def warm_up(self, prompt_lengths: Sequence[int] = WARMUP_PROMPT_LENGTHS, max_tokens: int = 8,
+                system_prompts: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Run short dummy generations so the first request does not pay for lazy initialization
+
+        Kernel selection for each prompt length, allocator growth, prefilling the system
+        prompts into the prefix cache and, with torch_compile, compiling the decode step
+        happen here instead of in the first user request.
+
+        Args:
+            prompt_lengths: Prompt token counts of the dummy generations (clipped to what the
+                            static cache of torch_compile or the model's context holds)
+            max_tokens: Tokens generated per dummy generation
+            system_prompts: System prompts of the dummy requests (the daily_chat prompt when None)
+
+        Returns:
+            dict: prompt_lengths, system_prompts, seconds (per generation), total_seconds and
+                  compiled; also kept in self.warmup_stats
+        """
+        limits = [getattr(getattr(self.model, "config", None), "max_position_embeddings", None)]
+        if self._compile_kwargs:
+            limits.append(self._compile_kwargs["max_cache_len"])
+        limits = [limit for limit in limits if limit]
+        # Leave room for the chat template, the system prompt and the reply
+        max_prompt_tokens = min(limits) - max_tokens - 64 if limits else None
+
+        def generate(prompt: str, system_prompt: Optional[str]):
+            messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+            return self.invoke({"messages": messages + [{"role": "user", "content": prompt}]}, {"max_tokens": max_tokens})
+
+        stats = run_warmup(generate, self.tokenizer, prompt_lengths, max_prompt_tokens,
+                           [load_prompt("daily_chat")] if system_prompts is None else system_prompts)
+        stats["compiled"] = bool(self._compile_kwargs)
+        self.warmup_stats = stats
+        return stats
+
+    def _sampling_config(self) -> Dict[str, Any]:
+        """Sampling settings of the model's generation config (used by generate() in invoke)"""
+        generation_config = self.model.generation_config
+        return {
+            "do_sample": bool(getattr(generation_config, "do_sample", False)),
+            "temperature": getattr(generation_config, "temperature", None),
+            "top_k": getattr(generation_config, "top_k", None),
+            "top_p": getattr(generation_config, "top_p", None),
+            "repetition_penalty": getattr(generation_config, "repetition_penalty", None),
+        }
+
+    def _eos_token_ids(self) -> List[int]:
+        eos_token_ids = self.model.generation_config.eos_token_id
+        if eos_token_ids is None:
+            eos_token_ids = self.tokenizer.eos_token_id
+        if not isinstance(eos_token_ids, (list, tuple)):
+            eos_token_ids = [eos_token_ids]
+        return list(eos_token_ids)
+
+    def _require_transformers(self, feature: str):
+        """Features that drive the model's forward pass and KV cache directly"""
+        if self.backend != "transformers":
+            raise ValueError(f"{feature} requires the transformers backend (this model runs on {self.backend})")
+
+    def enable_continuous_batching(self, max_batch_size: int = 8) -> ContinuousBatchingEngine:
+        """
+        Serve invoke and batch from a continuous batching engine
+
+        Concurrent invoke calls (e.g. from several threads) and the inputs of a batch call
+        are decoded together; each sequence leaves the batch as soon as it is finished and
+        waiting requests join at the next decode step. Async callers share the engine (the
+        async_engine they may have started is stopped). stream and sessions keep using generate().
+
+        Args:
+            max_batch_size: Maximum number of sequences decoded together
+
+        Returns:
+            ContinuousBatchingEngine: The running engine (get_stats() for counters)
+        """
+        self._require_transformers("Continuous batching")
+        self.disable_continuous_batching()
+        self.engine = ContinuousBatchingEngine(self.model, self._eos_token_ids(), max_batch_size=max_batch_size,
+                                               prefix_cache=self.prefix_cache)
+        return self.engine
+
+    def disable_continuous_batching(self):
+        """Stop the continuous batching engine and the async callers' engine, going back to generate()"""
+        with self._worker_lock:
+            for engine in (self.engine, self.async_engine):
+                if engine is not None:
+                    engine.close()
+            self.engine = None
+            self.async_engine = None
+
+    def enable_speculative_decoding(self, draft_model: Union[str, torch.nn.Module] = "Qwen3-0.6B",
+                                    num_speculative_tokens: int = 4, adaptive: bool = True,
+                                    min_acceptance: float = 0.3, warmup_tokens: int = 8,
+                                    quantized_checkpoint: Optional[str] = None) -> SpeculativeDecoder:
+        """
+        Decode invoke requests with a small draft model verified by this model
+
+        The draft model is loaded like this model (same device, dtype and quantization, with
+        its lm_head quantized as well) and must share its tokenizer, e.g. Qwen3-0.6B for Qwen3-1.7B or Qwen3-4B. batch, stream
+        and sessions keep using generate(); the continuous batching engine takes precedence
+        when both are enabled. Speculative decoding does not apply repetition_penalty.
+
+        Args:
+            draft_model: model2file.json name, model directory or an already loaded model
+            num_speculative_tokens: Tokens proposed by the draft per step
+            adaptive: Adjust the proposals per step to the acceptance
+            min_acceptance: Acceptance rate below which a generation stops drafting
+            warmup_tokens: Proposals made before the acceptance rate is judged
+            quantized_checkpoint: File caching the quantized draft model (with quantize=True)
+
+        Returns:
+            SpeculativeDecoder: The decoder (get_stats() for acceptance and speed)
+        """
+        self._require_transformers("Speculative decoding")
+        if isinstance(draft_model, str):
+            draft_path = resolve_model_path(draft_model)
+            draft_tokenizer, draft_model, _ = load_causal_lm(
+                draft_path, quantized_checkpoint=quantized_checkpoint, **self._load_options)
+            if draft_tokenizer.get_vocab() != self.tokenizer.get_vocab():
+                raise ValueError(f"Draft model {draft_path} does not share the tokenizer of this model")
+            if self._load_options["quantize"]:
+                # The output projection dominates a small model's cost; draft errors only
+                # lower the acceptance, the target still decides every token
+                draft_model = quantize_dynamic_int8(draft_model, skip_modules=())
+        self.speculative = SpeculativeDecoder(
+            self.model,
+            draft_model,
+            self._eos_token_ids(),
+            num_speculative_tokens=num_speculative_tokens,
+            adaptive=adaptive,
+            min_acceptance=min_acceptance,
+            warmup_tokens=warmup_tokens,
+            prefix_cache=self.prefix_cache
+        )
+        return self.speculative
+
+    def disable_speculative_decoding(self):
+        """Release the draft model and decode with this model alone"""
+        self.speculative = None
+
+    def get_speculative_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Speculative decoding counters (None when disabled)
+
+        Returns:
+            dict: generations, new_tokens, target_steps, drafted, accepted, fallbacks, skipped, seconds,
+                  acceptance_rate, tokens_per_step, tokens_per_second
+        """
+        return self.speculative.get_stats() if self.speculative is not None else None
@@ -0,0 +1,265 @@
+"""
+ChatSession - Multi-turn conversations that keep their KV cache between turns
+
+Resending the whole history with invoke() prefills every earlier turn again, so the cost
+of a turn grows with the conversation. A ChatSession keeps the token ids of the
+conversation (including the replies exactly as generated) and the past-key-values after
+the last reply; the next turn appends only its own tokens and prefills just those.
+
+SessionManager keeps the sessions of one LocalChatBot under a memory budget: the KV
+caches of the least recently used sessions are dropped when the budget is exceeded or a
+session has been idle too long. A session without a cache keeps its token history and
+prefills it once on its next turn, then continues incrementally.
+
+Turns are appended with the Qwen3 chat template layout ("<|im_end|>\\n<|im_start|>user ..."),
+which has no default system prompt.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import torch
+
+try:
+    from ChatBots.thinking_budget import resolve_thinking_budget, thinking_budget_kwargs
+except ImportError:
+    from thinking_budget import resolve_thinking_budget, thinking_budget_kwargs
+
+
+def cache_nbytes(past_key_values) -> int:
+    """
+    Memory held by a transformers KV cache
+
+    Args:
+        past_key_values: DynamicCache (or legacy tuple of (key, value) per layer)
+
+    Returns:
+        int: Bytes of all key and value tensors
+    """
+    if past_key_values is None:
+        return 0
+    if hasattr(past_key_values, "layers"):
+        tensors = [t for layer in past_key_values.layers for t in (getattr(layer, "keys", None), getattr(layer, "values", None))]
+    elif hasattr(past_key_values, "key_cache"):
+        tensors = list(past_key_values.key_cache) + list(past_key_values.value_cache)
+    else:
+        tensors = [t for layer in past_key_values for t in layer]
+    return sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+
+
+class ChatSession:
+    def __init__(self, chatbot, manager: "SessionManager", session_id: str, system_prompt: Optional[str] = None):
+        """
+        Args:
+            chatbot: LocalChatBot generating the replies
+            manager: SessionManager enforcing the memory budget
+            session_id: Identifier of the conversation
+            system_prompt: System prompt of the first turn (None for none)
+        """
+        self.chatbot = chatbot
+        self.manager = manager
+        self.session_id = session_id
+        self.system_prompt = system_prompt
+        self.messages: List[Dict[str, str]] = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        self.token_ids: List[int] = []
+        self.past_key_values = None
+        self.kv_bytes = 0
+        self.last_used = time.monotonic()
+        self.last_turn = {}
+        self._lock = threading.Lock()
+
+    def _turn_ids(self, user_input: str, thinking: bool) -> List[int]:
+        """Token ids appended to the conversation for a new user turn"""
+        tokenizer = self.chatbot.tokenizer
+        turn = tokenizer.apply_chat_template(
+            [{"role": "user", "content": user_input}],
+            tokenize=False,
+            add_generation_prompt=True,
+            enable_thinking=thinking
+        )
+        ids = tokenizer("\n" + turn)["input_ids"]
+        if self.token_ids[-1] not in self.chatbot._eos_token_ids():
+            # The previous reply hit max_tokens: close the assistant turn first
+            ids = [tokenizer.eos_token_id] + ids
+        return ids
+
+    def invoke(self, user_input: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """
+        Send one user turn and generate the reply
+
+        Args:
+            user_input: Text of the user turn
+            config: Same options as LocalChatBot.invoke (thinking, max_tokens, thinking_budget or intent)
+
+        Returns:
+            dict: thinking and content of the reply
+        """
+        config = config or {}
+        thinking = config.get("thinking", False)
+        max_tokens = config.get("max_tokens", 512)
+        chatbot = self.chatbot
+
+        with self._lock:
+            start = time.perf_counter()
+            if not self.token_ids:
+                ids, prefix_length = chatbot._tokenize({"messages": self.messages + [{"role": "user", "content": user_input}]}, thinking)
+                model_inputs = chatbot._build_inputs([ids], prefix_length)
+                cached_tokens = prefix_length
+            else:
+                ids = self.token_ids + self._turn_ids(user_input, thinking)
+                input_ids = torch.tensor([ids], device=chatbot.model.device)
+                model_inputs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+                cached_tokens = 0
+                if self.past_key_values is not None:
+                    model_inputs["past_key_values"] = self.past_key_values
+                    cached_tokens = self.past_key_values.get_seq_length()
+                else:
+                    self.manager._record("reprefills")
+
+            # Drop the reference while generate() extends the cache in place
+            self.past_key_values = None
+            with torch.no_grad():
+                outputs = chatbot.model.generate(
+                    **model_inputs,
+                    max_new_tokens=max_tokens,
+                    use_cache=True,
+                    return_dict_in_generate=True,
+                    **thinking_budget_kwargs(resolve_thinking_budget(config, chatbot.thinking_budgets),
+                                             chatbot.think_end_id, len(ids))
+                )
+            sequence = outputs.sequences[0].tolist()
+            new_tokens = sequence[len(ids):]
+            self.token_ids = sequence
+            self.past_key_values = outputs.past_key_values
+            self.kv_bytes = cache_nbytes(self.past_key_values)
+            self.last_used = time.monotonic()
+
+            try:
+                index = len(new_tokens) - new_tokens[::-1].index(chatbot.think_end_id)
+            except ValueError:
+                index = 0
+            result = {
+                "thinking": chatbot.tokenizer.decode(new_tokens[:index], skip_special_tokens=True).strip("\n"),
+                "content": chatbot.tokenizer.decode(new_tokens[index:], skip_special_tokens=True).strip("\n")
+            }
+            self.messages.append({"role": "user", "content": user_input})
+            self.messages.append({"role": "assistant", "content": result["content"]})
+            self.last_turn = {
+                "prompt_tokens": len(ids),
+                "prefilled_tokens": len(ids) - cached_tokens,
+                "new_tokens": len(new_tokens),
+                "latency_ms": (time.perf_counter() - start) * 1000
+            }
+
+        self.manager._touch(self)
+        return result
+
+    def drop_cache(self):
+        """Release the KV cache; the next turn prefills the history again"""
+        self.past_key_values = None
+        self.kv_bytes = 0
+
+    def reset(self):
+        """Start the conversation over, keeping the system prompt"""
+        with self._lock:
+            self.messages = self.messages[:1] if self.system_prompt else []
+            self.token_ids = []
+            self.drop_cache()
+        self.manager._touch(self)
+
+
+class SessionManager:
+    def __init__(self, chatbot, max_memory_mb: float = 512, idle_timeout: Optional[float] = 600,
+                 max_sessions: int = 64):
+        """
+        Args:
+            chatbot: LocalChatBot owning the sessions
+            max_memory_mb: Budget for the KV caches of all sessions
+            idle_timeout: Seconds after which an unused session loses its KV cache (None to keep)
+            max_sessions: Maximum number of sessions; the least recently used one is closed
+        """
+        self.chatbot = chatbot
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # session id -> ChatSession, least recently used first
+        self._stats = {"evictions": 0, "reprefills": 0, "closed": 0}
+        self._lock = threading.Lock()
+
+    def _record(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def create(self, system_prompt: Optional[str] = None, session_id: Optional[str] = None) -> ChatSession:
+        """Create (or replace) a session"""
+        session_id = session_id or uuid.uuid4().hex
+        session = ChatSession(self.chatbot, self, session_id, system_prompt)
+        with self._lock:
+            closed = [self._sessions.pop(session_id)] if session_id in self._sessions else []
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                closed.append(self._sessions.popitem(last=False)[1])
+                self._stats["closed"] += 1
+            self._sweep_locked(enforce_budget=False)
+        # Sessions dropped from the table may still be referenced by callers: free their caches now
+        for old_session in closed:
+            old_session.drop_cache()
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            self._sweep_locked(enforce_budget=False)
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str) -> bool:
+        """Remove a session and release its KV cache"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.drop_cache()
+        return True
+
+    def _touch(self, active: ChatSession):
+        """Mark a session as used and enforce the idle timeout and memory budget"""
+        with self._lock:
+            if active.session_id in self._sessions:
+                self._sessions.move_to_end(active.session_id)
+            self._sweep_locked(active)
+
+    def _sweep_locked(self, active: Optional[ChatSession] = None, enforce_budget: bool = True):
+        """
+        Drop the KV caches of idle sessions and (with enforce_budget, after a turn grew a
+        cache) of the least recently used ones over the memory budget
+        """
+        now = time.monotonic()
+        sessions = list(self._sessions.values())
+        total = sum(session.kv_bytes for session in sessions) if enforce_budget else 0
+        for session in sessions:
+            if session is active or session.past_key_values is None:
+                continue
+            idle = self.idle_timeout is not None and now - session.last_used > self.idle_timeout
+            if idle or total > self.max_memory_bytes:
+                total -= session.kv_bytes
+                session.drop_cache()
+                self._stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get session counters
+
+        Returns:
+            dict: sessions, cached_sessions, kv_mb, evictions (KV caches dropped),
+                  reprefills (turns that prefilled the history again) and closed
+        """
+        with self._lock:
+            self._sweep_locked(enforce_budget=False)
+            sessions = list(self._sessions.values())
+            stats = dict(self._stats)
+        stats["sessions"] = len(sessions)
+        stats["cached_sessions"] = sum(1 for session in sessions if session.past_key_values is not None)
+        stats["kv_mb"] = sum(session.kv_bytes for session in sessions) / (1024 * 1024)
+        return stats
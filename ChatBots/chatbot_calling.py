@@ -1,8 +1,8 @@
 from pathlib import Path
-from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+from ChatBots.LocalChatBot import load_prompt
+from ChatBots.model_pool import shared_model_pool
 def call_local(user_query: str, enable_thinking:bool=False) -> tuple:
     model_path = Path(__file__).parent.parent / "models" / "llm" / "Qwen3-1.7B"
-    local_llm = LocalChatBot(model_path=str(model_path))
     
     # 获取系统提示
     system_prompt = load_prompt("daily_chat")
@@ -14,13 +14,15 @@ def call_local(user_query: str, enable_thinking:bool=False) -> tuple:
     ]
     
     # 创建配置 - 使用字典而不是 RunnableConfig
-    model_config_dict = {"thinking": enable_thinking}
+    model_config_dict = {"thinking": enable_thinking, "intent": "daily_chat"}  # intent 决定思考token预算
     
-    # 直接调用 invoke 方法，传递标准消息格式和字典配置
-    result = local_llm.invoke(
-        {"messages": messages},  # 使用标准消息格式
-        config=model_config_dict
-    )
+    # 模型只在第一次调用时加载，之后的查询共用进程内模型池中的实例
+    with shared_model_pool.lease(str(model_path)) as local_llm:
+        # 直接调用 invoke 方法，传递标准消息格式和字典配置
+        result = local_llm.invoke(
+            {"messages": messages},  # 使用标准消息格式
+            config=model_config_dict
+        )
     
     chat_response = result["content"]
     thinking_process = result["thinking"]
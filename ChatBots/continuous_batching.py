@@ -0,0 +1,334 @@
+"""
+ContinuousBatchingEngine - Iteration-level scheduling of generation requests
+
+model.generate() keeps a static batch together until its longest sequence finishes, so a
+short device confirmation waits behind a long chat reply. The engine runs its own decode
+loop in a scheduler thread instead:
+- at every step, waiting requests are admitted (prefilled one by one, reusing the system
+  prompt prefix cache) while fewer than max_batch_size sequences are active
+- one forward pass decodes the next token of every active sequence
+- sequences that produced an end-of-sequence token or reached their max_new_tokens are
+  retired immediately and their results delivered
+
+All active sequences share one KV cache tensor per layer. Each sequence owns a row (its
+slot); rows are left-padded to the longest sequence and the padding is masked out, with
+position ids counted per row. Retiring a sequence removes its row, and padding columns
+that no row needs any more are cropped.
+
+A request's thinking budget (see thinking_budget.py) is applied when its next token is
+chosen: a reply that used up the budget without closing its reasoning gets </think>.
+Tokens are chosen as model.generate() would for the same sampling settings: repetition
+penalty over the prompt and the reply, then temperature, top-k and top-p.
+A request can follow its tokens as they are decoded (on_token, used for streaming) and
+stop early from that callback.
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import torch
+
+try:
+    from ChatBots.thinking_budget import thinking_budget_exhausted
+except ImportError:
+    from thinking_budget import thinking_budget_exhausted
+
+
+def _cache_tensors(cache) -> List[List[torch.Tensor]]:
+    """[keys, values] per layer of a transformers DynamicCache"""
+    if hasattr(cache, "layers"):
+        return [[layer.keys, layer.values] for layer in cache.layers]
+    return [[keys, values] for keys, values in zip(cache.key_cache, cache.value_cache)]
+
+
+def _set_cache_tensors(cache, tensors: List[List[torch.Tensor]]):
+    if hasattr(cache, "layers"):
+        for layer, (keys, values) in zip(cache.layers, tensors):
+            layer.keys, layer.values = keys, values
+    else:
+        cache.key_cache = [keys for keys, _ in tensors]
+        cache.value_cache = [values for _, values in tensors]
+
+
+def _left_pad(tensor: torch.Tensor, width: int, dim: int) -> torch.Tensor:
+    """Zero-pad a tensor on the left of dim up to width"""
+    missing = width - tensor.shape[dim]
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+class _Sequence:
+    """A request being decoded"""
+
+    def __init__(self, input_ids: List[int], prefix_length: int, max_new_tokens: int,
+                 sampling: Dict[str, Any], future: Future, thinking_budget: Optional[int] = None,
+                 think_end_id: Optional[int] = None, on_token: Optional[Callable[[int], bool]] = None):
+        self.input_ids = input_ids
+        self.prefix_length = prefix_length
+        self.max_new_tokens = max_new_tokens
+        self.sampling = sampling
+        self.thinking_budget = thinking_budget
+        self.think_end_id = think_end_id
+        self.on_token = on_token
+        self.future = future
+        self.tokens: List[int] = []
+        self.submitted = time.perf_counter()
+        self.first_token_time = None
+
+
+class ContinuousBatchingEngine:
+    def __init__(self, model, eos_token_ids: Iterable[int], max_batch_size: int = 8, prefix_cache=None):
+        """
+        Args:
+            model: Causal LM (Hugging Face transformers)
+            eos_token_ids: Token ids ending a sequence
+            max_batch_size: Maximum number of sequences decoded together
+            prefix_cache: PrefixKVCache used to prefill shared system prompts
+        """
+        self.model = model
+        self.eos_token_ids = set(eos_token_ids)
+        self.max_batch_size = max_batch_size
+        self.prefix_cache = prefix_cache
+
+        self._waiting = collections.deque()
+        self._active: List[_Sequence] = []
+        self._cache = None          # shared KV cache, one row per active sequence
+        self._mask = None           # attention mask [rows, cached tokens]
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = {"requests": 0, "completed": 0, "failed": 0, "steps": 0,
+                       "decoded_tokens": 0, "prefill_tokens": 0, "active_sum": 0}
+        self._thread = threading.Thread(target=self._run, name="continuous-batching", daemon=True)
+        self._thread.start()
+
+    # Public interface
+
+    def submit(self, input_ids: List[int], max_new_tokens: int = 512, prefix_length: int = 0,
+               sampling: Optional[Dict[str, Any]] = None, thinking_budget: Optional[int] = None,
+               think_end_id: Optional[int] = None, on_token: Optional[Callable[[int], bool]] = None) -> Future:
+        """
+        Queue a prompt for generation
+
+        Args:
+            input_ids: Prompt token ids
+            max_new_tokens: Maximum tokens to generate
+            prefix_length: Leading tokens that can come from the prefix cache
+            sampling: do_sample, temperature, top_k, top_p, repetition_penalty (greedy when omitted)
+            thinking_budget: Most reasoning tokens before </think> is forced (None: unbounded)
+            think_end_id: Id of </think> (required with a thinking budget)
+            on_token: Called with every new token from the scheduler thread; returning True
+                      ends the sequence there (e.g. the consumer of a stream went away)
+
+        Returns:
+            Future: resolves to the list of generated token ids (end-of-sequence included)
+        """
+        future = Future()
+        sequence = _Sequence(list(input_ids), prefix_length, max_new_tokens, dict(sampling or {}), future,
+                             thinking_budget, think_end_id, on_token)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ContinuousBatchingEngine is closed")
+            self._waiting.append(sequence)
+            self._stats["requests"] += 1
+            self._condition.notify()
+        return future
+
+    def generate(self, rows: List[List[int]], max_new_tokens: int = 512, prefix_lengths: Optional[List[int]] = None,
+                 sampling: Optional[Dict[str, Any]] = None) -> List[List[int]]:
+        """Submit several prompts and wait for all of them"""
+        prefix_lengths = prefix_lengths or [0] * len(rows)
+        futures = [self.submit(row, max_new_tokens, prefix_length, sampling)
+                   for row, prefix_length in zip(rows, prefix_lengths)]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stop the scheduler; queued requests are cancelled"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler counters
+
+        Returns:
+            dict: requests, completed, failed, steps (decode iterations), decoded_tokens,
+                  prefill_tokens, waiting, active and mean_batch_size (sequences per step)
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats["waiting"] = len(self._waiting)
+            stats["active"] = len(self._active)
+        active_sum = stats.pop("active_sum")
+        stats["mean_batch_size"] = active_sum / stats["steps"] if stats["steps"] else 0.0
+        return stats
+
+    # Scheduler
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and not self._waiting and not self._active:
+                    self._condition.wait()
+                if self._closed:
+                    pending = list(self._waiting) + self._active
+                    self._waiting.clear()
+                    break
+                admitted = []
+                while self._waiting and len(self._active) + len(admitted) < self.max_batch_size:
+                    admitted.append(self._waiting.popleft())
+
+            for sequence in admitted:
+                if not sequence.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    self._admit(sequence)
+                except BaseException as e:
+                    # A prompt that cannot be prefilled only fails its own request
+                    with self._condition:
+                        self._stats["failed"] += 1
+                    sequence.future.set_exception(e)
+            try:
+                if self._active:
+                    self._step()
+            except BaseException as e:
+                self._fail_all(e)
+
+        for sequence in pending:
+            if not sequence.future.cancel() and not sequence.future.done():
+                sequence.future.set_exception(RuntimeError("ContinuousBatchingEngine is closed"))
+        self._active, self._cache, self._mask = [], None, None
+
+    def _next_token(self, sequence: _Sequence, logits: torch.Tensor) -> int:
+        """Next token of a sequence: </think> once its thinking budget is spent, else selected from the logits"""
+        if thinking_budget_exhausted(sequence.tokens, sequence.thinking_budget, sequence.think_end_id):
+            return sequence.think_end_id
+        return self._select_token(logits, sequence.sampling, sequence.input_ids + sequence.tokens)
+
+    def _select_token(self, logits: torch.Tensor, sampling: Dict[str, Any],
+                      previous_tokens: Optional[List[int]] = None) -> int:
+        """Greedy or sampled next token from the logits of one sequence (previous_tokens: prompt and reply so far)"""
+        penalty = sampling.get("repetition_penalty")
+        if penalty is not None and penalty != 1.0 and previous_tokens:
+            # As transformers' RepetitionPenaltyLogitsProcessor, also with greedy decoding
+            logits = logits.float().clone()
+            seen = torch.tensor(previous_tokens, device=logits.device).unique()
+            scores = logits[seen]
+            logits[seen] = torch.where(scores < 0, scores * penalty, scores / penalty)
+        if not sampling.get("do_sample"):
+            return int(logits.argmax())
+        logits = logits.float() / max(sampling.get("temperature") or 1.0, 1e-5)
+        top_k = sampling.get("top_k")
+        if top_k:
+            threshold = torch.topk(logits, min(top_k, logits.shape[-1])).values[-1]
+            logits = logits.masked_fill(logits < threshold, float("-inf"))
+        top_p = sampling.get("top_p")
+        if top_p is not None and top_p < 1.0:
+            sorted_logits, order = torch.sort(logits, descending=True)
+            cumulative = torch.softmax(sorted_logits, dim=-1).cumsum(-1)
+            remove = cumulative - torch.softmax(sorted_logits, dim=-1) > top_p
+            logits[order[remove]] = float("-inf")
+        return int(torch.multinomial(torch.softmax(logits, dim=-1), 1))
+
+    def _emit(self, sequence: _Sequence, token: int) -> bool:
+        """Record a generated token; True when the sequence is finished"""
+        if sequence.first_token_time is None:
+            sequence.first_token_time = time.perf_counter()
+        sequence.tokens.append(token)
+        stopped = sequence.on_token is not None and sequence.on_token(token)
+        return stopped or token in self.eos_token_ids or len(sequence.tokens) >= sequence.max_new_tokens
+
+    def _finish(self, sequence: _Sequence):
+        # Counted first, so a caller woken by the result sees it in get_stats()
+        with self._condition:
+            self._stats["completed"] += 1
+        sequence.future.set_result(sequence.tokens)
+
+    def _admit(self, sequence: _Sequence):
+        """Prefill a new sequence and add its KV cache as a new row"""
+        prefix_length = sequence.prefix_length if self.prefix_cache is not None else 0
+        past_key_values = None
+        if prefix_length:
+            past_key_values = self.prefix_cache.get(self.model, sequence.input_ids[:prefix_length])
+        prompt = torch.tensor([sequence.input_ids[prefix_length:]], device=self.model.device)
+        with torch.no_grad():
+            outputs = self.model(input_ids=prompt, past_key_values=past_key_values, use_cache=True)
+        with self._condition:
+            self._stats["prefill_tokens"] += prompt.shape[1]
+
+        if self._emit(sequence, self._next_token(sequence, outputs.logits[0, -1])):
+            self._finish(sequence)
+            return
+
+        length = len(sequence.input_ids)
+        row_mask = torch.ones((1, length), dtype=torch.long, device=self.model.device)
+        if self._cache is None:
+            self._cache, self._mask = outputs.past_key_values, row_mask
+        else:
+            width = max(self._mask.shape[1], length)
+            merged = [
+                [torch.cat([_left_pad(old, width, 2), _left_pad(new, width, 2)], dim=0)
+                 for old, new in zip(old_layer, new_layer)]
+                for old_layer, new_layer in zip(_cache_tensors(self._cache), _cache_tensors(outputs.past_key_values))
+            ]
+            _set_cache_tensors(self._cache, merged)
+            self._mask = torch.cat([_left_pad(self._mask, width, 1), _left_pad(row_mask, width, 1)], dim=0)
+        with self._condition:
+            self._active.append(sequence)
+
+    def _step(self):
+        """Decode one token for every active sequence and retire the finished ones"""
+        input_ids = torch.tensor([[sequence.tokens[-1]] for sequence in self._active], device=self.model.device)
+        position_ids = self._mask.sum(dim=1, keepdim=True)
+        self._mask = torch.cat([self._mask, torch.ones_like(position_ids)], dim=1)
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids, attention_mask=self._mask, position_ids=position_ids,
+                                 past_key_values=self._cache, use_cache=True)
+        self._cache = outputs.past_key_values
+
+        keep = []
+        for row, sequence in enumerate(self._active):
+            if self._emit(sequence, self._next_token(sequence, outputs.logits[row, -1])):
+                self._finish(sequence)
+            else:
+                keep.append(row)
+        with self._condition:
+            self._stats["steps"] += 1
+            self._stats["decoded_tokens"] += len(self._active)
+            self._stats["active_sum"] += len(self._active)
+        if len(keep) < len(self._active):
+            self._retire(keep)
+
+    def _retire(self, keep: List[int]):
+        """Drop the rows of finished sequences and the padding no remaining row uses"""
+        with self._condition:
+            self._active = [self._active[row] for row in keep]
+        if not keep:
+            self._cache, self._mask = None, None
+            return
+        index = torch.tensor(keep, device=self._mask.device)
+        mask = self._mask.index_select(0, index)
+        # Columns before the first token of the longest remaining row are padding for every row
+        start = int((mask.cumsum(dim=1) == 0).sum(dim=1).min())
+        self._mask = mask[:, start:]
+        _set_cache_tensors(self._cache, [
+            [tensor.index_select(0, index)[:, :, start:] for tensor in layer]
+            for layer in _cache_tensors(self._cache)
+        ])
+
+    def _fail_all(self, error: BaseException):
+        """Deliver a scheduler error to every active sequence and start over"""
+        with self._condition:
+            failed, self._active = self._active, []
+            self._stats["failed"] += len(failed)
+        self._cache, self._mask = None, None
+        for sequence in failed:
+            if not sequence.future.done():
+                sequence.future.set_exception(error)
@@ -0,0 +1,471 @@
+"""
+Function call grammar - Constrained JSON decoding of registry function calls
+
+Asked for a function call, a model may wrap the JSON in prose or code fences, misspell
+a function name, quote a number or never close the object; every reply that does not
+parse costs another generation. FunctionCallGrammar compiles the registry.json parameter
+lists into a byte-level automaton accepting exactly one object
+
+    {"name": "<module_name>.<function_name>", "arguments": {"<param>": <value>, ...}}
+
+with all parameters of the function in registry order and values of the declared types
+(str: string, int: integer, float: number with a fraction, bool: true/false, list/dict:
+any JSON array/object). FunctionCallProcessor masks every token that would leave the
+grammar and allows only end-of-sequence once the object is closed, so generation stops
+right there and the reply always passes the router's parameter validator.
+
+Allowed tokens are found by walking the sorted token byte strings with the automaton (a
+prefix that leaves the grammar prunes all tokens starting with it) and cached per
+automaton state. Inside a string every token without a quote, backslash or control byte
+keeps the state, so only the remaining tokens are walked. A grammar is shared by every
+request for the same functions; its mask cache and stats are guarded by a lock, and a
+mask is computed outside it (two threads may compute the same mask once each).
+"""
+
+import json
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from transformers import LogitsProcessor
+
+# Make the project root importable when this file is used from the ChatBots directory
+try:
+    from RegistryModule.argument_coercion import compile_coercer
+    from RegistryModule.parameter_validator import compile_validator
+    from RegistryModule.registry_cache import shared_registry_cache
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from RegistryModule.argument_coercion import compile_coercer
+    from RegistryModule.parameter_validator import compile_validator
+    from RegistryModule.registry_cache import shared_registry_cache
+
+REGISTRY_PATH = Path(__file__).resolve().parent.parent / "RegistryModule" / "registry.json"
+
+MAX_DIGITS = 16  # Digits of the integer and of the fraction part of a number
+MAX_DEPTH = 4  # Nesting of list/dict argument values
+MASK_CACHE_SIZE = 1024  # Token masks kept per grammar, least recently used dropped first
+
+# Automaton frames, the top of the stack is the last frame of a state tuple
+_END, _LITERAL, _NAME, _STRING, _NUMBER, _WORD, _VALUE, _ARRAY, _OBJECT = range(9)
+_INTEGER, _FLOAT, _ANY_NUMBER = range(3)
+_NUMBER_ENDS = {_INTEGER: (2, 3), _FLOAT: (5,), _ANY_NUMBER: (2, 3, 5)}
+
+_QUOTE, _BACKSLASH, _SPACE, _MINUS, _DOT, _ZERO, _COMMA, _COLON = b'"\\ -.0,:'
+_LBRACKET, _RBRACKET, _LBRACE, _RBRACE = b"[]{}"
+_DIGITS = frozenset(b"0123456789")
+_HEX = frozenset(b"0123456789abcdefABCDEF")
+_ESCAPES = frozenset(b'"\\/bfnrt')
+_JSON_WORDS = (b"true", b"false", b"null")
+_JSON_WORD_STARTS = frozenset(word[0] for word in _JSON_WORDS)
+_INSIDE_STRING = (_STRING, 1)
+
+# First frame of an argument value per registry.json type name
+_TYPE_FRAMES = {
+    'str': (_STRING, 0),
+    'int': (_NUMBER, _INTEGER, 0, 0),
+    'float': (_NUMBER, _FLOAT, 0, 0),
+    'bool': (_WORD, (b"true", b"false"), b""),
+    'list': (_VALUE, 0, _LBRACKET),
+    'dict': (_VALUE, 0, _LBRACE),
+    'None': (_WORD, (b"null",), b""),
+}
+
+
+def registry_functions(registry_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Functions of a registry file for the grammar and the system prompt
+
+    Args:
+        registry_path: registry.json to read (RegistryModule/registry.json when None)
+
+    Returns:
+        list: {"name": "module_name.function_name", "description": ..., "parameters": [...]}
+              per function, shared by all callers (read-only)
+    """
+    snapshot = shared_registry_cache.load(registry_path or REGISTRY_PATH)
+
+    def build():
+        return [
+            {"name": f"{module.get('module_name', '')}.{function.get('function_name', '')}",
+             "description": function.get("description", ""),
+             "parameters": function.get("parameters", [])}
+            for module in snapshot.data.get("modules", []) for function in module.get("functions", [])
+        ]
+
+    return snapshot.get_index("function_call_grammar", build)
+
+
+def function_call_prompt(functions: Sequence[Dict[str, Any]]) -> str:
+    """System prompt asking for one call of the given functions in the grammar's format"""
+    return ("You are the in-car assistant. Answer the user's request with one function call as a JSON object "
+            '{"name": <function name>, "arguments": {<parameter>: <value>}} and nothing else. Functions:\n'
+            + json.dumps(list(functions), ensure_ascii=False))
+
+
+class TokenVocabulary:
+    def __init__(self, tokenizer):
+        """
+        Byte strings of a tokenizer's tokens, sorted for grammar walks
+
+        Args:
+            tokenizer: Tokenizer of the model; special and added tokens are never allowed
+        """
+        byte_decoder = {char: byte for byte, char in _bytes_to_unicode().items()}
+        excluded = set(tokenizer.all_special_ids) | set(getattr(tokenizer, "added_tokens_decoder", {}))
+        self.size = len(tokenizer)
+        entries = []
+        for token_id, token in enumerate(tokenizer.convert_ids_to_tokens(list(range(self.size)))):
+            if token_id in excluded or not token:
+                continue
+            if all(char in byte_decoder for char in token):
+                # Byte-level BPE (Qwen, GPT-2): every character stands for one byte
+                data = bytes(byte_decoder[char] for char in token)
+            else:
+                data = tokenizer.decode([token_id]).encode("utf-8")
+            if data:
+                entries.append((data, token_id))
+        entries.sort()
+        self._tokens = entries
+        self._keys = [data for data, _ in entries]
+        self._bytes_by_id = {token_id: data for data, token_id in entries}
+        # Tokens that can end or escape a string, walked inside strings
+        self._string_breaking = [(data, token_id) for data, token_id in entries
+                                 if any(byte in (_QUOTE, _BACKSLASH) or byte < 0x20 for byte in data)]
+        self._string_breaking_keys = [data for data, _ in self._string_breaking]
+        breaking_ids = {token_id for _, token_id in self._string_breaking}
+        self.string_plain_ids = torch.tensor([token_id for _, token_id in entries if token_id not in breaking_ids],
+                                             dtype=torch.long)
+
+    def token_bytes(self, token_id: int) -> Optional[bytes]:
+        """Bytes of a token, None for special tokens"""
+        return self._bytes_by_id.get(token_id)
+
+    def allowed_ids(self, advance, state) -> List[int]:
+        """
+        Ids of the tokens whose bytes the automaton accepts from state
+
+        Args:
+            advance: Callable (state, byte) -> next state or None
+            state: Automaton state
+
+        Returns:
+            list: Allowed token ids (not including string_plain_ids inside a string)
+        """
+        if state[-1] == _INSIDE_STRING:
+            tokens, keys = self._string_breaking, self._string_breaking_keys
+        else:
+            tokens, keys = self._tokens, self._keys
+        allowed = []
+        self._walk(advance, tokens, keys, state, 0, len(tokens), 0, allowed)
+        return allowed
+
+    def _walk(self, advance, tokens, keys, state, lo, hi, depth, allowed):
+        # tokens[lo:hi] share their first `depth` bytes, which lead the automaton to state
+        while lo < hi and len(keys[lo]) == depth:
+            allowed.append(tokens[lo][1])
+            lo += 1
+        while lo < hi:
+            byte = keys[lo][depth]
+            end = hi if byte == 255 else bisect_left(keys, keys[lo][:depth] + bytes((byte + 1,)), lo, hi)
+            next_state = advance(state, byte)
+            if next_state is not None:
+                self._walk(advance, tokens, keys, next_state, lo, end, depth + 1, allowed)
+            lo = end
+
+
+class FunctionCallGrammar:
+    def __init__(self, functions: Sequence[Dict[str, Any]], vocabulary: Optional[TokenVocabulary] = None):
+        """
+        Args:
+            functions: {"name": ..., "parameters": [{"name": ..., "type": ...}]} per function,
+                       e.g. registry_functions()
+            vocabulary: Token bytes of the model's tokenizer (needed for token masks only)
+        """
+        if not functions:
+            raise ValueError("A function call grammar needs at least one function")
+        self.functions = {function["name"]: function.get("parameters", []) for function in functions}
+        self.vocabulary = vocabulary
+        self._validators = {name: compile_validator(parameters) for name, parameters in self.functions.items()}
+        self._coercers = {name: compile_coercer(parameters) for name, parameters in self.functions.items()}
+        self._bodies = {name.encode("utf-8"): self._compile_body(parameters)
+                        for name, parameters in self.functions.items()}
+        self._name_prefixes = {name[:i] for name in self._bodies for i in range(len(name) + 1)}
+        self.initial_state = ((_END,), (_NAME, b""), (_LITERAL, b'{"name": "', 0))
+        self._masks = OrderedDict()   # (state, width) -> mask, least recently used first
+        self._lock = threading.Lock()
+        self.stats = {"mask_hits": 0, "mask_misses": 0}
+
+    @staticmethod
+    def _compile_body(parameters: List[Dict[str, Any]]) -> Tuple[tuple, ...]:
+        """Frames after the function name, reversed so that the first frame is on top"""
+        frames = [(_LITERAL, b', "arguments": {', 0)]
+        for index, param in enumerate(parameters):
+            key = json.dumps(param["name"], ensure_ascii=False).encode("utf-8")
+            frames.append((_LITERAL, (b", " if index else b"") + key + b": ", 0))
+            # Unknown types accept any JSON value, as the validator does not check them
+            frames.append(_TYPE_FRAMES.get(param.get("type"), (_VALUE, 0, None)))
+        frames.append((_LITERAL, b"}}", 0))
+        return tuple(reversed(frames))
+
+    def is_complete(self, state) -> bool:
+        """Whether the object of state is closed"""
+        return len(state) == 1
+
+    def advance_bytes(self, state, data: bytes):
+        """State after data, None if data leaves the grammar"""
+        for byte in data:
+            state = self.advance(state, byte)
+            if state is None:
+                return None
+        return state
+
+    def advance(self, state, byte: int):
+        """State after one more byte, None if the byte leaves the grammar"""
+        while True:
+            frame = state[-1]
+            kind = frame[0]
+            rest = state[:-1]
+            if kind == _STRING:
+                phase = frame[1]
+                if phase == 1:
+                    if byte == _QUOTE:
+                        return rest
+                    if byte == _BACKSLASH:
+                        return rest + ((_STRING, 2),)
+                    return state if byte >= 0x20 else None
+                if phase == 0:
+                    return rest + (_INSIDE_STRING,) if byte == _QUOTE else None
+                if phase == 2:
+                    if byte == ord("u"):
+                        return rest + ((_STRING, 3),)
+                    return rest + (_INSIDE_STRING,) if byte in _ESCAPES else None
+                # Phases 3-6: the four hex digits of \uXXXX
+                return rest + ((_STRING, phase + 1 if phase < 6 else 1),) if byte in _HEX else None
+            if kind == _LITERAL:
+                _, text, position = frame
+                if text[position] == byte:
+                    position += 1
+                    return rest + ((_LITERAL, text, position),) if position < len(text) else rest
+                if text[position] == _SPACE and text[position - 1] in (_COMMA, _COLON):
+                    # The space after a separator is optional
+                    position += 1
+                    state = rest + ((_LITERAL, text, position),) if position < len(text) else rest
+                    continue
+                return None
+            if kind == _NAME:
+                prefix = frame[1]
+                if byte == _QUOTE:
+                    return rest + self._bodies[prefix] if prefix in self._bodies else None
+                prefix += bytes((byte,))
+                return rest + ((_NAME, prefix),) if prefix in self._name_prefixes else None
+            if kind == _NUMBER:
+                _, number_type, phase, digits = frame
+                if byte in _DIGITS and digits < MAX_DIGITS and phase != 2:
+                    if phase in (0, 1):
+                        phase = 2 if byte == _ZERO else 3
+                    elif phase == 4:
+                        phase = 5
+                    return rest + ((_NUMBER, number_type, phase, digits + 1),)
+                if byte == _MINUS and phase == 0:
+                    return rest + ((_NUMBER, number_type, 1, 0),)
+                if byte == _DOT and phase in (2, 3) and number_type != _INTEGER:
+                    return rest + ((_NUMBER, number_type, 4, 0),)
+                if phase in _NUMBER_ENDS[number_type]:
+                    # The number is complete, the byte belongs to what follows
+                    state = rest
+                    continue
+                return None
+            if kind == _WORD:
+                _, words, prefix = frame
+                prefix += bytes((byte,))
+                if prefix in words:
+                    return rest
+                return rest + ((_WORD, words, prefix),) if any(word.startswith(prefix) for word in words) else None
+            if kind == _VALUE:
+                _, depth, opening = frame
+                if opening is not None and byte != opening:
+                    return None
+                if byte == _QUOTE:
+                    return rest + (_INSIDE_STRING,)
+                if byte == _LBRACKET and depth < MAX_DEPTH:
+                    return rest + ((_ARRAY, depth + 1, 0),)
+                if byte == _LBRACE and depth < MAX_DEPTH:
+                    return rest + ((_OBJECT, depth + 1, 0),)
+                if byte in _JSON_WORD_STARTS:
+                    state = rest + ((_WORD, _JSON_WORDS, b""),)
+                elif byte == _MINUS or byte in _DIGITS:
+                    state = rest + ((_NUMBER, _ANY_NUMBER, 0, 0),)
+                else:
+                    return None
+                continue
+            if kind == _ARRAY:
+                # Phases: 0 after "[", 1 after a value, 2 after ",", 3 after ", "
+                _, depth, phase = frame
+                if phase == 1:
+                    if byte == _RBRACKET:
+                        return rest
+                    return rest + ((_ARRAY, depth, 2),) if byte == _COMMA else None
+                if phase == 0 and byte == _RBRACKET:
+                    return rest
+                if phase == 2 and byte == _SPACE:
+                    return rest + ((_ARRAY, depth, 3),)
+                state = rest + ((_ARRAY, depth, 1), (_VALUE, depth, None))
+                continue
+            if kind == _OBJECT:
+                # Phases: 0 after "{", 1 after a key, 2 after ":", 3 after ": ", 4 after a value,
+                # 5 after ",", 6 after ", "
+                _, depth, phase = frame
+                if phase in (0, 5, 6):
+                    if byte == _QUOTE:
+                        return rest + ((_OBJECT, depth, 1), _INSIDE_STRING)
+                    if phase == 0 and byte == _RBRACE:
+                        return rest
+                    return rest + ((_OBJECT, depth, 6),) if phase == 5 and byte == _SPACE else None
+                if phase == 1:
+                    return rest + ((_OBJECT, depth, 2),) if byte == _COLON else None
+                if phase == 4:
+                    if byte == _RBRACE:
+                        return rest
+                    return rest + ((_OBJECT, depth, 5),) if byte == _COMMA else None
+                if phase == 2 and byte == _SPACE:
+                    return rest + ((_OBJECT, depth, 3),)
+                state = rest + ((_OBJECT, depth, 4), (_VALUE, depth, None))
+                continue
+            # _END: nothing may follow the closed object
+            return None
+
+    def token_mask(self, state, width: int) -> torch.Tensor:
+        """
+        Tokens allowed after state
+
+        Args:
+            state: Automaton state (not complete)
+            width: Vocabulary width of the logits
+
+        Returns:
+            torch.Tensor: Boolean mask of shape (width,), cached per state (read-only)
+        """
+        key = (state, width)
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                self.stats["mask_hits"] += 1
+                return mask
+            self.stats["mask_misses"] += 1
+        mask = torch.zeros(width, dtype=torch.bool)
+        allowed = self.vocabulary.allowed_ids(self.advance, state)
+        if allowed:
+            mask[torch.tensor(allowed, dtype=torch.long)] = True
+        if state[-1] == _INSIDE_STRING:
+            mask[self.vocabulary.string_plain_ids] = True
+        with self._lock:
+            self._masks[key] = mask
+            self._masks.move_to_end(key)
+            while len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get mask cache counters
+
+        Returns:
+            dict: mask_hits, mask_misses and cached_masks
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["cached_masks"] = len(self._masks)
+        return stats
+
+    def parse(self, content: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Function call of a reply, with arguments coerced and validated as the router does
+
+        Args:
+            content: Reply text; a surrounding code fence is ignored
+
+        Returns:
+            tuple: (function_name, arguments), the input of function_calling_interface.call_function
+
+        Raises:
+            ValueError: If the reply is not a call of a known function with valid arguments
+        """
+        text = content.strip()
+        if text.startswith("```"):
+            text = text.strip("`").split("\n", 1)[-1]
+        call = json.loads(text)
+        if not isinstance(call, dict) or not isinstance(call.get("arguments"), dict):
+            raise ValueError("Reply is not a {\"name\": ..., \"arguments\": {...}} object")
+        name = call.get("name")
+        if name not in self.functions:
+            raise ValueError(f"Unknown function: {name}")
+        arguments, _ = self._coercers[name](call["arguments"])
+        valid, error_message = self._validators[name](arguments)
+        if not valid:
+            raise ValueError(error_message)
+        return name, arguments
+
+
+class FunctionCallProcessor(LogitsProcessor):
+    def __init__(self, grammar: FunctionCallGrammar, eos_token_ids: List[int], prompt_width: int,
+                 think_end_id: Optional[int] = None):
+        """
+        Args:
+            grammar: Grammar with the model's TokenVocabulary
+            eos_token_ids: Tokens ending the reply, the only ones allowed once the object is closed
+            prompt_width: Width of the (padded) prompt; generated tokens follow it
+            think_end_id: In thinking mode the id of </think>; rows are constrained once they
+                          closed their reasoning (None: from the first token)
+        """
+        self.grammar = grammar
+        self.eos_token_ids = list(eos_token_ids)
+        self.prompt_width = prompt_width
+        self.think_end_id = think_end_id
+        self._states = None  # Per row: automaton state, None while reasoning
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        grammar = self.grammar
+        if self._states is None:
+            initial = None if self.think_end_id is not None else grammar.initial_state
+            self._states = [initial] * input_ids.shape[0]
+        elif input_ids.shape[1] > self.prompt_width:
+            for row, token in enumerate(input_ids[:, -1].tolist()):
+                state = self._states[row]
+                if state is None:
+                    if token == self.think_end_id:
+                        self._states[row] = grammar.initial_state
+                elif not grammar.is_complete(state):
+                    data = grammar.vocabulary.token_bytes(token)
+                    state = grammar.advance_bytes(state, data) if data is not None else None
+                    # A token outside the grammar (not sampled from the masked scores) ends the call
+                    self._states[row] = state if state is not None else grammar.initial_state[:1]
+        masks = []
+        for state in self._states:
+            if state is None:
+                masks.append(torch.ones(scores.shape[-1], dtype=torch.bool))
+            elif grammar.is_complete(state):
+                mask = torch.zeros(scores.shape[-1], dtype=torch.bool)
+                mask[self.eos_token_ids] = True
+                masks.append(mask)
+            else:
+                masks.append(grammar.token_mask(state, scores.shape[-1]))
+        return scores.masked_fill(~torch.stack(masks).to(scores.device), float("-inf"))
+
+
+def _bytes_to_unicode() -> Dict[int, str]:
+    """Byte -> character table of byte-level BPE tokenizers (as in GPT-2)"""
+    printable = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) \
+        + list(range(ord("®"), ord("ÿ") + 1))
+    table = {byte: chr(byte) for byte in printable}
+    extra = 0
+    for byte in range(256):
+        if byte not in table:
+            table[byte] = chr(256 + extra)
+            extra += 1
+    return table
@@ -0,0 +1,329 @@
+"""
+Inference backends behind LocalChatBot
+
+LocalChatBot formats every prompt with the Hugging Face tokenizer of the model directory
+(chat template, enable_thinking) and splits the reply at </think> itself; a backend only
+turns prompt token ids into new token ids. Available backends:
+- "transformers": AutoModelForCausalLM (see model_loader.py); the only backend with prefix
+  caching, chat sessions, continuous batching, speculative decoding and int8 quantization
+- "llama_cpp": a GGUF file run by llama-cpp-python (pip install llama-cpp-python)
+- "onnxruntime": an ONNX export run by optimum's ORTModelForCausalLM
+  (pip install -r requirements_onnx.txt); a model directory without an .onnx file is
+  exported once into <model_path>/onnx
+
+The GGUF and ONNX files sit next to (or below) the tokenizer files of the checkpoint they
+were converted from, so token ids match. Both models answer model.generate() like a
+transformers model (prompt rows with attention mask, max_new_tokens, sampling arguments,
+logits_processor, stopping_criteria, streamer, return_dict_in_generate/output_logits),
+so invoke, batch, stream, thinking budgets and function-call grammars work on every
+backend. The model object is created once per LocalChatBot and kept for its lifetime
+(and shared between users through model_pool).
+"""
+
+import copy
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from transformers import GenerationConfig, LogitsProcessorList
+from transformers.generation.utils import GenerateDecoderOnlyOutput
+
+try:
+    from llama_cpp import Llama
+    from llama_cpp import LogitsProcessorList as LlamaLogitsProcessorList
+    LLAMA_CPP_AVAILABLE = True
+except ImportError:
+    LLAMA_CPP_AVAILABLE = False
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForCausalLM
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+BACKENDS = ("transformers", "llama_cpp", "onnxruntime")
+
+# Model files of each backend, searched in the model directory and these subdirectories
+BACKEND_FILE_SUFFIXES = {"llama_cpp": (".gguf",), "onnxruntime": (".onnx",)}
+BACKEND_SUBDIRECTORIES = ("", "gguf", "onnx")
+ONNX_EXPORT_DIRECTORY = "onnx"
+
+DEFAULT_CONTEXT_LENGTH = 4096
+
+
+def resolve_backend(backend: Optional[str]) -> str:
+    """
+    Validate a backend name
+
+    Args:
+        backend: One of BACKENDS (None for "transformers")
+
+    Returns:
+        str: The backend name
+    """
+    backend = backend or "transformers"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported backend '{backend}', expected one of {list(BACKENDS)}")
+    return backend
+
+
+def find_model_file(model_path: str, backend: str, model_file: Optional[str] = None) -> Optional[str]:
+    """
+    Model file of a backend
+
+    Args:
+        model_path: Model directory
+        backend: "llama_cpp" or "onnxruntime"
+        model_file: Explicit file (absolute, or relative to model_path)
+
+    Returns:
+        str: Path of the file (the first in name order when a directory holds several;
+             pass model_file to choose a quantization), or None
+    """
+    if model_file:
+        path = Path(model_file) if os.path.isabs(model_file) else Path(model_path) / model_file
+        if not path.is_file():
+            raise FileNotFoundError(f"{backend} model file not found: {path}")
+        return str(path)
+    for subdirectory in BACKEND_SUBDIRECTORIES:
+        directory = Path(model_path) / subdirectory
+        if directory.is_dir():
+            files = sorted(f for f in directory.iterdir() if f.suffix in BACKEND_FILE_SUFFIXES[backend])
+            if files:
+                return str(files[0])
+    return None
+
+
+def backend_file_bytes(model_path: str, backend: str, model_file: Optional[str] = None) -> int:
+    """Size of the model file of a backend, with ONNX external data (0 when there is none yet)"""
+    path = find_model_file(model_path, backend, model_file)
+    if path is None:
+        return 0
+    files = [Path(path)]
+    if backend == "onnxruntime":
+        files += Path(path).parent.glob(Path(path).name + "_data")
+    return sum(f.stat().st_size for f in files)
+
+
+def load_backend_model(backend: str, model_path: str, tokenizer, device: str = "cpu",
+                       num_threads: Optional[int] = None, model_file: Optional[str] = None,
+                       **backend_options) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Load the model of a non-transformers backend
+
+    Args:
+        backend: "llama_cpp" or "onnxruntime"
+        model_path: Model directory holding the tokenizer files
+        tokenizer: Its tokenizer (end-of-sequence and padding ids)
+        device: "cpu" or "cuda" (GPU offload of all layers / the CUDA execution provider)
+        num_threads: CPU threads (None for the library default)
+        model_file: GGUF or ONNX file (searched in model_path when None)
+        **backend_options: Passed to Llama (e.g. n_ctx) or ORTModelForCausalLM.from_pretrained
+
+    Returns:
+        tuple: (model, info) where info holds model_file
+    """
+    if backend == "llama_cpp":
+        if not LLAMA_CPP_AVAILABLE:
+            raise ImportError("The llama_cpp backend requires llama-cpp-python (pip install llama-cpp-python)")
+        path = find_model_file(model_path, backend, model_file)
+        if path is None:
+            raise FileNotFoundError(f"No .gguf file in {model_path}; convert the checkpoint with llama.cpp's "
+                                    f"convert_hf_to_gguf.py or pass model_file")
+        generation_config = _generation_config(model_path, tokenizer)
+        model = LlamaCppCausalLM(path, generation_config, num_threads=num_threads,
+                                 n_gpu_layers=-1 if device == "cuda" else 0, **backend_options)
+        return model, {"model_file": path}
+    if backend == "onnxruntime":
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("The onnxruntime backend requires optimum[onnxruntime] "
+                              "(pip install -r requirements_onnx.txt)")
+        path = find_model_file(model_path, backend, model_file)
+        if path is None:
+            path = export_onnx(model_path)
+        session_options = onnxruntime.SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+        model = ORTModelForCausalLM.from_pretrained(
+            str(Path(path).parent),
+            file_name=Path(path).name,
+            use_cache=True,
+            provider="CUDAExecutionProvider" if device == "cuda" else "CPUExecutionProvider",
+            session_options=session_options,
+            **backend_options
+        )
+        if model.generation_config.pad_token_id is None:
+            model.generation_config.pad_token_id = tokenizer.pad_token_id
+        return model, {"model_file": path}
+    raise ValueError(f"Backend '{backend}' is not loaded by load_backend_model")
+
+
+def export_onnx(model_path: str, output_dir: Optional[str] = None) -> str:
+    """
+    Export a Hugging Face checkpoint to ONNX (decoder with KV cache inputs) with optimum
+
+    Args:
+        model_path: Model directory
+        output_dir: Directory of the export (<model_path>/onnx when None)
+
+    Returns:
+        str: Path of the .onnx file
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("ONNX export requires optimum[onnxruntime] (pip install -r requirements_onnx.txt)")
+    output_dir = output_dir or os.path.join(model_path, ONNX_EXPORT_DIRECTORY)
+    print(f"Exporting {model_path} to ONNX in {output_dir}, this runs once")
+    ORTModelForCausalLM.from_pretrained(model_path, export=True, use_cache=True).save_pretrained(output_dir)
+    return find_model_file(output_dir, "onnxruntime")
+
+
+def _generation_config(model_path: str, tokenizer) -> GenerationConfig:
+    """generation_config.json of the checkpoint, or end-of-sequence and padding ids from the tokenizer"""
+    try:
+        generation_config = GenerationConfig.from_pretrained(model_path)
+    except (OSError, ValueError):
+        generation_config = GenerationConfig(eos_token_id=tokenizer.eos_token_id)
+    if generation_config.pad_token_id is None:
+        generation_config.pad_token_id = tokenizer.pad_token_id
+    return generation_config
+
+
+class LlamaCppCausalLM:
+    """A GGUF model run by llama.cpp that answers generate() like a transformers causal LM"""
+
+    def __init__(self, model_file: str, generation_config: GenerationConfig, n_ctx: int = DEFAULT_CONTEXT_LENGTH,
+                 num_threads: Optional[int] = None, n_gpu_layers: int = 0, **llama_options):
+        """
+        Args:
+            model_file: GGUF file
+            generation_config: Sampling defaults and end-of-sequence ids (as for transformers)
+            n_ctx: Context length; prompt and new tokens of one row must fit
+            num_threads: CPU threads (None for llama.cpp's default)
+            n_gpu_layers: Layers offloaded to the GPU (-1 for all)
+            **llama_options: Passed to llama_cpp.Llama
+        """
+        self.llm = Llama(model_path=model_file, n_ctx=n_ctx, n_threads=num_threads, n_gpu_layers=n_gpu_layers,
+                         verbose=False, **llama_options)
+        self.model_file = model_file
+        self.generation_config = generation_config
+        self.device = torch.device("cpu")   # Inputs and outputs are CPU tensors
+        # One llama.cpp context decodes one sequence at a time; it keeps the KV cache of the
+        # previous prompt and only evaluates the tokens after the common prefix
+        self._lock = threading.Lock()
+
+    def generate(self, input_ids: torch.Tensor, attention_mask: Optional[torch.Tensor] = None,
+                 max_new_tokens: Optional[int] = None, logits_processor: Optional[LogitsProcessorList] = None,
+                 stopping_criteria=None, streamer=None, do_sample: Optional[bool] = None,
+                 temperature: Optional[float] = None, top_k: Optional[int] = None, top_p: Optional[float] = None,
+                 eos_token_id=None, pad_token_id: Optional[int] = None, output_logits: bool = False,
+                 return_dict_in_generate: bool = False, **_ignored):
+        """
+        Generate like transformers' generate(); rows of a batch are decoded one after another
+
+        Args:
+            input_ids: Left-padded prompt rows
+            attention_mask: 0 for the padding of each row
+            max_new_tokens: Most new tokens per row (generation_config.max_new_tokens when None)
+            logits_processor: transformers logits processors, applied before sampling; they see
+                              each row as a batch of one with its padding, as in generate()
+            stopping_criteria: transformers stopping criteria, checked after every token
+            streamer: Receives the prompt, then every new token (batch size 1)
+            do_sample, temperature, top_k, top_p: Override the generation config
+            eos_token_id, pad_token_id: Override the generation config
+            output_logits, return_dict_in_generate: As for generate()
+
+        Returns:
+            torch.Tensor of prompt plus new tokens (padded with pad_token_id), or a
+            GenerateDecoderOnlyOutput with sequences (and logits) when return_dict_in_generate
+        """
+        config = self.generation_config
+        if eos_token_id is None:
+            eos_token_id = config.eos_token_id
+        eos_token_ids = set(eos_token_id if isinstance(eos_token_id, (list, tuple)) else [eos_token_id])
+        if pad_token_id is None:
+            pad_token_id = config.pad_token_id if config.pad_token_id is not None else min(eos_token_ids)
+        sampling = self._sampling(do_sample, temperature, top_k, top_p)
+        max_new_tokens = max_new_tokens or config.max_new_tokens or 20
+        input_ids = torch.as_tensor(input_ids).cpu()
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        if streamer is not None:
+            streamer.put(input_ids)
+
+        rows, row_logits = [], []
+        with self._lock:
+            for row in range(input_ids.shape[0]):
+                new_tokens, logits = self._generate_row(input_ids[row], attention_mask[row].cpu().bool(),
+                                                        max_new_tokens, sampling, eos_token_ids, logits_processor,
+                                                        stopping_criteria, streamer, output_logits)
+                rows.append(new_tokens)
+                row_logits.append(logits)
+        if streamer is not None:
+            streamer.end()
+
+        width = max(len(tokens) for tokens in rows)
+        new_ids = torch.tensor([tokens + [pad_token_id] * (width - len(tokens)) for tokens in rows], dtype=torch.long)
+        sequences = torch.cat([input_ids, new_ids.reshape(len(rows), width)], dim=1)
+        if not return_dict_in_generate:
+            return sequences
+        logits = None
+        if output_logits:
+            vocabulary_size = self.llm.n_vocab()
+            logits = tuple(torch.stack([row[step] if step < len(row) else torch.zeros(vocabulary_size)
+                                        for row in row_logits])
+                           for step in range(width))
+        return GenerateDecoderOnlyOutput(sequences=sequences, logits=logits)
+
+    def _sampling(self, do_sample, temperature, top_k, top_p) -> Dict[str, Any]:
+        """llama.cpp sampling arguments equivalent to the transformers settings"""
+        config = self.generation_config
+        do_sample = config.do_sample if do_sample is None else do_sample
+        if not do_sample:
+            # temp 0 is greedy decoding in llama.cpp
+            return {"temp": 0.0, "top_k": 1, "top_p": 1.0, "min_p": 0.0}
+        temperature = config.temperature if temperature is None else temperature
+        top_k = config.top_k if top_k is None else top_k
+        top_p = config.top_p if top_p is None else top_p
+        return {
+            "temp": 1.0 if temperature is None else float(temperature),
+            "top_k": int(top_k or 0),  # 0: whole vocabulary, as top_k=None in transformers
+            "top_p": 1.0 if top_p is None else float(top_p),
+            "min_p": float(getattr(config, "min_p", None) or 0.0),
+            "repeat_penalty": float(getattr(config, "repetition_penalty", None) or 1.0),
+        }
+
+    def _generate_row(self, row_ids: torch.Tensor, row_mask: torch.Tensor, max_new_tokens: int,
+                      sampling: Dict[str, Any], eos_token_ids, logits_processor, stopping_criteria, streamer,
+                      output_logits: bool) -> Tuple[List[int], List[torch.Tensor]]:
+        """New tokens of one prompt row and the raw logits of each step"""
+        # Processors keep per-row state (thinking budgets, grammar states) created on first
+        # use; a shallow copy per row starts it afresh and shares what they precompute
+        processors = LogitsProcessorList(copy.copy(processor) for processor in logits_processor or [])
+        new_tokens, logits = [], []
+
+        def context() -> torch.Tensor:
+            return torch.cat([row_ids, torch.tensor(new_tokens, dtype=torch.long)])[None]
+
+        def process(_, scores: np.ndarray) -> np.ndarray:
+            values = torch.from_numpy(np.array(scores, dtype=np.float32))[None]
+            if output_logits:
+                logits.append(values[0].clone())
+            if processors:
+                values = processors(context(), values)
+            return values[0].numpy()
+
+        llama_processors = LlamaLogitsProcessorList([process]) if processors or output_logits else None
+        for token in self.llm.generate(row_ids[row_mask].tolist(), reset=True, logits_processor=llama_processors,
+                                       **sampling):
+            new_tokens.append(int(token))
+            if streamer is not None:
+                streamer.put(torch.tensor([int(token)]))
+            if int(token) in eos_token_ids or len(new_tokens) >= max_new_tokens:
+                break
+            if stopping_criteria and bool(torch.as_tensor(stopping_criteria(context(), None)).all()):
+                break
+        return new_tokens, logits
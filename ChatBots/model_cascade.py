@@ -0,0 +1,139 @@
+"""
+ModelCascade - Answer with the smallest model that is confident enough
+
+Most chat and extraction requests are handled as well by Qwen3-0.6B as by Qwen3-4B. The
+cascade asks its models from the smallest to the largest and keeps the first answer
+whose confidence reaches the threshold; the last model's answer is always kept. Models
+come from a ModelPool, so a larger model is only loaded once a request escalates to it
+(and can be evicted under a memory budget).
+
+Confidence, between 0 and 1:
+- "logprob": geometric mean probability of the generated tokens, exp(mean log-prob)
+  under the model that generated them
+- "consistency": share of `samples` sampled replies that agree with the greedy reply;
+  replies that parse as JSON (function calls, extracted slots) are compared as objects,
+  others as whitespace-normalized text. Costs `samples` extra generations per model
+"""
+
+import json
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain.schema.runnable import Runnable
+
+try:
+    from ChatBots.model_pool import ModelPool, shared_model_pool
+except ImportError:
+    from model_pool import ModelPool, shared_model_pool
+
+DEFAULT_CASCADE = ("Qwen3-0.6B", "Qwen3-1.7B", "Qwen3-4B")
+CONFIDENCE_METHODS = ("logprob", "consistency")
+
+
+def _normalize_reply(content: str) -> str:
+    """Comparable form of a reply: canonical JSON when it parses, else collapsed whitespace"""
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`").split("\n", 1)[-1]
+    try:
+        return json.dumps(json.loads(text), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        return " ".join(text.split())
+
+
+class ModelCascade(Runnable):
+    def __init__(self, models: Sequence[str] = DEFAULT_CASCADE, threshold: float = 0.5,
+                 method: str = "logprob", samples: int = 3, pool: Optional[ModelPool] = None,
+                 **load_options):
+        """
+        Args:
+            models: model2file.json names or model directories, smallest first
+            threshold: Confidence an answer needs to be kept without escalating
+            method: "logprob" or "consistency" (see module docstring)
+            samples: Sampled replies per model for the consistency check
+            pool: Pool the models are acquired from (shared_model_pool when None)
+            **load_options: LocalChatBot options for every model (device, dtype, quantize, ...)
+        """
+        if not models:
+            raise ValueError("A cascade needs at least one model")
+        if method not in CONFIDENCE_METHODS:
+            raise ValueError(f"Unknown confidence method '{method}', expected one of {CONFIDENCE_METHODS}")
+        self.models = list(models)
+        self.threshold = threshold
+        self.method = method
+        self.samples = samples
+        self.pool = pool or shared_model_pool
+        self.load_options = load_options
+        self._stats = {"requests": 0, "escalations": 0, "seconds": 0.0,
+                       "answered_by": {model: 0 for model in self.models}}
+        self._lock = threading.Lock()
+
+    def _confidence(self, chatbot, data_input: Any, config: Dict[str, Any], reply: Dict[str, Any]) -> float:
+        if self.method == "logprob":
+            return math.exp(reply["mean_logprob"])
+        expected = _normalize_reply(reply["content"])
+        agreeing = sum(
+            _normalize_reply(chatbot.invoke(data_input, {**config, "do_sample": True})["content"]) == expected
+            for _ in range(self.samples))
+        return agreeing / self.samples if self.samples else 1.0
+
+    def invoke(
+        self,
+        data_input: Any,  # noqa: A002
+        config: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        Answer with the first model of the cascade that is confident enough
+
+        Args:
+            data_input: Any input accepted by LocalChatBot.invoke
+            config: LocalChatBot.invoke config (thinking, max_tokens, ...); threshold
+                    overrides the cascade's threshold for this call
+
+        Returns:
+            dict: thinking and content of the kept answer, model (the model that gave it),
+                  confidence, escalations (models asked before it) and attempts
+                  (model, confidence, seconds per model asked)
+        """
+        config = dict(config or {})
+        threshold = config.pop("threshold", self.threshold)
+        config["logprobs"] = self.method == "logprob"
+        start = time.perf_counter()
+        attempts = []
+        for level, model in enumerate(self.models):
+            model_start = time.perf_counter()
+            with self.pool.lease(model, **self.load_options) as chatbot:
+                # The greedy reply is the answer; sampling only enters the consistency check
+                reply = chatbot.invoke(data_input, {**config, "do_sample": False})
+                confidence = self._confidence(chatbot, data_input, config, reply)
+            attempts.append({"model": model, "confidence": confidence, "seconds": time.perf_counter() - model_start})
+            if confidence >= threshold or level == len(self.models) - 1:
+                break
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["escalations"] += level
+            self._stats["seconds"] += time.perf_counter() - start
+            self._stats["answered_by"][model] += 1
+        return {"thinking": reply["thinking"], "content": reply["content"], "model": model,
+                "confidence": confidence, "escalations": level, "attempts": attempts}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cascade counters
+
+        Returns:
+            dict: requests, escalations (models asked beyond the first, summed), seconds,
+                  answered_by (requests per model), escalation_rate (share of requests not
+                  answered by the first model) and mean_seconds
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["answered_by"] = dict(self._stats["answered_by"])
+        requests = stats["requests"]
+        stats["escalation_rate"] = (requests - stats["answered_by"][self.models[0]]) / requests if requests else 0.0
+        stats["mean_seconds"] = stats["seconds"] / requests if requests else 0.0
+        return stats
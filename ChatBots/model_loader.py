@@ -0,0 +1,402 @@
+"""
+Device selection and model loading shared by LocalChatBot and QwenRunnable
+
+GPU machines load the checkpoint as before (torch_dtype="auto" on CUDA). CPU-only
+machines (edge boxes, CI runners) get a dedicated load path:
+- bf16 or fp32 weights (fp32 by default; bf16 pays off on CPUs with AVX512-BF16/AMX)
+- PyTorch dynamic int8 quantization of the nn.Linear layers (weights stored as int8,
+  activations quantized per batch at run time), lm_head kept in floating point
+- intra-op thread count tuned to the available cores
+- an optional saved quantized checkpoint, so startup loads the int8 model directly
+  instead of loading fp32 weights and quantizing them again
+
+Other backends (llama.cpp GGUF files, ONNX Runtime) are loaded through
+inference_backends.py with the same tokenizer; load_causal_lm(backend=...) selects one.
+
+Models can be referred to by their model2file.json name (e.g. "Qwen3-0.6B"); the path
+for the current platform is resolved against the project root.
+
+Safetensors checkpoints are memory-mapped by transformers. When the load dtype equals the
+stored dtype (bf16 for Qwen3) and the model is not quantized, the weights stay mapped
+from the file: pages are read on first use and can be dropped by the OS. Converting
+(fp32, int8) copies them into process memory.
+"""
+
+import json
+import math
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+try:
+    from ChatBots.inference_backends import backend_file_bytes, load_backend_model, resolve_backend
+except ImportError:
+    from inference_backends import backend_file_bytes, load_backend_model, resolve_backend
+
+DTYPE_ALIASES = {
+    "auto": "auto",
+    "fp32": torch.float32,
+    "float32": torch.float32,
+    "bf16": torch.bfloat16,
+    "bfloat16": torch.bfloat16,
+    "fp16": torch.float16,
+    "float16": torch.float16,
+}
+
+# Layers left in floating point by dynamic quantization (the output projection is
+# the most sensitive to int8 error and is tied to the embeddings in small Qwen3 models)
+DEFAULT_QUANTIZATION_SKIP = ("lm_head",)
+
+QUANTIZED_CHECKPOINT_FORMAT = 1
+
+# Bytes per element of the safetensors dtypes
+SAFETENSORS_ELEMENT_SIZES = {
+    "F64": 8, "I64": 8, "U64": 8,
+    "F32": 4, "I32": 4, "U32": 4,
+    "F16": 2, "BF16": 2, "I16": 2, "U16": 2,
+    "F8_E4M3": 1, "F8_E5M2": 1, "I8": 1, "U8": 1, "BOOL": 1,
+}
+SAFETENSORS_FLOAT_DTYPES = ("F64", "F32", "F16", "BF16")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_CATALOG_FILE = PROJECT_ROOT / "model2file.json"
+
+
+def load_model_catalog(catalog_file: Union[str, Path, None] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the model catalog
+
+    Args:
+        catalog_file: JSON list of model entries (model2file.json at the project root when None)
+
+    Returns:
+        dict: model_name -> catalog entry
+    """
+    with open(catalog_file or MODEL_CATALOG_FILE, encoding="utf-8") as f:
+        return {entry["model_name"]: entry for entry in json.load(f)}
+
+
+def resolve_model_path(model: str, catalog_file: Union[str, Path, None] = None) -> str:
+    """
+    Directory of a model given by catalog name or path
+
+    Args:
+        model: model_name from the catalog, or a model directory
+        catalog_file: Catalog to look the name up in (see load_model_catalog)
+
+    Returns:
+        str: The model directory (catalog paths are relative to the catalog's directory)
+    """
+    if os.path.isdir(model):
+        return model
+    catalog = load_model_catalog(catalog_file)
+    if model not in catalog:
+        raise FileNotFoundError(f"Model '{model}' is neither a directory nor in the model catalog "
+                                f"(known: {sorted(catalog)})")
+    entry = catalog[model]
+    relative = entry["Windows_model_path"] if os.name == "nt" else entry["Unix_model_path"]
+    return str((Path(catalog_file or MODEL_CATALOG_FILE).resolve().parent / relative).resolve())
+
+
+def select_device(device: Optional[str] = None) -> str:
+    """
+    Pick the inference device
+
+    Args:
+        device: "cuda", "mps", "cpu" or None/"auto" to detect
+
+    Returns:
+        str: Device name usable by transformers/torch
+    """
+    if device and device != "auto":
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def resolve_dtype(dtype: Union[str, torch.dtype, None], device: str) -> Union[str, torch.dtype]:
+    """
+    Map a dtype name to the torch dtype used for loading
+
+    Args:
+        dtype: "auto", "bf16", "fp32", "fp16", a torch.dtype or None
+        device: Device the model is loaded on
+
+    Returns:
+        "auto" or a torch.dtype; CPU defaults to fp32 and never uses fp16
+    """
+    if isinstance(dtype, torch.dtype):
+        resolved = dtype
+    else:
+        name = (dtype or ("auto" if device != "cpu" else "fp32")).lower()
+        if name not in DTYPE_ALIASES:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {sorted(DTYPE_ALIASES)}")
+        resolved = DTYPE_ALIASES[name]
+
+    if device == "cpu" and resolved in ("auto", torch.float16):
+        # Half precision matmuls are slow or unsupported on most CPUs
+        return torch.float32
+    return resolved
+
+
+def configure_cpu_threads(num_threads: Optional[int] = None) -> int:
+    """
+    Set the intra-op thread count for CPU inference
+
+    Args:
+        num_threads: Thread count (None for the cores available to this process)
+
+    Returns:
+        int: Thread count in use
+    """
+    if num_threads is None:
+        try:
+            num_threads = len(os.sched_getaffinity(0))
+        except AttributeError:
+            num_threads = os.cpu_count() or 1
+    num_threads = max(1, int(num_threads))
+    torch.set_num_threads(num_threads)
+    try:
+        # Token-by-token decoding has no inter-op parallelism to exploit
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before the first parallel region runs
+        pass
+    return num_threads
+
+
+def read_safetensors_header(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Tensor table of a safetensors file without reading the weights
+
+    Returns:
+        dict: tensor name -> {"dtype", "shape", "data_offsets"} ("__metadata__" removed)
+    """
+    with open(path, "rb") as f:
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length))
+    header.pop("__metadata__", None)
+    return header
+
+
+def estimate_model_bytes(model_path: str,
+                         device: Optional[str] = None,
+                         dtype: Union[str, torch.dtype, None] = None,
+                         quantize: bool = False,
+                         backend: Optional[str] = None,
+                         model_file: Optional[str] = None,
+                         **_ignored) -> int:
+    """
+    Memory the weights of a checkpoint take once loaded with the given options
+
+    Computed from the safetensors headers; the KV cache and activations come on top.
+
+    Args:
+        model_path: Model directory
+        device, dtype, quantize, backend, model_file: Load options as for load_causal_lm
+                                                      (other options are ignored)
+
+    Returns:
+        int: Estimated bytes (total weight file size for non-safetensors checkpoints and for
+             the GGUF/ONNX file of other backends, 0 if none)
+    """
+    if resolve_backend(backend) != "transformers":
+        return backend_file_bytes(model_path, backend, model_file)
+    directory = Path(model_path)
+    files = sorted(directory.glob("*.safetensors"))
+    if not files:
+        return sum(f.stat().st_size for f in directory.glob("*.bin"))
+
+    torch_dtype = torch.float32 if quantize else resolve_dtype(dtype, select_device(device))
+    float_size = None if torch_dtype == "auto" else torch.empty((), dtype=torch_dtype).element_size()
+    total = 0
+    for file in files:
+        for name, tensor in read_safetensors_header(file).items():
+            stored = tensor["dtype"]
+            if quantize and len(tensor["shape"]) == 2 and name.endswith(".weight") and "embed" not in name \
+                    and not any(skip in name for skip in DEFAULT_QUANTIZATION_SKIP):
+                element_size = 1    # linear layer weight after int8 quantization
+            elif stored in SAFETENSORS_FLOAT_DTYPES and float_size is not None:
+                element_size = float_size
+            else:
+                element_size = SAFETENSORS_ELEMENT_SIZES.get(stored, 4)
+            total += math.prod(tensor["shape"]) * element_size
+    return total
+
+
+def model_memory_bytes(model: torch.nn.Module) -> int:
+    """
+    Bytes held by the parameters and buffers of a loaded model
+
+    Tied weights are counted once; int8 weights of dynamically quantized layers are included.
+    """
+    seen, total = set(), 0
+    pending = list(model.state_dict(keep_vars=True).values())
+    while pending:
+        value = pending.pop()
+        if isinstance(value, (tuple, list)):
+            pending.extend(value)
+        elif isinstance(value, torch.Tensor):
+            storage = value.untyped_storage()
+            key = (storage.data_ptr(), value.device)
+            if key not in seen:
+                seen.add(key)
+                total += storage.nbytes()
+    return total
+
+
+def quantize_dynamic_int8(model: torch.nn.Module, skip_modules=DEFAULT_QUANTIZATION_SKIP) -> torch.nn.Module:
+    """
+    Replace nn.Linear layers with dynamically quantized int8 linear layers
+
+    Args:
+        model: Floating point (fp32) model in eval mode, modified in place
+        skip_modules: Names (or name suffixes) of linear layers kept in floating point
+
+    Returns:
+        torch.nn.Module: The quantized model
+    """
+    targets = {
+        name for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and not any(
+            name == skip or name.endswith("." + skip) for skip in skip_modules)
+    }
+    # In place: a copy would briefly double the memory of the fp32 model
+    return torch.ao.quantization.quantize_dynamic(model, targets, dtype=torch.qint8, inplace=True)
+
+
+def _checkpoint_metadata(model_path: str) -> Dict[str, Any]:
+    """Values that must match for a saved quantized checkpoint to be reused"""
+    import transformers
+    model_dir = Path(model_path)
+    config_file = model_dir / "config.json"
+    # Replaced weights often keep config.json untouched (fine-tune exported over the same directory)
+    weight_files = sorted(path for pattern in ("*.safetensors", "*.bin") for path in model_dir.glob(pattern))
+    return {
+        "format": QUANTIZED_CHECKPOINT_FORMAT,
+        "source": str(model_dir.resolve()),
+        "source_mtime": config_file.stat().st_mtime_ns if config_file.exists() else None,
+        "weights": [(path.name, path.stat().st_size, path.stat().st_mtime_ns) for path in weight_files],
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+    }
+
+
+def load_quantized_checkpoint(checkpoint_path: str, model_path: str) -> Optional[torch.nn.Module]:
+    """
+    Load a quantized model saved by save_quantized_checkpoint
+
+    Returns:
+        The model, or None if the file is missing or was made from another model or library version
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    try:
+        # The checkpoint stores the module itself (quantized modules cannot be rebuilt from
+        # a plain state dict without loading the fp32 weights first); only load trusted files
+        saved = torch.load(checkpoint_path, map_location="cpu", weights_only=False)
+    except Exception as e:
+        print(f"Warning: could not load quantized checkpoint {checkpoint_path}: {e}")
+        return None
+    if saved.get("metadata") != _checkpoint_metadata(model_path):
+        print(f"Quantized checkpoint {checkpoint_path} is stale, quantizing again")
+        return None
+    return saved["model"]
+
+
+def save_quantized_checkpoint(model: torch.nn.Module, checkpoint_path: str, model_path: str) -> None:
+    """Save a quantized model for load_quantized_checkpoint"""
+    directory = os.path.dirname(os.path.abspath(checkpoint_path))
+    os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{checkpoint_path}.tmp"
+    torch.save({"model": model, "metadata": _checkpoint_metadata(model_path)}, temporary_path)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def load_causal_lm(model_path: str,
+                   device: Optional[str] = None,
+                   dtype: Union[str, torch.dtype, None] = None,
+                   quantize: bool = False,
+                   num_threads: Optional[int] = None,
+                   quantized_checkpoint: Optional[str] = None,
+                   trust_remote_code: bool = False,
+                   backend: Optional[str] = None,
+                   model_file: Optional[str] = None,
+                   backend_options: Optional[Dict[str, Any]] = None) -> Tuple[Any, Any, Dict[str, Any]]:
+    """
+    Load tokenizer and model for the detected (or requested) device
+
+    Args:
+        model_path: Hugging Face model directory
+        device: "cuda", "mps", "cpu" or None to detect
+        dtype: "auto", "bf16", "fp32" or "fp16" (see resolve_dtype)
+        quantize: Apply dynamic int8 quantization (CPU only)
+        num_threads: CPU intra-op threads (None for all available cores)
+        quantized_checkpoint: File caching the quantized model between restarts
+        trust_remote_code: Passed to transformers
+        backend: "transformers" (default), "llama_cpp" or "onnxruntime" (see inference_backends.py)
+        model_file: GGUF or ONNX file of the other backends (found in model_path when None)
+        backend_options: Passed to the llama_cpp or onnxruntime model (e.g. {"n_ctx": 8192})
+
+    Returns:
+        tuple: (tokenizer, model, load_info) where load_info holds backend, device, dtype,
+               quantized, threads, load_seconds and source ("pretrained"/"quantized_checkpoint",
+               or the model file of the other backends)
+    """
+    start = time.perf_counter()
+    backend = resolve_backend(backend)
+    device = select_device(device)
+    torch_dtype = resolve_dtype(dtype, device)
+    if quantize and device != "cpu":
+        raise ValueError("Dynamic int8 quantization is only supported on CPU")
+    if quantize and backend != "transformers":
+        raise ValueError(f"quantize applies to the transformers backend; give the {backend} backend "
+                         f"a quantized model file instead")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, trust_remote_code=trust_remote_code)
+    info = {"backend": backend, "device": device, "dtype": "qint8" if quantize else str(torch_dtype),
+            "quantized": quantize, "threads": None, "source": "pretrained"}
+
+    if backend != "transformers":
+        if device == "cpu":
+            info["threads"] = configure_cpu_threads(num_threads)
+        model, backend_info = load_backend_model(backend, model_path, tokenizer, device=device,
+                                                 num_threads=info["threads"], model_file=model_file,
+                                                 **(backend_options or {}))
+        info.update(dtype=Path(backend_info["model_file"]).suffix.lstrip("."), source=backend_info["model_file"])
+    elif device == "cpu":
+        info["threads"] = configure_cpu_threads(num_threads)
+        model = load_quantized_checkpoint(quantized_checkpoint, model_path) if quantize else None
+        if model is not None:
+            info["source"] = "quantized_checkpoint"
+        else:
+            model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                torch_dtype=torch.float32 if quantize else torch_dtype,
+                low_cpu_mem_usage=True,
+                trust_remote_code=trust_remote_code
+            )
+            if quantize:
+                model = quantize_dynamic_int8(model.eval())
+                if quantized_checkpoint:
+                    save_quantized_checkpoint(model, quantized_checkpoint, model_path)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            torch_dtype=torch_dtype,
+            device_map=device,
+            trust_remote_code=trust_remote_code
+        )
+
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+    info["load_seconds"] = time.perf_counter() - start
+    return tokenizer, model, info
@@ -0,0 +1,347 @@
+"""
+Process-wide pool of loaded models
+
+chatbot_calling.call_local built a new LocalChatBot, i.e. a full from_pretrained load, for
+every query, and every Router or QwenRunnable loaded its own copy of the same weights.
+The pool loads each (model, load options) combination once and hands the same instance
+to all callers:
+- acquire() returns the shared instance and counts the reference, release() drops it;
+  lease() does both around a with-block
+- concurrent first requests for the same model wait for a single load; different models
+  load in parallel
+- a model without references is unloaded after idle_timeout seconds, so a burst of
+  queries shares one load while an unused model does not hold memory forever
+- with a memory_budget_mb, switching between models (Qwen3-0.6B/1.7B/4B, Phi-4-mini)
+  keeps as many resident as fit: before a load, the weight size is estimated from the
+  safetensors headers, and models without references are unloaded least recently used
+  first until it fits. After the load, the model's actual parameter and buffer bytes are
+  recorded. A load that cannot fit because the other models are in use raises MemoryError
+- a catalog entry may carry "load_options" for LocalChatBot, e.g. {"backend": "llama_cpp",
+  "model_file": "qwen3-1.7b-q8_0.gguf"} to serve that model with llama.cpp everywhere it
+  is acquired by name (see inference_backends.py)
+
+Instances are shared between threads: LocalChatBot and QwenRunnable only read the model
+during generation, and their caches (prefix cache, sessions) are locked.
+"""
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import torch
+
+try:
+    from ChatBots.model_loader import estimate_model_bytes, load_model_catalog, model_memory_bytes, resolve_model_path
+except ImportError:
+    from model_loader import estimate_model_bytes, load_model_catalog, model_memory_bytes, resolve_model_path
+
+MB = 1024 * 1024
+
+
+def _local_chatbot(model_path: str, **options):
+    try:
+        from ChatBots.LocalChatBot import LocalChatBot
+    except ImportError:
+        from LocalChatBot import LocalChatBot
+    return LocalChatBot(model_path, **options)
+
+
+class _PoolEntry:
+    def __init__(self, key: Tuple):
+        self.key = key
+        self.instance = None
+        self.error = None
+        self.loaded = threading.Event()
+        self.refs = 0
+        self.idle_since = None
+        self.load_seconds = 0.0
+        self.timer = None
+        self.memory_bytes = 0
+        self.last_used = time.monotonic()
+
+
+def _resident_bytes(instance: Any) -> Optional[int]:
+    """Weight bytes of a pooled instance (LocalChatBot/QwenRunnable .model or a (tokenizer, model) tuple)"""
+    parts = instance if isinstance(instance, tuple) else (getattr(instance, "model", instance),)
+    models = [part for part in parts if isinstance(part, torch.nn.Module)]
+    return sum(model_memory_bytes(model) for model in models) if models else None
+
+
+class ModelPool:
+    def __init__(self, idle_timeout: Optional[float] = 600, memory_budget_mb: Optional[float] = None,
+                 catalog_file: Union[str, Path, None] = None):
+        """
+        Args:
+            idle_timeout: Seconds a model without references stays loaded (None: until unload_idle/clear)
+            memory_budget_mb: Most weight memory of all loaded models (None: no limit)
+            catalog_file: Model catalog for names (model2file.json when None)
+        """
+        self.idle_timeout = idle_timeout
+        self.memory_budget_mb = memory_budget_mb
+        self.catalog_file = catalog_file
+        self._entries: Dict[Tuple, _PoolEntry] = {}
+        self._keys_by_instance: Dict[int, Tuple] = {}
+        self._stats = {"loads": 0, "hits": 0, "unloads": 0, "evictions": 0, "load_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def _catalog_load_options(self, model: str) -> Dict[str, Any]:
+        """load_options of a model2file.json entry (e.g. {"backend": "llama_cpp", "model_file": "q8_0.gguf"})"""
+        if os.path.isdir(model):
+            return {}
+        try:
+            entry = load_model_catalog(self.catalog_file).get(model)
+        except OSError:
+            return {}
+        return dict(entry.get("load_options", {})) if entry else {}
+
+    @staticmethod
+    def _key(model_path: str, factory: Callable, options: Dict[str, Any]) -> Tuple:
+        return (factory, os.path.abspath(model_path),
+                tuple(sorted((name, repr(value)) for name, value in options.items())))
+
+    def acquire(self, model_path: str, factory: Optional[Callable] = None, **options) -> Any:
+        """
+        Shared instance of a model, loaded on first use
+
+        Args:
+            model_path: Model directory or model2file.json name
+            factory: Callable(model_path, **options) building the instance (LocalChatBot when None)
+            **options: Load options passed to the factory; part of the pool key. For the default
+                       factory they override the load_options of the model's catalog entry
+
+        Returns:
+            The shared instance; call release(instance) when done with it
+        """
+        if factory is None:
+            factory = _local_chatbot
+            # A catalog entry may choose the backend and other LocalChatBot options
+            options = {**self._catalog_load_options(model_path), **options}
+        try:
+            model_path = resolve_model_path(model_path, self.catalog_file)
+        except FileNotFoundError:
+            # Hub ids and missing directories are left to the factory
+            pass
+        key = self._key(model_path, factory, options)
+        evicted = 0
+        with self._lock:
+            entry = self._entries.get(key)
+            load = entry is None
+            if load:
+                estimate = self._estimate(model_path, options)
+                evicted = self._make_room(estimate)
+                entry = self._entries[key] = _PoolEntry(key)
+                entry.memory_bytes = estimate
+            entry.refs += 1
+            entry.idle_since = None
+            entry.last_used = time.monotonic()
+            if entry.timer is not None:
+                entry.timer.cancel()
+                entry.timer = None
+        if evicted:
+            self._free_memory()
+
+        if load:
+            start = time.perf_counter()
+            try:
+                entry.instance = factory(model_path, **options)
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    self._entries.pop(key, None)
+                entry.loaded.set()
+                raise
+            entry.load_seconds = time.perf_counter() - start
+            measured = _resident_bytes(entry.instance)
+            with self._lock:
+                if measured is not None:
+                    entry.memory_bytes = measured
+                self._keys_by_instance[id(entry.instance)] = key
+                self._stats["loads"] += 1
+                self._stats["load_seconds"] += entry.load_seconds
+            entry.loaded.set()
+        else:
+            entry.loaded.wait()
+            if entry.error is not None:
+                raise entry.error
+            with self._lock:
+                self._stats["hits"] += 1
+        return entry.instance
+
+    def release(self, instance: Any):
+        """Drop a reference taken by acquire; idle models are unloaded after idle_timeout"""
+        with self._lock:
+            key = self._keys_by_instance.get(id(instance))
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None or entry.refs == 0:
+                return
+            entry.refs -= 1
+            entry.last_used = time.monotonic()
+            if entry.refs > 0:
+                return
+            entry.idle_since = time.monotonic()
+            if self.idle_timeout is not None:
+                entry.timer = threading.Timer(self.idle_timeout, self._expire, (key, entry.idle_since))
+                entry.timer.daemon = True
+                entry.timer.start()
+
+    @contextmanager
+    def lease(self, model_path: str, factory: Optional[Callable] = None, **options):
+        """acquire() for the duration of a with-block"""
+        instance = self.acquire(model_path, factory, **options)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def _estimate(self, model_path: str, options: Dict[str, Any]) -> int:
+        """Weight bytes a load will take (0 without a budget or for paths that are not directories)"""
+        if self.memory_budget_mb is None or not os.path.isdir(model_path):
+            return 0
+        return estimate_model_bytes(model_path, **options)
+
+    def _make_room(self, needed: int) -> int:
+        """
+        Unload least recently used models without references until needed bytes fit the
+        budget (caller holds the lock)
+
+        Returns:
+            int: Number of models evicted
+        """
+        if self.memory_budget_mb is None:
+            return 0
+        budget = self.memory_budget_mb * MB
+        resident = sum(entry.memory_bytes for entry in self._entries.values())
+        idle = sorted((entry for entry in self._entries.values()
+                       if entry.refs == 0 and entry.loaded.is_set() and entry.instance is not None),
+                      key=lambda entry: entry.last_used)
+        in_use = resident - sum(entry.memory_bytes for entry in idle)
+        if in_use + needed > budget:
+            # Checked before evicting anything: unloading the idle models would not help
+            raise MemoryError(f"Loading {needed / MB:.0f} MB exceeds the model memory budget of "
+                              f"{self.memory_budget_mb:.0f} MB ({in_use / MB:.0f} MB held by models in use)")
+        evicted = 0
+        while resident + needed > budget:
+            entry = idle.pop(0)
+            resident -= entry.memory_bytes
+            self._remove(entry)
+            self._stats["evictions"] += 1
+            evicted += 1
+        return evicted
+
+    def _expire(self, key: Tuple, idle_since: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refs or entry.idle_since != idle_since:
+                return
+            self._remove(entry)
+        self._free_memory()
+
+    def _remove(self, entry: _PoolEntry):
+        """Forget an entry (caller holds the lock)"""
+        self._entries.pop(entry.key, None)
+        self._keys_by_instance.pop(id(entry.instance), None)
+        if entry.timer is not None:
+            entry.timer.cancel()
+        close = getattr(entry.instance, "disable_continuous_batching", None)
+        if close is not None:
+            # The engine's scheduler thread holds a reference to the model
+            close()
+        entry.instance = None
+        self._stats["unloads"] += 1
+
+    @staticmethod
+    def _free_memory():
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def unload_idle(self, min_idle_seconds: float = 0) -> int:
+        """
+        Unload models without references
+
+        Args:
+            min_idle_seconds: Only unload models idle for at least this long
+
+        Returns:
+            int: Number of models unloaded
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = [entry for entry in self._entries.values()
+                    if entry.refs == 0 and entry.idle_since is not None and now - entry.idle_since >= min_idle_seconds]
+            for entry in idle:
+                self._remove(entry)
+        if idle:
+            self._free_memory()
+        return len(idle)
+
+    def clear(self):
+        """Forget every model, including ones still referenced (their holders keep them alive)"""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry.loaded.is_set() and entry.instance is not None:
+                    self._remove(entry)
+        self._free_memory()
+
+    def list_models(self, **options) -> List[Dict[str, Any]]:
+        """
+        Models of the catalog with their local availability
+
+        Args:
+            **options: Load options the memory estimate is made for (e.g. dtype="bf16", quantize=True)
+
+        Returns:
+            list: name, path, available (directory exists), estimated_mb (None when not
+                  available) and loaded (any load options) per catalog entry
+        """
+        with self._lock:
+            loaded_paths = {entry.key[1] for entry in self._entries.values() if entry.loaded.is_set()}
+        models = []
+        for name in load_model_catalog(self.catalog_file):
+            path = resolve_model_path(name, self.catalog_file)
+            available = os.path.isdir(path)
+            models.append({"name": name, "path": path, "available": available,
+                           "estimated_mb": estimate_model_bytes(path, **{**self._catalog_load_options(name), **options}) / MB
+                           if available else None,
+                           "loaded": os.path.abspath(path) in loaded_paths})
+        return models
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool counters
+
+        Returns:
+            dict: loads, hits (acquires served by a loaded model), unloads (idle timeouts,
+                  unload_idle, clear and evictions), evictions (unloads to stay within the
+                  memory budget), load_seconds (total time spent loading), memory_mb (weights
+                  of the loaded models), memory_budget_mb and models (path, refs, idle_seconds,
+                  factory, load_seconds, memory_mb per loaded model, least recently used first)
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            entries = sorted((entry for entry in self._entries.values() if entry.loaded.is_set()),
+                             key=lambda entry: entry.last_used)
+            stats["models"] = [
+                {"path": entry.key[1], "factory": getattr(entry.key[0], "__qualname__", type(entry.key[0]).__name__),
+                 "refs": entry.refs,
+                 "idle_seconds": now - entry.idle_since if entry.idle_since is not None else 0.0,
+                 "load_seconds": entry.load_seconds,
+                 "memory_mb": entry.memory_bytes / MB}
+                for entry in entries
+            ]
+            stats["memory_mb"] = sum(entry.memory_bytes for entry in self._entries.values()) / MB
+        stats["memory_budget_mb"] = self.memory_budget_mb
+        return stats
+
+
+# Shared by call_local, the IntentRouter Router and QwenRunnable
+shared_model_pool = ModelPool()
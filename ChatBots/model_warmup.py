@@ -0,0 +1,132 @@
+"""
+Startup warm-up and compiled decoding for the local chat models
+
+The first request after loading pays for lazy work that later requests do not: the
+allocator growing to the size of a long prompt, oneDNN/MKL picking kernels for each
+new shape, and (with torch.compile) tracing and compiling the decode step. A warm-up
+runs a few short dummy generations over representative prompt lengths at load time, so
+that work happens before the first user is waiting. The dummy requests carry the system
+prompts the assistant uses, so their prefilled prefixes are already in the prefix cache.
+
+torch.compile uses the automatic compilation of transformers' generate(): with a static
+KV cache of a fixed length (max_cache_len) every decode step has the same shapes, so the
+decode forward pass is compiled once and reused by every request; the prefill stays
+eager. Inductor keeps its compiled kernels and graphs in a cache directory; pointing it
+at a directory that survives restarts (instead of the default under /tmp) lets the next
+start load them instead of compiling again.
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import torch
+from transformers import CompileConfig
+
+# Prompt tokens of the dummy generations: a bare voice command, a request with a system
+# prompt, a multi-turn conversation
+WARMUP_PROMPT_LENGTHS = (32, 256, 768)
+
+# Static KV cache length of compiled decoding (prompt plus reply); longer requests grow
+# the cache, which compiles the decode step once more
+DEFAULT_COMPILE_MAX_LENGTH = 1024
+
+# Repeated to build the dummy prompts
+_WARMUP_TEXT = "打开车窗，把空调调到22度，然后导航到最近的充电站。What is the weather today? "
+
+
+def enable_compile_cache(cache_dir: str) -> str:
+    """
+    Keep torch.compile's kernels and graphs in a directory that survives restarts
+
+    Sets the process-wide Inductor cache directory (TORCHINDUCTOR_CACHE_DIR) and turns
+    on its FX graph and AOTAutograd caches.
+
+    Args:
+        cache_dir: Cache directory, created if missing
+
+    Returns:
+        str: The absolute cache directory
+    """
+    cache_dir = os.path.abspath(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = cache_dir
+    import torch._functorch.config
+    import torch._inductor.config
+    torch._inductor.config.fx_graph_cache = True
+    torch._functorch.config.enable_autograd_cache = True
+    return cache_dir
+
+
+def compile_generate_kwargs(device: str, max_cache_len: int = DEFAULT_COMPILE_MAX_LENGTH,
+                            mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    generate() arguments for a static KV cache with a compiled decode step
+
+    Args:
+        device: Device of the model
+        max_cache_len: Static cache length, the same for every request so the compiled
+                       decode step is reused
+        mode: torch.compile mode ("reduce-overhead" on CUDA, where it captures CUDA graphs,
+              "default" elsewhere when None)
+
+    Returns:
+        dict: cache_implementation, max_cache_len and compile_config
+    """
+    compile_config = CompileConfig(mode=mode or ("reduce-overhead" if device == "cuda" else "default"))
+    # transformers only compiles automatically on accelerators unless asked to
+    compile_config._compile_all_devices = True
+    return {"cache_implementation": "static", "max_cache_len": max_cache_len, "compile_config": compile_config}
+
+
+def warmup_prompt(tokenizer, length: int) -> str:
+    """
+    Dummy prompt of about `length` tokens (before the chat template)
+
+    Args:
+        tokenizer: Tokenizer of the model
+        length: Token count
+
+    Returns:
+        str: The prompt text
+    """
+    ids = tokenizer.encode(_WARMUP_TEXT, add_special_tokens=False)
+    repeated = (ids * (length // max(1, len(ids)) + 1))[:length]
+    return tokenizer.decode(repeated, skip_special_tokens=True)
+
+
+def run_warmup(generate: Callable[[str, Optional[str]], Any], tokenizer,
+               prompt_lengths: Sequence[int] = WARMUP_PROMPT_LENGTHS,
+               max_prompt_tokens: Optional[int] = None,
+               system_prompts: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Run one dummy generation per prompt length
+
+    Args:
+        generate: Generates a short reply for a prompt text and a system prompt (or None),
+                  e.g. through LocalChatBot.invoke
+        tokenizer: Tokenizer of the model
+        prompt_lengths: Prompt token counts (run shortest first)
+        max_prompt_tokens: Longer lengths are clipped to this
+        system_prompts: System prompts of the dummy requests: the first one is sent with
+                        every length, the others once with the shortest, so each of them is
+                        prefilled (and prefix cached) before the first request
+
+    Returns:
+        dict: prompt_lengths (as run), system_prompts (count), seconds (per generation) and
+              total_seconds
+    """
+    lengths = sorted({min(length, max_prompt_tokens) if max_prompt_tokens else length
+                      for length in prompt_lengths if length > 0})
+    system_prompts = list(system_prompts) or [None]
+    runs = [(length, system_prompts[0]) for length in lengths]
+    runs += [(lengths[0], system_prompt) for system_prompt in system_prompts[1:] if lengths]
+    seconds = []
+    start = time.perf_counter()
+    for length, system_prompt in runs:
+        generation_start = time.perf_counter()
+        with torch.no_grad():
+            generate(warmup_prompt(tokenizer, length), system_prompt)
+        seconds.append(time.perf_counter() - generation_start)
+    return {"prompt_lengths": lengths, "system_prompts": len([prompt for prompt in system_prompts if prompt]),
+            "seconds": seconds, "total_seconds": time.perf_counter() - start}
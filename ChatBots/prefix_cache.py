@@ -0,0 +1,159 @@
+"""
+PrefixKVCache - Reuse the prefilled system prompt across requests
+
+Every request to LocalChatBot starts with the same tokens: the chat template header and
+the system prompt (e.g. load_prompt("daily_chat")). Their past-key-values are computed
+once per model and prompt, kept in an LRU cache bounded by entry count and total cached
+tokens, and copied into each generate() call so that only the user turn is prefilled.
+
+A prefix is only used when its token ids are an exact prefix of the request's token ids,
+so the generated text is the same as without the cache. Entries are keyed by the model as
+well as the token ids, so one PrefixKVCache can be shared by several chatbots: a model
+never receives past-key-values computed by another one.
+"""
+
+import copy
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+
+class PrefixKVCache:
+    def __init__(self, max_entries: int = 8, max_tokens: int = 32768):
+        """
+        Args:
+            max_entries: Maximum number of cached prefixes
+            max_tokens: Maximum total length of the cached prefixes (bounds the memory:
+                        each token costs 2 * layers * kv_heads * head_dim values)
+        """
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        # (id(model), prefix token ids) -> (weakref to the model, past_key_values, prefill_ms)
+        self._entries = OrderedDict()
+        self._cached_tokens = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "saved_prefill_ms": 0.0}
+        self._lock = threading.Lock()
+
+    def _compute(self, model, prefix_ids: Tuple[int, ...]) -> Tuple[Any, float]:
+        """Run the prefix through the model and return its past-key-values"""
+        input_ids = torch.tensor([prefix_ids], device=model.device)
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = model(input_ids=input_ids, use_cache=True)
+        return outputs.past_key_values, (time.perf_counter() - start) * 1000
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._cached_tokens > self.max_tokens):
+            (_, prefix_ids), _ = self._entries.popitem(last=False)
+            self._cached_tokens -= len(prefix_ids)
+            self._stats["evictions"] += 1
+
+    def get(self, model, prefix_ids: Sequence[int], batch_size: int = 1) -> Any:
+        """
+        Past-key-values of a prefix, ready to pass to generate()
+
+        Args:
+            model: The model that continues from the prefix (entries are kept per model)
+            prefix_ids: Token ids of the shared prefix
+            batch_size: Number of sequences that will continue from the prefix
+
+        Returns:
+            A private copy of the cache (generate() appends to it), expanded to batch_size
+        """
+        prefix_ids = tuple(prefix_ids)
+        key = (id(model), prefix_ids)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is not model:
+                # The model of the entry is gone and its id was reused by another one
+                del self._entries[key]
+                self._cached_tokens -= len(prefix_ids)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["saved_prefill_ms"] += entry[2]
+            else:
+                self._stats["misses"] += 1
+                # Prefixes longer than the whole budget are computed but not kept
+                entry = (weakref.ref(model),) + self._compute(model, prefix_ids)
+                if len(prefix_ids) <= self.max_tokens:
+                    self._entries[key] = entry
+                    self._cached_tokens += len(prefix_ids)
+                    self._evict()
+            past_key_values = copy.deepcopy(entry[1])
+
+        if batch_size > 1:
+            past_key_values.batch_repeat_interleave(batch_size)
+        return past_key_values
+
+    def clear(self):
+        """Drop all cached prefixes"""
+        with self._lock:
+            self._entries.clear()
+            self._cached_tokens = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits, misses, evictions, saved_prefill_ms (prefill time skipped by hits),
+                  entries and cached_tokens
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["cached_tokens"] = self._cached_tokens
+        return stats
+
+
+def system_prefix_messages(messages: List[Any]) -> Optional[List[Dict[str, str]]]:
+    """
+    The leading system message of a conversation in chat-template form
+
+    Args:
+        messages: Dicts with role/content or langchain messages
+
+    Returns:
+        list: [{"role": "system", "content": ...}] or None if the conversation has no system prompt
+    """
+    if not messages:
+        return None
+    first = messages[0]
+    if isinstance(first, dict):
+        role, content = first.get("role"), first.get("content")
+    else:
+        role, content = getattr(first, "type", None), getattr(first, "content", None)
+    if role != "system" or not isinstance(content, str):
+        return None
+    return [{"role": "system", "content": content}]
+
+
+def split_prefix(tokenizer, text: str, prefix_text: Optional[str],
+                 prefix_ids: Optional[List[int]] = None) -> Tuple[List[int], int]:
+    """
+    Tokenize a prompt and find how many leading tokens belong to the prefix
+
+    Args:
+        tokenizer: Tokenizer of the model
+        text: Full prompt text
+        prefix_text: Rendered system prompt, expected at the start of text
+        prefix_ids: Token ids of prefix_text if already known (e.g. from the PromptRegistry)
+
+    Returns:
+        tuple: (token ids of text, prefix length); the prefix length is 0 when the prefix
+               does not tokenize identically inside the full prompt or nothing follows it
+    """
+    ids = tokenizer(text)["input_ids"]
+    if not prefix_text or not text.startswith(prefix_text):
+        return ids, 0
+    if prefix_ids is None:
+        prefix_ids = tokenizer(prefix_text)["input_ids"]
+    if len(prefix_ids) >= len(ids) or ids[:len(prefix_ids)] != prefix_ids:
+        return ids, 0
+    return ids, len(prefix_ids)
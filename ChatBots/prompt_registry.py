@@ -0,0 +1,218 @@
+"""
+PromptRegistry - System prompts from ExtendMaterial/Prompts kept in memory
+
+load_prompt() used to locate the project root, list the Prompts directory and read the
+prompt file (printing every step) on each request. The registry finds the directory once,
+reads every prompt file once and serves the text from memory. A watcher thread polls the
+files' modification times and reloads changed, added or removed prompts, so editing a
+prompt file takes effect without a restart and requests never touch the filesystem.
+
+For each tokenizer the registry also keeps the chat-template rendering of a prompt as a
+system message and its token ids, which LocalChatBot uses to split the cacheable system
+prompt prefix from a request without tokenizing the prompt again.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PROMPT = "You are a helpful AI assistant"
+
+# Intent -> prompt file in the Prompts directory ("" for intents without a system prompt)
+INTENT_PROMPTS = {
+    "device_control": "",
+    "info_query": "",
+    "daily_chat": "DailyChat.md",
+}
+DEFAULT_PROMPT_FILE = "DailyChat.md"
+PROMPT_SUFFIXES = (".md", ".txt")
+
+
+def find_prompts_dir(start: Optional[Path] = None) -> Path:
+    """
+    Locate ExtendMaterial/Prompts in the first ancestor of start that has it
+
+    Args:
+        start: Directory to search from (this file's directory when None)
+
+    Returns:
+        Path: The Prompts directory (under the project root if no ancestor has one)
+    """
+    start = Path(start or Path(__file__).resolve().parent)
+    for directory in [start, *start.parents]:
+        if (directory / "ExtendMaterial" / "Prompts").is_dir():
+            return directory / "ExtendMaterial" / "Prompts"
+    return Path(__file__).resolve().parent.parent / "ExtendMaterial" / "Prompts"
+
+
+def _read_prompt(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except UnicodeDecodeError:
+        return path.read_text(encoding="latin-1")
+
+
+class PromptRegistry:
+    def __init__(self, prompts_dir: Optional[str] = None, watch_interval: Optional[float] = 2.0):
+        """
+        Args:
+            prompts_dir: Directory of prompt files (ExtendMaterial/Prompts when None)
+            watch_interval: Seconds between checks for changed prompt files (None: only on refresh())
+        """
+        self.prompts_dir = Path(prompts_dir) if prompts_dir else find_prompts_dir()
+        self.watch_interval = watch_interval
+        self._files: Dict[str, Tuple[int, int, str]] = {}    # file name -> (mtime_ns, size, text)
+        self._names_by_text: Dict[str, str] = {}
+        self._chat_prefixes: Dict[Tuple[int, str], Tuple[Any, str, str, List[int]]] = {}
+        self._stats = {"lookups": 0, "reloads": 0, "scans": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self.refresh()
+        if watch_interval is not None:
+            self._watcher = threading.Thread(target=self._watch, name="prompt-registry", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.refresh()
+            except OSError as e:
+                print(f"Warning: could not check prompt files in {self.prompts_dir}: {e}")
+
+    def refresh(self) -> int:
+        """
+        Re-read prompt files whose modification time or size changed
+
+        Returns:
+            int: Number of prompt files loaded, changed or removed
+        """
+        found = {}
+        if self.prompts_dir.is_dir():
+            for entry in os.scandir(self.prompts_dir):
+                if entry.is_file() and entry.name.endswith(PROMPT_SUFFIXES):
+                    stat = entry.stat()
+                    found[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            current = dict(self._files)
+        files = {}
+        changed = 0
+        for name, (mtime_ns, size) in found.items():
+            cached = current.get(name)
+            if cached is not None and cached[:2] == (mtime_ns, size):
+                files[name] = cached
+                continue
+            try:
+                files[name] = (mtime_ns, size, _read_prompt(self.prompts_dir / name))
+            except OSError as e:
+                # Deleted or unreadable between listing and reading: keep the previous text
+                print(f"Warning: could not read prompt {name}: {e}")
+                if cached is not None:
+                    files[name] = cached
+                continue
+            changed += 1
+        changed += len(set(current) - set(files))
+
+        with self._lock:
+            self._stats["scans"] += 1
+            if changed:
+                self._files = files
+                self._names_by_text = {text: name for name, (_, _, text) in files.items()}
+                # Renderings of changed prompts are dropped; the others stay valid
+                self._chat_prefixes = {key: value for key, value in self._chat_prefixes.items()
+                                       if key[1] in files and self._names_by_text.get(value[1]) == key[1]}
+                self._stats["reloads"] += changed
+        return changed
+
+    def get(self, intent: str) -> str:
+        """
+        System prompt of an intent or prompt file
+
+        Args:
+            intent: Key of INTENT_PROMPTS, a prompt file name or its stem (e.g. "DailyChat")
+
+        Returns:
+            str: The prompt text; unknown intents get the daily chat prompt and a missing
+                 prompt file the built-in DEFAULT_PROMPT
+        """
+        file_name = INTENT_PROMPTS.get(intent)
+        if file_name == "":
+            return ""
+        with self._lock:
+            self._stats["lookups"] += 1
+            if file_name is None:
+                candidates = [intent] + [intent + suffix for suffix in PROMPT_SUFFIXES]
+                file_name = next((name for name in candidates if name in self._files), DEFAULT_PROMPT_FILE)
+            entry = self._files.get(file_name)
+        return entry[2] if entry is not None else DEFAULT_PROMPT
+
+    def names(self) -> List[str]:
+        """File names of the loaded prompts"""
+        with self._lock:
+            return sorted(self._files)
+
+    def chat_prefix(self, tokenizer, system_prompt: str) -> Tuple[str, List[int]]:
+        """
+        Chat-template rendering of a system prompt and its token ids
+
+        Renderings of registered prompts are kept per tokenizer; other prompts are
+        rendered on every call.
+
+        Args:
+            tokenizer: Tokenizer with a chat template
+            system_prompt: Content of the system message
+
+        Returns:
+            tuple: (rendered system message, token ids)
+        """
+        with self._lock:
+            name = self._names_by_text.get(system_prompt)
+            cached = self._chat_prefixes.get((id(tokenizer), name)) if name is not None else None
+        if cached is not None and cached[0] is tokenizer and cached[1] == system_prompt:
+            return cached[2], cached[3]
+
+        prefix_text = tokenizer.apply_chat_template([{"role": "system", "content": system_prompt}],
+                                                    tokenize=False, add_generation_prompt=False)
+        prefix_ids = tokenizer(prefix_text)["input_ids"]
+        if name is not None:
+            with self._lock:
+                if self._names_by_text.get(system_prompt) == name:
+                    # The tokenizer is kept alive so that its id is not reused
+                    self._chat_prefixes[(id(tokenizer), name)] = (tokenizer, system_prompt, prefix_text, prefix_ids)
+        return prefix_text, prefix_ids
+
+    def close(self):
+        """Stop watching the prompt files"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get registry counters
+
+        Returns:
+            dict: prompts, lookups, reloads (prompt files loaded, changed or removed),
+                  scans and chat_prefixes (cached renderings)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["prompts"] = len(self._files)
+            stats["chat_prefixes"] = len(self._chat_prefixes)
+        return stats
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def default_registry() -> PromptRegistry:
+    """The process-wide registry of ExtendMaterial/Prompts, created on first use"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = PromptRegistry()
+        return _default_registry
@@ -1,63 +1,117 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import time
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 from langchain_core.runnables import Runnable, RunnableConfig
 
-class QwenRunnable(Runnable):
+try:
+    from ChatBots.model_loader import load_causal_lm
+    from ChatBots.model_pool import shared_model_pool
+    from ChatBots.thinking_budget import INTENT_THINKING_BUDGETS, resolve_thinking_budget, thinking_budget_kwargs
+    from ChatBots.token_streaming import start_generation, think_end_token_id
+except ImportError:
+    from model_loader import load_causal_lm
+    from model_pool import shared_model_pool
+    from thinking_budget import INTENT_THINKING_BUDGETS, resolve_thinking_budget, thinking_budget_kwargs
+    from token_streaming import start_generation, think_end_token_id
+
+
+def load_qwen_model(model_name: str, load_8bit: bool = True, llm_int8_threshold: float = 5.0,
+                    quantized_checkpoint: str = None):
     """
-    Runnable wrapper for local Qwen3-1.7B inference with optional Chain-of-Thought.
+    Load tokenizer and model for QwenRunnable
+
+    Returns:
+        tuple: (tokenizer, model); bitsandbytes 8-bit on GPU, dynamic int8 on CPU
     """
-    def __init__(self,
-                 model_name: str = "./Qwen3-1.7B",
-                 load_8bit: bool = True,
-                 llm_int8_threshold: float = 5.0,
-                 max_new_tokens: int = 500):
-        super().__init__(config=RunnableConfig())
-        # Load tokenizer and model once
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+    if torch.cuda.is_available():
+        tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
         quant_config = BitsAndBytesConfig(
             load_in_8bit=load_8bit,
             llm_int8_threshold=llm_int8_threshold
         )
-        self.model = AutoModelForCausalLM.from_pretrained(
+        model = AutoModelForCausalLM.from_pretrained(
             model_name,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            torch_dtype=torch.float16,
             quantization_config=quant_config,
             device_map="auto",
             trust_remote_code=True
         )
+    else:
+        # bitsandbytes 8-bit needs a GPU; use PyTorch dynamic int8 quantization on CPU
+        tokenizer, model, _ = load_causal_lm(
+            model_name,
+            device="cpu",
+            quantize=load_8bit,
+            quantized_checkpoint=quantized_checkpoint,
+            trust_remote_code=True
+        )
+    return tokenizer, model
+
+class QwenRunnable(Runnable):
+    """
+    Runnable wrapper for local Qwen3-1.7B inference with optional Chain-of-Thought.
+    """
+    def __init__(self,
+                 model_name: str = "./Qwen3-1.7B",
+                 load_8bit: bool = True,
+                 llm_int8_threshold: float = 5.0,
+                 max_new_tokens: int = 500,
+                 quantized_checkpoint: str = None,
+                 thinking_budgets: Optional[Dict[str, Optional[int]]] = None):
+        super().__init__()
+        # Load tokenizer and model once per process (shared with other QwenRunnables)
+        self._pooled = shared_model_pool.acquire(
+            model_name,
+            factory=load_qwen_model,
+            load_8bit=load_8bit,
+            llm_int8_threshold=llm_int8_threshold,
+            quantized_checkpoint=quantized_checkpoint
+        )
+        self.tokenizer, self.model = self._pooled
         self.max_new_tokens = max_new_tokens
+        self.think_end_id = think_end_token_id(self.tokenizer)
+        # Intent type -> most reasoning tokens in thinking mode (see thinking_budget.py)
+        self.thinking_budgets = dict(INTENT_THINKING_BUDGETS if thinking_budgets is None else thinking_budgets)
+        self._last_streamer = None
+
+    def _encode(self, inputs: Dict[str, Any]):
+        """Apply the chat template to inputs["prompt"] and tokenize it"""
+        messages = [{"role": "user", "content": inputs.get("prompt", "")}]
+        text = self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True,
+            enable_thinking=inputs.get("thinking", False)
+        )
+        return self.tokenizer([text], return_tensors="pt").to(self.model.device)
+
+    def _budget_kwargs(self, inputs: Dict[str, Any], model_inputs) -> Dict[str, Any]:
+        """generate() arguments for the thinking budget of a request"""
+        budget = resolve_thinking_budget(inputs, self.thinking_budgets)
+        return thinking_budget_kwargs(budget, self.think_end_id, model_inputs.input_ids.shape[1])
 
     def invoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
         inputs:
           - prompt: str (user input)
           - thinking: bool (whether to retain CoT tokens, default False)
+          - thinking_budget: int (most reasoning tokens before </think> is forced) or
+            intent: str (budget from self.thinking_budgets); unbounded when neither is given
         returns:
           - thinking: str
           - content: str
         """
-        prompt_text: str = inputs.get("prompt", "")
         thinking_flag: bool = inputs.get("thinking", False)
-
-        # Build chat template
-        messages = [{"role": "user", "content": prompt_text}]
-        text = self.tokenizer.apply_chat_template(
-            messages,
-            tokenize=False,
-            add_generation_prompt=True,
-            enable_thinking=thinking_flag
-        )
-        # Encode inputs
-        model_inputs = self.tokenizer([text], return_tensors="pt").to(self.model.device)
+        model_inputs = self._encode(inputs)
 
         # Generate
         start = time.perf_counter()
         outputs = self.model.generate(
             **model_inputs,
             max_new_tokens=self.max_new_tokens,
-            use_cache=True
+            use_cache=True,
+            **self._budget_kwargs(inputs, model_inputs)
         )
         gen_ids = outputs[0][len(model_inputs.input_ids[0]):].tolist()
         elapsed_ms = (time.perf_counter() - start) * 1000
@@ -67,8 +121,8 @@ class QwenRunnable(Runnable):
         thinking_content, content = "", ""
         if thinking_flag:
             try:
-                # 151668 token id corresponds to </think>
-                idx = len(gen_ids) - gen_ids[::-1].index(151668)
+                # 151668 token id corresponds to </think> in Qwen3
+                idx = len(gen_ids) - gen_ids[::-1].index(self.think_end_id)
             except ValueError:
                 idx = 0
             thinking_content = self.tokenizer.decode(gen_ids[:idx], skip_special_tokens=True).strip("\n")
@@ -78,6 +132,39 @@ class QwenRunnable(Runnable):
 
         return {"thinking": thinking_content, "content": content}
 
-    async def astream(self, inputs: Dict[str, Any]):
-        # Optionally implement streaming if needed
-        raise NotImplementedError("Streaming not implemented for QwenRunnable")
+    def _start_stream(self, inputs: Dict[str, Any]):
+        model_inputs = self._encode(inputs)
+        streamer = start_generation(
+            self.model,
+            self.tokenizer,
+            model_inputs,
+            thinking=inputs.get("thinking", False),
+            think_end_id=self.think_end_id,
+            max_new_tokens=self.max_new_tokens,
+            use_cache=True,
+            **self._budget_kwargs(inputs, model_inputs)
+        )
+        self._last_streamer = streamer
+        return streamer
+
+    def stream(self, inputs: Dict[str, Any], config: RunnableConfig = None, **kwargs):
+        """
+        Same inputs as invoke; yields {"thinking": str, "content": str} chunks per token.
+        Timing (ttft_ms, total_ms, tokens_per_second) of the last stream: get_stream_stats().
+        """
+        yield from self._start_stream(inputs)
+
+    async def astream(self, inputs: Dict[str, Any], config: RunnableConfig = None, **kwargs):
+        """Async version of stream; generation runs in a background thread"""
+        async for chunk in self._start_stream(inputs):
+            yield chunk
+
+    def get_stream_stats(self):
+        """Timing of the most recent stream (None before any stream)"""
+        return self._last_streamer.get_stats() if self._last_streamer else None
+
+    def close(self):
+        """Release the shared model; it is unloaded once no QwenRunnable has used it for a while"""
+        if self._pooled is not None:
+            shared_model_pool.release(self._pooled)
+            self._pooled = None
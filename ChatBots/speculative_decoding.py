@@ -0,0 +1,278 @@
+"""
+SpeculativeDecoder - Draft-and-verify decoding with a small model of the same family
+
+Qwen3-0.6B, 1.7B and 4B share one tokenizer. Decoding with the large model is bound by
+one forward pass per token; a small draft model is several times cheaper per token.
+Each step:
+- the draft model proposes the next k tokens, one cheap forward pass each
+- the target model scores the last token and all k proposals in a single forward pass
+- the longest run of proposals the target agrees with is kept, plus one token chosen by
+  the target itself, so every step yields between 1 and k+1 tokens
+- both KV caches are cropped back to the accepted tokens
+
+Greedy decoding keeps a proposal when it is the target's argmax, so the output is the
+target's own greedy output. With sampling, proposals are accepted with probability
+min(1, p/q) and a rejected position is resampled from the residual max(0, p - q), which
+keeps the target's sampling distribution.
+
+k adapts to the acceptance (one more after a fully accepted step, one fewer otherwise).
+When the acceptance rate of a generation stays below min_acceptance after warmup_tokens
+proposals, the draft model is dropped for the rest of that generation and the target
+decodes alone, so a poorly matched draft costs at most the warm-up. After a generation
+falls back, the following 1, 3, 7, ... (at most max_skipped) generations skip the draft
+altogether; a generation that keeps the draft resets the back-off.
+
+With a thinking budget (see thinking_budget.py), tokens past the budget of an unclosed
+reasoning section are dropped and replaced by </think>, and both caches are cropped.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import torch
+
+try:
+    from ChatBots.continuous_batching import _cache_tensors, _set_cache_tensors
+    from ChatBots.thinking_budget import thinking_budget_exhausted
+except ImportError:
+    from continuous_batching import _cache_tensors, _set_cache_tensors
+    from thinking_budget import thinking_budget_exhausted
+
+
+def _crop_cache(cache, length: int):
+    """Keep the first length positions of a transformers DynamicCache"""
+    if cache is not None and cache.get_seq_length() > length:
+        _set_cache_tensors(cache, [[tensor[:, :, :length] for tensor in layer] for layer in _cache_tensors(cache)])
+
+
+def _probabilities(logits: torch.Tensor, sampling: Dict[str, Any]) -> torch.Tensor:
+    """Next-token distribution after temperature, top-k and top-p"""
+    logits = logits.float() / max(sampling.get("temperature") or 1.0, 1e-5)
+    top_k = sampling.get("top_k")
+    if top_k:
+        threshold = torch.topk(logits, min(top_k, logits.shape[-1])).values[-1]
+        logits = logits.masked_fill(logits < threshold, float("-inf"))
+    top_p = sampling.get("top_p")
+    if top_p is not None and top_p < 1.0:
+        sorted_logits, order = torch.sort(logits, descending=True)
+        sorted_probs = torch.softmax(sorted_logits, dim=-1)
+        remove = sorted_probs.cumsum(-1) - sorted_probs > top_p
+        logits[order[remove]] = float("-inf")
+    return torch.softmax(logits, dim=-1)
+
+
+class SpeculativeDecoder:
+    def __init__(self, model, draft_model, eos_token_ids: Iterable[int], num_speculative_tokens: int = 4,
+                 adaptive: bool = True, min_acceptance: float = 0.3, warmup_tokens: int = 8, max_skipped: int = 16,
+                 prefix_cache=None):
+        """
+        Args:
+            model: Target causal LM (Hugging Face transformers)
+            draft_model: Smaller causal LM with the same tokenizer
+            eos_token_ids: Token ids ending a sequence
+            num_speculative_tokens: Tokens proposed per step (upper bound when adaptive)
+            adaptive: Adjust the number of proposals to the acceptance of the previous step
+            min_acceptance: Acceptance rate below which a generation stops using the draft
+            warmup_tokens: Proposals made before the acceptance rate is judged
+            max_skipped: Most generations decoded without the draft after repeated fallbacks
+            prefix_cache: PrefixKVCache of the target model for shared system prompts
+        """
+        target_vocab, draft_vocab = model.config.vocab_size, draft_model.config.vocab_size
+        if target_vocab != draft_vocab:
+            raise ValueError(f"Draft model vocabulary ({draft_vocab}) does not match the target model ({target_vocab})")
+        if num_speculative_tokens < 1:
+            raise ValueError("num_speculative_tokens must be at least 1")
+        self.model = model
+        self.draft_model = draft_model
+        self.eos_token_ids = set(eos_token_ids)
+        self.num_speculative_tokens = num_speculative_tokens
+        self.adaptive = adaptive
+        self.min_acceptance = min_acceptance
+        self.warmup_tokens = warmup_tokens
+        self.max_skipped = max_skipped
+        self.prefix_cache = prefix_cache
+        self.last_generation = {}
+        self._fallback_streak = 0
+        self._skip_remaining = 0
+        self._stats = {"generations": 0, "new_tokens": 0, "target_steps": 0, "drafted": 0, "accepted": 0,
+                       "fallbacks": 0, "skipped": 0, "seconds": 0.0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _forward(model, tokens: List[int], cache) -> Tuple[Any, torch.Tensor]:
+        """Run tokens after the cached ones; returns the extended cache and their logits"""
+        input_ids = torch.tensor([tokens], device=model.device)
+        with torch.no_grad():
+            outputs = model(input_ids=input_ids, past_key_values=cache, use_cache=True)
+        return outputs.past_key_values, outputs.logits[0]
+
+    @staticmethod
+    def _choose(logits: torch.Tensor, sampling: Dict[str, Any]) -> Tuple[int, Optional[torch.Tensor]]:
+        """Token picked from logits and the distribution it was drawn from (None when greedy)"""
+        if not sampling.get("do_sample"):
+            return int(logits.argmax()), None
+        probs = _probabilities(logits, sampling)
+        return int(torch.multinomial(probs, 1)), probs
+
+    @staticmethod
+    def _verify(candidates: List[int], draft_probs: List[Optional[torch.Tensor]], target_logits: torch.Tensor,
+                sampling: Dict[str, Any]) -> Tuple[List[int], int]:
+        """
+        Tokens kept from a step: the accepted proposals followed by one target token
+
+        Returns:
+            tuple: (new tokens, number of accepted proposals)
+        """
+        if not sampling.get("do_sample"):
+            choices = target_logits.argmax(dim=-1).tolist()
+            accepted = 0
+            while accepted < len(candidates) and candidates[accepted] == choices[accepted]:
+                accepted += 1
+            return candidates[:accepted] + [choices[accepted]], accepted
+
+        for i, token in enumerate(candidates):
+            p = _probabilities(target_logits[i], sampling)
+            q = draft_probs[i]
+            if torch.rand(()) * q[token] > p[token]:
+                # Rejected: resample from the part of p the draft under-proposed
+                residual = torch.clamp(p - q, min=0)
+                if residual.sum() <= 0:
+                    residual = p
+                return candidates[:i] + [int(torch.multinomial(residual / residual.sum(), 1))], i
+        bonus = torch.multinomial(_probabilities(target_logits[len(candidates)], sampling), 1)
+        return candidates + [int(bonus)], len(candidates)
+
+    def generate(self, input_ids: List[int], max_new_tokens: int = 512, prefix_length: int = 0,
+                 sampling: Optional[Dict[str, Any]] = None, thinking_budget: Optional[int] = None,
+                 think_end_id: Optional[int] = None) -> List[int]:
+        """
+        Generate a reply with draft proposals verified by the target model
+
+        Args:
+            input_ids: Prompt token ids
+            max_new_tokens: Maximum tokens to generate
+            prefix_length: Leading tokens that can come from the target's prefix cache
+            sampling: do_sample, temperature, top_k, top_p (greedy when omitted)
+            thinking_budget: Most reasoning tokens before </think> is forced (None: unbounded)
+            think_end_id: Id of </think> (required with a thinking budget)
+
+        Returns:
+            list: Generated token ids (end-of-sequence included); counters of the call are
+                  kept in self.last_generation
+        """
+        sampling = dict(sampling or {})
+        ids = list(input_ids)
+        prompt_length = len(ids)
+
+        def next_token(logits):
+            if thinking_budget_exhausted(ids[prompt_length:], thinking_budget, think_end_id):
+                return think_end_id
+            return self._choose(logits, sampling)[0]
+
+        def thinking_left():
+            """Reasoning tokens left before </think> must follow (None: no bound or reasoning closed)"""
+            generated = ids[prompt_length:]
+            if thinking_budget is None or think_end_id in generated:
+                return None
+            return thinking_budget - len(generated)
+        with self._lock:
+            start = time.perf_counter()
+            stats = {"target_steps": 0, "drafted": 0, "accepted": 0, "fell_back": False,
+                     "skipped": self._skip_remaining > 0}
+            if stats["skipped"]:
+                self._skip_remaining -= 1
+
+            past_key_values = None
+            if prefix_length and self.prefix_cache is not None:
+                past_key_values = self.prefix_cache.get(self.model, ids[:prefix_length])
+            else:
+                prefix_length = 0
+            target_cache, logits = self._forward(self.model, ids[prefix_length:], past_key_values)
+            ids.append(next_token(logits[-1]))
+
+            draft_cache = None
+            k = self.num_speculative_tokens
+            while ids[-1] not in self.eos_token_ids and len(ids) - prompt_length < max_new_tokens:
+                stats["target_steps"] += 1
+                proposals = min(k, max_new_tokens - (len(ids) - prompt_length) - 1)
+                left = thinking_left()
+                if left is not None:
+                    # Proposals past the budget would be replaced by </think>
+                    proposals = min(proposals, left)
+                if stats["fell_back"] or stats["skipped"] or proposals < 1:
+                    target_cache, logits = self._forward(self.model, ids[-1:], target_cache)
+                    ids.append(next_token(logits[-1]))
+                    continue
+
+                # Draft: catch up on the tokens it has not seen, then propose one token per pass
+                drafted_length = draft_cache.get_seq_length() if draft_cache is not None else 0
+                draft_cache, draft_logits = self._forward(self.draft_model, ids[drafted_length:], draft_cache)
+                candidates, draft_probs = [], []
+                while True:
+                    token, probs = self._choose(draft_logits[-1], sampling)
+                    candidates.append(token)
+                    draft_probs.append(probs)
+                    if len(candidates) == proposals or token in self.eos_token_ids:
+                        break
+                    draft_cache, draft_logits = self._forward(self.draft_model, [token], draft_cache)
+
+                # Target: score the last token and every proposal in one pass
+                target_cache, target_logits = self._forward(self.model, ids[-1:] + candidates, target_cache)
+                new_tokens, accepted = self._verify(candidates, draft_probs, target_logits, sampling)
+                ids.extend(new_tokens)
+                if thinking_budget is not None and think_end_id not in ids[prompt_length:prompt_length + thinking_budget + 1] \
+                        and len(ids) - prompt_length > thinking_budget:
+                    # The target's own token after the last proposal lands on the budget
+                    del ids[prompt_length + thinking_budget:]
+                    ids.append(think_end_id)
+                _crop_cache(target_cache, len(ids) - 1)
+                _crop_cache(draft_cache, len(ids) - 1)
+
+                stats["drafted"] += len(candidates)
+                stats["accepted"] += accepted
+                if self.adaptive:
+                    k = min(k + 1, self.num_speculative_tokens) if accepted == len(candidates) else max(1, k - 1)
+                if stats["drafted"] >= self.warmup_tokens and stats["accepted"] < self.min_acceptance * stats["drafted"]:
+                    stats["fell_back"] = True
+                    draft_cache = None
+
+            output_ids = ids[prompt_length:prompt_length + max_new_tokens]
+            for j, token in enumerate(output_ids):
+                if token in self.eos_token_ids:
+                    output_ids = output_ids[:j + 1]
+                    break
+
+            stats["new_tokens"] = len(output_ids)
+            stats["seconds"] = time.perf_counter() - start
+            stats["acceptance_rate"] = stats["accepted"] / stats["drafted"] if stats["drafted"] else 0.0
+            stats["tokens_per_second"] = stats["new_tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+            self.last_generation = stats
+            self._stats["generations"] += 1
+            self._stats["fallbacks"] += int(stats["fell_back"])
+            self._stats["skipped"] += int(stats["skipped"])
+            if stats["fell_back"]:
+                self._fallback_streak += 1
+                self._skip_remaining = min(2 ** self._fallback_streak - 1, self.max_skipped)
+            elif stats["drafted"]:
+                self._fallback_streak = 0
+            for key in ("new_tokens", "target_steps", "drafted", "accepted", "seconds"):
+                self._stats[key] += stats[key]
+        return output_ids
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get counters over all generations
+
+        Returns:
+            dict: generations, new_tokens, target_steps (target forward passes after the prompt),
+                  drafted, accepted, fallbacks (generations that stopped using the draft),
+                  skipped (generations decoded without the draft during back-off), seconds,
+                  acceptance_rate, tokens_per_step and tokens_per_second
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["acceptance_rate"] = stats["accepted"] / stats["drafted"] if stats["drafted"] else 0.0
+        stats["tokens_per_step"] = stats["new_tokens"] / stats["target_steps"] if stats["target_steps"] else 0.0
+        stats["tokens_per_second"] = stats["new_tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
@@ -0,0 +1,128 @@
+"""
+Unit tests for the native async methods of LocalChatBot (ainvoke, abatch, astream)
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from langchain_core.prompts import ChatPromptTemplate
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站", "讲一个睡前故事"]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers, tokenizers and langchain are required")
+class TestAsyncLocalChatBot(unittest.TestCase):
+    """Concurrent awaits share the generation worker and reply as the sync methods do"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+        cls.chatbot.model.generation_config.do_sample = False
+        cls.config = {"thinking": True, "max_tokens": 12, "thinking_budget": 4}
+        cls.expected = [cls.chatbot.invoke(prompt, cls.config) for prompt in PROMPTS]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.chatbot.disable_continuous_batching()
+        shutil.rmtree(cls.test_dir)
+
+    def tearDown(self):
+        self.chatbot.disable_continuous_batching()
+
+    def test_concurrent_ainvoke_is_batched(self):
+        async def run():
+            return await asyncio.gather(*(self.chatbot.ainvoke(prompt, self.config) for prompt in PROMPTS))
+
+        self.assertEqual(asyncio.run(run()), self.expected)
+        stats = self.chatbot.async_engine.get_stats()
+        self.assertEqual(stats["completed"], len(PROMPTS))
+        self.assertGreater(stats["mean_batch_size"], 1.0)
+        # Sync callers keep using generate(): the async worker does not switch them over
+        self.assertIsNone(self.chatbot.engine)
+        self.assertEqual(self.chatbot.invoke(PROMPTS[0], self.config), self.expected[0])
+        self.assertEqual(self.chatbot.async_engine.get_stats()["completed"], len(PROMPTS))
+
+    def test_explicit_engine_is_shared(self):
+        engine = self.chatbot.enable_continuous_batching()
+        self.assertEqual(asyncio.run(self.chatbot.ainvoke(PROMPTS[0], self.config)), self.expected[0])
+        self.assertEqual(self.chatbot.invoke(PROMPTS[1], self.config), self.expected[1])
+        self.assertIsNone(self.chatbot.async_engine)
+        self.assertEqual(engine.get_stats()["completed"], 2)
+
+    def test_ainvoke_logprobs_and_function_call(self):
+        async def run():
+            scored = await self.chatbot.ainvoke("hi", {"max_tokens": 8, "logprobs": True})
+            call = await self.chatbot.ainvoke("hi", {"max_tokens": 80, "function_call": ["get_battery_status"]})
+            return scored, call
+
+        scored, call = asyncio.run(run())
+        self.assertEqual(scored, self.chatbot.invoke("hi", {"max_tokens": 8, "logprobs": True}))
+        grammar = self.chatbot._function_call_grammar(["get_battery_status"])
+        self.assertEqual(grammar.parse(call["content"]), ("battery_module.get_battery_status", {}))
+
+    def test_abatch_matches_batch(self):
+        expected = self.chatbot.batch(PROMPTS, self.config)
+        self.assertEqual(asyncio.run(self.chatbot.abatch(PROMPTS, self.config)), expected)
+        self.assertEqual(self.chatbot.last_batch_stats["padding_tokens"], 0)
+        self.assertEqual(self.chatbot.async_engine.get_stats()["completed"], len(PROMPTS))
+        # One config per input, as LangChain passes them
+        replies = asyncio.run(self.chatbot.abatch(PROMPTS[:2], [self.config, {"max_tokens": 12}]))
+        self.assertEqual(replies, [self.expected[0], self.chatbot.invoke(PROMPTS[1], {"max_tokens": 12})])
+
+    def test_astream_and_early_exit(self):
+        async def collect(prompt):
+            return [chunk async for chunk in self.chatbot.astream(prompt, self.config)]
+
+        async def run():
+            streams = await asyncio.gather(*(collect(prompt) for prompt in PROMPTS))
+            # Leaving the loop after the first chunk stops the sequence at its next token
+            async for _ in self.chatbot.astream("hi", {"max_tokens": 200}):
+                break
+            return streams
+
+        streams = asyncio.run(run())
+        for chunks, expected in zip(streams, self.expected):
+            self.assertEqual("".join(chunk["thinking"] for chunk in chunks).strip("\n"), expected["thinking"])
+            self.assertEqual("".join(chunk["content"] for chunk in chunks).strip("\n"), expected["content"])
+        self.assertIsNotNone(self.chatbot.get_stream_stats()["ttft_ms"])
+        for _ in range(100):
+            if self.chatbot.async_engine.get_stats()["active"] == 0:
+                break
+            time.sleep(0.05)
+        self.assertLess(self.chatbot.async_engine.get_stats()["decoded_tokens"], 200)
+
+    def test_langchain_chain(self):
+        chain = ChatPromptTemplate.from_messages([("user", "{question}")]) | self.chatbot
+        config = {"max_tokens": 12}
+
+        async def run():
+            concurrent = await asyncio.gather(*(chain.ainvoke({"question": prompt}, config) for prompt in PROMPTS))
+            return concurrent, await chain.abatch([{"question": prompt} for prompt in PROMPTS], config)
+
+        concurrent, batched = asyncio.run(run())
+        expected = [self.chatbot.invoke(prompt, config) for prompt in PROMPTS]
+        self.assertEqual(concurrent, expected)
+        self.assertEqual(batched, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
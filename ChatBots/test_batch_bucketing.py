@@ -0,0 +1,96 @@
+"""
+Unit tests for length-bucketed batching in LocalChatBot.batch
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from LocalChatBot import LocalChatBot
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+
+def encoded_lengths(*lengths, prefix=()):
+    """_plan_batches input with token rows of the given lengths after a shared prefix"""
+    return {j: (list(prefix) + [7] * length, len(prefix)) for j, length in enumerate(lengths)}
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestPlanBatches(unittest.TestCase):
+    """Tests for the batch planning alone"""
+
+    def test_arrival_order_slices(self):
+        batches = LocalChatBot._plan_batches(encoded_lengths(5, 50, 6, 7), 2, length_bucketing=False)
+        self.assertEqual(batches, [[0, 1], [2, 3]])
+
+    def test_long_prompt_gets_own_batch(self):
+        batches = LocalChatBot._plan_batches(encoded_lengths(5, 50, 6, 7), 8)
+        self.assertEqual(batches, [[0, 2, 3], [1]])
+
+    def test_batch_size_respected(self):
+        batches = LocalChatBot._plan_batches(encoded_lengths(*[10] * 5), 2)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+    def test_prefixes_never_mixed(self):
+        encoded = encoded_lengths(4, 4, prefix=(1, 2))
+        encoded.update({j + 2: row for j, row in encoded_lengths(4, 4, prefix=(3,)).items()})
+        batches = LocalChatBot._plan_batches(encoded, 8)
+        self.assertEqual(sorted(map(sorted, batches)), [[0, 1], [2, 3]])
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestBucketedBatch(unittest.TestCase):
+    """batch() on a tiny random Qwen3 checkpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+        cls.inputs = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站，然后把空调调到二十二度", "ok",
+                      {"messages": [{"role": "system", "content": "You are a car."}, {"role": "user", "content": "锁车"}]}]
+        cls.config = {"max_tokens": 6}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_results_in_input_order_and_match_invoke(self):
+        results = self.chatbot.batch(self.inputs, self.config)
+        self.assertEqual(results, [self.chatbot.invoke(item, self.config) for item in self.inputs])
+
+    def test_bucketing_reduces_padding(self):
+        bucketed = self.chatbot.batch(self.inputs, self.config)
+        bucketed_stats = self.chatbot.last_batch_stats
+        arrival = self.chatbot.batch(self.inputs, dict(self.config, length_bucketing=False))
+        arrival_stats = self.chatbot.last_batch_stats
+        self.assertEqual(bucketed, arrival)
+        self.assertLess(bucketed_stats["padding_ratio"], arrival_stats["padding_ratio"])
+        self.assertEqual(bucketed_stats["prompt_tokens"], arrival_stats["prompt_tokens"])
+        self.assertGreater(bucketed_stats["tokens_per_second"], 0)
+
+    def test_item_error_does_not_fail_batch(self):
+        results = self.chatbot.batch(["打开车窗", BrokenInput()], self.config)
+        self.assertEqual(results[0], self.chatbot.invoke("打开车窗", self.config))
+        self.assertTrue(results[1]["content"].startswith("Item processing error"))
+
+
+class BrokenInput:
+    def __str__(self):
+        raise RuntimeError("cannot format")
+
+
+if __name__ == "__main__":
+    unittest.main()
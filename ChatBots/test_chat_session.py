@@ -0,0 +1,156 @@
+"""
+Unit tests for multi-turn sessions with KV cache retention in chat_session.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from chat_session import cache_nbytes
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestChatSession(unittest.TestCase):
+    """Sessions on a tiny random Qwen3 checkpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+        cls.config = {"max_tokens": 6}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def setUp(self):
+        manager = self.chatbot.sessions
+        manager.max_memory_bytes, manager.idle_timeout = 512 * 1024 * 1024, 600
+        for session_id in list(manager._sessions):
+            self.chatbot.close_session(session_id)
+
+    def test_turns_prefill_only_new_tokens(self):
+        session = self.chatbot.create_session("You are a car assistant.")
+        session.invoke("打开车窗", self.config)
+        first_length = len(session.token_ids)
+        session.invoke("刚才说什么", self.config)
+        self.assertEqual(session.last_turn["prompt_tokens"] - session.last_turn["prefilled_tokens"], first_length - 1)
+        self.assertEqual([m["role"] for m in session.messages], ["system", "user", "assistant", "user", "assistant"])
+        self.assertEqual(session.past_key_values.get_seq_length(), len(session.token_ids) - 1)
+
+    def test_cached_turn_matches_full_prefill(self):
+        session = self.chatbot.create_session("You are a car assistant.")
+        session.invoke("打开车窗", self.config)
+        session.invoke("继续", self.config)
+        prompt = session.token_ids[:session.last_turn["prompt_tokens"]]
+        with torch.no_grad():
+            expected = self.chatbot.model.generate(input_ids=torch.tensor([prompt]), max_new_tokens=6, use_cache=True)
+        self.assertEqual(expected[0].tolist(), session.token_ids)
+
+    def test_reply_cut_by_max_tokens_is_closed(self):
+        session = self.chatbot.create_session()
+        session.invoke("打开车窗", {"max_tokens": 1})
+        length = len(session.token_ids)
+        session.invoke("继续", {"max_tokens": 1})
+        self.assertEqual(session.token_ids[length], self.chatbot.tokenizer.eos_token_id)
+
+    def test_reply_ended_by_another_eos_is_not_closed_again(self):
+        generation_config = self.chatbot.model.generation_config
+        original = generation_config.eos_token_id
+        other_eos = self.chatbot.tokenizer.convert_tokens_to_ids("<|endoftext|>")
+        generation_config.eos_token_id = [self.chatbot.tokenizer.eos_token_id, other_eos]
+        try:
+            session = self.chatbot.create_session()
+            session.token_ids = session.token_ids + [other_eos]
+            self.assertNotEqual(session._turn_ids("继续", False)[0], self.chatbot.tokenizer.eos_token_id)
+        finally:
+            generation_config.eos_token_id = original
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        first = self.chatbot.create_session(session_id="first")
+        second = self.chatbot.create_session(session_id="second")
+        first.invoke("打开车窗", self.config)
+        self.chatbot.sessions.max_memory_bytes = cache_nbytes(first.past_key_values) + 1
+        second.invoke("关闭车窗", self.config)
+        self.assertIsNone(first.past_key_values)
+        self.assertIsNotNone(second.past_key_values)
+
+        # The evicted session prefills its history once and continues
+        first.invoke("继续", self.config)
+        self.assertEqual(first.last_turn["prefilled_tokens"], first.last_turn["prompt_tokens"])
+        stats = self.chatbot.get_session_stats()
+        self.assertGreaterEqual(stats["evictions"], 2)
+        self.assertEqual(stats["reprefills"], 1)
+        self.assertEqual(stats["cached_sessions"], 1)
+
+    def test_idle_sessions_lose_cache(self):
+        idle = self.chatbot.create_session()
+        idle.invoke("打开车窗", self.config)
+        self.chatbot.sessions.idle_timeout = 0
+        self.chatbot.create_session().invoke("关闭车窗", self.config)
+        self.assertIsNone(idle.past_key_values)
+        self.assertTrue(idle.token_ids)
+
+    def test_idle_caches_released_without_new_turns(self):
+        first = self.chatbot.create_session(session_id="first")
+        second = self.chatbot.create_session(session_id="second")
+        first.invoke("打开车窗", self.config)
+        second.invoke("关闭车窗", self.config)
+        self.chatbot.sessions.idle_timeout = 0
+        self.assertIs(self.chatbot.get_session("first"), first)
+        self.assertIsNone(first.past_key_values)
+        self.assertIsNone(second.past_key_values)
+
+        third = self.chatbot.create_session(session_id="third")
+        third.invoke("继续", self.config)
+        self.assertIsNotNone(third.past_key_values)
+        self.assertEqual(self.chatbot.get_session_stats()["cached_sessions"], 0)
+
+    def test_sessions_over_the_limit_release_cache(self):
+        manager = self.chatbot.sessions
+        max_sessions, manager.max_sessions = manager.max_sessions, 1
+        try:
+            oldest = self.chatbot.create_session(session_id="oldest")
+            oldest.invoke("打开车窗", self.config)
+            self.chatbot.create_session(session_id="newest")
+            self.assertIsNone(self.chatbot.get_session("oldest"))
+            self.assertIsNone(oldest.past_key_values)
+            self.assertEqual(oldest.kv_bytes, 0)
+
+            # Replacing a session by id releases the old one too
+            replaced = self.chatbot.get_session("newest")
+            replaced.invoke("关闭车窗", self.config)
+            self.chatbot.create_session(session_id="newest")
+            self.assertIsNone(replaced.past_key_values)
+        finally:
+            manager.max_sessions = max_sessions
+
+    def test_reset_and_close(self):
+        session = self.chatbot.create_session("system", session_id="s1")
+        session.invoke("打开车窗", self.config)
+        session.reset()
+        self.assertEqual(session.messages, [{"role": "system", "content": "system"}])
+        self.assertEqual(session.token_ids, [])
+        self.assertIs(self.chatbot.get_session("s1"), session)
+        self.assertTrue(self.chatbot.close_session("s1"))
+        self.assertIsNone(self.chatbot.get_session("s1"))
+        self.assertFalse(self.chatbot.close_session("s1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
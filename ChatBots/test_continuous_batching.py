@@ -0,0 +1,158 @@
+"""
+Unit tests for the continuous batching engine in continuous_batching.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from continuous_batching import ContinuousBatchingEngine
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站", "ok", "关闭车窗", "x"]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestContinuousBatchingEngine(unittest.TestCase):
+    """Engine on a tiny random Qwen3 checkpoint, compared with model.generate"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.chatbot.disable_continuous_batching()
+        shutil.rmtree(cls.test_dir)
+
+    def setUp(self):
+        self.engine = ContinuousBatchingEngine(self.chatbot.model, [self.chatbot.tokenizer.eos_token_id],
+                                               max_batch_size=2, prefix_cache=self.chatbot.prefix_cache)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def generate(self, ids, max_new_tokens):
+        with torch.no_grad():
+            output = self.chatbot.model.generate(input_ids=torch.tensor([ids]), max_new_tokens=max_new_tokens,
+                                                 do_sample=False)
+        return output[0, len(ids):].tolist()
+
+    def test_mixed_lengths_match_generate(self):
+        lengths = [3, 12, 20, 1, 9, 5]
+        encoded = [self.chatbot._tokenize(prompt) for prompt in PROMPTS]
+        futures = [self.engine.submit(ids, n, prefix_length) for (ids, prefix_length), n in zip(encoded, lengths)]
+        for (ids, _), n, future in zip(encoded, lengths, futures):
+            self.assertEqual(future.result(timeout=60), self.generate(ids, n))
+
+        stats = self.engine.get_stats()
+        self.assertEqual(stats["completed"], len(PROMPTS))
+        self.assertLessEqual(stats["mean_batch_size"], 2)
+        self.assertEqual(stats["active"], 0)
+
+    def test_shared_system_prompt_prefix(self):
+        messages = [{"role": "system", "content": "You are a car."}, {"role": "user", "content": "锁车"}]
+        ids, prefix_length = self.chatbot._tokenize({"messages": messages})
+        self.assertGreater(prefix_length, 0)
+        self.assertEqual(self.engine.generate([ids], 6, [prefix_length]), [self.generate(ids, 6)])
+        self.assertLess(self.engine.get_stats()["prefill_tokens"], len(ids))
+
+    def test_repetition_penalty_matches_generate(self):
+        ids = self.chatbot._tokenize(PROMPTS[2])[0]
+        with torch.no_grad():
+            output = self.chatbot.model.generate(input_ids=torch.tensor([ids]), max_new_tokens=16, do_sample=False,
+                                                 repetition_penalty=1.5)
+        expected = output[0, len(ids):].tolist()
+        self.assertEqual(self.engine.generate([ids], 16, sampling={"repetition_penalty": 1.5}), [expected])
+        self.assertNotEqual(expected, self.generate(ids, 16))
+
+    def test_prefill_error_fails_only_its_request(self):
+        good = self.engine.submit(self.chatbot._tokenize("hi")[0], 4)
+        bad = self.engine.submit([], 4)
+        with self.assertRaises(Exception):
+            bad.result(timeout=60)
+        self.assertEqual(len(good.result(timeout=60)), 4)
+
+    def test_close_cancels_waiting_requests(self):
+        engine = ContinuousBatchingEngine(self.chatbot.model, [], max_batch_size=1)
+        ids = self.chatbot._tokenize("hi")[0]
+        futures = [engine.submit(ids, 200) for _ in range(3)]
+        engine.close()
+        self.assertTrue(all(future.done() for future in futures))
+        with self.assertRaises(RuntimeError):
+            engine.submit(ids, 1)
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestLocalChatBotContinuousBatching(unittest.TestCase):
+    """invoke and batch served by the engine"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+        cls.config = {"max_tokens": 8}
+        cls.expected = [cls.chatbot.invoke(prompt, cls.config) for prompt in PROMPTS]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def setUp(self):
+        self.chatbot.enable_continuous_batching(max_batch_size=3)
+
+    def tearDown(self):
+        self.chatbot.disable_continuous_batching()
+
+    def test_batch(self):
+        self.assertEqual(self.chatbot.batch(PROMPTS, self.config), self.expected)
+        self.assertEqual(self.chatbot.last_batch_stats["padding_tokens"], 0)
+        self.assertEqual(self.chatbot.last_batch_stats["batches"], 1)
+
+    def test_batch_keeps_repetition_penalty(self):
+        unpenalized = self.chatbot.batch(PROMPTS[:3], {"max_tokens": 16})
+        generation_config = self.chatbot.model.generation_config
+        penalty, generation_config.repetition_penalty = generation_config.repetition_penalty, 1.5
+        try:
+            self.chatbot.disable_continuous_batching()
+            expected = self.chatbot.batch(PROMPTS[:3], {"max_tokens": 16})
+            self.assertNotEqual(expected, unpenalized)
+            self.chatbot.enable_continuous_batching(max_batch_size=3)
+            self.assertEqual(self.chatbot.batch(PROMPTS[:3], {"max_tokens": 16}), expected)
+        finally:
+            generation_config.repetition_penalty = penalty
+
+    def test_concurrent_invoke(self):
+        results = [None] * len(PROMPTS)
+
+        def ask(j):
+            results[j] = self.chatbot.invoke(PROMPTS[j], self.config)
+
+        threads = [threading.Thread(target=ask, args=(j,)) for j in range(len(PROMPTS))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, self.expected)
+        self.assertGreater(self.chatbot.engine.get_stats()["mean_batch_size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+"""
+Unit tests for constrained function-call decoding in function_call_grammar.py
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from transformers import AutoTokenizer
+    import function_call_grammar
+    from function_call_grammar import FunctionCallGrammar, FunctionCallProcessor, TokenVocabulary, registry_functions
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+FUNCTIONS = [
+    {"name": "climate_module.set_cabin_temperature",
+     "parameters": [{"name": "temperature", "type": "float"}, {"name": "zone", "type": "str"}]},
+    {"name": "navigation_module.set_destination",
+     "parameters": [{"name": "location", "type": "str"}, {"name": "waypoints", "type": "list"}]},
+    {"name": "navigation_module.find_charging_stations",
+     "parameters": [{"name": "radius_km", "type": "int"}, {"name": "filter_by", "type": "dict"}]},
+    {"name": "battery_module.get_battery_status", "parameters": []},
+]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestFunctionCallGrammar(unittest.TestCase):
+    """The automaton and its token masks"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        cls.tokenizer = AutoTokenizer.from_pretrained(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+        cls.vocabulary = TokenVocabulary(cls.tokenizer)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def accepts(self, grammar, text):
+        state = grammar.advance_bytes(grammar.initial_state, text.encode("utf-8"))
+        return state is not None and grammar.is_complete(state)
+
+    def test_accepts_exactly_the_calls_of_the_registry(self):
+        grammar = FunctionCallGrammar(FUNCTIONS)
+        for text in [
+            '{"name": "climate_module.set_cabin_temperature", "arguments": {"temperature": -22.5, "zone": "主驾"}}',
+            '{"name":"climate_module.set_cabin_temperature","arguments":{"temperature":0.5,"zone":"a\\"\\u4e2d"}}',
+            '{"name": "navigation_module.set_destination", "arguments": {"location": "西湖", '
+            '"waypoints": [1, "b", {"c": [true, null]}, []]}}',
+            '{"name": "navigation_module.find_charging_stations", "arguments": {"radius_km": 10, "filter_by": {}}}',
+            '{"name": "battery_module.get_battery_status", "arguments": {}}',
+        ]:
+            self.assertTrue(self.accepts(grammar, text), text)
+            self.assertEqual(grammar.parse(text)[0], text.split('"')[3])
+        for text in [
+            'Sure: {"name": "battery_module.get_battery_status", "arguments": {}}',  # Prose
+            '{"name": "battery_module.get_status", "arguments": {}}',  # Unknown function
+            '{"name": "climate_module.set_cabin_temperature", "arguments": {"temperature": 22, "zone": "a"}}',
+            '{"name": "climate_module.set_cabin_temperature", "arguments": {"temperature": "22.0", "zone": "a"}}',
+            '{"name": "climate_module.set_cabin_temperature", "arguments": {"zone": "a", "temperature": 22.0}}',
+            '{"name": "navigation_module.find_charging_stations", "arguments": {"radius_km": 01, "filter_by": {}}}',
+            '{"name": "battery_module.get_battery_status", "arguments": {}} ',  # Anything after the object
+            '{"name":  "battery_module.get_battery_status", "arguments": {}}',  # Only one optional space
+        ]:
+            self.assertFalse(self.accepts(grammar, text), text)
+        with self.assertRaises(ValueError):
+            FunctionCallGrammar([])
+
+    def test_parse_applies_the_router_checks(self):
+        grammar = FunctionCallGrammar(FUNCTIONS)
+        text = '```json\n{"name": "climate_module.set_cabin_temperature", "arguments": {"temperature": "22", "zone": "a"}}\n```'
+        self.assertEqual(grammar.parse(text), ("climate_module.set_cabin_temperature", {"temperature": 22.0, "zone": "a"}))
+        for text in ['好的 {"name": "battery_module.get_battery_status", "arguments": {}}',
+                     '{"name": "battery_module.get_status", "arguments": {}}',
+                     '{"name": "navigation_module.set_destination", "arguments": {"location": "x"}}']:
+            with self.assertRaises(ValueError):
+                grammar.parse(text)
+
+    def test_every_masked_walk_ends_in_a_valid_call(self):
+        grammar = FunctionCallGrammar(registry_functions(), self.vocabulary)
+        width = len(self.tokenizer) + 16
+        for seed in range(50):
+            rng = random.Random(seed)
+            state, tokens = grammar.initial_state, []
+            while not grammar.is_complete(state) and len(tokens) < 400:
+                mask = grammar.token_mask(state, width)
+                self.assertFalse(mask[len(self.tokenizer):].any())
+                allowed = mask.nonzero().flatten().tolist()
+                # Prefer closing tokens now and then so that walks end
+                closing = [token for token in allowed if self.vocabulary.token_bytes(token)[-1:] in (b'"', b"]", b"}")]
+                token = rng.choice(closing if closing and rng.random() < 0.3 else allowed)
+                state = grammar.advance_bytes(state, self.vocabulary.token_bytes(token))
+                self.assertIsNotNone(state)
+                tokens.append(token)
+            self.assertTrue(grammar.is_complete(state))
+            grammar.parse(self.tokenizer.decode(tokens))
+        self.assertGreater(grammar.stats["mask_hits"], grammar.stats["mask_misses"])
+
+    def test_masks_shared_across_threads(self):
+        grammar = FunctionCallGrammar(FUNCTIONS, self.vocabulary)
+        states = [grammar.initial_state]
+        for byte in b'{"name": "climate_module.set_cabin_temperature", "arguments": {"temperature": 2':
+            states.append(grammar.advance(states[-1], byte))
+        width = len(self.tokenizer)
+        expected = [grammar.token_mask(state, width).clone() for state in states]
+        grammar.stats.update(mask_hits=0, mask_misses=0)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    for state, mask in zip(states, expected):
+                        self.assertTrue(torch.equal(grammar.token_mask(state, width), mask))
+            except AssertionError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(grammar.get_stats(), {"mask_hits": 4 * 5 * len(states), "mask_misses": 0,
+                                               "cached_masks": len(states)})
+
+    def test_mask_cache_drops_least_recently_used(self):
+        grammar = FunctionCallGrammar(FUNCTIONS, self.vocabulary)
+        states = [grammar.initial_state]
+        for byte in b'{"name": "nav':
+            states.append(grammar.advance(states[-1], byte))
+        original = function_call_grammar.MASK_CACHE_SIZE
+        function_call_grammar.MASK_CACHE_SIZE = 3
+        try:
+            for state in states[:3]:
+                grammar.token_mask(state, len(self.tokenizer))
+            grammar.token_mask(states[0], len(self.tokenizer))
+            grammar.token_mask(states[3], len(self.tokenizer))
+        finally:
+            function_call_grammar.MASK_CACHE_SIZE = original
+        self.assertEqual(grammar.get_stats()["cached_masks"], 3)
+        # states[1] was the least recently used
+        self.assertEqual([key[0] for key in grammar._masks], [states[2], states[0], states[3]])
+
+    def test_processor_allows_only_eos_after_the_object(self):
+        grammar = FunctionCallGrammar(FUNCTIONS[3:], self.vocabulary)
+        call = self.tokenizer('{"name": "battery_module.get_battery_status", "arguments": {}}')["input_ids"]
+        processor = FunctionCallProcessor(grammar, [self.tokenizer.eos_token_id], prompt_width=1)
+        scores = torch.zeros(1, len(self.tokenizer))
+        for width in range(1, len(call) + 2):
+            masked = processor(torch.tensor([[0] + call[:width - 1]]), scores)
+            if width <= len(call):
+                self.assertFalse(torch.isinf(masked[0, call[width - 1]]))
+        self.assertEqual(torch.isfinite(masked[0]).nonzero().flatten().tolist(), [self.tokenizer.eos_token_id])
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestLocalChatBotFunctionCall(unittest.TestCase):
+    """Constrained replies of LocalChatBot"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+        cls.chatbot.model.generation_config.do_sample = False
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_extract_function_call(self):
+        name, arguments = self.chatbot.extract_function_call("把空调调到22度", ["battery_module.get_battery_status"])
+        self.assertEqual((name, arguments), ("battery_module.get_battery_status", {}))
+        # Bare function names select the same grammar
+        grammar = self.chatbot._function_call_grammar(["get_battery_status"])
+        self.assertIs(grammar, self.chatbot._function_call_grammar(["battery_module.get_battery_status"]))
+        with self.assertRaises(ValueError):
+            self.chatbot._function_call_grammar(["open_sunroof"])
+
+    def test_grammar_cache_is_bounded(self):
+        import LocalChatBot
+        names = [function["name"] for function in registry_functions()][:4]
+        original = LocalChatBot.FUNCTION_CALL_GRAMMAR_CACHE_SIZE
+        LocalChatBot.FUNCTION_CALL_GRAMMAR_CACHE_SIZE = 2
+        try:
+            first = self.chatbot._function_call_grammar(names[:1])
+            for count in range(2, 5):
+                self.chatbot._function_call_grammar(names[:count])
+            self.assertEqual(len(self.chatbot._function_call_grammars), 2)
+            self.assertIsNot(self.chatbot._function_call_grammar(names[:1]), first)
+        finally:
+            LocalChatBot.FUNCTION_CALL_GRAMMAR_CACHE_SIZE = original
+
+    def test_constrained_reply_stops_at_the_closed_object(self):
+        free = self.chatbot.invoke("打开车窗", {"max_tokens": 80, "logprobs": True})
+        self.assertEqual(free["new_tokens"], 80)
+        config = {"max_tokens": 80, "function_call": ["get_battery_status"], "logprobs": True}
+        reply = self.chatbot.invoke("打开车窗", config)
+        grammar = self.chatbot._function_call_grammar(["get_battery_status"])
+        self.assertEqual(grammar.parse(reply["content"]), ("battery_module.get_battery_status", {}))
+        self.assertTrue(reply["content"].endswith("}}"))
+        self.assertLess(reply["new_tokens"], 80)
+        # Continuous batching falls back to generate() for constrained replies
+        self.chatbot.enable_continuous_batching()
+        try:
+            self.assertEqual(self.chatbot.invoke("打开车窗", config), reply)
+        finally:
+            self.chatbot.disable_continuous_batching()
+
+    def test_constraint_starts_after_the_reasoning(self):
+        config = {"thinking": True, "thinking_budget": 3, "max_tokens": 100, "function_call": ["get_battery_status"]}
+        reply = self.chatbot.invoke("hi", config)
+        self.assertTrue(reply["thinking"])
+        self.assertEqual(self.chatbot._function_call_grammar(["get_battery_status"]).parse(reply["content"])[0],
+                         "battery_module.get_battery_status")
+
+
+if __name__ == "__main__":
+    unittest.main()
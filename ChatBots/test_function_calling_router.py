@@ -0,0 +1,178 @@
+"""
+Unit tests for the function calling interface in FunctionCalling_router.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from FunctionCalling_router import function_calling_interface, shared_registry_cache, NUMPY_AVAILABLE
+
+
+PLUGIN_SOURCE = '''
+LOAD_TOKEN = object()
+
+def whoami():
+    return LOAD_TOKEN
+
+def set_cabin_temperature(temperature, zone):
+    return {"temperature": temperature, "zone": zone, "version": VERSION}
+
+VERSION = {version}
+'''
+
+
+class TestFunctionDispatchCache(unittest.TestCase):
+    """Tests for the resolved-callable cache used by _execute_function"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.module_path = os.path.join(self.test_dir, "cached_plugin_module.py")
+        self._write_module(version=1)
+        self.router = function_calling_interface()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        sys.modules.pop("cached_plugin_module", None)
+
+    def _write_module(self, version):
+        with open(self.module_path, "w", encoding="utf-8") as f:
+            f.write(PLUGIN_SOURCE.replace("{version}", str(version)))
+
+    def _func_info(self, function_name):
+        return {
+            'module_name': 'cached_plugin_module',
+            'module_path': self.module_path,
+            'function_name': function_name,
+            'parameters': []
+        }
+
+    def test_module_executed_once(self):
+        first = self.router._execute_function(self._func_info('whoami'), {})
+        second = self.router._execute_function(self._func_info('whoami'), {})
+        self.assertIs(first, second)
+
+        # Other functions of the same module share the loaded module
+        result = self.router._execute_function(
+            self._func_info('set_cabin_temperature'), {"temperature": 22.0, "zone": "driver"})
+        self.assertEqual(result["version"], 1)
+        self.assertEqual(len(self.router._module_cache), 1)
+
+    def test_reload_on_mtime_change(self):
+        first = self.router._execute_function(self._func_info('whoami'), {})
+
+        self._write_module(version=2)
+        stat = os.stat(self.module_path)
+        os.utime(self.module_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        second = self.router._execute_function(self._func_info('whoami'), {})
+        self.assertIsNot(first, second)
+        result = self.router._execute_function(
+            self._func_info('set_cabin_temperature'), {"temperature": 22.0, "zone": "driver"})
+        self.assertEqual(result["version"], 2)
+
+    def test_missing_module_file(self):
+        func_info = self._func_info('whoami')
+        func_info['module_path'] = os.path.join(self.test_dir, "missing_module.py")
+        with self.assertRaises(Exception) as context:
+            self.router._execute_function(func_info, {})
+        self.assertIn("No such file or directory", str(context.exception))
+
+    def test_preload_reports_failures(self):
+        # Registry modules point at /vehicle/systems/*.py which do not exist here
+        results = self.router.preload_functions()
+        self.assertEqual(set(results), {info['search_text'] for info in self.router.registry.function_index})
+        self.assertTrue(all(error is not None for error in results.values()))
+
+
+
+class TestFunctionSearch(unittest.TestCase):
+    """Tests for the precomputed search corpus and batch search"""
+
+    def setUp(self):
+        self.router = function_calling_interface()
+        self.registry = self.router.registry
+
+    def test_corpus_built_once_per_load(self):
+        self.assertEqual(len(self.registry.search_corpus), 3 * len(self.registry.function_index))
+        self.assertEqual(self.registry.search_corpus[1], self.registry.function_index[0]['search_text'])
+
+    def test_batch_search_matches_single_search(self):
+        queries = ["set_cabin_temperature", "adjust_volume", "get_battery_status"]
+        batch_results = self.router.batch_search_functions(queries, limit=1)
+
+        self.assertEqual(len(batch_results), len(queries))
+        for query, results in zip(queries, batch_results):
+            single = self.registry.semantic_search(query, limit=1)
+            self.assertEqual([item['full_name'] for item in results], [item['full_name'] for item in single])
+            self.assertTrue(results[0]['full_name'].endswith(query))
+
+    def test_batch_search_limit_and_threshold(self):
+        results = self.registry.batch_semantic_search(["climate"], limit=100, threshold=0)
+        self.assertEqual(len(results[0]), len(self.registry.function_index))
+
+        results = self.registry.batch_semantic_search(["zzzz"], limit=3, threshold=101)
+        self.assertEqual(results, [[]])
+        self.assertEqual(self.registry.batch_semantic_search([]), [])
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "numpy is required")
+    def test_numpy_fallback_scores_match_simple_fuzz(self):
+        import FunctionCalling_router
+        original = FunctionCalling_router.RAPIDFUZZ_AVAILABLE
+        FunctionCalling_router.RAPIDFUZZ_AVAILABLE = False
+        try:
+            self.registry._build_search_corpus()
+        finally:
+            FunctionCalling_router.RAPIDFUZZ_AVAILABLE = original
+        queries = ["set_cabin_temperature", "Climate_Module", "adjust volume", "打开车窗", "İstanbul navigation",
+                   "get battery status please", "x", "", "seat heater level three"]
+        expected = [[FunctionCalling_router.SimpleFuzz.WRatio(query, target) for target in self.registry.search_corpus]
+                    for query in queries]
+        self.assertEqual(self.registry._numpy_scores(queries).astype(int).tolist(), expected)
+
+
+class TestArgumentCoercion(unittest.TestCase):
+    """Tests for argument coercion before parameter validation"""
+
+    def test_coerced_arguments_pass_validation(self):
+        router = function_calling_interface()
+        success, message = router.call_function(
+            ("set_cabin_temperature", {"temperature": "二十五度", "zone": "driver"}))
+        # The registry module files are not installed here, so only execution fails
+        self.assertNotIn("augment error", str(message))
+        self.assertEqual(router.last_coercions, ["temperature: '二十五度' -> 25.0"])
+
+        router.call_function(("set_cabin_temperature", {"temperature": "warm", "zone": "driver"}))
+        self.assertEqual(router.get_validation_stats(),
+                         {'calls': 2, 'coerced': 1, 'rejected': 1, 'retry_rate': 0.5})
+
+    def test_coercion_disabled(self):
+        router = function_calling_interface(coerce_arguments=False)
+        success, message = router.call_function(
+            ("set_cabin_temperature", {"temperature": "25", "zone": "driver"}))
+        self.assertFalse(success)
+        self.assertIn("should be float", message)
+
+
+class TestSharedRegistryCache(unittest.TestCase):
+    """Tests for sharing the parsed registry between interface instances"""
+
+    def test_instances_share_parsed_registry(self):
+        first = function_calling_interface()
+        parse_count = shared_registry_cache.parse_count
+
+        second = function_calling_interface()
+        self.assertEqual(shared_registry_cache.parse_count, parse_count)
+        self.assertIs(first.registry.registry_data, second.registry.registry_data)
+        self.assertIs(first.registry.function_index, second.registry.function_index)
+        self.assertIs(first.registry.search_corpus, second.registry.search_corpus)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Unit tests for backend selection in inference_backends.py
+
+The llama_cpp and onnxruntime backends are exercised when their packages are installed;
+the ONNX test exports the tiny checkpoint with optimum.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from inference_backends import (LLAMA_CPP_AVAILABLE, ONNXRUNTIME_AVAILABLE, backend_file_bytes, find_model_file,
+                                    resolve_backend)
+    from model_loader import estimate_model_bytes, load_causal_lm
+    from model_pool import ModelPool
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+    LLAMA_CPP_AVAILABLE = ONNXRUNTIME_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站"]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestBackendSelection(unittest.TestCase):
+    """Backend names, model files and the options that need the transformers backend"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+        cls.chatbot = LocalChatBot(cls.model_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_backend_names(self):
+        self.assertEqual(resolve_backend(None), "transformers")
+        self.assertEqual(resolve_backend("llama_cpp"), "llama_cpp")
+        with self.assertRaises(ValueError):
+            resolve_backend("tensorrt")
+        self.assertEqual(self.chatbot.backend, "transformers")
+        self.assertEqual(self.chatbot.load_info["backend"], "transformers")
+
+    def test_model_files(self):
+        model_dir = os.path.join(self.test_dir, "files")
+        os.makedirs(os.path.join(model_dir, "onnx"))
+        self.assertIsNone(find_model_file(model_dir, "llama_cpp"))
+        self.assertEqual(backend_file_bytes(model_dir, "onnxruntime"), 0)
+        for name, size in [("qwen3-q8_0.gguf", 3), ("qwen3-q4_k_m.gguf", 2), ("onnx/model.onnx", 5),
+                           ("onnx/model.onnx_data", 7)]:
+            with open(os.path.join(model_dir, name), "wb") as f:
+                f.write(b"0" * size)
+        self.assertEqual(find_model_file(model_dir, "llama_cpp"), os.path.join(model_dir, "qwen3-q4_k_m.gguf"))
+        self.assertEqual(find_model_file(model_dir, "llama_cpp", "qwen3-q8_0.gguf"),
+                         os.path.join(model_dir, "qwen3-q8_0.gguf"))
+        with self.assertRaises(FileNotFoundError):
+            find_model_file(model_dir, "llama_cpp", "qwen3-f16.gguf")
+        # Memory estimates of the other backends are their file sizes
+        self.assertEqual(estimate_model_bytes(model_dir, backend="llama_cpp", model_file="qwen3-q8_0.gguf"), 3)
+        self.assertEqual(estimate_model_bytes(model_dir, backend="onnxruntime"), 12)
+
+    def test_transformers_only_features(self):
+        with self.assertRaises(ValueError):
+            load_causal_lm(self.model_path, backend="llama_cpp", quantize=True)
+        # Without the package or a model file the other backends fail at load time
+        if not LLAMA_CPP_AVAILABLE:
+            with self.assertRaises(ImportError):
+                load_causal_lm(self.model_path, backend="llama_cpp")
+        else:
+            with self.assertRaises(FileNotFoundError):
+                load_causal_lm(self.model_path, backend="llama_cpp")
+
+        # Features driving the forward pass directly check the backend first
+        self.chatbot.backend = "llama_cpp"
+        try:
+            for enable in (self.chatbot.create_session, self.chatbot.enable_continuous_batching,
+                           lambda: self.chatbot.enable_speculative_decoding(self.chatbot.model)):
+                with self.assertRaises(ValueError):
+                    enable()
+        finally:
+            self.chatbot.backend = "transformers"
+
+    def test_catalog_load_options(self):
+        catalog_file = os.path.join(self.test_dir, "model2file.json")
+        with open(catalog_file, "w", encoding="utf-8") as f:
+            json.dump([{"model_name": "tiny", "Unix_model_path": "./tiny-qwen3", "Windows_model_path": ".\\tiny-qwen3",
+                        "load_options": {"prefix_cache": False}}], f)
+        pool = ModelPool(idle_timeout=None, catalog_file=catalog_file)
+        with pool.lease("tiny") as chatbot:
+            self.assertIsNone(chatbot.prefix_cache)
+        # Options of the call override the catalog
+        with pool.lease("tiny", prefix_cache=True) as chatbot:
+            self.assertIsNotNone(chatbot.prefix_cache)
+        self.assertEqual(pool.get_stats()["loads"], 2)
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE and ONNXRUNTIME_AVAILABLE, "optimum[onnxruntime] is required")
+class TestOnnxRuntimeBackend(unittest.TestCase):
+    """Replies of an ONNX export match the transformers model"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+        cls.reference = LocalChatBot(model_path)
+        cls.chatbot = LocalChatBot(model_path, backend="onnxruntime")
+        for chatbot in (cls.reference, cls.chatbot):
+            chatbot.model.generation_config.do_sample = False
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_replies_match_transformers(self):
+        self.assertTrue(self.chatbot.load_info["source"].endswith(".onnx"))
+        config = {"thinking": True, "max_tokens": 12, "thinking_budget": 4}
+        expected = [self.reference.invoke(prompt, config) for prompt in PROMPTS]
+        self.assertEqual([self.chatbot.invoke(prompt, config) for prompt in PROMPTS], expected)
+        self.assertEqual(self.chatbot.batch(PROMPTS, config), self.reference.batch(PROMPTS, config))
+        chunks = list(self.chatbot.stream("hi", config))
+        self.assertEqual("".join(chunk["thinking"] for chunk in chunks).strip("\n"), expected[0]["thinking"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the confidence-based model cascade in model_cascade.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from model_cascade import ModelCascade, _normalize_reply
+    from model_pool import ModelPool
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站"]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers, tokenizers and langchain are required")
+class TestModelCascade(unittest.TestCase):
+    """Escalation, confidence scores and counters on tiny random Qwen3 checkpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        cls.models = [build_tiny_qwen3(os.path.join(cls.test_dir, name), seed=seed)
+                      for seed, name in enumerate(["small", "large"])]
+        cls.pool = ModelPool(idle_timeout=None)
+        cls.config = {"max_tokens": 12}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.clear()
+        shutil.rmtree(cls.test_dir)
+
+    def test_confident_small_model_answers(self):
+        cascade = ModelCascade(self.models, threshold=0.0, pool=self.pool)
+        result = cascade.invoke("打开车窗", self.config)
+        self.assertEqual((result["model"], result["escalations"]), (self.models[0], 0))
+        with self.pool.lease(self.models[0]) as small:
+            self.assertEqual(result["content"], small.invoke("打开车窗", {**self.config, "do_sample": False})["content"])
+
+    def test_unsure_answers_escalate_to_the_last_model(self):
+        cascade = ModelCascade(self.models, threshold=1.1, pool=self.pool)
+        results = [cascade.invoke(prompt, self.config) for prompt in PROMPTS]
+        self.assertTrue(all(result["model"] == self.models[-1] for result in results))
+        self.assertEqual([len(result["attempts"]) for result in results], [2] * len(PROMPTS))
+        # A per-call threshold overrides the cascade's
+        self.assertEqual(cascade.invoke("hi", {**self.config, "threshold": 0.0})["escalations"], 0)
+
+        stats = cascade.get_stats()
+        self.assertEqual(stats["requests"], len(PROMPTS) + 1)
+        self.assertEqual(stats["escalations"], len(PROMPTS))
+        self.assertEqual(stats["answered_by"], {self.models[0]: 1, self.models[1]: len(PROMPTS)})
+        self.assertAlmostEqual(stats["escalation_rate"], len(PROMPTS) / (len(PROMPTS) + 1))
+
+    def test_logprob_confidence_matches_a_scoring_pass(self):
+        # The system prompt request goes through the cached prefix in the scoring pass
+        system_prompt = {"messages": [{"role": "system", "content": "You are an in-car voice assistant."},
+                                      {"role": "user", "content": "打开车窗"}]}
+        with self.pool.lease(self.models[0]) as chatbot:
+            self.assertIsNotNone(chatbot.prefix_cache)
+            for prompt in PROMPTS + [system_prompt]:
+                reply = chatbot.invoke(prompt, {**self.config, "do_sample": False, "logprobs": True})
+                self.assertLess(reply["mean_logprob"], 0.0)
+                self.assertLessEqual(reply["new_tokens"], self.config["max_tokens"])
+                # The scoring pass (continuous batching and speculative paths) agrees with generate()
+                chatbot.enable_continuous_batching()
+                try:
+                    scored = chatbot.invoke(prompt, {**self.config, "do_sample": False, "logprobs": True})
+                finally:
+                    chatbot.disable_continuous_batching()
+                self.assertAlmostEqual(scored["mean_logprob"], reply["mean_logprob"], places=4)
+                self.assertAlmostEqual(scored["mean_logprob"], self._generate_mean_logprob(chatbot, prompt), places=4)
+        result = ModelCascade(self.models[:1], pool=self.pool).invoke("hi", self.config)
+        self.assertTrue(0.0 < result["confidence"] < 1.0)
+        self.assertEqual(result["attempts"][0]["confidence"], result["confidence"])
+
+    def _generate_mean_logprob(self, chatbot, prompt):
+        """Mean log-probability of the greedy reply from generate(output_scores=True), without any cache"""
+        ids, _ = chatbot._tokenize(prompt)
+        with torch.no_grad():
+            generated = chatbot.model.generate(
+                input_ids=torch.tensor([ids], device=chatbot.model.device),
+                attention_mask=torch.ones(1, len(ids), dtype=torch.long, device=chatbot.model.device),
+                max_new_tokens=self.config["max_tokens"], do_sample=False, output_scores=True,
+                return_dict_in_generate=True, eos_token_id=chatbot._eos_token_ids(),
+                pad_token_id=chatbot.tokenizer.pad_token_id)
+        tokens = generated.sequences[0][len(ids):].tolist()
+        scores = torch.log_softmax(torch.stack(generated.scores, dim=1)[0].float(), dim=-1)
+        return float(scores[torch.arange(len(tokens)), tokens].mean())
+
+    def test_consistency_confidence(self):
+        cascade = ModelCascade(self.models, threshold=1.0, method="consistency", samples=2, pool=self.pool)
+        # Near-zero temperature: every sample repeats the greedy reply
+        result = cascade.invoke("打开车窗", {**self.config, "temperature": 1e-4})
+        self.assertEqual((result["confidence"], result["escalations"]), (1.0, 0))
+
+    def test_json_replies_are_compared_as_objects(self):
+        self.assertEqual(_normalize_reply('{"b": 1, "a": "x"}'), _normalize_reply('```json\n{"a":"x","b":1}\n```'))
+        self.assertEqual(_normalize_reply("打开  车窗\n"), "打开 车窗")
+        self.assertNotEqual(_normalize_reply('{"a": 1}'), _normalize_reply('{"a": 2}'))
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            ModelCascade([], pool=self.pool)
+        with self.assertRaises(ValueError):
+            ModelCascade(self.models, method="vote", pool=self.pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
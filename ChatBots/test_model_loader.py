@@ -0,0 +1,105 @@
+"""
+Unit tests for device selection and the CPU load path in model_loader.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from model_loader import load_causal_lm, resolve_dtype, select_device
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestModelLoader(unittest.TestCase):
+    """Tests for load_causal_lm on a tiny random Qwen3 checkpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        cls.model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_resolve_dtype(self):
+        self.assertEqual(resolve_dtype(None, "cpu"), torch.float32)
+        self.assertEqual(resolve_dtype("fp16", "cpu"), torch.float32)
+        self.assertEqual(resolve_dtype("auto", "cpu"), torch.float32)
+        self.assertEqual(resolve_dtype("bf16", "cpu"), torch.bfloat16)
+        self.assertEqual(resolve_dtype(None, "cuda"), "auto")
+        with self.assertRaises(ValueError):
+            resolve_dtype("int4", "cpu")
+
+    def test_select_device(self):
+        self.assertEqual(select_device("cpu"), "cpu")
+        self.assertIn(select_device(), ("cuda", "mps", "cpu"))
+
+    def test_quantization_requires_cpu(self):
+        with self.assertRaises(ValueError):
+            load_causal_lm(self.model_path, device="cuda", quantize=True)
+
+    def test_bf16_load(self):
+        _, model, info = load_causal_lm(self.model_path, device="cpu", dtype="bf16", num_threads=1)
+        self.assertEqual(next(model.parameters()).dtype, torch.bfloat16)
+        self.assertEqual(info["threads"], 1)
+        self.assertFalse(info["quantized"])
+
+    def test_dynamic_quantization_keeps_lm_head(self):
+        tokenizer, model, info = load_causal_lm(self.model_path, device="cpu", quantize=True)
+        self.assertEqual(info["dtype"], "qint8")
+        self.assertIsInstance(model.lm_head, torch.nn.Linear)
+        quantized = [m for m in model.modules() if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)]
+        self.assertGreater(len(quantized), 0)
+
+        inputs = tokenizer(["打开车窗"], return_tensors="pt")
+        with torch.no_grad():
+            output = model.generate(**inputs, max_new_tokens=3, min_new_tokens=3, do_sample=False,
+                                    pad_token_id=tokenizer.pad_token_id)
+        self.assertEqual(output.shape[1], inputs.input_ids.shape[1] + 3)
+
+    def test_quantized_checkpoint_reused_until_stale(self):
+        checkpoint = os.path.join(self.test_dir, "quantized.pt")
+        _, first, info = load_causal_lm(self.model_path, device="cpu", quantize=True, quantized_checkpoint=checkpoint)
+        self.assertEqual(info["source"], "pretrained")
+        self.assertTrue(os.path.exists(checkpoint))
+
+        _, second, info = load_causal_lm(self.model_path, device="cpu", quantize=True, quantized_checkpoint=checkpoint)
+        self.assertEqual(info["source"], "quantized_checkpoint")
+        inputs = torch.tensor([[1, 2, 3]])
+        with torch.no_grad():
+            self.assertTrue(torch.equal(first(inputs).logits, second(inputs).logits))
+
+        # Touching config.json marks the checkpoint as made from another model
+        config_file = os.path.join(self.model_path, "config.json")
+        stat = os.stat(config_file)
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        _, _, info = load_causal_lm(self.model_path, device="cpu", quantize=True, quantized_checkpoint=checkpoint)
+        self.assertEqual(info["source"], "pretrained")
+
+        # So does replacing the weights while config.json stays the same
+        _, _, info = load_causal_lm(self.model_path, device="cpu", quantize=True, quantized_checkpoint=checkpoint)
+        self.assertEqual(info["source"], "quantized_checkpoint")
+        weights_file = os.path.join(self.model_path, "model.safetensors")
+        stat = os.stat(weights_file)
+        os.utime(weights_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        _, _, info = load_causal_lm(self.model_path, device="cpu", quantize=True, quantized_checkpoint=checkpoint)
+        self.assertEqual(info["source"], "pretrained")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Unit tests for the process-wide model pool in model_pool.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from model_loader import estimate_model_bytes
+    from model_pool import MB, ModelPool
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+
+class CountingFactory:
+    """Builds a plain object per call and counts the loads"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, model_path, **options):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("load failed")
+        return {"path": model_path, "options": options}
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestModelPool(unittest.TestCase):
+    """Sharing, reference counting and idle unloading"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        cls.model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_local_chatbot_is_loaded_once(self):
+        pool = ModelPool(idle_timeout=None)
+        first = pool.acquire(self.model_path)
+        second = pool.acquire(self.model_path)
+        self.assertIs(first, second)
+        self.assertEqual(first.invoke("打开车窗", {"max_tokens": 4}), second.invoke("打开车窗", {"max_tokens": 4}))
+        # Other load options are another pool entry
+        self.assertIsNot(pool.acquire(self.model_path, dtype="bf16"), first)
+
+        stats = pool.get_stats()
+        self.assertEqual((stats["loads"], stats["hits"]), (2, 1))
+        self.assertEqual(sorted(model["refs"] for model in stats["models"]), [1, 2])
+
+    def test_concurrent_first_acquires_share_one_load(self):
+        pool, factory = ModelPool(idle_timeout=None), CountingFactory(delay=0.2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pool.acquire(self.model_path, factory)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(factory.calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_idle_model_is_unloaded_after_timeout(self):
+        pool, factory = ModelPool(idle_timeout=0.2), CountingFactory()
+        with pool.lease(self.model_path, factory) as instance:
+            self.assertEqual(instance["path"], self.model_path)
+        # Reacquiring before the timeout cancels the unload
+        self.assertIs(pool.acquire(self.model_path, factory), instance)
+        time.sleep(0.4)
+        self.assertEqual(pool.get_stats()["unloads"], 0)
+
+        pool.release(instance)
+        time.sleep(0.4)
+        self.assertEqual(pool.get_stats()["unloads"], 1)
+        self.assertEqual(pool.get_stats()["models"], [])
+        pool.acquire(self.model_path, factory)
+        self.assertEqual(factory.calls, 2)
+
+    def test_unload_idle_keeps_referenced_models(self):
+        pool, factory = ModelPool(idle_timeout=None), CountingFactory()
+        held = pool.acquire(self.model_path, factory, size="held")
+        pool.release(pool.acquire(self.model_path, factory, size="idle"))
+        self.assertEqual(pool.unload_idle(), 1)
+        self.assertEqual([model["refs"] for model in pool.get_stats()["models"]], [1])
+        self.assertIs(pool.acquire(self.model_path, factory, size="held"), held)
+
+    def test_failed_load_is_retried(self):
+        pool, factory = ModelPool(idle_timeout=None), CountingFactory(fail=True)
+        with self.assertRaises(RuntimeError):
+            pool.acquire(self.model_path, factory)
+        factory.fail = False
+        self.assertEqual(pool.acquire(self.model_path, factory)["path"], self.model_path)
+        self.assertEqual(factory.calls, 2)
+
+    def test_qwen_runnables_share_the_model(self):
+        try:
+            from qwen_runnable import QwenRunnable
+            from model_pool import shared_model_pool
+        except ImportError:
+            self.skipTest("langchain_core is required")
+        first = QwenRunnable(self.model_path, load_8bit=False, max_new_tokens=4)
+        second = QwenRunnable(self.model_path, load_8bit=False, max_new_tokens=4)
+        try:
+            self.assertIs(first.model, second.model)
+            self.assertEqual(first.invoke({"prompt": "hi"}), second.invoke({"prompt": "hi"}))
+        finally:
+            first.close()
+            second.close()
+            shared_model_pool.unload_idle()
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestModelPoolMemoryBudget(unittest.TestCase):
+    """Memory accounting, LRU eviction and the model catalog"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.mkdtemp()
+        cls.paths = {name: build_tiny_qwen3(os.path.join(cls.test_dir, name), seed=seed)
+                     for seed, name in enumerate(["model-a", "model-b", "model-c"])}
+        cls.model_mb = estimate_model_bytes(cls.paths["model-a"]) / MB
+        cls.catalog_file = os.path.join(cls.test_dir, "model2file.json")
+        with open(cls.catalog_file, "w", encoding="utf-8") as f:
+            json.dump([{"model_name": name, "Unix_model_path": f"./{name}", "Windows_model_path": f".\\{name}"}
+                       for name in ["model-a", "model-b", "missing"]], f)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_estimate_matches_loaded_weights(self):
+        pool = ModelPool(idle_timeout=None, memory_budget_mb=10 * self.model_mb)
+        for options in ({}, {"dtype": "bf16"}, {"quantize": True}):
+            pool.acquire(self.paths["model-a"], **options)
+            self.assertAlmostEqual(pool.get_stats()["models"][-1]["memory_mb"],
+                                   estimate_model_bytes(self.paths["model-a"], **options) / MB, places=3)
+        self.assertAlmostEqual(pool.get_stats()["memory_mb"], sum(m["memory_mb"] for m in pool.get_stats()["models"]))
+
+    def test_least_recently_used_model_is_evicted(self):
+        pool = ModelPool(idle_timeout=None, memory_budget_mb=2.5 * self.model_mb)
+        for name in ["model-a", "model-b", "model-a"]:
+            with pool.lease(self.paths[name]) as chatbot:
+                chatbot.invoke("打开车窗", {"max_tokens": 2})
+        # model-b was used less recently than model-a
+        with pool.lease(self.paths["model-c"]):
+            pass
+
+        stats = pool.get_stats()
+        self.assertEqual((stats["loads"], stats["hits"], stats["evictions"]), (3, 1, 1))
+        self.assertEqual([model["path"] for model in stats["models"]],
+                         [os.path.abspath(self.paths["model-a"]), os.path.abspath(self.paths["model-c"])])
+        self.assertLessEqual(stats["memory_mb"], stats["memory_budget_mb"])
+
+    def test_models_in_use_are_not_evicted(self):
+        pool = ModelPool(idle_timeout=None, memory_budget_mb=1.5 * self.model_mb)
+        held = pool.acquire(self.paths["model-a"])
+        with self.assertRaises(MemoryError):
+            pool.acquire(self.paths["model-b"])
+        self.assertEqual(pool.get_stats()["evictions"], 0)
+
+        pool.release(held)
+        with pool.lease(self.paths["model-b"]):
+            pass
+        self.assertEqual(pool.get_stats()["evictions"], 1)
+
+    def test_catalog_names_and_listing(self):
+        pool = ModelPool(idle_timeout=None, memory_budget_mb=10 * self.model_mb, catalog_file=self.catalog_file)
+        with pool.lease("model-b"):
+            self.assertEqual([model["path"] for model in pool.get_stats()["models"]],
+                             [os.path.realpath(self.paths["model-b"])])
+        models = {model["name"]: model for model in pool.list_models(dtype="bf16")}
+        self.assertEqual(sorted(models), ["missing", "model-a", "model-b"])
+        self.assertTrue(models["model-b"]["loaded"])
+        self.assertFalse(models["model-a"]["loaded"])
+        self.assertFalse(models["missing"]["available"])
+        self.assertIsNone(models["missing"]["estimated_mb"])
+        self.assertAlmostEqual(models["model-a"]["estimated_mb"], self.model_mb / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
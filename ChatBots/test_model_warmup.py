@@ -0,0 +1,100 @@
+"""
+Unit tests for the startup warm-up and compiled decoding of LocalChatBot (model_warmup.py)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from model_warmup import WARMUP_PROMPT_LENGTHS, compile_generate_kwargs, warmup_prompt
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站"]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestWarmup(unittest.TestCase):
+    """Dummy generations at load time and the compiled static-cache decode path"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+        cls.reference = LocalChatBot(cls.model_path)
+        cls.reference.model.generation_config.do_sample = False
+        cls.config = {"thinking": True, "max_tokens": 12, "thinking_budget": 4}
+        cls.expected = [cls.reference.invoke(prompt, cls.config) for prompt in PROMPTS]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_warmup_prompt_lengths(self):
+        tokenizer = self.reference.tokenizer
+        for length in (1, 32, 300):
+            self.assertEqual(len(tokenizer.encode(warmup_prompt(tokenizer, length), add_special_tokens=False)), length)
+
+    def test_warmup_at_load(self):
+        from LocalChatBot import LocalChatBot, load_prompt
+        self.assertIsNone(self.reference.warmup_stats)
+        chatbot = LocalChatBot(self.model_path, warmup=True)
+        chatbot.model.generation_config.do_sample = False
+        stats = chatbot.warmup_stats
+        self.assertEqual(stats["prompt_lengths"], sorted(WARMUP_PROMPT_LENGTHS))
+        self.assertEqual(len(stats["seconds"]), len(WARMUP_PROMPT_LENGTHS))
+        self.assertFalse(stats["compiled"])
+        self.assertEqual(stats["system_prompts"], 1)
+        self.assertEqual([chatbot.invoke(prompt, self.config) for prompt in PROMPTS], self.expected)
+        # The first request with the daily_chat prompt finds its prefix cached
+        chatbot.invoke({"messages": [{"role": "system", "content": load_prompt("daily_chat")},
+                                     {"role": "user", "content": PROMPTS[1]}]}, self.config)
+        self.assertEqual(chatbot.get_prefix_cache_stats()["misses"], 1)
+        self.assertEqual(chatbot.get_prefix_cache_stats()["hits"], len(WARMUP_PROMPT_LENGTHS))
+        # Lengths beyond the model's context are clipped
+        stats = chatbot.warm_up([4096], max_tokens=2)
+        self.assertEqual(stats["prompt_lengths"], [2048 - 2 - 64])
+
+    def test_compile_arguments(self):
+        kwargs = compile_generate_kwargs("cpu", max_cache_len=256)
+        self.assertEqual(kwargs["cache_implementation"], "static")
+        self.assertEqual(kwargs["max_cache_len"], 256)
+        self.assertEqual(kwargs["compile_config"].mode, "default")
+        self.assertEqual(compile_generate_kwargs("cuda")["compile_config"].mode, "reduce-overhead")
+
+    def test_torch_compile_matches_eager(self):
+        from LocalChatBot import LocalChatBot
+        cache_dir = os.path.join(self.test_dir, "compile-cache")
+        chatbot = LocalChatBot(self.model_path, warmup=[16, 64], torch_compile=True, compile_cache_dir=cache_dir,
+                               compile_max_length=256)
+        chatbot.model.generation_config.do_sample = False
+        self.assertIsNone(chatbot.prefix_cache)
+        self.assertEqual(chatbot.warmup_stats["prompt_lengths"], [16, 64])
+        self.assertEqual(chatbot.warmup_stats["system_prompts"], 1)
+        self.assertTrue(chatbot.warmup_stats["compiled"])
+        # The compiled kernels are kept for the next start
+        self.assertTrue(any(files for _, _, files in os.walk(cache_dir)))
+
+        self.assertEqual([chatbot.invoke(prompt, self.config) for prompt in PROMPTS], self.expected)
+        chunks = list(chatbot.stream(PROMPTS[1], self.config))
+        self.assertEqual("".join(chunk["content"] for chunk in chunks).strip("\n"), self.expected[1]["content"])
+        # Sessions pass their own cache to generate() and keep decoding eagerly
+        session = chatbot.create_session()
+        self.assertEqual(session.invoke(PROMPTS[0], self.config), self.expected[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Unit tests for the system prompt prefix cache in prefix_cache.py and LocalChatBot
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from prefix_cache import PrefixKVCache, split_prefix, system_prefix_messages
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+SYSTEM_PROMPT = "You are a helpful AI assistant for the car. 你是车载智能助手。"
+
+
+def conversation(query, system_prompt=SYSTEM_PROMPT):
+    return {"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": query}]}
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestPrefixCache(unittest.TestCase):
+    """Prefix reuse on a tiny random Qwen3 checkpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+        cls.cached = LocalChatBot(model_path)
+        cls.uncached = LocalChatBot(model_path, prefix_cache=False)
+        cls.config = {"max_tokens": 10}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def setUp(self):
+        self.cached.prefix_cache = PrefixKVCache()
+
+    def test_system_prefix_messages(self):
+        self.assertEqual(system_prefix_messages(conversation("hi")["messages"]),
+                         [{"role": "system", "content": SYSTEM_PROMPT}])
+        self.assertIsNone(system_prefix_messages([{"role": "user", "content": "hi"}]))
+        self.assertIsNone(system_prefix_messages([]))
+
+    def test_split_prefix_requires_identical_tokens(self):
+        tokenizer = self.cached.tokenizer
+        ids, prefix_length = split_prefix(tokenizer, "abc def", "abc")
+        self.assertEqual(ids[:prefix_length], tokenizer("abc")["input_ids"])
+        self.assertEqual(split_prefix(tokenizer, "abc", "abc")[1], 0)      # nothing after the prefix
+        self.assertEqual(split_prefix(tokenizer, "abc def", "xyz")[1], 0)
+
+    def test_invoke_reuses_prefix_with_same_output(self):
+        for query in ["打开车窗", "今天天气怎么样？"]:
+            self.assertEqual(self.cached.invoke(conversation(query), self.config),
+                             self.uncached.invoke(conversation(query), self.config))
+        stats = self.cached.get_prefix_cache_stats()
+        self.assertEqual((stats["misses"], stats["hits"], stats["entries"]), (1, 1, 1))
+        self.assertGreater(stats["saved_prefill_ms"], 0)
+
+    def test_batch_groups_by_system_prompt(self):
+        inputs = [conversation("打开车窗"), conversation("导航到最近的充电站，然后播放音乐"),
+                  conversation("hi", system_prompt="You are a car."), "没有系统提示词"]
+        self.assertEqual(self.cached.batch(inputs, self.config), self.uncached.batch(inputs, self.config))
+        # Padded rows give the same reply as a single request
+        self.assertEqual(self.cached.batch(inputs, self.config)[1], self.uncached.invoke(inputs[1], self.config))
+        self.assertEqual(self.cached.get_prefix_cache_stats()["entries"], 2)
+
+    def test_batch_truncates_long_prompts(self):
+        import LocalChatBot
+        original = LocalChatBot.BATCH_MAX_PROMPT_TOKENS
+        inputs = [conversation("打开车窗，然后导航到最近的充电站")]
+        prefix_length = self.cached._tokenize(inputs[0])[1]
+        try:
+            # The prompt keeps its first tokens; the cached prefix is still used
+            LocalChatBot.BATCH_MAX_PROMPT_TOKENS = prefix_length + 2
+            truncated = self.cached.batch(inputs, self.config)
+            self.assertEqual(self.cached.last_batch_stats["prompt_tokens"], 2)
+            self.assertEqual(truncated, self.uncached.batch(inputs, self.config))
+            # Nothing left after the prefix: the prompt is prefilled without the cache
+            LocalChatBot.BATCH_MAX_PROMPT_TOKENS = prefix_length
+            self.cached.batch(inputs, self.config)
+            self.assertEqual(self.cached.last_batch_stats["prompt_tokens"], prefix_length)
+        finally:
+            LocalChatBot.BATCH_MAX_PROMPT_TOKENS = original
+        self.assertEqual(self.cached.get_prefix_cache_stats()["misses"], 1)
+
+    def test_shared_cache_keeps_models_apart(self):
+        from LocalChatBot import LocalChatBot
+        other_path = build_tiny_qwen3(os.path.join(self.test_dir, "tiny-qwen3-other"), seed=1)
+        other = LocalChatBot(other_path, prefix_cache=self.cached.prefix_cache)
+        expected = LocalChatBot(other_path, prefix_cache=False).invoke(conversation("打开车窗"), self.config)
+        self.cached.invoke(conversation("打开车窗"), self.config)
+        self.assertEqual(other.invoke(conversation("打开车窗"), self.config), expected)
+        stats = self.cached.get_prefix_cache_stats()
+        self.assertEqual((stats["misses"], stats["hits"], stats["entries"]), (2, 0, 2))
+
+    def test_stream_uses_prefix(self):
+        chunks = list(self.cached.stream(conversation("打开车窗"), self.config))
+        self.assertEqual("".join(c["content"] for c in chunks),
+                         self.uncached.invoke(conversation("打开车窗"), self.config)["content"])
+        self.assertEqual(self.cached.get_prefix_cache_stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        self.cached.prefix_cache = PrefixKVCache(max_entries=2)
+        for system_prompt in ["first", "second", "first", "third"]:
+            self.cached.invoke(conversation("hi", system_prompt), {"max_tokens": 1})
+        stats = self.cached.get_prefix_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["entries"]), (1, 3, 1, 2))
+        # "second" was least recently used
+        self.cached.invoke(conversation("hi", "first"), {"max_tokens": 1})
+        self.assertEqual(self.cached.get_prefix_cache_stats()["hits"], 2)
+
+    def test_token_budget(self):
+        cache = PrefixKVCache(max_tokens=5)
+        model = self.cached.model
+        cache.get(model, [1, 2, 3])
+        cache.get(model, [4, 5, 6])
+        self.assertEqual(cache.get_stats()["cached_tokens"], 3)
+        past_key_values = cache.get(model, [4, 5, 6], batch_size=3)
+        self.assertEqual(past_key_values.get_seq_length(), 3)
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Unit tests for the in-memory prompt registry in prompt_registry.py and load_prompt
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+from prompt_registry import DEFAULT_PROMPT, PromptRegistry, default_registry, find_prompts_dir
+
+try:
+    import tokenizers
+    import transformers
+    from tiny_qwen3_checkpoint import build_tokenizer
+    TOKENIZER_AVAILABLE = True
+except ImportError:
+    TOKENIZER_AVAILABLE = False
+
+
+class TestPromptRegistry(unittest.TestCase):
+    """Prompt lookup and change detection on a temporary Prompts directory"""
+
+    def setUp(self):
+        self.prompts_dir = tempfile.mkdtemp()
+        self.write("DailyChat.md", "# Role\nYou are a friendly assistant.")
+        self.write("Navigation.md", "You plan routes.")
+        self.registry = PromptRegistry(self.prompts_dir, watch_interval=None)
+
+    def tearDown(self):
+        self.registry.close()
+        shutil.rmtree(self.prompts_dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.prompts_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Make the change visible to modification-time checks on coarse clocks
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_intents_and_file_names(self):
+        self.assertEqual(self.registry.get("daily_chat"), "# Role\nYou are a friendly assistant.")
+        self.assertEqual(self.registry.get("device_control"), "")
+        self.assertEqual(self.registry.get("Navigation"), "You plan routes.")
+        self.assertEqual(self.registry.get("Navigation.md"), "You plan routes.")
+        # Unknown intents get the daily chat prompt, as load_prompt always did
+        self.assertEqual(self.registry.get("small_talk"), self.registry.get("daily_chat"))
+        self.assertEqual(self.registry.names(), ["DailyChat.md", "Navigation.md"])
+
+    def test_refresh_reloads_changed_added_and_removed_files(self):
+        self.assertEqual(self.registry.refresh(), 0)
+        self.write("DailyChat.md", "Updated prompt")
+        self.write("Music.md", "You pick songs.")
+        os.remove(os.path.join(self.prompts_dir, "Navigation.md"))
+        self.assertEqual(self.registry.refresh(), 3)
+        self.assertEqual(self.registry.get("daily_chat"), "Updated prompt")
+        self.assertEqual(self.registry.get("Music"), "You pick songs.")
+        self.assertEqual(self.registry.get("Navigation"), "Updated prompt")
+
+    def test_missing_prompt_file_uses_default_prompt(self):
+        os.remove(os.path.join(self.prompts_dir, "DailyChat.md"))
+        self.registry.refresh()
+        self.assertEqual(self.registry.get("daily_chat"), DEFAULT_PROMPT)
+
+    def test_watcher_picks_up_edits(self):
+        registry = PromptRegistry(self.prompts_dir, watch_interval=0.05)
+        try:
+            self.write("DailyChat.md", "Edited while running")
+            for _ in range(100):
+                if registry.get("daily_chat") == "Edited while running":
+                    break
+                time.sleep(0.05)
+            self.assertEqual(registry.get("daily_chat"), "Edited while running")
+        finally:
+            registry.close()
+
+    @unittest.skipUnless(TOKENIZER_AVAILABLE, "transformers and tokenizers are required")
+    def test_chat_prefix_is_cached_per_prompt_version(self):
+        tokenizer = build_tokenizer()
+        prompt = self.registry.get("daily_chat")
+        text, ids = self.registry.chat_prefix(tokenizer, prompt)
+        self.assertEqual(text, tokenizer.apply_chat_template([{"role": "system", "content": prompt}],
+                                                             tokenize=False, add_generation_prompt=False))
+        self.assertEqual(ids, tokenizer(text)["input_ids"])
+        self.assertIs(self.registry.chat_prefix(tokenizer, prompt)[1], ids)
+        self.assertEqual(self.registry.get_stats()["chat_prefixes"], 1)
+
+        # Unregistered prompts are rendered but not kept
+        self.registry.chat_prefix(tokenizer, "Some other prompt")
+        self.assertEqual(self.registry.get_stats()["chat_prefixes"], 1)
+
+        self.write("DailyChat.md", "Updated prompt")
+        self.registry.refresh()
+        self.assertEqual(self.registry.get_stats()["chat_prefixes"], 0)
+
+
+class TestLoadPrompt(unittest.TestCase):
+    """load_prompt served by the process-wide registry"""
+
+    def test_project_prompts(self):
+        self.assertEqual(find_prompts_dir(), current_dir.parent / "ExtendMaterial" / "Prompts")
+        expected = (current_dir.parent / "ExtendMaterial" / "Prompts" / "DailyChat.md").read_text(encoding="utf-8")
+        self.assertEqual(default_registry().get("daily_chat"), expected)
+
+    def test_load_prompt_is_quiet(self):
+        try:
+            from LocalChatBot import load_prompt
+        except ImportError:
+            self.skipTest("LocalChatBot dependencies are not installed")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            prompt = load_prompt("daily_chat")
+        self.assertEqual(prompt, default_registry().get("daily_chat"))
+        self.assertEqual(output.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Unit tests for speculative decoding in speculative_decoding.py and the model catalog lookup
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from model_loader import resolve_model_path
+    from speculative_decoding import SpeculativeDecoder
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站",
+           {"messages": [{"role": "system", "content": "You are a car."}, {"role": "user", "content": "锁车"}]}]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestSpeculativeDecoding(unittest.TestCase):
+    """SpeculativeDecoder on tiny random Qwen3 checkpoints"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "target")))
+        cls.unrelated_path = build_tiny_qwen3(os.path.join(cls.test_dir, "unrelated"), seed=1)
+        cls.config = {"max_tokens": 20}
+        cls.expected = [cls.chatbot.invoke(prompt, cls.config) for prompt in PROMPTS]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def tearDown(self):
+        self.chatbot.disable_speculative_decoding()
+
+    def test_matching_draft_accepts_and_keeps_greedy_output(self):
+        # The target as its own draft agrees with every proposal
+        self.chatbot.enable_speculative_decoding(self.chatbot.model, num_speculative_tokens=4)
+        self.assertEqual([self.chatbot.invoke(prompt, self.config) for prompt in PROMPTS], self.expected)
+
+        stats = self.chatbot.get_speculative_stats()
+        self.assertEqual(stats["acceptance_rate"], 1.0)
+        self.assertGreater(stats["tokens_per_step"], 4)
+        self.assertEqual(stats["fallbacks"], 0)
+
+    def test_unrelated_draft_falls_back(self):
+        decoder = self.chatbot.enable_speculative_decoding(self.unrelated_path, warmup_tokens=4)
+        self.assertEqual([self.chatbot.invoke(prompt, self.config) for prompt in PROMPTS], self.expected)
+
+        stats = decoder.get_stats()
+        self.assertLess(stats["acceptance_rate"], 0.3)
+        self.assertGreaterEqual(stats["fallbacks"], 1)
+        # The generation after a fallback skips the draft
+        self.assertGreaterEqual(stats["skipped"], 1)
+        self.assertLessEqual(stats["drafted"], 4 * (stats["generations"] - stats["skipped"]) + 4)
+
+    def test_sampling_with_matching_draft(self):
+        decoder = SpeculativeDecoder(self.chatbot.model, self.chatbot.model, [self.chatbot.tokenizer.eos_token_id])
+        ids, _ = self.chatbot._tokenize("打开车窗")
+        torch.manual_seed(0)
+        output = decoder.generate(ids, 24, sampling={"do_sample": True, "temperature": 0.7, "top_k": 20, "top_p": 0.9})
+        self.assertGreater(len(output), 0)
+        self.assertLessEqual(len(output), 24)
+        # p == q: every proposal is accepted
+        self.assertGreater(decoder.last_generation["acceptance_rate"], 0.9)
+
+    def test_eos_ends_generation(self):
+        eos = self.chatbot.tokenizer.eos_token_id
+        ids, _ = self.chatbot._tokenize("打开车窗")
+        reference = SpeculativeDecoder(self.chatbot.model, self.chatbot.model, []).generate(ids, 12)
+        # Treat the fourth generated token as end-of-sequence
+        decoder = SpeculativeDecoder(self.chatbot.model, self.chatbot.model, [eos, reference[3]])
+        output = decoder.generate(ids, 12)
+        self.assertEqual(output, reference[:reference.index(reference[3]) + 1])
+
+    def test_vocabulary_mismatch_is_rejected(self):
+        from model_loader import load_causal_lm
+        other = build_tiny_qwen3(os.path.join(self.test_dir, "other-vocab"), vocab_size=600)
+        _, draft, _ = load_causal_lm(other)
+        with self.assertRaises(ValueError):
+            SpeculativeDecoder(self.chatbot.model, draft, [])
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestModelCatalog(unittest.TestCase):
+    """resolve_model_path with model2file.json style catalogs"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.catalog = os.path.join(self.test_dir, "model2file.json")
+        with open(self.catalog, "w", encoding="utf-8") as f:
+            json.dump([{"model_name": "Qwen3-0.6B", "Unix_model_path": "./models/llm/Qwen3-0.6B",
+                        "Windows_model_path": ".\\\\models\\\\llm\\\\Qwen3-0.6B"}], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_name_resolves_relative_to_catalog(self):
+        path = resolve_model_path("Qwen3-0.6B", self.catalog)
+        self.assertTrue(Path(path).is_absolute())
+        if os.name != "nt":
+            self.assertEqual(Path(path), Path(self.test_dir).resolve() / "models" / "llm" / "Qwen3-0.6B")
+
+    def test_directory_is_returned_unchanged(self):
+        self.assertEqual(resolve_model_path(self.test_dir, self.catalog), self.test_dir)
+
+    def test_unknown_name(self):
+        with self.assertRaises(FileNotFoundError):
+            resolve_model_path("Qwen3-235B", self.catalog)
+
+    def test_project_catalog_lists_qwen3(self):
+        self.assertTrue(resolve_model_path("Qwen3-0.6B").endswith("Qwen3-0.6B"))
+
+
+if __name__ == "__main__":
+    unittest.main()
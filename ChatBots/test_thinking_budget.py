@@ -0,0 +1,118 @@
+"""
+Unit tests for the thinking-token budget in thinking_budget.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from thinking_budget import (INTENT_THINKING_BUDGETS, ThinkingBudgetProcessor, resolve_thinking_budget,
+                                 thinking_budget_kwargs)
+    from tiny_qwen3_checkpoint import build_tiny_qwen3
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+PROMPTS = ["hi", "打开车窗", "今天天气怎么样？请帮我导航到最近的充电站"]
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestThinkingBudgetProcessor(unittest.TestCase):
+    """Budget lookup and the logits processor on its own"""
+
+    def test_resolve_budget(self):
+        self.assertIsNone(resolve_thinking_budget({"thinking_budget": 8}))
+        self.assertEqual(resolve_thinking_budget({"thinking": True, "thinking_budget": 8, "intent": "info_query"}), 8)
+        self.assertEqual(resolve_thinking_budget({"thinking": True, "intent": "device_control"}),
+                         INTENT_THINKING_BUDGETS["device_control"])
+        self.assertEqual(resolve_thinking_budget({"thinking": True, "intent": "daily_chat"}, {"daily_chat": 32}), 32)
+        self.assertIsNone(resolve_thinking_budget({"thinking": True, "intent": "unknown"}))
+        self.assertEqual(thinking_budget_kwargs(None, 7, 3), {})
+
+    def test_forces_think_end_once_the_budget_is_spent(self):
+        processor = ThinkingBudgetProcessor(budget=2, think_end_id=7, prompt_width=3)
+        scores = torch.zeros(2, 10)
+        # Step 0 and 1: within the budget
+        self.assertTrue(torch.equal(processor(torch.tensor([[1, 2, 3], [1, 2, 3]]), scores), scores))
+        processor(torch.tensor([[1, 2, 3, 5], [1, 2, 3, 7]]), scores)
+        # Step 2: row 0 is still reasoning, row 1 closed its reasoning at step 1
+        forced = processor(torch.tensor([[1, 2, 3, 5, 6], [1, 2, 3, 7, 6]]), scores)
+        self.assertEqual(int(forced[0].argmax()), 7)
+        self.assertEqual(forced[0].isinf().sum().item(), 9)
+        self.assertTrue(torch.equal(forced[1], scores[1]))
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestLocalChatBotThinkingBudget(unittest.TestCase):
+    """The budget on every decoding path of LocalChatBot"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.model_path = build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3"))
+        cls.chatbot = LocalChatBot(cls.model_path, thinking_budgets={"device_control": 0, "daily_chat": 4})
+        cls.chatbot.model.generation_config.do_sample = False
+        cls.config = {"thinking": True, "max_tokens": 12, "thinking_budget": 4}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_generate_closes_reasoning_at_the_budget(self):
+        ids, _ = self.chatbot._tokenize("hi", enable_thinking=True)
+        input_ids = torch.tensor([ids])
+        for budget in (0, 3):
+            output = self.chatbot.model.generate(input_ids, max_new_tokens=8,
+                                                 **thinking_budget_kwargs(budget, self.chatbot.think_end_id, len(ids)))
+            new_tokens = output[0][len(ids):].tolist()
+            self.assertEqual(new_tokens.index(self.chatbot.think_end_id), budget)
+
+    def test_budget_splits_thinking_and_content(self):
+        unbounded = self.chatbot.invoke("hi", {"thinking": True, "max_tokens": 12})
+        bounded = self.chatbot.invoke("hi", self.config)
+        self.assertNotEqual(bounded, unbounded)
+        self.assertTrue(bounded["thinking"])
+        # The intent table of the chatbot supplies the same budget
+        self.assertEqual(self.chatbot.invoke("hi", {"thinking": True, "max_tokens": 12, "intent": "daily_chat"}),
+                         bounded)
+        # Without thinking mode the budget does not apply
+        self.assertEqual(self.chatbot.invoke("hi", {"max_tokens": 12, "thinking_budget": 0}),
+                         self.chatbot.invoke("hi", {"max_tokens": 12}))
+
+    def test_all_decoding_paths_agree(self):
+        expected = [self.chatbot.invoke(prompt, self.config) for prompt in PROMPTS]
+        self.assertEqual(self.chatbot.batch(PROMPTS, self.config), expected)
+
+        self.chatbot.enable_continuous_batching()
+        try:
+            self.assertEqual([self.chatbot.invoke(prompt, self.config) for prompt in PROMPTS], expected)
+        finally:
+            self.chatbot.disable_continuous_batching()
+
+        # The model as its own draft accepts every proposal, including ones past the budget
+        self.chatbot.enable_speculative_decoding(self.chatbot.model, num_speculative_tokens=3)
+        try:
+            self.assertEqual([self.chatbot.invoke(prompt, self.config) for prompt in PROMPTS], expected)
+        finally:
+            self.chatbot.disable_speculative_decoding()
+
+        chunks = list(self.chatbot.stream("hi", self.config))
+        self.assertEqual("".join(chunk["thinking"] for chunk in chunks).strip("\n"), expected[0]["thinking"])
+
+        session = self.chatbot.create_session()
+        self.assertEqual(session.invoke("hi", self.config), expected[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Unit tests for token-level streaming in token_streaming.py and LocalChatBot.stream
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add current directory and SystemTest (tiny checkpoint builder) to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir.parent / "SystemTest"))
+
+try:
+    import torch
+    from token_streaming import ThinkingStreamer, think_end_token_id
+    from tiny_qwen3_checkpoint import build_tiny_qwen3, build_tokenizer
+    DEPENDENCIES_AVAILABLE = True
+except ImportError:
+    DEPENDENCIES_AVAILABLE = False
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestThinkingStreamer(unittest.TestCase):
+    """Tests for incremental decoding and the thinking/content split"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tokenizer = build_tokenizer()
+
+    def _feed(self, streamer, text_parts):
+        streamer.put(torch.tensor([[1, 2, 3]]))  # prompt, skipped
+        for part in text_parts:
+            ids = [self.tokenizer.convert_tokens_to_ids(part)] if part in ("</think>", "<think>") \
+                else self.tokenizer.encode(part)
+            for token_id in ids:
+                streamer.put(torch.tensor([token_id]))
+        streamer.end()
+
+    def test_think_end_token_lookup(self):
+        self.assertEqual(think_end_token_id(self.tokenizer), self.tokenizer.convert_tokens_to_ids("</think>"))
+
+    def test_thinking_split_on_the_fly(self):
+        streamer = ThinkingStreamer(self.tokenizer, thinking=True)
+        self._feed(streamer, ["<think>", "\n先确认车速", "</think>", "\n\n好的，已打开车窗"])
+        chunks = list(streamer)
+        thinking = "".join(c["thinking"] for c in chunks)
+        content = "".join(c["content"] for c in chunks)
+        self.assertEqual(thinking, "先确认车速")
+        self.assertEqual(content, "好的，已打开车窗")
+        # Every thinking chunk precedes every content chunk
+        kinds = ["thinking" if c["thinking"] else "content" for c in chunks]
+        self.assertEqual(kinds, sorted(kinds, key=lambda kind: kind == "content"))
+        self.assertIsNotNone(streamer.get_stats()["first_content_ms"])
+
+    def test_multibyte_characters_are_not_split(self):
+        streamer = ThinkingStreamer(self.tokenizer)
+        self._feed(streamer, ["空调温度二十二度"])
+        chunks = [c["content"] for c in streamer]
+        self.assertEqual("".join(chunks), "空调温度二十二度")
+        self.assertFalse(any("�" in chunk for chunk in chunks))
+
+    def test_decoding_is_incremental(self):
+        text = "好的，已打开车窗。" * 40 + "Navigate to the nearest charging station, please. " * 20
+        decoded_lengths = []
+        decode = self.tokenizer.decode
+
+        def counting_decode(ids, *args, **kwargs):
+            decoded_lengths.append(len(ids))
+            return decode(ids, *args, **kwargs)
+
+        streamer = ThinkingStreamer(self.tokenizer)
+        self.tokenizer.decode = counting_decode
+        try:
+            self._feed(streamer, [text])
+        finally:
+            del self.tokenizer.decode
+        self.assertEqual("".join(c["content"] for c in streamer), text)
+        # Each decode covers the last chunk and the new tokens, not the whole reply
+        self.assertLess(max(decoded_lengths), 8)
+        self.assertLess(sum(decoded_lengths), 8 * len(self.tokenizer.encode(text)))
+
+    def test_generation_error_is_raised_to_consumer(self):
+        streamer = ThinkingStreamer(self.tokenizer)
+        streamer.fail(RuntimeError("out of memory"))
+        with self.assertRaises(RuntimeError):
+            list(streamer)
+
+    def test_async_iteration(self):
+        streamer = ThinkingStreamer(self.tokenizer)
+        self._feed(streamer, ["打开车窗"])
+
+        async def collect():
+            return [chunk async for chunk in streamer]
+
+        chunks = asyncio.run(collect())
+        self.assertEqual("".join(c["content"] for c in chunks), "打开车窗")
+
+
+@unittest.skipUnless(DEPENDENCIES_AVAILABLE, "torch, transformers and tokenizers are required")
+class TestLocalChatBotStreaming(unittest.TestCase):
+    """LocalChatBot.stream on a tiny random Qwen3 checkpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        from LocalChatBot import LocalChatBot
+        cls.test_dir = tempfile.mkdtemp()
+        cls.chatbot = LocalChatBot(build_tiny_qwen3(os.path.join(cls.test_dir, "tiny-qwen3")))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_stream_matches_invoke(self):
+        config = {"max_tokens": 16}
+        expected = self.chatbot.invoke("打开车窗", config)
+        chunks = list(self.chatbot.stream("打开车窗", config))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(c["content"] for c in chunks), expected["content"])
+
+        stats = self.chatbot.get_stream_stats()
+        self.assertLessEqual(stats["tokens"], 16)
+        self.assertLess(stats["ttft_ms"], stats["total_ms"])
+
+    def test_closing_stream_stops_generation(self):
+        stream = self.chatbot.stream("打开车窗", {"max_tokens": 500})
+        next(stream)
+        stream.close()
+        streamer = self.chatbot._last_streamer
+        # The stopping criterion ends generate() at the next token
+        for _ in range(50):
+            if streamer.end_time is not None:
+                break
+            time.sleep(0.1)
+        self.assertIsNotNone(streamer.end_time)
+        self.assertLess(streamer.get_stats()["tokens"], 500)
+
+    def test_astream(self):
+        async def collect():
+            return [chunk async for chunk in self.chatbot.astream("打开车窗", {"max_tokens": 8})]
+
+        chunks = asyncio.run(collect())
+        self.assertLessEqual(self.chatbot.get_stream_stats()["tokens"], 8)
+        self.assertTrue(all(set(chunk) == {"thinking", "content"} for chunk in chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Thinking budget - Bound the reasoning of Qwen3 thinking mode
+
+With enable_thinking, Qwen3 may reason for hundreds of tokens before the answer, and
+max_new_tokens then cuts off the answer rather than the reasoning. A thinking budget
+caps the reasoning instead: once a reply has generated `budget` tokens without closing
+its reasoning, the next token is forced to </think> (151668 for Qwen3) and the model
+goes on to the answer. A budget of 0 skips the reasoning altogether.
+
+Budgets are given per request (config["thinking_budget"]) or per intent type
+(config["intent"] looked up in INTENT_THINKING_BUDGETS or the chatbot's own table);
+requests without either reason without a bound. generate() applies the budget through
+ThinkingBudgetProcessor; the continuous batching engine and the speculative decoder
+check thinking_budget_exhausted after each token.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList
+
+# Intent type -> most reasoning tokens (None: unbounded). Device commands are answered
+# from the prompt alone; open questions get room to reason.
+INTENT_THINKING_BUDGETS: Dict[str, Optional[int]] = {
+    "device_control": 0,
+    "info_query": 256,
+    "daily_chat": 512,
+}
+
+
+def resolve_thinking_budget(config: Dict[str, Any],
+                            budgets: Optional[Dict[str, Optional[int]]] = None) -> Optional[int]:
+    """
+    Thinking budget of a request
+
+    Args:
+        config: Request config; "thinking_budget" wins over the budget of "intent"
+        budgets: Intent type -> budget (INTENT_THINKING_BUDGETS when None)
+
+    Returns:
+        int or None: Most reasoning tokens, None for no bound (or thinking disabled)
+    """
+    if not config.get("thinking"):
+        return None
+    if config.get("thinking_budget") is not None:
+        return max(0, int(config["thinking_budget"]))
+    return (INTENT_THINKING_BUDGETS if budgets is None else budgets).get(config.get("intent"))
+
+
+def thinking_budget_kwargs(budget: Optional[int], think_end_id: int, prompt_width: int) -> Dict[str, Any]:
+    """
+    generate() arguments enforcing a thinking budget
+
+    Args:
+        budget: Most reasoning tokens (None: unbounded, no arguments)
+        think_end_id: Id of </think>
+        prompt_width: Width of the input_ids passed to generate()
+
+    Returns:
+        dict: {"logits_processor": ...} or {}
+    """
+    if budget is None:
+        return {}
+    return {"logits_processor": LogitsProcessorList([ThinkingBudgetProcessor(budget, think_end_id, prompt_width)])}
+
+
+def thinking_budget_exhausted(tokens: List[int], budget: Optional[int], think_end_id: int) -> bool:
+    """Whether the next token of a reply must be </think>"""
+    return budget is not None and len(tokens) >= budget and think_end_id not in tokens
+
+
+class ThinkingBudgetProcessor(LogitsProcessor):
+    def __init__(self, budget: int, think_end_id: int, prompt_width: int):
+        """
+        Args:
+            budget: Most reasoning tokens per row
+            think_end_id: Id of </think>
+            prompt_width: Width of the (padded) prompt; generated tokens follow it
+        """
+        self.budget = budget
+        self.think_end_id = think_end_id
+        self.prompt_width = prompt_width
+        self._closed = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        generated = input_ids.shape[1] - self.prompt_width
+        if self._closed is None:
+            self._closed = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        elif generated > 0:
+            self._closed |= input_ids[:, -1] == self.think_end_id
+        if generated < self.budget:
+            return scores
+        force = ~self._closed
+        if force.any():
+            scores = scores.clone()
+            scores[force] = float("-inf")
+            scores[force, self.think_end_id] = 0.0
+        return scores
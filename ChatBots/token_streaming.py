@@ -0,0 +1,260 @@
+"""
+Token-level streaming for the local chat models
+
+model.generate runs in a background thread and pushes every new token to a
+ThinkingStreamer. The streamer decodes the tokens incrementally (only the tokens since the
+last chunk, with the tokens of that chunk as context, so a long reply costs linear time),
+splits the reasoning from the answer as soon as the </think> token appears, and hands out
+chunks in the format of LocalChatBot.invoke ({"thinking": str, "content": str}) through a
+sync or an async iterator. Time-to-first-token is recorded for every stream. A streamer
+bound to an event loop (loop=...) hands its chunks to an asyncio queue, so an async
+consumer waits without occupying an executor thread.
+
+Stopping the iteration early (e.g. the user interrupts the voice reply) stops the
+generation at the next token instead of running to max_new_tokens.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from transformers import StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
+
+# </think> in the Qwen3 vocabulary, used when the tokenizer does not define the token
+QWEN_THINK_END_TOKEN_ID = 151668
+
+_END = object()
+
+
+def think_end_token_id(tokenizer) -> int:
+    """
+    Id of the </think> token of a tokenizer
+
+    Args:
+        tokenizer: Hugging Face tokenizer
+
+    Returns:
+        int: The token id (151668 for Qwen3 when the lookup fails)
+    """
+    try:
+        token_id = tokenizer.convert_tokens_to_ids("</think>")
+    except Exception:
+        token_id = None
+    if not isinstance(token_id, int) or token_id == tokenizer.unk_token_id:
+        return QWEN_THINK_END_TOKEN_ID
+    return token_id
+
+
+class _CancelCriteria(StoppingCriteria):
+    """Stops generate() once the consumer has abandoned the stream"""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.event.is_set()
+
+
+class ThinkingStreamer(BaseStreamer):
+    def __init__(self, tokenizer, thinking: bool = False, think_end_id: Optional[int] = None,
+                 timeout: Optional[float] = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Args:
+            tokenizer: Tokenizer used to decode the generated ids
+            thinking: Whether the model starts in a reasoning section (enable_thinking)
+            think_end_id: Id of </think> (looked up from the tokenizer when None)
+            timeout: Seconds to wait for the next chunk before raising queue.Empty
+            loop: Event loop of the async consumer; the chunks are then only available
+                  through async iteration
+        """
+        self.tokenizer = tokenizer
+        self.think_end_id = think_end_token_id(tokenizer) if think_end_id is None else think_end_id
+        self.timeout = timeout
+        self.section = "thinking" if thinking else "content"
+        self.cancelled = threading.Event()
+        self.error = None
+
+        self._queue = queue.Queue()
+        self._loop = loop
+        self._async_queue = asyncio.Queue() if loop is not None else None
+        self._prompt_skipped = False
+        self._section_ids = []
+        # _section_ids[:_read_offset] are sent; _prefix_offset starts the tokens decoded again
+        # as context, so the text of the new tokens is the same as in a decode of the section
+        self._prefix_offset = 0
+        self._read_offset = 0
+        self._section_started = False
+
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+        self.first_content_time = None
+        self.end_time = None
+        self.tokens = 0
+
+    # Producer side, called by model.generate in the generation thread
+
+    def put(self, value):
+        if not self._prompt_skipped:
+            # generate() passes the prompt first
+            self._prompt_skipped = True
+            return
+        if len(value.shape) > 1:
+            if value.shape[0] > 1:
+                raise ValueError("ThinkingStreamer only supports batch size 1")
+            value = value[0]
+
+        for token_id in value.tolist():
+            if self.first_token_time is None:
+                self.first_token_time = time.perf_counter()
+            self.tokens += 1
+            if token_id == self.think_end_id:
+                self._flush(final=True)
+                self.section = "content"
+                self._section_ids, self._prefix_offset, self._read_offset = [], 0, 0
+                self._section_started = False
+                continue
+            self._section_ids.append(token_id)
+            self._flush(final=False)
+
+    def end(self):
+        self._flush(final=True)
+        self.end_time = time.perf_counter()
+        self._send(_END)
+
+    def _send(self, item):
+        if self._loop is None:
+            self._queue.put(item)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._async_queue.put_nowait, item)
+        except RuntimeError:
+            # The consumer's event loop is closed, nobody is left to read the chunk
+            pass
+
+    def _flush(self, final: bool):
+        """Send the newly decoded text of the current section"""
+        ids = self._section_ids
+        prefix_text = self.tokenizer.decode(ids[self._prefix_offset:self._read_offset], skip_special_tokens=True)
+        text = self.tokenizer.decode(ids[self._prefix_offset:], skip_special_tokens=True)
+        # A multi-byte character split across tokens decodes to U+FFFD until it is complete
+        if not final and (len(text) <= len(prefix_text) or text.endswith("�")):
+            return
+        chunk = text[len(prefix_text):]
+        self._prefix_offset, self._read_offset = self._read_offset, len(ids)
+        if not self._section_started:
+            # Same as the strip("\n") of invoke for the start of each section
+            chunk = chunk.lstrip("\n")
+            if not chunk:
+                return
+            self._section_started = True
+        if chunk:
+            if self.section == "content" and self.first_content_time is None:
+                self.first_content_time = time.perf_counter()
+            self._send({"thinking": chunk if self.section == "thinking" else "",
+                        "content": chunk if self.section == "content" else ""})
+
+    def fail(self, error: BaseException):
+        """Record an exception raised by the generation thread"""
+        self.error = error
+        self.end_time = time.perf_counter()
+        self._send(_END)
+
+    # Consumer side
+
+    def cancel(self):
+        """Ask the generation thread to stop at the next token"""
+        self.cancelled.set()
+
+    def stopping_criteria(self) -> StoppingCriteriaList:
+        return StoppingCriteriaList([_CancelCriteria(self.cancelled)])
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        try:
+            while True:
+                item = self._queue.get(timeout=self.timeout)
+                if item is _END:
+                    break
+                yield item
+        finally:
+            self.cancel()
+        if self.error is not None:
+            raise self.error
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if self._async_queue is not None:
+                    try:
+                        item = await asyncio.wait_for(self._async_queue.get(), self.timeout)
+                    except asyncio.TimeoutError:
+                        raise queue.Empty from None
+                else:
+                    item = await loop.run_in_executor(None, self._queue.get, True, self.timeout)
+                if item is _END:
+                    break
+                yield item
+        finally:
+            self.cancel()
+        if self.error is not None:
+            raise self.error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Timing of the stream
+
+        Returns:
+            dict: ttft_ms (first generated token), first_content_ms (first answer text),
+                  total_ms, tokens and tokens_per_second; None for values not reached yet
+        """
+        def since_start(moment):
+            return (moment - self.start_time) * 1000 if moment is not None else None
+
+        decode_seconds = (self.end_time - self.first_token_time
+                          if self.end_time is not None and self.first_token_time is not None else 0.0)
+        return {
+            "ttft_ms": since_start(self.first_token_time),
+            "first_content_ms": since_start(self.first_content_time),
+            "total_ms": since_start(self.end_time),
+            "tokens": self.tokens,
+            "tokens_per_second": (self.tokens - 1) / decode_seconds if decode_seconds > 0 else None,
+        }
+
+
+def start_generation(model, tokenizer, model_inputs, thinking: bool = False,
+                     think_end_id: Optional[int] = None, timeout: Optional[float] = None,
+                     **generate_kwargs) -> ThinkingStreamer:
+    """
+    Run model.generate in a background thread
+
+    Args:
+        model: Causal LM
+        tokenizer: Its tokenizer
+        model_inputs: Tokenized prompt (batch size 1) on the model device
+        thinking: Whether reasoning is enabled for this prompt
+        think_end_id: Id of </think> (looked up from the tokenizer when None)
+        timeout: Seconds the consumer waits for each chunk
+        **generate_kwargs: Passed to model.generate (max_new_tokens, use_cache, ...)
+
+    Returns:
+        ThinkingStreamer: Iterate it (sync or async) to receive the chunks
+    """
+    streamer = ThinkingStreamer(tokenizer, thinking=thinking, think_end_id=think_end_id, timeout=timeout)
+    stopping_criteria = streamer.stopping_criteria()
+    if generate_kwargs.get("stopping_criteria"):
+        stopping_criteria.extend(generate_kwargs.pop("stopping_criteria"))
+
+    def generate():
+        try:
+            import torch
+            with torch.no_grad():
+                model.generate(**model_inputs, streamer=streamer, stopping_criteria=stopping_criteria,
+                               **generate_kwargs)
+        except BaseException as e:
+            streamer.fail(e)
+
+    threading.Thread(target=generate, name="token-streaming", daemon=True).start()
+    return streamer
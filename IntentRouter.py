@@ -5,24 +5,39 @@ from typing import Tuple, Dict, Any
 
 
 class Router:
-    def __init__(self, rules_path: str = "Rules.json", registration_path: str = None):
+    def __init__(self, rules_path: str = "Rules.json", registration_path: str = None,
+                 use_command_table: bool = True, llm_model: str = "Qwen3-1.7B"):
         """
         Initialize the Router with rule engine and function registry
 
         Args:
             rules_path: Path to the Rules.json file
             registration_path: Path to RegistrationTemplate.json file (auto-detected if None)
+            use_command_table: Dispatch known car commands (CommandParameters.json) directly,
+                               before the rule engine and the LLM
+            llm_model: Local LLM (model2file.json name or directory), shared with other
+                       users of the model through the process-wide model pool
         """
         try:
             # Import required modules
             from RuleBaseEngine.RuleBaseEngine import RuleEngine
-            from ChatBots.LocalChatBot import LocalChatBot
+            from RuleBaseEngine.CommandTable import CommandTable
+            from ChatBots.model_pool import shared_model_pool
 
             # Initialize rule engine
             self.rule_engine = RuleEngine(rules_path)
 
-            # Initialize local LLM
-            self.local_llm = LocalChatBot()
+            # Command table fast path, sharing the rule engine's risk level mapping
+            self.command_table = None
+            if use_command_table:
+                try:
+                    self.command_table = CommandTable(risk_level_mapping=self.rule_engine.risk_level_mapping)
+                except Exception as e:
+                    print(f"Command table unavailable, using rule engine only: {str(e)}")
+            self._function_executor = None
+
+            # Initialize local LLM (loaded once per process)
+            self.local_llm = shared_model_pool.acquire(llm_model)
 
             # Load function registry
             if registration_path is None:
@@ -48,26 +63,32 @@ class Router:
             return "/RegistryModule/RegistrationTemplate.json"
 
     def _load_function_registry(self, registration_path: str) -> Dict[str, Any]:
-        """Load function registry from JSON file"""
+        """Load function registry from JSON file (parsed once per process via the shared registry cache)"""
+        from RegistryModule.registry_cache import shared_registry_cache
+
         try:
             # Handle both absolute and relative paths
             if not os.path.isabs(registration_path):
                 registration_path = os.path.join(os.getcwd(), registration_path.lstrip('/\\'))
 
-            with open(registration_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            self._registry_snapshot = shared_registry_cache.load(registration_path)
+            return self._registry_snapshot.data
         except FileNotFoundError:
             raise Exception(f"Registration file not found: {registration_path}")
         except json.JSONDecodeError:
             raise Exception(f"Invalid JSON format in registration file: {registration_path}")
 
     def _function_exists(self, function_name: str) -> bool:
-        """Check if function exists in registry"""
-        for module in self.function_registry.get("modules", []):
-            for function in module.get("functions", []):
-                if function.get("function_name") == function_name:
-                    return True
-        return False
+        """Check if function exists in registry (re-read when the file's mtime or size changed)"""
+        from RegistryModule.registry_cache import shared_registry_cache
+
+        try:
+            self._registry_snapshot = shared_registry_cache.load(self._registry_snapshot.path)
+            self.function_registry = self._registry_snapshot.data
+        except (OSError, json.JSONDecodeError) as e:
+            # Keep answering from the last readable version, e.g. while the file is rewritten
+            print(f"Registration file unavailable, using the last loaded version: {str(e)}")
+        return function_name in self._registry_snapshot.function_names
 
     def _extract_function_name(self, intent_type: str, user_input: str) -> str:
         """Extract function name from intent type and user input"""
@@ -102,6 +123,66 @@ class Router:
         except Exception as e:
             return False, f"Function call failed: {str(e)}"
 
+    def _get_function_executor(self):
+        """Function calling interface over registry.json, created on first use"""
+        if self._function_executor is None:
+            from ChatBots.FunctionCalling_router import function_calling_interface
+            self._function_executor = function_calling_interface()
+        return self._function_executor
+
+    def _can_execute_directly(self, function_name: str) -> bool:
+        """
+        Check that the registry _execute_directly calls (registry.json) has the function
+
+        RegistrationTemplate.json, checked by _function_exists, may list functions that
+        registry.json does not, or the other way around.
+        """
+        try:
+            return self._get_function_executor().registry.get_function_by_name(function_name) is not None
+        except Exception as e:
+            print(f"Function calling interface unavailable: {str(e)}")
+            return False
+
+    def _execute_directly(self, function_name: str, parameters: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Call a registry function with known parameters through the function calling interface"""
+        return self._get_function_executor().call_function((function_name, parameters))
+
+    def _dispatch_command(self, command: Dict[str, Any], user_input: str) -> str:
+        """
+        Handle a command found in the command table
+
+        The risk decision comes from the command's danger level. Commands whose parameters
+        are all known and whose API is in registry.json are executed without the LLM; the LLM
+        only fills in missing parameters or handles APIs missing from the registry.
+
+        Args:
+            command: Result of CommandTable.match
+            user_input: User's text input
+
+        Returns:
+            str: Response string or error message with "Error: " prefix
+        """
+        action = command["action"]
+        function_name = command["api_name"]
+        print(f"Command table match ({command['match_type']}): {command['command']} -> {function_name}, {action}")
+
+        if action == "HIGH_RISK_FORBIDDEN":
+            reason = self.risk_explanations.get(action, "High-risk operation blocked")
+            return f"Operation blocked: {reason}"
+
+        if action == "REQUIRES_CONFIRMATION":
+            confirmation_msg = self.risk_explanations.get(action, "Operation requires confirmation")
+            return f"Confirmation required: {confirmation_msg} Please confirm if you want to proceed."
+
+        if not command["missing_parameters"] and self._can_execute_directly(function_name):
+            success, result = self._execute_directly(function_name, command["parameters"])
+        else:
+            success, result = self._call_function(user_input, function_name)
+
+        if success:
+            return self._generate_response(command["category"], function_name, True, result, user_input)
+        return f"Error: {result}"
+
     def _generate_response(self, intent_type: str, function_name: str,
                            success: bool, result: str, user_input: str) -> str:
         """Generate appropriate response based on function execution result"""
@@ -134,8 +215,14 @@ class Router:
             if not user_input.strip():
                 return "Error: Empty input provided"
 
-            # Pass to rule base engine
+            # Known car commands skip the rule engine and the LLM
             print(f"Processing user input: {user_input}")
+            if self.command_table is not None:
+                command = self.command_table.match(user_input)
+                if command is not None:
+                    return self._dispatch_command(command, user_input)
+
+            # Pass to rule base engine
             intent_type, action = self.rule_engine.process_input(user_input)
 
             print(f"Rule engine response - Intent: {intent_type}, Action: {action}")
@@ -185,10 +272,23 @@ class Router:
             print(error_msg)
             return f"Error: {error_msg}"
 
+    def get_command_table_stats(self) -> Dict[str, Any]:
+        """Share of requests served by the command table without the rule engine or LLM"""
+        return self.command_table.get_stats() if self.command_table is not None else {}
+
+    def close(self):
+        """Release the shared local LLM"""
+        from ChatBots.model_pool import shared_model_pool
+        if self.local_llm is not None:
+            shared_model_pool.release(self.local_llm)
+            self.local_llm = None
+
     def update_risk_mapping(self, new_mapping: Dict[str, str]):
         """Update risk level mapping in rule engine"""
         try:
             self.rule_engine.update_risk_mapping(new_mapping)
+            if self.command_table is not None:
+                self.command_table.update_risk_mapping(new_mapping)
             print("Risk mapping updated successfully")
         except Exception as e:
             print(f"Error updating risk mapping: {str(e)}")
@@ -0,0 +1,369 @@
+"""
+Embedding-based function retrieval index
+Maps colloquial user requests to registry functions (climate_module.set_cabin_temperature) by
+semantic similarity, where fuzzy string matching on module_name.function_name cannot.
+
+Indexed documents per function:
+- function name and module name split into words, plus parameter names
+- the optional "description" of the registry entry
+- example commands from ExtendMaterial/CarCommands/CommandParameters.json and the
+  category of the same command in voice2command.json
+
+Documents are embedded with Qwen3-Embedding-0.6B and kept as one L2-normalized float32
+matrix; a query is answered with one matrix multiplication, a per-function max and
+np.argpartition for the top-k. Embeddings are cached by document text, so a registry
+change only embeds the documents that are new; embeddings of documents that are gone
+are dropped on rebuild. The persisted cache records the encoder and the embedding
+dimension and is discarded when either differs, so switching models re-embeds everything.
+
+Command-table APIs without a registry entry are indexed too (their example commands
+still help ranking) but have no module to import: their results carry callable=False
+and search(..., callable_only=True), which the router uses, leaves them out.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from RegistryModule.registry_cache import shared_registry_cache
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_REGISTRY_PATH = PROJECT_ROOT / "RegistryModule" / "registry.json"
+DEFAULT_COMMAND_PATHS = [
+    PROJECT_ROOT / "ExtendMaterial" / "CarCommands" / "CommandParameters.json",
+    PROJECT_ROOT / "ExtendMaterial" / "CarCommands" / "voice2command.json",
+]
+DEFAULT_EMBEDDING_MODEL = Path(__file__).resolve().parent / "Qwen3-Embedding-0.6B"
+
+# Qwen3-Embedding expects an instruction on the query side only
+QUERY_INSTRUCTION = "Instruct: Given a voice command from a car driver, retrieve the vehicle function that handles it\nQuery: "
+
+# Minimum cosine similarity of a result, so a request without a matching function returns
+# nothing instead of `limit` unrelated functions. Uncalibrated default: it has not been measured
+# with Qwen3-Embedding on command/function pairs (Qwen3-Embedding-0.6B_TestReport.md reports
+# 0.587 for two unrelated texts without the query instruction), so tune it on real requests
+DEFAULT_SCORE_THRESHOLD = 0.4
+
+
+def load_default_encoder(model_path: str = str(DEFAULT_EMBEDDING_MODEL)) -> Callable[[List[str]], np.ndarray]:
+    """
+    Load Qwen3-Embedding-0.6B from RAGmodule and return a text -> normalized embedding function
+
+    Args:
+        model_path: Path to the Qwen3-Embedding-0.6B model directory
+
+    Returns:
+        Callable mapping a list of texts to an (n, dim) array of L2-normalized embeddings
+    """
+    from RAGmodule.Qwen3Embedding0_6_simplecalling import Qwen3Embedding0_6_SimpleAPI
+
+    model = Qwen3Embedding0_6_SimpleAPI(model_path=model_path)
+    model.check_model_loaded()
+    return lambda texts: model.encode_text(texts, normalize=True)
+
+
+def _split_identifier(identifier: str) -> str:
+    """set_cabin_temperature -> set cabin temperature"""
+    return identifier.replace(".", " ").replace("_", " ").strip()
+
+
+def _read_json(path: Path) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FunctionEmbeddingIndex:
+    """Vector index over registry functions and the car command tables"""
+
+    def __init__(self,
+                 encoder: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 registry_path: str = str(DEFAULT_REGISTRY_PATH),
+                 command_paths: Optional[List[str]] = None,
+                 cache_path: Optional[str] = None,
+                 auto_refresh: bool = True,
+                 encode_batch_size: int = 32,
+                 encoder_id: Optional[str] = None):
+        """
+        Args:
+            encoder: Callable mapping a list of texts to normalized embeddings (Qwen3-Embedding-0.6B if None)
+            registry_path: Path to registry.json
+            command_paths: CommandParameters.json / voice2command.json paths (project files if None)
+            cache_path: Optional .npz file persisting document embeddings between restarts
+            auto_refresh: Check the source files for changes before every search
+            encode_batch_size: Number of documents embedded per encoder call
+            encoder_id: Identifies the encoder in the persisted cache (the model path for the
+                        default encoder, the encoder's module and class or function name if None)
+        """
+        if encoder_id is None:
+            encoder_id = (f"Qwen3-Embedding-0.6B:{DEFAULT_EMBEDDING_MODEL}" if encoder is None else
+                          f"{getattr(encoder, '__module__', '')}."
+                          f"{getattr(encoder, '__qualname__', type(encoder).__qualname__)}")
+        self.encoder_id = encoder_id
+        self.encoder = encoder if encoder is not None else load_default_encoder()
+        self.registry_path = str(registry_path)
+        self.command_paths = [str(path) for path in (command_paths if command_paths is not None else DEFAULT_COMMAND_PATHS)]
+        self.cache_path = cache_path
+        self.auto_refresh = auto_refresh
+        self.encode_batch_size = encode_batch_size
+
+        self.functions = []          # Function result dictionaries, position = function id
+        self.matrix = None           # (documents, dim) float32, L2-normalized rows grouped by function
+        # (matrix, row starts, function id per row group, callable mask per row group, functions)
+        self._state = (None, None, None, None, [])
+        self._embedding_cache = {}   # document text -> embedding vector, pruned to the current documents
+        self._embedding_dim = None   # Dimension of the cached embeddings
+        self._source_signature = None
+        self._lock = threading.Lock()
+
+        self._load_embedding_cache()
+        self.refresh()
+
+    def _signature(self) -> Tuple:
+        """(mtime_ns, size) of every source file, None for missing ones"""
+        signature = []
+        for path in [self.registry_path] + self.command_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Rebuild the index if the registry or command tables changed, embedding only new documents
+
+        Args:
+            force: Rebuild even if the source files are unchanged
+
+        Returns:
+            bool: True if the index was rebuilt
+        """
+        signature = self._signature()
+        if not force and signature == self._source_signature:
+            return False
+
+        with self._lock:
+            if not force and signature == self._source_signature:
+                return False
+
+            functions, documents = self._collect_documents()
+            texts = dict.fromkeys(text for _, text in documents)
+            embedded = self._embed_missing(list(texts))
+
+            # Documents are grouped by function id so rows of a function are contiguous
+            documents.sort(key=lambda item: item[0])
+            if documents:
+                matrix = np.stack([self._embedding_cache[text] for _, text in documents])
+                owners = np.array([function_id for function_id, _ in documents])
+                # First row of each function, for np.maximum.reduceat
+                row_starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+                group_functions = owners[row_starts]
+                callable_groups = np.array([functions[function_id]['callable'] for function_id in group_functions])
+                self._state = (matrix, row_starts, group_functions, callable_groups, functions)
+            else:
+                matrix = None
+                self._state = (None, None, None, None, functions)
+            self.matrix = matrix
+            self.functions = functions
+            self._source_signature = signature
+
+            # Keep only the embeddings of current documents, so the cache is bounded by the index
+            pruned = len(self._embedding_cache) > len(texts)
+            if pruned:
+                self._embedding_cache = {text: self._embedding_cache[text] for text in texts}
+            if embedded or pruned:
+                self._save_embedding_cache()
+            return True
+
+    def _collect_documents(self) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+        """Build the function list and (function id, document text) pairs from the source files"""
+        functions = []
+        documents = []
+        by_name = {}
+
+        def add_document(function_id, text):
+            text = text.strip()
+            if text:
+                documents.append((function_id, text))
+
+        if os.path.exists(self.registry_path):
+            registry_data = shared_registry_cache.load(self.registry_path).data
+            for module in registry_data.get('modules', []):
+                module_name = module.get('module_name', '')
+                for function in module.get('functions', []):
+                    function_name = function.get('function_name', '')
+                    parameters = function.get('parameters', [])
+                    function_id = len(functions)
+                    functions.append({
+                        'module_name': module_name,
+                        'function_name': function_name,
+                        'parameters': parameters,
+                        'full_name': f"{module_name}.{function_name}",
+                        'callable': bool(module_name)
+                    })
+                    by_name.setdefault(function_name, function_id)
+
+                    parameter_names = ", ".join(_split_identifier(param['name']) for param in parameters)
+                    add_document(function_id, f"{_split_identifier(module_name)}: {_split_identifier(function_name)}"
+                                              + (f" ({parameter_names})" if parameter_names else ""))
+                    add_document(function_id, function.get('description', ''))
+
+        # Command tables: CommandParameters.json has API names, voice2command.json the categories
+        commands = []
+        categories = {}
+        for path in self.command_paths:
+            if not os.path.exists(path):
+                continue
+            for entry in _read_json(Path(path)):
+                if 'API_calling' in entry:
+                    commands.append(entry)
+                if 'window_operation' in entry:
+                    categories[entry.get('command', '')] = entry['window_operation']
+
+        for entry in commands:
+            api_name = entry['API_calling']
+            function_id = by_name.get(api_name)
+            if function_id is None:
+                # Command-table API without a registry entry: ranked, but cannot be dispatched
+                function_id = len(functions)
+                functions.append({
+                    'module_name': '',
+                    'function_name': api_name,
+                    'parameters': [
+                        {'name': spec.split(':')[0], 'type': spec.split(':')[1].split('=')[0] if ':' in spec else 'Any'}
+                        for spec in entry.get('parameters', [])
+                    ],
+                    'full_name': api_name,
+                    'callable': False
+                })
+                by_name[api_name] = function_id
+                add_document(function_id, _split_identifier(api_name))
+
+            command = entry.get('command', '')
+            category = categories.get(command)
+            add_document(function_id, command)
+            if category:
+                add_document(function_id, f"{command} ({_split_identifier(category)})")
+
+        return functions, documents
+
+    def search(self, query: str, limit: int = 5, threshold: float = DEFAULT_SCORE_THRESHOLD,
+               callable_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Retrieve the functions most similar to a query
+
+        Args:
+            query: User request text
+            limit: Maximum number of functions returned
+            threshold: Minimum cosine similarity
+            callable_only: Leave out command-table APIs that have no registry entry
+
+        Returns:
+            List of function dictionaries (module_name, function_name, parameters, full_name,
+            callable, score)
+        """
+        return self.search_batch([query], limit=limit, threshold=threshold, callable_only=callable_only)[0]
+
+    def search_batch(self, queries: List[str], limit: int = 5, threshold: float = DEFAULT_SCORE_THRESHOLD,
+                     callable_only: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve the top-k functions for many queries with one matrix multiplication
+
+        Args:
+            queries: User request texts
+            limit: Maximum number of functions returned per query
+            threshold: Minimum cosine similarity
+            callable_only: Leave out command-table APIs that have no registry entry
+
+        Returns:
+            For each query, function dictionaries sorted by score
+        """
+        if not queries:
+            return []
+        if self.auto_refresh:
+            self.refresh()
+
+        matrix, row_starts, group_functions, callable_groups, functions = self._state
+        if matrix is None:
+            return [[] for _ in queries]
+
+        query_embeddings = np.asarray(self.encoder([QUERY_INSTRUCTION + query for query in queries]), dtype=np.float32)
+        query_embeddings /= np.maximum(np.linalg.norm(query_embeddings, axis=1, keepdims=True), 1e-12)
+
+        # (queries, documents) cosine scores reduced to the best document per function
+        function_scores = np.maximum.reduceat(query_embeddings @ matrix.T, row_starts, axis=1)
+        if callable_only:
+            function_scores[:, ~callable_groups] = -np.inf
+        k = min(limit, function_scores.shape[1])
+        if k <= 0:
+            return [[] for _ in queries]
+
+        top = np.argpartition(-function_scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            candidate_scores = function_scores[row, candidates]
+            ranked = []
+            for position in candidates[np.argsort(-candidate_scores)]:
+                score = float(function_scores[row, position])
+                if score < threshold or (callable_only and not callable_groups[position]):
+                    continue
+                result = dict(functions[group_functions[position]])
+                result['score'] = score
+                ranked.append(result)
+            results.append(ranked)
+        return results
+
+    def _embed_missing(self, texts: List[str]) -> bool:
+        """Embed the texts that are not cached yet; True if any was"""
+        new_texts = [text for text in texts if text not in self._embedding_cache]
+        for start in range(0, len(new_texts), self.encode_batch_size):
+            batch = new_texts[start:start + self.encode_batch_size]
+            embeddings = np.asarray(self.encoder(batch), dtype=np.float32)
+            if self._embedding_dim is not None and embeddings.shape[1] != self._embedding_dim:
+                # The cached vectors come from an encoder with another dimension: start over
+                self._embedding_cache = {}
+                self._embedding_dim = embeddings.shape[1]
+                return self._embed_missing(texts)
+            self._embedding_dim = embeddings.shape[1]
+            for text, embedding in zip(batch, embeddings):
+                self._embedding_cache[text] = embedding / max(np.linalg.norm(embedding), 1e-12)
+        return bool(new_texts)
+
+    def _load_embedding_cache(self):
+        """Load persisted document embeddings if a cache file of the same encoder and dimension is configured"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            data = np.load(self.cache_path, allow_pickle=False)
+            if 'encoder_id' not in data.files or str(data['encoder_id']) != self.encoder_id:
+                # Written by another encoder (or before the encoder was recorded)
+                return
+            texts, embeddings, dim = data['texts'].tolist(), data['embeddings'], int(data['dim'])
+            if not texts or embeddings.ndim != 2 or embeddings.shape[1] != dim:
+                return
+            # One document is embedded again to check that the encoder still has that dimension
+            if np.asarray(self.encoder(texts[:1])).shape[-1] != dim:
+                return
+            self._embedding_dim = dim
+            for text, embedding in zip(texts, embeddings):
+                self._embedding_cache[text] = embedding.astype(np.float32)
+        except Exception as e:
+            print(f"Warning: could not load function index cache {self.cache_path}: {e}")
+
+    def _save_embedding_cache(self):
+        """Persist document embeddings if a cache file is configured"""
+        if not self.cache_path or not self._embedding_cache:
+            return
+        try:
+            texts = list(self._embedding_cache)
+            np.savez(self.cache_path, texts=np.array(texts),
+                     embeddings=np.stack([self._embedding_cache[text] for text in texts]),
+                     encoder_id=np.array(self.encoder_id), dim=np.array(self._embedding_dim))
+        except Exception as e:
+            print(f"Warning: could not save function index cache {self.cache_path}: {e}")
@@ -0,0 +1,303 @@
+# argument_coercion.py
+"""
+Compiled argument coercers applied before parameter validation.
+
+LLM-generated arguments often carry the right value in the wrong type:
+"25" or "二十五度" for a float temperature, "true" for a bool, a JSON string
+for a list. Rejecting them costs another LLM generation, so the parameter
+types of a function are compiled once into a closure that converts such
+values when the conversion is unambiguous and reports every change:
+
+    coerce = compile_coercer([{"name": "temperature", "type": "float"}])
+    coerce({"temperature": "二十五度"})
+    # -> ({"temperature": 25.0}, ["temperature: '二十五度' -> 25.0"])
+
+Values that cannot be converted safely are left unchanged for the validator to reject.
+Only parameters with a declared type are coerced: untyped ("Any") parameters keep
+whatever the caller passed, and a union (Optional[int], ["integer", "null"]) never
+turns a number into a string.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from RegistryModule.parameter_validator import TYPE_MAPPING, JSON_SCHEMA_TYPE_MAPPING
+except ImportError:
+    from parameter_validator import TYPE_MAPPING, JSON_SCHEMA_TYPE_MAPPING
+
+Coercer = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], List[str]]]
+
+_NO_COERCION = object()
+
+_CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+              '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_CN_UNITS = {'十': 10, '百': 100, '千': 1000}
+_CN_NUMERAL = re.compile(r'^(负)?([零〇一二两三四五六七八九十百千万]+)(?:点([零〇一二三四五六七八九]+))?$')
+
+# Units that may follow a number in a spoken value ("25度", "三档")
+_UNIT_SUFFIX = re.compile(r'\s*(?:摄氏度|度|℃|°C|°|%|％|档|级|格|个|分钟|小时|秒|公里|米)$')
+
+_TRUE_WORDS = frozenset(['true', 'yes', 'on', '1', '是', '对', '开', '打开', '开启', '启用'])
+_FALSE_WORDS = frozenset(['false', 'no', 'off', '0', '否', '不', '关', '关闭', '禁用'])
+_NONE_WORDS = frozenset(['', 'none', 'null', '无'])
+
+
+def _parse_chinese_integer(text: str) -> int:
+    """二十五 -> 25, 一万二千 -> 12000, 一九 -> 19 (digit by digit when there are no units)"""
+    if not any(char in _CN_UNITS or char == '万' for char in text):
+        return int(''.join(str(_CN_DIGITS[char]) for char in text))
+
+    total, section, digit = 0, 0, None
+    for char in text:
+        if char in _CN_DIGITS:
+            digit = _CN_DIGITS[char]
+        elif char in _CN_UNITS:
+            # "十五": a unit without a leading digit counts as one
+            section += (1 if digit is None else digit) * _CN_UNITS[char]
+            digit = None
+        else:  # 万
+            total += (section + (digit or 0)) * 10000
+            section, digit = 0, None
+    return total + section + (digit or 0)
+
+
+def parse_number(text: str) -> Optional[float]:
+    """
+    Parse an Arabic or Chinese number with an optional unit suffix.
+
+    Args:
+        text: e.g. "25", "-3.5", "25度", "二十五度", "负三", "二十二点五"
+
+    Returns:
+        The number as int or float, None if the text is not a number
+    """
+    text = _UNIT_SUFFIX.sub('', text.strip())
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        value = float(text)
+        # Reject "nan"/"inf", which float() accepts
+        return value if value == value and value not in (float('inf'), float('-inf')) else None
+    except ValueError:
+        pass
+
+    match = _CN_NUMERAL.match(text)
+    if not match:
+        return None
+    negative, integer_text, fraction_text = match.groups()
+    try:
+        value = _parse_chinese_integer(integer_text)
+    except KeyError:
+        return None
+    if fraction_text:
+        value = float(f"{value}.{''.join(str(_CN_DIGITS[char]) for char in fraction_text)}")
+    return -value if negative else value
+
+
+def _to_int(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        number = parse_number(value)
+        if number is not None and float(number).is_integer():
+            return int(number)
+    return _NO_COERCION
+
+
+def _to_float(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        number = parse_number(value)
+        if number is not None:
+            return float(number)
+    return _NO_COERCION
+
+
+def _to_number(value):
+    if isinstance(value, str):
+        number = parse_number(value)
+        if number is not None:
+            return number
+    return _NO_COERCION
+
+
+def _to_bool(value):
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        word = value.strip().lower()
+        if word in _TRUE_WORDS:
+            return True
+        if word in _FALSE_WORDS:
+            return False
+    return _NO_COERCION
+
+
+def _to_str(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return _NO_COERCION
+
+
+def _json_converter(expected_type):
+    def convert(value):
+        if isinstance(value, str):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                return _NO_COERCION
+            if isinstance(parsed, expected_type):
+                return parsed
+        return _NO_COERCION
+    return convert
+
+
+def _to_tuple(value):
+    if isinstance(value, list):
+        return tuple(value)
+    parsed = _json_converter(list)(value)
+    return tuple(parsed) if parsed is not _NO_COERCION else _NO_COERCION
+
+
+def _to_none(value):
+    if isinstance(value, str) and value.strip().lower() in _NONE_WORDS:
+        return None
+    return _NO_COERCION
+
+
+# Converters by registry.json type name; each returns _NO_COERCION when unsafe
+CONVERTERS = {
+    'str': _to_str,
+    'int': _to_int,
+    'float': _to_float,
+    'bool': _to_bool,
+    'list': _json_converter(list),
+    'dict': _json_converter(dict),
+    'tuple': _to_tuple,
+    'None': _to_none
+}
+
+# Converters by JSON schema type name
+SCHEMA_CONVERTERS = {
+    "string": _to_str,
+    "integer": _to_int,
+    "number": _to_number,
+    "boolean": _to_bool,
+    "array": _json_converter(list),
+    "object": _json_converter(dict),
+    "null": _to_none
+}
+
+
+def _union_converter(converters: List[Callable]) -> Callable:
+    """Try the converters of a union in order; numbers are never converted to strings"""
+    converters = tuple(converter for converter in converters if converter is not _to_str)
+
+    def convert(value):
+        for converter in converters:
+            new_value = converter(value)
+            if new_value is not _NO_COERCION:
+                return new_value
+        return _NO_COERCION
+    return convert
+
+
+def _registry_union_members(type_name: Any) -> Optional[List[str]]:
+    """Member type names of "Optional[int]" or "Union[int, str]", None for other names"""
+    if not isinstance(type_name, str):
+        return None
+    if type_name.startswith("Optional[") and type_name.endswith("]"):
+        return [type_name[len("Optional["):-1].strip(), "None"]
+    if type_name.startswith("Union[") and type_name.endswith("]"):
+        return [member.strip() for member in type_name[len("Union["):-1].split(",")]
+    return None
+
+
+def _conversion(param_name: str, type_names: List[str], accepted_types: Dict[str, Any],
+                converters: Dict[str, Callable]) -> Optional[Tuple[str, Any, Callable]]:
+    """(name, accepted_type, converter) for the declared type names, None if any is unknown"""
+    if not type_names or not all(type_name in converters for type_name in type_names):
+        return None
+    if len(type_names) == 1:
+        return param_name, accepted_types[type_names[0]], converters[type_names[0]]
+    accepted = []
+    for type_name in type_names:
+        python_type = accepted_types[type_name]
+        accepted.extend(python_type if isinstance(python_type, tuple) else [python_type])
+    return param_name, tuple(accepted), _union_converter([converters[type_name] for type_name in type_names])
+
+
+def _build_coercer(conversions: List[Tuple[str, Any, Callable]]) -> Coercer:
+    """Close over (name, accepted_type, converter) triples"""
+    conversions = tuple(conversions)
+
+    def coerce(params_dict: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        coerced = params_dict
+        changes = []
+        for param_name, accepted_type, converter in conversions:
+            if param_name not in params_dict:
+                continue
+            value = params_dict[param_name]
+            if isinstance(value, accepted_type):
+                continue
+            new_value = converter(value)
+            if new_value is _NO_COERCION:
+                continue
+            if coerced is params_dict:
+                coerced = dict(params_dict)
+            coerced[param_name] = new_value
+            changes.append(f"{param_name}: {value!r} -> {new_value!r}")
+        return coerced, changes
+
+    return coerce
+
+
+def compile_coercer(parameters: List[Dict[str, Any]]) -> Coercer:
+    """
+    Compile a registry.json parameter list into a coercer.
+
+    Args:
+        parameters: List of {"name": ..., "type": ...} entries; "Optional[int]" and
+                    "Union[int, str]" are coerced to their member types, "Any" and unknown
+                    types are left as passed
+
+    Returns:
+        Callable taking the parameter dict and returning (coerced_params, coercions);
+        the input dict is returned unchanged when nothing was coerced
+    """
+    conversions = []
+    for param in parameters:
+        type_name = param.get('type')
+        conversion = _conversion(param['name'], _registry_union_members(type_name) or [type_name],
+                                 TYPE_MAPPING, CONVERTERS)
+        if conversion:
+            conversions.append(conversion)
+    return _build_coercer(conversions)
+
+
+def compile_schema_coercer(schema: Dict[str, Any]) -> Coercer:
+    """
+    Compile a JSON parameter schema into a coercer.
+
+    Args:
+        schema: JSON schema with "properties"; properties without a "type" are not coerced,
+                a list of types (e.g. ["integer", "null"]) is coerced to its members
+
+    Returns:
+        Callable taking the parameter dict and returning (coerced_params, coercions)
+    """
+    conversions = []
+    for param_name, details in schema.get("properties", {}).items():
+        type_names = details.get("type")
+        conversion = _conversion(param_name, [type_names] if isinstance(type_names, str) else list(type_names or []),
+                                 JSON_SCHEMA_TYPE_MAPPING, SCHEMA_CONVERTERS)
+        if conversion:
+            conversions.append(conversion)
+    return _build_coercer(conversions)
@@ -5,9 +5,82 @@ import json
 import logging
 import os
 import datetime
+import types
+import typing
 from typing import Callable, Dict, Any, Optional, List, Union
 from enum import Enum
 
+try:
+    from RegistryModule.parameter_validator import compile_schema_validator
+    from RegistryModule.argument_coercion import compile_schema_coercer
+    from RegistryModule.result_cache import ResultCache
+    from RegistryModule.sandbox_pool import SandboxPool
+except ImportError:
+    from parameter_validator import compile_schema_validator
+    from argument_coercion import compile_schema_coercer
+    from result_cache import ResultCache
+    from sandbox_pool import SandboxPool
+
+
+# JSON schema type of an annotation (generic aliases such as List[int] map through their origin)
+_ANNOTATION_SCHEMA_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+    type(None): "null"
+}
+
+# registry.json type names of the JSON schema types
+_SCHEMA_PYTHON_TYPES = {
+    "string": "str",
+    "integer": "int",
+    "number": "float",
+    "boolean": "bool",
+    "array": "list",
+    "object": "dict",
+    "null": "None"
+}
+
+
+def _annotation_schema_types(annotation: Any) -> Optional[List[str]]:
+    """
+    JSON schema types accepted by a parameter annotation
+
+    Returns:
+        List of type names, or None for a missing, Any or unrecognized annotation (not type checked)
+    """
+    if annotation is None:
+        return ["null"]
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return None
+    origin = typing.get_origin(annotation)
+    if origin is Union or (hasattr(types, "UnionType") and origin is types.UnionType):
+        schema_types = []
+        for argument in typing.get_args(annotation):
+            argument_types = _annotation_schema_types(argument)
+            if argument_types is None:
+                return None
+            schema_types.extend(t for t in argument_types if t not in schema_types)
+        return schema_types
+    schema_type = _ANNOTATION_SCHEMA_TYPES.get(origin or annotation)
+    return [schema_type] if schema_type else None
+
+
+def _registry_type_name(param_details: Dict) -> str:
+    """registry.json type name of a schema property ("Any" when untyped, "Optional[int]" for unions)"""
+    schema_type = param_details.get("type")
+    if schema_type is None:
+        return "Any"
+    if isinstance(schema_type, str):
+        return _SCHEMA_PYTHON_TYPES.get(schema_type, schema_type)
+    names = [_SCHEMA_PYTHON_TYPES.get(t, t) for t in schema_type if t != "null"]
+    if len(names) == 1 and "null" in schema_type:
+        return f"Optional[{names[0]}]"
+    return f"Union[{', '.join(_SCHEMA_PYTHON_TYPES.get(t, t) for t in schema_type)}]"
+
 
 class FunctionType(Enum):
     STATIC = "static"
@@ -22,12 +95,21 @@ class FunctionRegistry:
     Can record API calls to a JSON file for documentation and monitoring.
     """
 
-    def __init__(self, verbose: bool = False, json_registry_path: str = "registry.json"):
+    # Per-function entries that only make sense in memory (not listed or exported)
+    _RUNTIME_KEYS = ("function", "validator", "coercer")
+
+    # Function types executed in sandbox worker processes once a sandbox is enabled
+    SANDBOXED_TYPES = (FunctionType.PLUGIN.value, FunctionType.THIRD_PARTY.value)
+
+    def __init__(self, verbose: bool = False, json_registry_path: str = "registry.json",
+                 sandbox_pool: Optional[SandboxPool] = None):
         self.functions = {}
         self.verbose = verbose
         self.logger = self._setup_logger()
         self.json_registry_path = json_registry_path
         self.module_info = {}  # Track module paths and information
+        self.result_cache = ResultCache()  # TTL cache for functions registered with a cache policy
+        self.sandbox_pool = sandbox_pool  # Runs plugin/third-party functions out of process when set
         self._load_registry_if_exists()
 
     def _setup_logger(self):
@@ -56,7 +138,8 @@ class FunctionRegistry:
                  function_type: FunctionType = FunctionType.STATIC,
                  description: str = "",
                  override: bool = False,
-                 module_path: str = None) -> bool:
+                 module_path: str = None,
+                 cache_policy: Optional[Dict] = None) -> bool:
         """
         Register a function with the registry.
 
@@ -68,10 +151,15 @@ class FunctionRegistry:
             description: Human-readable description of what the function does
             override: Whether to override an existing function with the same name
             module_path: Path to the module containing the function (for JSON tracking)
+            cache_policy: Cache settings for read-only functions, e.g.
+                          {"ttl": 5, "key_params": ["time_period"], "invalidated_by": ["set_driving_mode"]}
+                          (the "cache" entry of the loaded registry.json if None, {} for no caching)
 
         Returns:
             bool: True if registration was successful, False otherwise
         """
+        previous = self.functions.get(name)
+        configured = False
         try:
             # Check if function already exists
             if name in self.functions and not override:
@@ -101,14 +189,26 @@ class FunctionRegistry:
             # Extract module name from path
             module_name = os.path.basename(module_path).replace(".py", "") if module_path else "unknown_module"
 
+            # Fall back to a policy declared in registry.json
+            if cache_policy is None:
+                cache_policy = self._declared_cache_policy(name)
+
+            # Configure result caching before the function is added, so an invalid policy is
+            # rejected up front; later failures restore the previous policy below
+            self.result_cache.configure(name, cache_policy)
+            configured = True
+
             # Register the function
             self.functions[name] = {
                 "function": func,
+                "validator": compile_schema_validator(parameter_schema),
+                "coercer": compile_schema_coercer(parameter_schema),
                 "parameters": parameter_schema,
                 "type": function_type.value,
                 "description": description,
                 "module_path": module_path,
                 "module_name": module_name,
+                "cache_policy": cache_policy,
                 "call_count": 0,
                 "last_called": None
             }
@@ -123,23 +223,18 @@ class FunctionRegistry:
             # Store parameter info in format matching RegistrationTemplate.json
             param_info = []
             for param_name, param_details in parameter_schema.get("properties", {}).items():
-                param_type = param_details.get("type", "string")
                 # Convert JSON schema types to Python types
-                type_mapping = {
-                    "string": "str",
-                    "integer": "int",
-                    "number": "float",
-                    "boolean": "bool",
-                    "array": "list",
-                    "object": "dict"
-                }
-                py_type = type_mapping.get(param_type, param_type)
-                param_info.append({"name": param_name, "type": py_type})
+                param_info.append({"name": param_name, "type": _registry_type_name(param_details)})
 
             self.module_info[module_name]["functions"][name] = {
                 "function_name": name,
                 "parameters": param_info
             }
+            if description:
+                # Used by the embedding-based function retrieval index
+                self.module_info[module_name]["functions"][name]["description"] = description
+            if cache_policy:
+                self.module_info[module_name]["functions"][name]["cache"] = cache_policy
 
             self.logger.info(f"Successfully registered {function_type.value} function: {name}")
 
@@ -149,15 +244,27 @@ class FunctionRegistry:
             return True
 
         except Exception as e:
+            if configured and self.functions.get(name) is previous:
+                # Do not leave a cache policy behind for a function that was not registered
+                self.result_cache.configure(name, previous["cache_policy"] if previous else None)
             return self._handle_error(f"Error registering function '{name}': {str(e)}")
 
+    def _declared_cache_policy(self, name: str) -> Optional[Dict]:
+        """Cache policy of a function declared in the loaded registry JSON, if any"""
+        for module_data in self.module_info.values():
+            func_data = module_data["functions"].get(name)
+            if func_data and func_data.get("cache"):
+                return dict(func_data["cache"])
+        return None
+
     def register_static(self,
                         name: str,
                         func: Callable,
                         parameter_schema: Optional[Dict] = None,
                         description: str = "",
                         override: bool = False,
-                        module_path: str = None) -> bool:
+                        module_path: str = None,
+                        cache_policy: Optional[Dict] = None) -> bool:
         """Register a static function that's part of the core application."""
         return self.register(
             name=name,
@@ -166,7 +273,8 @@ class FunctionRegistry:
             function_type=FunctionType.STATIC,
             description=description,
             override=override,
-            module_path=module_path
+            module_path=module_path,
+            cache_policy=cache_policy
         )
 
     def register_plugin(self,
@@ -176,7 +284,8 @@ class FunctionRegistry:
                         description: str = "",
                         plugin_name: str = "",
                         override: bool = False,
-                        module_path: str = None) -> bool:
+                        module_path: str = None,
+                        cache_policy: Optional[Dict] = None) -> bool:
         """Register a function from a plugin."""
         full_name = f"{plugin_name}.{name}" if plugin_name else name
         return self.register(
@@ -186,7 +295,8 @@ class FunctionRegistry:
             function_type=FunctionType.PLUGIN,
             description=description,
             override=override,
-            module_path=module_path
+            module_path=module_path,
+            cache_policy=cache_policy
         )
 
     def register_third_party(self,
@@ -196,7 +306,8 @@ class FunctionRegistry:
                              description: str = "",
                              app_name: str = "",
                              override: bool = False,
-                             module_path: str = None) -> bool:
+                             module_path: str = None,
+                             cache_policy: Optional[Dict] = None) -> bool:
         """Register a function from a third-party application."""
         full_name = f"{app_name}.{name}" if app_name else name
         return self.register(
@@ -206,7 +317,8 @@ class FunctionRegistry:
             function_type=FunctionType.THIRD_PARTY,
             description=description,
             override=override,
-            module_path=module_path
+            module_path=module_path,
+            cache_policy=cache_policy
         )
 
     def register_batch(self, functions: List[Dict]) -> Dict[str, bool]:
@@ -259,17 +371,42 @@ class FunctionRegistry:
             self._handle_error(f"Function '{function_name}' not found in registry.")
             return None
 
-        try:
-            # Update call statistics
-            self.functions[function_name]["call_count"] += 1
-            self.functions[function_name]["last_called"] = datetime.datetime.now().isoformat()
+        # Convert values such as "25" or "true" to the schema types, then validate
+        kwargs, coercions = self.functions[function_name]["coercer"](kwargs)
+        if coercions:
+            self.logger.info(f"Coerced arguments of '{function_name}': {'; '.join(coercions)}")
+
+        # Validate parameters with the validator compiled at registration time
+        valid, error_message = self.functions[function_name]["validator"](kwargs)
+        if not valid:
+            self._handle_error(f"Invalid parameters for function '{function_name}': {error_message}")
+            return None
+
+        # Update call statistics (calls answered from the result cache count too)
+        self.functions[function_name]["call_count"] += 1
+        self.functions[function_name]["last_called"] = datetime.datetime.now().isoformat()
 
-            # Record this API call
-            self._record_api_call(function_name, kwargs)
+        # Record this API call
+        self._record_api_call(function_name, kwargs)
 
+        # Serve read-only functions from the result cache while the entry is fresh
+        hit, cached_result, cache_generation = self.result_cache.lookup(function_name, kwargs)
+        if hit:
+            return cached_result
+
+        try:
             # Execute the function
             func = self.functions[function_name]["function"]
-            result = func(**kwargs)
+            try:
+                if self.sandbox_pool is not None and self.functions[function_name]["type"] in self.SANDBOXED_TYPES:
+                    result = self.sandbox_pool.call(self.functions[function_name]["module_path"], func.__name__, kwargs)
+                else:
+                    result = func(**kwargs)
+            finally:
+                # A (possibly partial) write makes dependent cached reads stale
+                self.result_cache.notify_executed(function_name)
+
+            self.result_cache.store(function_name, kwargs, result, cache_generation)
 
             # Save updated registry to JSON after successful execution
             self.save_to_json()
@@ -279,6 +416,46 @@ class FunctionRegistry:
             self._handle_error(f"Error executing function '{function_name}': {str(e)}")
             return None
 
+    def enable_sandbox(self, **pool_options) -> SandboxPool:
+        """
+        Run plugin and third-party functions in a pool of pre-forked worker processes.
+
+        The workers import the modules of all registered plugin/third-party functions
+        at start. Functions must be module-level so workers can resolve them by name.
+
+        Args:
+            **pool_options: SandboxPool arguments (num_workers, timeout, memory_limit_mb,
+                            max_calls_per_worker, ...)
+
+        Returns:
+            The started SandboxPool
+        """
+        self.disable_sandbox()
+        preload = [info["module_path"] for info in self.functions.values()
+                   if info["type"] in self.SANDBOXED_TYPES and str(info["module_path"]).endswith(".py")]
+        pool_options["preload"] = list(pool_options.get("preload", [])) + preload
+        self.sandbox_pool = SandboxPool(**pool_options)
+        self.logger.info(f"Sandbox enabled with {self.sandbox_pool.num_workers} workers")
+        return self.sandbox_pool
+
+    def disable_sandbox(self) -> None:
+        """Stop the sandbox workers and run all functions in process again"""
+        if self.sandbox_pool is not None:
+            self.sandbox_pool.close()
+            self.sandbox_pool = None
+
+    def get_cache_stats(self, function_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get result cache metrics (hits, misses, hit_rate, invalidations) per cached function.
+
+        Args:
+            function_name: Name of the function (None for all cached functions)
+
+        Returns:
+            Dictionary mapping function names to their cache metrics
+        """
+        return self.result_cache.get_stats(function_name)
+
     def _record_api_call(self, function_name: str, parameters: Dict[str, Any]) -> None:
         """
         Record an API call for tracking purposes.
@@ -327,7 +504,7 @@ class FunctionRegistry:
             Dictionary of function information
         """
         if function_type is None:
-            return {name: {k: v for k, v in info.items() if k != 'function'}
+            return {name: {k: v for k, v in info.items() if k not in self._RUNTIME_KEYS}
                     for name, info in self.functions.items()}
 
         # Handle string type for convenience
@@ -337,7 +514,7 @@ class FunctionRegistry:
             type_value = function_type.value
 
         return {
-            name: {k: v for k, v in info.items() if k != 'function'}
+            name: {k: v for k, v in info.items() if k not in self._RUNTIME_KEYS}
             for name, info in self.functions.items()
             if info["type"] == type_value
         }
@@ -365,8 +542,9 @@ class FunctionRegistry:
             if not self.module_info[module_name]["functions"]:
                 del self.module_info[module_name]
 
-        # Remove from functions dict
+        # Remove from functions dict and drop cached results
         del self.functions[function_name]
+        self.result_cache.remove(function_name)
 
         # Save updated registry to JSON
         self.save_to_json()
@@ -378,6 +556,10 @@ class FunctionRegistry:
         """
         Automatically generate a parameter schema from function signature.
 
+        Only annotated parameters get a "type" (Optional/Union annotations and a None
+        default become a list of types); unannotated ones accept any value. *args are
+        skipped, **kwargs are skipped and allow parameters beyond the signature.
+
         Args:
             func: The function to analyze
 
@@ -385,31 +567,34 @@ class FunctionRegistry:
             Parameter schema dictionary
         """
         sig = inspect.signature(func)
+        try:
+            # Resolves string annotations (from __future__ import annotations)
+            hints = typing.get_type_hints(func)
+        except Exception:
+            hints = {}
         schema = {
             "type": "object",
             "properties": {},
-            "required": []
+            "required": [],
+            "additionalProperties": False
         }
 
         for param_name, param in sig.parameters.items():
             # Skip self parameter for methods
-            if param_name == "self":
+            if param_name == "self" or param.kind == inspect.Parameter.VAR_POSITIONAL:
+                continue
+            if param.kind == inspect.Parameter.VAR_KEYWORD:
+                schema["additionalProperties"] = True
                 continue
 
-            param_type = "string"  # Default type
-            if param.annotation != inspect.Parameter.empty:
-                if param.annotation == int:
-                    param_type = "integer"
-                elif param.annotation == float:
-                    param_type = "number"
-                elif param.annotation == bool:
-                    param_type = "boolean"
-                elif param.annotation == list or param.annotation == List:
-                    param_type = "array"
-                elif param.annotation == dict or param.annotation == Dict:
-                    param_type = "object"
-
-            schema["properties"][param_name] = {"type": param_type}
+            param_types = _annotation_schema_types(hints.get(param_name, param.annotation))
+            if param_types is not None and param.default is None and "null" not in param_types:
+                # def f(x: int = None) accepts its own default
+                param_types.append("null")
+            if param_types is None:
+                schema["properties"][param_name] = {}
+            else:
+                schema["properties"][param_name] = {"type": param_types[0] if len(param_types) == 1 else param_types}
 
             # Add to required parameters if no default value
             if param.default == inspect.Parameter.empty:
@@ -463,6 +648,7 @@ class FunctionRegistry:
         """
         Load registry information from a JSON file.
         Note: This only loads metadata, not the actual function implementations.
+        "cache" entries apply when the functions are registered without a cache policy.
 
         Args:
             filepath: Path to the JSON file
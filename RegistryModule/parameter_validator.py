@@ -0,0 +1,135 @@
+# parameter_validator.py
+"""
+Compiled parameter validators shared by both function registries.
+
+RegistryModule/function_registry.py describes parameters with a JSON schema,
+while ChatBots/FunctionCalling_router.py reads the registry.json parameter
+lists ({"name": ..., "type": "float"}). Both are compiled here once, when a
+function is registered or the registry is loaded, into a closure that takes
+the call's parameter dict and returns (success, error_message).
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Python type names used in registry.json / RegistrationTemplate.json
+TYPE_MAPPING = {
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'None': type(None)
+}
+
+# JSON schema types used by FunctionRegistry.register
+JSON_SCHEMA_TYPE_MAPPING = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+    "null": type(None)
+}
+
+_VALID = (True, None)
+
+
+def _as_tuple(python_type: Any) -> Tuple[type, ...]:
+    return python_type if isinstance(python_type, tuple) else (python_type,)
+
+Validator = Callable[[Dict[str, Any]], Tuple[bool, Optional[str]]]
+
+
+def _build_validator(checks: List[Tuple[str, Any, str]],
+                     names: Iterable[str],
+                     required: Iterable[str],
+                     allow_extra: bool) -> Validator:
+    """Close over precomputed name sets and (name, python_type, type_name) checks"""
+    names = frozenset(names)
+    required = frozenset(required)
+    checks = tuple(checks)
+
+    def validate(params_dict: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        provided = params_dict.keys()
+
+        if not provided >= required:
+            missing = sorted(required - provided)
+            return (False, f"Missing required parameters: {', '.join(missing)}")
+
+        if not allow_extra and not provided <= names:
+            unexpected = sorted(provided - names)
+            return (False, f"Unexpected parameters: {', '.join(unexpected)}")
+
+        for param_name, expected_type, type_name in checks:
+            if param_name in params_dict:
+                value = params_dict[param_name]
+                if not isinstance(value, expected_type):
+                    if type_name == 'None':
+                        return (False, f"Parameter '{param_name}' should be None, got {type(value).__name__}")
+                    return (False, f"Parameter '{param_name}' should be {type_name}, got {type(value).__name__}")
+
+        return _VALID
+
+    return validate
+
+
+def compile_validator(parameters: List[Dict[str, Any]],
+                      required: Optional[Iterable[str]] = None,
+                      allow_extra: bool = False) -> Validator:
+    """
+    Compile a registry.json parameter list into a validator.
+
+    Args:
+        parameters: List of {"name": ..., "type": ...} entries
+        required: Names of required parameters (all parameters if None)
+        allow_extra: Whether parameters not in the list are accepted
+
+    Returns:
+        Callable taking the parameter dict and returning (success, error_message)
+    """
+    checks = []
+    for param in parameters:
+        type_name = param.get('type')
+        # Unknown types are not validated
+        if type_name in TYPE_MAPPING:
+            checks.append((param['name'], TYPE_MAPPING[type_name], type_name))
+
+    names = [param['name'] for param in parameters]
+    return _build_validator(checks, names, names if required is None else required, allow_extra)
+
+
+def compile_schema_validator(schema: Dict[str, Any]) -> Validator:
+    """
+    Compile a JSON parameter schema (as produced by
+    FunctionRegistry._generate_parameter_schema) into a validator.
+
+    Args:
+        schema: JSON schema with "properties", "required" and optionally "additionalProperties";
+                a property "type" may be a list of types (e.g. ["integer", "null"])
+
+    Returns:
+        Callable taking the parameter dict and returning (success, error_message)
+    """
+    properties = schema.get("properties", {})
+    checks = []
+    for param_name, param_details in properties.items():
+        type_names = param_details.get("type")
+        if isinstance(type_names, str):
+            type_names = [type_names]
+        # Properties without a type, or with an unknown one, accept any value
+        if type_names and all(type_name in JSON_SCHEMA_TYPE_MAPPING for type_name in type_names):
+            expected_types = tuple(
+                python_type for type_name in type_names
+                for python_type in _as_tuple(JSON_SCHEMA_TYPE_MAPPING[type_name]))
+            checks.append((param_name, expected_types,
+                           ' or '.join('None' if type_name == "null" else type_name for type_name in type_names)))
+
+    return _build_validator(
+        checks,
+        properties.keys(),
+        schema.get("required", []),
+        schema.get("additionalProperties", True)
+    )
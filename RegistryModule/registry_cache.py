@@ -0,0 +1,118 @@
+# registry_cache.py
+"""
+Process-wide cache of parsed registry JSON files.
+
+Every function_calling_interface (and the IntentRouter Router) used to parse
+registry.json again on construction. The cache parses each file once and hands
+the same snapshot to all callers until the file's modification time or size
+changes. Derived structures (function index, search corpus, name sets) are
+built once per snapshot through RegistrySnapshot.get_index.
+
+Snapshots are shared: callers must treat snapshot.data and built indexes as read-only.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Tuple, Union
+
+
+class RegistrySnapshot:
+    """Parsed content of one registry file version plus lazily built indexes"""
+
+    def __init__(self, path: str, signature: Tuple[int, int], data: Dict[str, Any]):
+        self.path = path
+        self.signature = signature  # (mtime_ns, size) of the parsed file
+        self.data = data
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get_index(self, name: str, builder: Callable[[], Any]) -> Any:
+        """
+        Get a derived structure, building it on first request for this snapshot.
+
+        Args:
+            name: Identifier of the index
+            builder: Callable producing the index from the snapshot data
+
+        Returns:
+            The built (shared) index
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = builder()
+                    self._indexes[name] = index
+        return index
+
+    @property
+    def function_names(self) -> FrozenSet[str]:
+        """All function names, both bare and as module_name.function_name"""
+        return self.get_index("function_names", self._build_function_names)
+
+    def _build_function_names(self) -> FrozenSet[str]:
+        names = set()
+        for module in self.data.get("modules", []):
+            module_name = module.get("module_name", "")
+            for function in module.get("functions", []):
+                function_name = function.get("function_name")
+                if function_name:
+                    names.add(function_name)
+                    names.add(f"{module_name}.{function_name}")
+        return frozenset(names)
+
+
+class RegistryCache:
+    """Parse-once registry loader revalidated by file mtime and size"""
+
+    def __init__(self):
+        self._snapshots = {}  # resolved path -> RegistrySnapshot
+        self._lock = threading.Lock()
+        self.parse_count = 0  # Number of times a file was actually parsed
+
+    def load(self, path: Union[str, Path]) -> RegistrySnapshot:
+        """
+        Get the snapshot for a registry file, parsing it only if it changed.
+
+        Args:
+            path: Path to the registry JSON file
+
+        Returns:
+            RegistrySnapshot for the current file content
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        path = os.path.abspath(str(path))
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        snapshot = self._snapshots.get(path)
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            if snapshot is not None and snapshot.signature == signature:
+                return snapshot
+
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.parse_count += 1
+
+            snapshot = RegistrySnapshot(path, signature, data)
+            self._snapshots[path] = snapshot
+            return snapshot
+
+    def clear(self) -> None:
+        """Drop all cached snapshots"""
+        with self._lock:
+            self._snapshots.clear()
+
+
+# Shared by every registry consumer in the process
+shared_registry_cache = RegistryCache()
@@ -0,0 +1,247 @@
+# result_cache.py
+"""
+TTL result cache for read-only registry functions.
+
+A function declares its cache policy when it is registered, or through a
+"cache" entry in registry.json that FunctionRegistry.register uses when no
+policy is passed:
+
+    {
+        "ttl": 5.0,                                  # seconds a result stays valid
+        "key_params": ["time_period"],               # parameters forming the cache key (all if omitted)
+        "invalidated_by": ["set_driving_mode"]       # write functions that drop cached results
+    }
+
+Only functions with a policy are cached. Hit, miss and invalidation counters
+are kept per function so the effectiveness of each policy can be checked.
+
+Results are deep-copied when stored and when served, so a caller mutating the
+dictionary it got back cannot change what the next caller receives. Every
+invalidation bumps a per-function generation; a result computed by a call that
+looked up the cache before the invalidation is not stored, so a read racing a
+write cannot put the pre-write value back into the cache.
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ResultCache:
+    """Per-function TTL cache with write-triggered invalidation and hit-rate metrics"""
+
+    def __init__(self, max_entries: int = 128, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries: Maximum cached results per function (least recently used are evicted)
+            clock: Monotonic time source, replaceable for testing
+        """
+        self.max_entries = max_entries
+        self.clock = clock
+        self._policies = {}      # function name -> normalized policy
+        self._entries = {}       # function name -> OrderedDict(key -> (expires_at, result))
+        self._dependents = {}    # write function name -> set of cached function names
+        self._stats = {}         # function name -> counters
+        self._generations = {}   # function name -> invalidation count, checked by store()
+        self._lock = threading.Lock()
+
+    def configure(self, function_name: str, policy: Optional[Dict[str, Any]]) -> None:
+        """
+        Set (or clear, when policy is None) the cache policy of a function.
+
+        Args:
+            function_name: Name of the read-only function
+            policy: Dictionary with "ttl", optional "key_params" and optional "invalidated_by"
+        """
+        with self._lock:
+            self._remove_locked(function_name)
+            if not policy:
+                return
+
+            ttl = float(policy.get("ttl", 0))
+            if ttl <= 0:
+                raise ValueError(f"Cache ttl for '{function_name}' must be a positive number of seconds")
+
+            key_params = policy.get("key_params")
+            self._policies[function_name] = {
+                "ttl": ttl,
+                "key_params": tuple(key_params) if key_params is not None else None,
+                "invalidated_by": tuple(policy.get("invalidated_by", []))
+            }
+            self._entries[function_name] = OrderedDict()
+            self._stats[function_name] = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0,
+                                          "stale_drops": 0}
+            for writer in self._policies[function_name]["invalidated_by"]:
+                self._dependents.setdefault(writer, set()).add(function_name)
+
+    def remove(self, function_name: str) -> None:
+        """Drop the policy, cached results and metrics of a function"""
+        with self._lock:
+            self._remove_locked(function_name)
+
+    def _remove_locked(self, function_name: str) -> None:
+        # Calls that looked up the old policy must not store into a new one
+        self._generations[function_name] = self._generations.get(function_name, 0) + 1
+        policy = self._policies.pop(function_name, None)
+        self._entries.pop(function_name, None)
+        self._stats.pop(function_name, None)
+        if policy:
+            for writer in policy["invalidated_by"]:
+                readers = self._dependents.get(writer)
+                if readers:
+                    readers.discard(function_name)
+                    if not readers:
+                        del self._dependents[writer]
+
+    def is_cacheable(self, function_name: str) -> bool:
+        """Check whether a function has a cache policy"""
+        return function_name in self._policies
+
+    def _make_key(self, function_name: str, parameters: Dict[str, Any]) -> Hashable:
+        key_params = self._policies[function_name]["key_params"]
+        if key_params is None:
+            items = tuple(sorted(parameters.items()))
+        else:
+            items = tuple((name, parameters.get(name)) for name in key_params)
+        try:
+            hash(items)
+            return items
+        except TypeError:
+            # Lists/dicts as parameter values
+            return json.dumps(items, sort_keys=True, default=str)
+
+    def lookup(self, function_name: str, parameters: Dict[str, Any]) -> Tuple[bool, Any, int]:
+        """
+        Look up a cached result.
+
+        Args:
+            function_name: Name of the function
+            parameters: Parameters of the call
+
+        Returns:
+            tuple: (hit, result, generation); result is a copy of the cached one, None on a
+                   miss; pass generation to store() with the result of the call
+        """
+        if function_name not in self._policies:
+            return (False, None, 0)
+
+        with self._lock:
+            entries = self._entries[function_name]
+            stats = self._stats[function_name]
+            generation = self._generations.get(function_name, 0)
+            key = self._make_key(function_name, parameters)
+            entry = entries.get(key)
+
+            if entry is not None:
+                if entry[0] > self.clock():
+                    entries.move_to_end(key)
+                    stats["hits"] += 1
+                    result = entry[1]
+                else:
+                    del entries[key]
+                    entry = None
+
+            if entry is None:
+                stats["misses"] += 1
+                return (False, None, generation)
+        return (True, copy.deepcopy(result), generation)
+
+    def store(self, function_name: str, parameters: Dict[str, Any], result: Any,
+              generation: Optional[int] = None) -> bool:
+        """
+        Store the result of a call to a cacheable function.
+
+        Args:
+            function_name: Name of the function
+            parameters: Parameters of the call
+            result: Result of the call (a copy is stored)
+            generation: Generation returned by the lookup() made before the call; the result
+                        is dropped when the function was invalidated since then
+
+        Returns:
+            bool: Whether the result was stored
+        """
+        if function_name not in self._policies:
+            return False
+        try:
+            result = copy.deepcopy(result)
+        except Exception:
+            # Results that cannot be copied are not cached
+            return False
+
+        with self._lock:
+            if function_name not in self._policies:
+                return False
+            if generation is not None and generation != self._generations.get(function_name, 0):
+                self._stats[function_name]["stale_drops"] += 1
+                return False
+            entries = self._entries[function_name]
+            key = self._make_key(function_name, parameters)
+            entries[key] = (self.clock() + self._policies[function_name]["ttl"], result)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._stats[function_name]["evictions"] += 1
+            return True
+
+    def invalidate(self, function_name: str) -> None:
+        """Drop all cached results of a function"""
+        with self._lock:
+            self._invalidate_locked(function_name)
+
+    def _invalidate_locked(self, function_name: str) -> None:
+        # Bumped even when nothing is cached: a call in flight must not store its result
+        self._generations[function_name] = self._generations.get(function_name, 0) + 1
+        entries = self._entries.get(function_name)
+        if entries:
+            entries.clear()
+            self._stats[function_name]["invalidations"] += 1
+
+    def notify_executed(self, function_name: str) -> List[str]:
+        """
+        Invalidate every cached function that declares the executed function in "invalidated_by".
+
+        Args:
+            function_name: Name of the function that was just executed
+
+        Returns:
+            List of function names whose cached results were dropped
+        """
+        readers = self._dependents.get(function_name)
+        if not readers:
+            return []
+
+        with self._lock:
+            for reader in readers:
+                self._invalidate_locked(reader)
+            return sorted(readers)
+
+    def get_stats(self, function_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-function cache metrics.
+
+        Args:
+            function_name: Restrict the report to one function (None for all)
+
+        Returns:
+            Dictionary mapping function names to hits, misses, hit_rate, invalidations,
+            evictions, stale_drops (results computed before an invalidation), entries and ttl
+        """
+        with self._lock:
+            names = [function_name] if function_name is not None else list(self._policies)
+            report = {}
+            for name in names:
+                if name not in self._policies:
+                    continue
+                stats = self._stats[name]
+                lookups = stats["hits"] + stats["misses"]
+                report[name] = dict(
+                    stats,
+                    hit_rate=stats["hits"] / lookups if lookups else 0.0,
+                    entries=len(self._entries[name]),
+                    ttl=self._policies[name]["ttl"]
+                )
+            return report
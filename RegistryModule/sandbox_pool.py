@@ -0,0 +1,368 @@
+# sandbox_pool.py
+"""
+Pre-forked worker pool isolating plugin and third-party functions.
+
+Plugin code imported with importlib runs inside the assistant process, so a
+crash (segfault, os._exit) or an endless loop stops the whole voice pipeline.
+Starting a process per call would isolate it but costs tens of milliseconds.
+
+SandboxPool keeps a few warm worker processes that have already imported the
+plugin modules. A call is sent to an idle worker over a multiprocessing pipe
+(pickle, highest protocol) and the parent waits on the pipe with a timeout:
+
+- a call that exceeds its timeout kills the worker, which is replaced in the
+  background so the failed call returns right away
+- a worker that dies while running a call is replaced
+- the address space every worker may add on top of what it inherits from the
+  parent (a forked assistant process that imported torch already maps
+  gigabytes) is capped (RLIMIT_AS) where supported
+- a worker is recycled after max_calls_per_worker calls to bound leaks
+
+Functions are identified by (module_path, function_name) so that workers
+resolve them on their side; results must be picklable.
+"""
+
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    # Not available on Windows: memory limits are not enforced there
+    RESOURCE_AVAILABLE = False
+
+
+class SandboxError(Exception):
+    """Base class for errors raised when running a function in a sandbox worker"""
+
+
+class SandboxTimeoutError(SandboxError):
+    """The function did not return within the timeout; its worker was killed"""
+
+
+class SandboxCrashError(SandboxError):
+    """The worker process died while running the function"""
+
+
+class SandboxExecutionError(SandboxError):
+    """The function raised an exception inside the worker"""
+
+
+def _load_module(module_path: str, modules: Dict[str, Any]) -> Any:
+    """Import a module from a .py file path or a dotted module name, once per worker"""
+    module = modules.get(module_path)
+    if module is None:
+        if module_path.endswith(".py"):
+            module_name = f"sandbox_{os.path.splitext(os.path.basename(module_path))[0]}_{abs(hash(module_path))}"
+            spec = importlib.util.spec_from_file_location(module_name, module_path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"Cannot load module from {module_path}")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(module_path)
+        modules[module_path] = module
+    return module
+
+
+def _address_space_bytes() -> int:
+    """Virtual memory size of the current process (VmSize), 0 where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _worker_main(conn, preload: List[str], memory_limit_mb: Optional[int]) -> None:
+    """
+    Worker process loop: import the preloaded modules, then serve calls until the pipe closes.
+
+    Messages are (module_path, function_name, kwargs); replies are (True, result)
+    or (False, "ExceptionType: message").
+    """
+    if memory_limit_mb and RESOURCE_AVAILABLE:
+        # On top of the address space inherited from the parent, so the budget means the
+        # same whether or not the parent imported torch before forking
+        limit = _address_space_bytes() + int(memory_limit_mb) * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+    modules = {}
+    preload_errors = {}
+    for module_path in preload:
+        try:
+            _load_module(module_path, modules)
+        except Exception as e:
+            preload_errors[module_path] = f"{type(e).__name__}: {e}"
+    conn.send(preload_errors)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        module_path, function_name, kwargs = message
+        try:
+            func = getattr(_load_module(module_path, modules), function_name)
+            reply = (True, func(**kwargs))
+        except BaseException as e:
+            # MemoryError and SystemExit included: the worker stays alive for the next call
+            reply = (False, f"{type(e).__name__}: {e}")
+
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Unpicklable result
+            conn.send((False, f"{type(e).__name__}: result could not be returned: {e}"))
+
+
+class _Worker:
+    """Parent-side handle of one worker process"""
+
+    def __init__(self, context, preload: List[str], memory_limit_mb: Optional[int], start_timeout: float):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, preload, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+        if not self.conn.poll(start_timeout):
+            self.kill()
+            raise SandboxError(f"Sandbox worker did not start within {start_timeout}s")
+        self.preload_errors = self.conn.recv()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def stop(self) -> None:
+        """Ask the worker to exit, killing it if it does not"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """Pool of warm worker processes running plugin/third-party functions with timeouts and memory limits"""
+
+    def __init__(self,
+                 num_workers: int = 2,
+                 preload: Optional[Iterable[str]] = None,
+                 timeout: float = 5.0,
+                 memory_limit_mb: Optional[int] = 512,
+                 max_calls_per_worker: int = 1000,
+                 start_method: Optional[str] = None,
+                 start_timeout: float = 30.0,
+                 acquire_timeout: Optional[float] = None):
+        """
+        Args:
+            num_workers: Number of worker processes kept warm
+            preload: Module paths (.py files or dotted names) imported by every worker at start
+            timeout: Default seconds a call may take before its worker is killed
+            memory_limit_mb: Address space a worker may add on top of what it has when it
+                             starts, including the preloaded modules (None for no limit)
+            max_calls_per_worker: Calls served by a worker before it is replaced (0 to never recycle)
+            start_method: multiprocessing start method ("fork" where available by default)
+            start_timeout: Seconds a new worker may take to import the preloaded modules
+            acquire_timeout: Seconds a call waits for an idle worker (timeout + start_timeout
+                             if None: a busy worker finishes or is replaced within that)
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+
+        if start_method is None:
+            start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        self.num_workers = num_workers
+        self.preload = list(dict.fromkeys(preload or []))
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_calls_per_worker = max_calls_per_worker
+        self.start_timeout = start_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._missing = 0   # Workers whose replacement failed to start
+        self._stats = {"calls": 0, "errors": 0, "timeouts": 0, "crashes": 0, "recycled": 0, "started": 0,
+                       "start_failures": 0}
+
+        for _ in range(num_workers):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self) -> Optional[_Worker]:
+        """Start a worker; None if the pool was closed meanwhile"""
+        worker = _Worker(self._context, self.preload, self.memory_limit_mb, self.start_timeout)
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._workers.add(worker)
+                self._stats["started"] += 1
+        if closed:
+            worker.stop()
+            return None
+        return worker
+
+    def _replace_worker(self) -> None:
+        """Start a replacement worker and make it idle (runs in a background thread)"""
+        try:
+            worker = self._start_worker()
+        except Exception:
+            # Started again by the next call that finds no idle worker
+            with self._lock:
+                self._stats["start_failures"] += 1
+                self._missing += 1
+            return
+        if worker is not None:
+            self._idle.put(worker)
+
+    def _retire(self, worker: _Worker, killed: bool) -> None:
+        """Stop a worker and start a fresh one in its place without waiting for it"""
+        with self._lock:
+            self._workers.discard(worker)
+        if killed:
+            worker.kill()
+        else:
+            worker.stop()
+        if not self._closed:
+            threading.Thread(target=self._replace_worker, name="sandbox-worker-start", daemon=True).start()
+
+    def call(self, module_path: str, function_name: str, kwargs: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None) -> Any:
+        """
+        Run a function in a worker process.
+
+        Args:
+            module_path: Path of the module file (or dotted module name) defining the function
+            function_name: Name of the function in that module
+            kwargs: Keyword arguments of the call (must be picklable)
+            timeout: Seconds before the worker is killed (pool default if None)
+
+        Returns:
+            The value returned by the function
+
+        Raises:
+            SandboxError: The arguments could not be pickled
+            SandboxTimeoutError: The call took longer than the timeout, or no worker became
+                                 idle within acquire_timeout
+            SandboxCrashError: The worker process died during the call
+            SandboxExecutionError: The function raised an exception
+        """
+        if self._closed:
+            raise SandboxError("Sandbox pool is closed")
+        timeout = self.timeout if timeout is None else timeout
+
+        # Pickled before a worker is taken, so unpicklable arguments cannot leak one
+        try:
+            message = pickle.dumps((module_path, function_name, kwargs or {}), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            raise SandboxError(f"Arguments of '{function_name}' could not be pickled: {type(e).__name__}: {e}")
+
+        acquire_timeout = self.timeout + self.start_timeout if self.acquire_timeout is None else self.acquire_timeout
+        with self._lock:
+            restart = self._missing > 0 and self._idle.empty()
+            if restart:
+                self._missing -= 1
+        if restart:
+            self._replace_worker()
+        try:
+            worker = self._idle.get(timeout=acquire_timeout)
+        except queue.Empty:
+            raise SandboxTimeoutError(f"No sandbox worker became idle within {acquire_timeout}s")
+        with self._lock:
+            self._stats["calls"] += 1
+
+        try:
+            worker.conn.send_bytes(message)
+            finished = worker.conn.poll(timeout)
+            if finished:
+                ok, value = worker.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            with self._lock:
+                self._stats["crashes"] += 1
+            worker.process.join(1.0)
+            exit_code = worker.process.exitcode
+            self._retire(worker, killed=True)
+            raise SandboxCrashError(f"Sandbox worker running '{function_name}' died (exit code {exit_code})")
+        except BaseException:
+            # Anything else (e.g. an unpicklable reply, KeyboardInterrupt) leaves the pipe in an
+            # unknown state: replace the worker rather than losing it
+            self._retire(worker, killed=True)
+            raise
+        if not finished:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            self._retire(worker, killed=True)
+            raise SandboxTimeoutError(f"'{function_name}' did not finish within {timeout}s")
+
+        worker.calls += 1
+        if self.max_calls_per_worker and worker.calls >= self.max_calls_per_worker:
+            with self._lock:
+                self._stats["recycled"] += 1
+            self._retire(worker, killed=False)
+        else:
+            self._idle.put(worker)
+
+        if not ok:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise SandboxExecutionError(value)
+        return value
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get pool counters.
+
+        Returns:
+            Dictionary with calls, errors, timeouts, crashes, recycled, started, start_failures
+            and workers
+        """
+        with self._lock:
+            return dict(self._stats, workers=len(self._workers))
+
+    def worker_pids(self) -> List[int]:
+        """Process ids of the current workers"""
+        with self._lock:
+            return sorted(worker.pid for worker in self._workers)
+
+    def close(self) -> None:
+        """Stop all workers"""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
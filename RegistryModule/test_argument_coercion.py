@@ -0,0 +1,117 @@
+# test_argument_coercion.py
+
+import unittest
+from argument_coercion import compile_coercer, compile_schema_coercer, parse_number
+from parameter_validator import compile_validator
+
+
+class TestParseNumber(unittest.TestCase):
+    """Unit tests for Arabic and Chinese number parsing"""
+
+    def test_arabic_numbers(self):
+        self.assertEqual(parse_number("25"), 25)
+        self.assertEqual(parse_number(" -3.5 "), -3.5)
+        self.assertEqual(parse_number("22.5℃"), 22.5)
+        self.assertEqual(parse_number("50%"), 50)
+
+    def test_chinese_numerals(self):
+        self.assertEqual(parse_number("二十五度"), 25)
+        self.assertEqual(parse_number("十五"), 15)
+        self.assertEqual(parse_number("两百零五"), 205)
+        self.assertEqual(parse_number("一万二千"), 12000)
+        self.assertEqual(parse_number("二十二点五"), 22.5)
+        self.assertEqual(parse_number("负三"), -3)
+        self.assertEqual(parse_number("三档"), 3)
+
+    def test_not_numbers(self):
+        for text in ["", "abc", "nan", "inf", "度", "二十五个人"]:
+            self.assertIsNone(parse_number(text), text)
+
+
+class TestCompileCoercer(unittest.TestCase):
+    """Unit tests for coercers compiled from registry.json parameter lists"""
+
+    def setUp(self):
+        self.parameters = [
+            {"name": "enable", "type": "bool"},
+            {"name": "target_temp", "type": "float"},
+            {"name": "departure_time", "type": "str"},
+            {"name": "radius_km", "type": "int"},
+            {"name": "waypoints", "type": "list"},
+            {"name": "filter_by", "type": "dict"}
+        ]
+        self.coerce = compile_coercer(self.parameters)
+        self.validate = compile_validator(self.parameters)
+
+    def test_llm_style_arguments_become_valid(self):
+        params = {"enable": "true", "target_temp": "二十五度", "departure_time": 7,
+                  "radius_km": "10", "waypoints": '["加油站"]', "filter_by": '{"fast": true}'}
+        coerced, changes = self.coerce(params)
+        self.assertEqual(coerced, {"enable": True, "target_temp": 25.0, "departure_time": "7",
+                                   "radius_km": 10, "waypoints": ["加油站"], "filter_by": {"fast": True}})
+        self.assertEqual(len(changes), 6)
+        self.assertIn("target_temp: '二十五度' -> 25.0", changes)
+        self.assertEqual(self.validate(coerced), (True, None))
+        # The caller's dictionary is not modified
+        self.assertEqual(params["enable"], "true")
+
+    def test_valid_arguments_unchanged(self):
+        params = {"enable": False, "target_temp": 22.5, "radius_km": 5}
+        coerced, changes = self.coerce(params)
+        self.assertIs(coerced, params)
+        self.assertEqual(changes, [])
+
+    def test_unsafe_values_left_for_validator(self):
+        params = {"radius_km": "10.5", "enable": "maybe", "waypoints": '{"a": 1}', "target_temp": True}
+        coerced, changes = self.coerce(params)
+        self.assertEqual(coerced, params)
+        self.assertEqual(changes, [])
+
+    def test_int_to_float(self):
+        coerced, _ = self.coerce({"target_temp": 25})
+        self.assertIsInstance(coerced["target_temp"], float)
+
+
+class TestCompileSchemaCoercer(unittest.TestCase):
+    """Unit tests for coercers compiled from JSON parameter schemas"""
+
+    def test_schema_types(self):
+        coerce = compile_schema_coercer({
+            "type": "object",
+            "properties": {
+                "height": {"type": "number"},
+                "count": {"type": "integer"},
+                "confirm": {"type": "boolean"}
+            }
+        })
+        coerced, changes = coerce({"height": "七十五", "count": "3", "confirm": "关闭"})
+        self.assertEqual(coerced, {"height": 75, "count": 3, "confirm": False})
+        self.assertEqual(len(changes), 3)
+
+    def test_only_declared_types_are_coerced(self):
+        coerce = compile_schema_coercer({
+            "type": "object",
+            "properties": {
+                "x": {},
+                "n": {"type": ["integer", "null"]},
+                "label": {"type": ["integer", "string"]}
+            }
+        })
+        params = {"x": 3, "n": 3, "label": 2}
+        self.assertEqual(coerce(params), (params, []))
+        coerced, changes = coerce({"x": "3", "n": "3", "label": 2.5})
+        # Untyped values stay as passed and unions never turn numbers into strings
+        self.assertEqual(coerced, {"x": "3", "n": 3, "label": 2.5})
+        self.assertEqual(changes, ["n: '3' -> 3"])
+        self.assertEqual(coerce({"n": "null"})[0], {"n": None})
+
+    def test_registry_union_and_untyped_names(self):
+        coerce = compile_coercer([{"name": "n", "type": "Optional[int]"}, {"name": "label", "type": "Union[int, str]"},
+                                  {"name": "x", "type": "Any"}])
+        coerced, _ = coerce({"n": "二十", "label": "7", "x": 3})
+        self.assertEqual(coerced, {"n": 20, "label": "7", "x": 3})
+        self.assertEqual(coerce({"n": 3, "label": 1.5})[1], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ import os
 import json
 import tempfile
 import shutil
+from typing import Optional, Union
 from unittest.mock import patch, MagicMock
 from function_registry import FunctionRegistry, FunctionType
 
@@ -138,6 +139,234 @@ class TestFunctionRegistry(unittest.TestCase):
         result = self.registry.execute("nonexistent", param1="test")
         self.assertIsNone(result)
 
+    def test_execute_validates_parameters(self):
+        """Test execute rejects calls that do not match the compiled schema"""
+        self.registry.register_static("validate_test", self.test_static_func)
+
+        # Missing required parameter
+        self.assertIsNone(self.registry.execute("validate_test", param2=5))
+        # Wrong type for an integer parameter
+        self.assertIsNone(self.registry.execute("validate_test", param1="hello", param2="five"))
+
+        # Rejected calls are not counted
+        self.assertEqual(self.registry.functions["validate_test"]["call_count"], 0)
+
+        # Optional parameter may be omitted
+        self.assertEqual(self.registry.execute("validate_test", param1="hello"), "Static: hello - 10")
+
+    def test_execute_accepts_untyped_and_variadic_parameters(self):
+        """Test the generated schema only constrains what the signature declares"""
+        def with_kwargs(**kw):
+            return kw
+
+        def with_args(first, *args, **kwargs):
+            return first, args, kwargs
+
+        def untyped(items, x=None):
+            return items, x
+
+        def optional(n: Optional[int] = 3, label: Union[int, str] = "a", limit: int = None):
+            return n, label, limit
+
+        for name, func in [("with_kwargs", with_kwargs), ("with_args", with_args), ("untyped", untyped),
+                           ("optional", optional)]:
+            self.registry.register_static(name, func)
+
+        # **kwargs are not required parameters and allow any keyword
+        self.assertEqual(self.registry.execute("with_kwargs"), {})
+        self.assertEqual(self.registry.execute("with_kwargs", a=1, b="x"), {"a": 1, "b": "x"})
+        self.assertEqual(self.registry.execute("with_args", first=1, extra=2), (1, (), {"extra": 2}))
+        self.assertNotIn("args", self.registry.functions["with_args"]["parameters"]["required"])
+
+        # Unannotated parameters accept any value and keep None defaults
+        self.assertEqual(self.registry.execute("untyped", items=[1, 2]), ([1, 2], None))
+        self.assertEqual(self.registry.execute("untyped", items={"a": 1}, x=None), ({"a": 1}, None))
+        self.assertEqual(self.registry.execute("untyped", items=3, x=[1]), (3, [1]))
+
+        # Optional/Union annotations and None defaults accept each of their types
+        self.assertEqual(self.registry.execute("optional", n=None, label=2, limit=None), (None, 2, None))
+        self.assertEqual(self.registry.execute("optional", n=5, label="b", limit=1), (5, "b", 1))
+        self.assertIsNone(self.registry.execute("optional", n=[1]))
+        self.assertEqual(self.registry.functions["optional"]["parameters"]["properties"]["n"]["type"],
+                         ["integer", "null"])
+
+        # Without **kwargs, unknown parameters are rejected before the call
+        self.assertIsNone(self.registry.execute("untyped", items=1, unknown=2))
+
+        # registry.json keeps readable types for untyped and union parameters
+        params = self.registry.module_info["test_function_registry"]["functions"]["optional"]["parameters"]
+        self.assertEqual([p["type"] for p in params], ["Optional[int]", "Union[int, str]", "Optional[int]"])
+        params = self.registry.module_info["test_function_registry"]["functions"]["untyped"]["parameters"]
+        self.assertEqual([p["type"] for p in params], ["Any", "Any"])
+
+    def test_execute_coerces_arguments(self):
+        """Test that string arguments are converted to the schema types before validation"""
+        self.registry.register_static("test_static_func", self.test_static_func)
+        self.assertEqual(self.registry.execute("test_static_func", param1="hello", param2="二十"),
+                         "Static: hello - 20")
+        self.assertIsNone(self.registry.execute("test_static_func", param1="hello", param2="many"))
+
+    def test_execute_keeps_values_of_undeclared_types(self):
+        """Test that only parameters with a declared type are coerced"""
+        def echo(x):
+            return x
+
+        def count(n: Optional[int] = 3):
+            return n
+
+        self.registry.register_static("echo", echo)
+        self.registry.register_static("count", count)
+        self.assertEqual(self.registry.execute("echo", x=3), 3)
+        self.assertEqual(self.registry.execute("count", n=3), 3)
+        self.assertEqual(self.registry.execute("count"), 3)
+        self.assertEqual(self.registry.execute("count", n="5"), 5)
+
+    def test_list_functions_excludes_runtime_entries(self):
+        """Test listed functions do not expose callables or compiled validators"""
+        self.registry.register_static("runtime_test", self.test_static_func)
+
+        info = self.registry.list_functions()["runtime_test"]
+        self.assertNotIn("function", info)
+        self.assertNotIn("validator", info)
+        self.assertNotIn("coercer", info)
+
+    def test_cached_function_results(self):
+        """Test read-only functions with a cache policy are served from the cache"""
+        backend_calls = []
+
+        def get_driving_statistics(time_period: str):
+            backend_calls.append(time_period)
+            return {"period": time_period, "distance_km": len(backend_calls)}
+
+        def set_driving_mode(mode: str):
+            return {"mode": mode}
+
+        now = [1000.0]
+        self.registry.result_cache.clock = lambda: now[0]
+        self.registry.register_static("set_driving_mode", set_driving_mode)
+        self.registry.register_static(
+            "get_driving_statistics",
+            get_driving_statistics,
+            cache_policy={"ttl": 30, "key_params": ["time_period"], "invalidated_by": ["set_driving_mode"]}
+        )
+
+        first = self.registry.execute("get_driving_statistics", time_period="today")
+        second = self.registry.execute("get_driving_statistics", time_period="today")
+        self.assertEqual(first, second)
+        self.assertEqual(backend_calls, ["today"])
+
+        # Different key parameter misses
+        self.registry.execute("get_driving_statistics", time_period="week")
+        self.assertEqual(len(backend_calls), 2)
+
+        # Related write function invalidates cached results
+        self.registry.execute("set_driving_mode", mode="sport")
+        self.registry.execute("get_driving_statistics", time_period="today")
+        self.assertEqual(len(backend_calls), 3)
+
+        # Expired entries go back to the backend
+        now[0] += 31
+        self.registry.execute("get_driving_statistics", time_period="today")
+        self.assertEqual(len(backend_calls), 4)
+
+        stats = self.registry.get_cache_stats("get_driving_statistics")["get_driving_statistics"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["invalidations"], 1)
+        self.assertAlmostEqual(stats["hit_rate"], 0.2)
+        # Cache hits are counted as calls
+        self.assertEqual(self.registry.get_function_info("get_driving_statistics")["call_count"], 5)
+
+        # The policy is persisted with the registry
+        with open(self.test_json_path, 'r') as f:
+            data = json.load(f)
+        functions = {func["function_name"]: func for module in data["modules"] for func in module["functions"]}
+        self.assertEqual(functions["get_driving_statistics"]["cache"]["ttl"], 30)
+        self.assertNotIn("cache", functions["set_driving_mode"])
+
+    def test_cache_policy_declared_in_registry_json(self):
+        """Test a "cache" entry of the registry file applies when no policy is passed"""
+        backend_calls = []
+
+        def get_battery_status():
+            backend_calls.append(1)
+            return {"level": 80}
+
+        with open(self.test_json_path, 'w') as f:
+            json.dump({"modules": [{"module_name": "battery_module", "module_path": "battery_module.py",
+                                    "functions": [{"function_name": "get_battery_status", "parameters": [],
+                                                   "cache": {"ttl": 30}}]}]}, f)
+        registry = FunctionRegistry(verbose=False, json_registry_path=self.test_json_path)
+        self.assertTrue(registry.register_static("get_battery_status", get_battery_status))
+        registry.execute("get_battery_status")
+        registry.execute("get_battery_status")
+        self.assertEqual(len(backend_calls), 1)
+        self.assertEqual(registry.functions["get_battery_status"]["cache_policy"], {"ttl": 30})
+
+        # An explicit empty policy turns caching off
+        registry.register_static("get_battery_status", get_battery_status, override=True, cache_policy={})
+        self.assertFalse(registry.result_cache.is_cacheable("get_battery_status"))
+
+    def test_cache_drops_results_read_before_a_write(self):
+        """Test a read overlapping a write does not cache the value from before the write"""
+        backend = {"mode": "eco"}
+
+        def set_driving_mode(mode: str):
+            backend["mode"] = mode
+
+        def get_driving_mode():
+            value = {"mode": backend["mode"]}
+            if value["mode"] == "eco":
+                # The write lands after this read took its value
+                self.registry.execute("set_driving_mode", mode="sport")
+            return value
+
+        self.registry.register_static("set_driving_mode", set_driving_mode)
+        self.registry.register_static("get_driving_mode", get_driving_mode,
+                                      cache_policy={"ttl": 30, "invalidated_by": ["set_driving_mode"]})
+
+        self.assertEqual(self.registry.execute("get_driving_mode"), {"mode": "eco"})
+        self.assertEqual(self.registry.execute("get_driving_mode"), {"mode": "sport"})
+        stats = self.registry.get_cache_stats("get_driving_mode")["get_driving_mode"]
+        self.assertEqual(stats["stale_drops"], 1)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_cached_results_are_copies(self):
+        """Test mutating a returned result does not change the cached one"""
+        def get_favorites():
+            return {"places": ["家", "公司"]}
+
+        self.registry.register_static("get_favorites", get_favorites, cache_policy={"ttl": 30})
+        first = self.registry.execute("get_favorites")
+        first["places"].append("机场")
+        second = self.registry.execute("get_favorites")
+        self.assertEqual(second, {"places": ["家", "公司"]})
+        second["places"].clear()
+        self.assertEqual(self.registry.execute("get_favorites"), {"places": ["家", "公司"]})
+        self.assertEqual(self.registry.get_cache_stats("get_favorites")["get_favorites"]["hits"], 2)
+
+    def test_invalid_cache_policy(self):
+        """Test a cache policy without a positive ttl is rejected"""
+        result = self.registry.register_static("bad_cache", self.test_static_func, cache_policy={"ttl": 0})
+        self.assertFalse(result)
+        self.assertNotIn("bad_cache", self.registry.functions)
+
+    def test_failed_registration_drops_cache_policy(self):
+        """Test a registration failing after the cache policy was set does not keep the policy"""
+        result = self.registry.register_static("bad_schema", self.test_static_func,
+                                               parameter_schema={"type": "object", "properties": {"x": "int"}},
+                                               cache_policy={"ttl": 30})
+        self.assertFalse(result)
+        self.assertNotIn("bad_schema", self.registry.functions)
+        self.assertFalse(self.registry.result_cache.is_cacheable("bad_schema"))
+
+        # A failed override keeps the policy of the registered function
+        self.registry.register_static("cached", self.test_static_func, cache_policy={"ttl": 30})
+        result = self.registry.register_static("cached", self.test_static_func, override=True,
+                                               parameter_schema={"type": "object", "properties": {"x": "int"}})
+        self.assertFalse(result)
+        self.assertTrue(self.registry.result_cache.is_cacheable("cached"))
+
     def test_list_functions(self):
         """Test listing all functions"""
         # Register functions of different types
@@ -0,0 +1,92 @@
+# test_parameter_validator.py
+
+import unittest
+from parameter_validator import compile_validator, compile_schema_validator
+
+
+class TestCompileValidator(unittest.TestCase):
+    """Unit tests for validators compiled from registry.json parameter lists"""
+
+    def setUp(self):
+        self.validate = compile_validator([
+            {"name": "temperature", "type": "float"},
+            {"name": "zone", "type": "str"}
+        ])
+
+    def test_valid_parameters(self):
+        self.assertEqual(self.validate({"temperature": 22.5, "zone": "driver"}), (True, None))
+
+    def test_missing_parameters(self):
+        success, message = self.validate({"zone": "driver"})
+        self.assertFalse(success)
+        self.assertEqual(message, "Missing required parameters: temperature")
+
+    def test_unexpected_parameters(self):
+        success, message = self.validate({"temperature": 22.5, "zone": "driver", "fan": 3})
+        self.assertFalse(success)
+        self.assertEqual(message, "Unexpected parameters: fan")
+
+    def test_wrong_type(self):
+        success, message = self.validate({"temperature": "22.5", "zone": "driver"})
+        self.assertFalse(success)
+        self.assertEqual(message, "Parameter 'temperature' should be float, got str")
+
+    def test_none_and_unknown_types(self):
+        validate = compile_validator([
+            {"name": "nothing", "type": "None"},
+            {"name": "anything", "type": "custom_type"}
+        ])
+        self.assertEqual(validate({"nothing": None, "anything": object()}), (True, None))
+
+        success, message = validate({"nothing": 1, "anything": 1})
+        self.assertFalse(success)
+        self.assertEqual(message, "Parameter 'nothing' should be None, got int")
+
+
+class TestCompileSchemaValidator(unittest.TestCase):
+    """Unit tests for validators compiled from JSON parameter schemas"""
+
+    def setUp(self):
+        self.validate = compile_schema_validator({
+            "type": "object",
+            "properties": {
+                "window_obj": {"type": "string"},
+                "height": {"type": "number"}
+            },
+            "required": ["window_obj"]
+        })
+
+    def test_number_accepts_int_and_float(self):
+        self.assertTrue(self.validate({"window_obj": "driver", "height": 75})[0])
+        self.assertTrue(self.validate({"window_obj": "driver", "height": 75.5})[0])
+
+    def test_optional_and_extra_parameters(self):
+        # Optional parameters may be omitted, extra ones are allowed unless forbidden
+        self.assertTrue(self.validate({"window_obj": "driver"})[0])
+        self.assertTrue(self.validate({"window_obj": "driver", "speed": 1})[0])
+
+        strict = compile_schema_validator({
+            "properties": {"window_obj": {"type": "string"}},
+            "required": ["window_obj"],
+            "additionalProperties": False
+        })
+        self.assertFalse(strict({"window_obj": "driver", "speed": 1})[0])
+
+    def test_wrong_type(self):
+        success, message = self.validate({"window_obj": 1})
+        self.assertFalse(success)
+        self.assertEqual(message, "Parameter 'window_obj' should be string, got int")
+
+    def test_type_lists_and_untyped_properties(self):
+        validate = compile_schema_validator({
+            "properties": {"level": {"type": ["integer", "null"]}, "items": {}},
+            "required": ["items"]
+        })
+        self.assertTrue(validate({"level": None, "items": [1, 2]})[0])
+        self.assertTrue(validate({"level": 3, "items": "anything"})[0])
+        self.assertEqual(validate({"level": "3", "items": 1}),
+                         (False, "Parameter 'level' should be integer or None, got str"))
+
+
+if __name__ == "__main__":
+    unittest.main()
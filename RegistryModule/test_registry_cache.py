@@ -0,0 +1,73 @@
+# test_registry_cache.py
+
+import unittest
+import os
+import json
+import tempfile
+import shutil
+from registry_cache import RegistryCache
+
+
+class TestRegistryCache(unittest.TestCase):
+    """Unit tests for the process-wide registry cache"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.registry_path = os.path.join(self.test_dir, "registry.json")
+        self._write_registry(["get_battery_status"])
+        self.cache = RegistryCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_registry(self, function_names):
+        data = {"modules": [{
+            "module_name": "battery_module",
+            "module_path": "/vehicle/systems/battery_module.py",
+            "functions": [{"function_name": name, "parameters": []} for name in function_names]
+        }]}
+        with open(self.registry_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def test_parsed_once(self):
+        first = self.cache.load(self.registry_path)
+        second = self.cache.load(self.registry_path)
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.parse_count, 1)
+
+    def test_revalidates_on_change(self):
+        first = self.cache.load(self.registry_path)
+        self._write_registry(["get_battery_status", "get_charging_status"])
+        stat = os.stat(self.registry_path)
+        os.utime(self.registry_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        second = self.cache.load(self.registry_path)
+        self.assertIsNot(first, second)
+        self.assertEqual(self.cache.parse_count, 2)
+        self.assertIn("get_charging_status", second.function_names)
+        self.assertNotIn("get_charging_status", first.function_names)
+
+    def test_index_built_once_per_snapshot(self):
+        snapshot = self.cache.load(self.registry_path)
+        builds = []
+
+        def builder():
+            builds.append(1)
+            return {"built": True}
+
+        self.assertIs(snapshot.get_index("test", builder), snapshot.get_index("test", builder))
+        self.assertEqual(len(builds), 1)
+        self.assertIn("battery_module.get_battery_status", snapshot.function_names)
+
+    def test_missing_and_invalid_files(self):
+        with self.assertRaises(FileNotFoundError):
+            self.cache.load(os.path.join(self.test_dir, "missing.json"))
+
+        with open(self.registry_path, 'w', encoding='utf-8') as f:
+            f.write("{invalid")
+        with self.assertRaises(json.JSONDecodeError):
+            self.cache.load(self.registry_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+# test_sandbox_pool.py
+
+import os
+import shutil
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+
+from sandbox_pool import (SandboxPool, SandboxError, SandboxCrashError, SandboxExecutionError,
+                          SandboxTimeoutError, RESOURCE_AVAILABLE)
+from function_registry import FunctionRegistry
+
+PLUGIN_SOURCE = textwrap.dedent("""
+    import os
+    import time
+
+    def add(a, b):
+        return a + b
+
+    def worker_pid():
+        return os.getpid()
+
+    def fail(message):
+        raise RuntimeError(message)
+
+    def hang(seconds):
+        time.sleep(seconds)
+        return "done"
+
+    def crash():
+        os._exit(3)
+
+    def allocate(megabytes):
+        return len(bytearray(megabytes * 1024 * 1024))
+""")
+
+SLOW_START_SOURCE = textwrap.dedent("""
+    import time
+
+    time.sleep(1.5)
+
+    def hang(seconds):
+        time.sleep(seconds)
+""")
+
+
+class TestSandboxPool(unittest.TestCase):
+    """Unit tests for SandboxPool"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.plugin_path = os.path.join(self.test_dir, "sandbox_plugin.py")
+        with open(self.plugin_path, 'w') as f:
+            f.write(PLUGIN_SOURCE)
+        self.pool = SandboxPool(num_workers=1, preload=[self.plugin_path], timeout=2.0,
+                                memory_limit_mb=None, max_calls_per_worker=0)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_call_runs_in_worker(self):
+        self.assertEqual(self.pool.call(self.plugin_path, "add", {"a": 2, "b": 3}), 5)
+        pid = self.pool.call(self.plugin_path, "worker_pid")
+        self.assertNotEqual(pid, os.getpid())
+        # The warm worker is reused
+        self.assertEqual(self.pool.call(self.plugin_path, "worker_pid"), pid)
+
+    def test_exception_is_reported(self):
+        with self.assertRaises(SandboxExecutionError) as context:
+            self.pool.call(self.plugin_path, "fail", {"message": "boom"})
+        self.assertIn("RuntimeError: boom", str(context.exception))
+        self.assertEqual(self.pool.call(self.plugin_path, "add", {"a": 1, "b": 1}), 2)
+
+    def test_timeout_replaces_worker(self):
+        pid = self.pool.call(self.plugin_path, "worker_pid")
+        with self.assertRaises(SandboxTimeoutError):
+            self.pool.call(self.plugin_path, "hang", {"seconds": 30}, timeout=0.2)
+        self.assertNotEqual(self.pool.call(self.plugin_path, "worker_pid"), pid)
+        # Let any extra replacement finish starting before counting workers
+        time.sleep(0.5)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["workers"], self.pool.num_workers)
+        self.assertEqual(stats["started"], 2)
+
+    def test_replacement_starts_in_background(self):
+        slow_path = os.path.join(self.test_dir, "slow_plugin.py")
+        with open(slow_path, 'w') as f:
+            f.write(SLOW_START_SOURCE)
+        pool = SandboxPool(num_workers=1, preload=[slow_path], memory_limit_mb=None)
+        try:
+            start = time.perf_counter()
+            with self.assertRaises(SandboxTimeoutError):
+                pool.call(slow_path, "hang", {"seconds": 30}, timeout=0.2)
+            # The failed call does not wait for the replacement to import the slow module
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertIsNone(pool.call(slow_path, "hang", {"seconds": 0}))
+            time.sleep(0.5)
+            self.assertEqual(pool.get_stats()["started"], 2)
+            self.assertEqual(pool.get_stats()["workers"], 1)
+        finally:
+            pool.close()
+
+    def test_crash_replaces_worker(self):
+        with self.assertRaises(SandboxCrashError):
+            self.pool.call(self.plugin_path, "crash")
+        self.assertEqual(self.pool.call(self.plugin_path, "add", {"a": 1, "b": 2}), 3)
+        self.assertEqual(self.pool.get_stats()["crashes"], 1)
+
+    def test_unpicklable_arguments_keep_worker(self):
+        with self.assertRaises(SandboxError) as context:
+            self.pool.call(self.plugin_path, "add", {"a": lambda: 1, "b": 2})
+        self.assertIn("could not be pickled", str(context.exception))
+        # The only worker is still idle for the next call
+        self.assertEqual(self.pool.call(self.plugin_path, "add", {"a": 1, "b": 2}, timeout=1.0), 3)
+        self.assertEqual(self.pool.get_stats()["calls"], 1)
+
+    def test_waiting_for_idle_worker_times_out(self):
+        pool = SandboxPool(num_workers=1, preload=[self.plugin_path], memory_limit_mb=None, acquire_timeout=0.2)
+        try:
+            busy = threading.Thread(target=pool.call, args=(self.plugin_path, "hang", {"seconds": 1}))
+            busy.start()
+            while pool._idle.qsize():
+                time.sleep(0.01)
+            with self.assertRaises(SandboxTimeoutError) as context:
+                pool.call(self.plugin_path, "add", {"a": 1, "b": 2})
+            self.assertIn("No sandbox worker", str(context.exception))
+            busy.join()
+            self.assertEqual(pool.call(self.plugin_path, "add", {"a": 1, "b": 2}), 3)
+        finally:
+            pool.close()
+
+    def test_worker_recycled_after_max_calls(self):
+        pool = SandboxPool(num_workers=1, preload=[self.plugin_path], max_calls_per_worker=2, memory_limit_mb=None)
+        try:
+            first = pool.call(self.plugin_path, "worker_pid")
+            self.assertEqual(pool.call(self.plugin_path, "worker_pid"), first)
+            self.assertNotEqual(pool.call(self.plugin_path, "worker_pid"), first)
+            self.assertEqual(pool.get_stats()["recycled"], 1)
+        finally:
+            pool.close()
+
+    @unittest.skipUnless(RESOURCE_AVAILABLE, "memory limits need the resource module")
+    def test_memory_limit(self):
+        pool = SandboxPool(num_workers=1, preload=[self.plugin_path], memory_limit_mb=2048)
+        try:
+            with self.assertRaises(SandboxExecutionError) as context:
+                pool.call(self.plugin_path, "allocate", {"megabytes": 4096})
+            self.assertIn("MemoryError", str(context.exception))
+            self.assertEqual(pool.call(self.plugin_path, "allocate", {"megabytes": 1}), 1024 * 1024)
+        finally:
+            pool.close()
+
+    @unittest.skipUnless(RESOURCE_AVAILABLE, "memory limits need the resource module")
+    def test_memory_limit_after_importing_torch(self):
+        try:
+            import torch  # noqa: F401 - maps gigabytes that forked workers inherit
+        except ImportError:
+            self.skipTest("torch is not installed")
+        pool = SandboxPool(num_workers=1, preload=[self.plugin_path], memory_limit_mb=512)
+        try:
+            self.assertEqual(pool.call(self.plugin_path, "allocate", {"megabytes": 64}), 64 * 1024 * 1024)
+            with self.assertRaises(SandboxExecutionError):
+                pool.call(self.plugin_path, "allocate", {"megabytes": 1024})
+        finally:
+            pool.close()
+
+
+class TestSandboxedRegistry(unittest.TestCase):
+    """Plugin and third-party functions executed through FunctionRegistry.enable_sandbox"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.plugin_path = os.path.join(self.test_dir, "sandbox_plugin.py")
+        with open(self.plugin_path, 'w') as f:
+            f.write(PLUGIN_SOURCE)
+        self.registry = FunctionRegistry(json_registry_path=os.path.join(self.test_dir, "registry.json"))
+
+        def worker_pid():
+            return os.getpid()
+
+        def crash():
+            os._exit(3)
+
+        # The local callables stand in for the plugin module's functions of the same name
+        self.registry.register_plugin("worker_pid", worker_pid, plugin_name="demo", module_path=self.plugin_path)
+        self.registry.register_third_party("crash", crash, app_name="demo", module_path=self.plugin_path)
+        self.registry.register_static("local_pid", worker_pid, module_path=self.plugin_path)
+        self.registry.enable_sandbox(num_workers=1, memory_limit_mb=None)
+
+    def tearDown(self):
+        self.registry.disable_sandbox()
+        shutil.rmtree(self.test_dir)
+
+    def test_plugin_runs_out_of_process(self):
+        self.assertNotEqual(self.registry.execute("demo.worker_pid"), os.getpid())
+        self.assertEqual(self.registry.execute("local_pid"), os.getpid())
+
+    def test_crash_does_not_take_down_registry(self):
+        self.assertIsNone(self.registry.execute("demo.crash"))
+        self.assertIsInstance(self.registry.execute("demo.worker_pid"), int)
+
+    def test_disable_sandbox(self):
+        self.registry.disable_sandbox()
+        self.assertEqual(self.registry.execute("demo.worker_pid"), os.getpid())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,264 @@
+"""
+CommandTable - Direct lookup of known car commands
+
+Compiles ExtendMaterial/CarCommands/CommandParameters.json (command -> API_calling and
+default parameters) and voice2command.json (command -> danger_level) into a normalized
+hash table. The Router consults it before the rule engine: a known command such as
+"打开车窗" is dispatched straight to its API with the risk decision of its danger level,
+without regular expression matching or an LLM generation.
+
+Matching:
+- exact: the normalized input (punctuation, spaces, polite fillers such as "请"/"帮我"/"一下"
+  removed) is a key of the table
+- fuzzy: a single key within a small edit distance, allowed only for longer commands so that
+  "打开车门" never matches "打开车窗"; ties between keys are treated as no match. The edits
+  may not touch the leading verb (the first two characters): "关闭自动驾驶跟车距离" is one
+  substitution away from "调整自动驾驶跟车距离" but asks for something else. Trailing
+  particles are kept for it: "打开车窗了" may state what happened rather than ask for it, so
+  it is only dispatched when it is otherwise exactly a known command
+
+Danger levels 1-5 map to the rule engine levels L1-L5 and their actions.
+"""
+
+import ast
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Optional, Tuple
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_COMMAND_PARAMETERS_PATH = os.path.join(_PROJECT_ROOT, "ExtendMaterial", "CarCommands", "CommandParameters.json")
+DEFAULT_VOICE2COMMAND_PATH = os.path.join(_PROJECT_ROOT, "ExtendMaterial", "CarCommands", "voice2command.json")
+
+# Same mapping as RuleEngine.risk_level_mapping
+DEFAULT_RISK_LEVEL_MAPPING = {
+    "L1": "HIGH_RISK_FORBIDDEN",
+    "L2": "REQUIRES_CONFIRMATION",
+    "L3": "REQUIRES_CONFIRMATION",
+    "L4": "DIRECT_ALLOW",
+    "L5": "DIRECT_ALLOW"
+}
+
+# (minimum normalized length, allowed edit distance), checked from the longest
+DEFAULT_FUZZY_THRESHOLDS = ((10, 2), (6, 1))
+
+# Leading characters that must be equal for a fuzzy match: the verb of a command
+# ("打开", "关闭", "调整", ...), whose substitution turns it into a different command
+LEADING_VERB_LENGTH = 2
+
+_PUNCTUATION = re.compile(r'[\s　-〿＀-／：-＠‘-‟!-/:-@\[-`{-~]+')
+_LEADING_FILLERS = re.compile(r'^(?:请你|请|麻烦你|麻烦|帮我|帮忙|给我|我想|我要)+')
+_TRAILING_FILLERS = re.compile(r'(?:一下|吧|呀|啊|了|哦|呢)+$')
+_PARENTHESES = re.compile(r'[（(][^（()）]*[)）]')
+
+
+def normalize_command(text: str, strip_trailing_fillers: bool = True) -> str:
+    """
+    Normalize a spoken command for table lookup
+
+    Args:
+        text: Command text, e.g. "请帮我打开车窗吧！"
+        strip_trailing_fillers: Also remove trailing particles such as "吧"/"了"/"一下"
+                                (exact lookups only)
+
+    Returns:
+        str: Normalized key, e.g. "打开车窗"
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCTUATION.sub("", text)
+    text = _LEADING_FILLERS.sub("", text)
+    return _TRAILING_FILLERS.sub("", text) if strip_trailing_fillers else text
+
+
+def parse_parameter_spec(spec: str) -> Tuple[str, str, bool, Any]:
+    """
+    Parse a CommandParameters.json parameter such as "action:str='open'" or "value:int"
+
+    Returns:
+        tuple: (name, type, has_default, default)
+    """
+    declaration, has_default, default_text = spec.partition("=")
+    name, _, type_name = declaration.partition(":")
+    default = None
+    if has_default:
+        try:
+            default = ast.literal_eval(default_text.strip())
+        except (ValueError, SyntaxError):
+            default = default_text.strip().strip("'\"")
+    return name.strip(), type_name.strip() or "str", bool(has_default), default
+
+
+def _bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Edit distance of a and b, or max_distance + 1 as soon as it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class CommandTable:
+    def __init__(self,
+                 command_parameters_path: str = DEFAULT_COMMAND_PARAMETERS_PATH,
+                 voice2command_path: str = DEFAULT_VOICE2COMMAND_PATH,
+                 risk_level_mapping: Optional[Dict[str, str]] = None,
+                 fuzzy_thresholds: Tuple[Tuple[int, int], ...] = DEFAULT_FUZZY_THRESHOLDS):
+        """
+        Args:
+            command_parameters_path: Path to CommandParameters.json
+            voice2command_path: Path to voice2command.json (danger levels; commands without
+                                one are treated as L3, requiring confirmation)
+            risk_level_mapping: Risk level -> action mapping (RuleEngine defaults if None)
+            fuzzy_thresholds: (minimum length, edit distance) pairs for near-exact matches
+        """
+        self.risk_level_mapping = dict(risk_level_mapping or DEFAULT_RISK_LEVEL_MAPPING)
+        self.fuzzy_thresholds = tuple(sorted(fuzzy_thresholds, reverse=True))
+        self.entries = {}       # normalized command -> entry
+        self._by_length = {}    # normalized length -> [(key, set of its characters)], for the fuzzy fallback
+        self._stats = {"lookups": 0, "exact": 0, "fuzzy": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._compile(command_parameters_path, voice2command_path)
+
+    def _compile(self, command_parameters_path: str, voice2command_path: str):
+        """Build the normalized lookup table from the two command files"""
+        with open(command_parameters_path, 'r', encoding='utf-8') as f:
+            commands = json.load(f)
+
+        danger_levels = {}
+        if voice2command_path and os.path.exists(voice2command_path):
+            with open(voice2command_path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    danger_levels[normalize_command(item.get("command", ""))] = (
+                        item.get("danger_level"), item.get("window_operation", ""))
+
+        for item in commands:
+            command = item.get("command", "")
+            key = normalize_command(command)
+            if not key or not item.get("API_calling"):
+                continue
+
+            parameters, missing = {}, []
+            for spec in item.get("parameters", []):
+                name, _, has_default, default = parse_parameter_spec(spec)
+                if has_default:
+                    parameters[name] = default
+                else:
+                    missing.append(name)
+
+            danger_level, category = danger_levels.get(key, (None, ""))
+            risk_level = f"L{danger_level}" if danger_level in (1, 2, 3, 4, 5) else "L3"
+            entry = {
+                "command": command,
+                "api_name": item["API_calling"],
+                "parameters": parameters,
+                "missing_parameters": missing,
+                "danger_level": danger_level,
+                "risk_level": risk_level,
+                "category": category
+            }
+
+            # "切换驾驶模式（节能/运动）" is also spoken without the parenthesized options
+            aliases = {key, normalize_command(_PARENTHESES.sub("", command))}
+            for alias in aliases:
+                if alias and alias not in self.entries:
+                    self.entries[alias] = entry
+                    self._by_length.setdefault(len(alias), []).append((alias, frozenset(alias)))
+
+    def _max_distance(self, length: int) -> int:
+        for min_length, distance in self.fuzzy_thresholds:
+            if length >= min_length:
+                return distance
+        return 0
+
+    def _fuzzy_lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Unique closest entry with the same leading verb within the allowed edit distance"""
+        max_distance = self._max_distance(len(key))
+        if max_distance == 0:
+            return None, 0
+
+        key_chars = set(key)
+        verb = key[:LEADING_VERB_LENGTH]
+        best_distance, matches = max_distance + 1, []
+        for length in range(len(key) - max_distance, len(key) + max_distance + 1):
+            for candidate, candidate_chars in self._by_length.get(length, ()):
+                if not candidate.startswith(verb):
+                    continue
+                # The shorter of the two strings decides the distance allowed
+                allowed = min(max_distance, self._max_distance(len(candidate)))
+                # Every character missing from the candidate costs at least one edit
+                if allowed == 0 or len(key_chars - candidate_chars) > allowed:
+                    continue
+                distance = _bounded_levenshtein(key, candidate, allowed)
+                entry = self.entries[candidate]
+                if distance < best_distance and distance <= allowed:
+                    best_distance, matches = distance, [entry]
+                elif distance == best_distance and all(entry is not match for match in matches):
+                    matches.append(entry)
+
+        # Ambiguous inputs fall through to the rule engine
+        if len(matches) != 1:
+            return None, 0
+        return matches[0], best_distance
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a spoken command
+
+        Args:
+            text: User input
+
+        Returns:
+            dict: command, api_name, parameters (defaults), missing_parameters, danger_level,
+                  risk_level, action, category, match_type ("exact"/"fuzzy") and distance;
+                  None if the input is not a known command
+        """
+        key = normalize_command(text) if isinstance(text, str) else ""
+        entry, distance, match_type = self.entries.get(key), 0, "exact"
+        if entry is None and key:
+            # Trailing particles only count as fillers for an exact match
+            entry, distance = self._fuzzy_lookup(normalize_command(text, strip_trailing_fillers=False))
+            match_type = "fuzzy"
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats[match_type if entry is not None else "misses"] += 1
+
+        if entry is None:
+            return None
+        return dict(entry,
+                     parameters=dict(entry["parameters"]),
+                     action=self.risk_level_mapping.get(entry["risk_level"], "REQUIRES_CONFIRMATION"),
+                     match_type=match_type,
+                     distance=distance)
+
+    def update_risk_mapping(self, new_mapping: Dict[str, str]):
+        """Update the risk level -> action mapping (kept in sync with the rule engine)"""
+        self.risk_level_mapping.update(new_mapping)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get lookup counters
+
+        Returns:
+            dict: lookups, exact, fuzzy, misses and served_rate (share of lookups matched)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["served_rate"] = (stats["exact"] + stats["fuzzy"]) / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    table = CommandTable()
+    for text in ["打开车窗", "请帮我关闭车窗吧！", "切换驾驶模式", "调整座椅加热", "查看电池余量", "打开车门", "讲个笑话"]:
+        print(f"{text} -> {table.match(text)}")
+    print(table.get_stats())
@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add the current directory to the path so we can import CommandTable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from CommandTable import CommandTable, normalize_command, parse_parameter_spec
+
+
+class TestCommandTable(unittest.TestCase):
+    """Unit tests for the command table compiled from the CarCommands files"""
+
+    def setUp(self):
+        self.table = CommandTable()
+
+    def test_normalize_command(self):
+        self.assertEqual(normalize_command("请帮我打开车窗吧！"), "打开车窗")
+        self.assertEqual(normalize_command(" 启用特斯拉“召唤”功能 "), "启用特斯拉召唤功能")
+        self.assertEqual(normalize_command("远程锁车一下。"), "远程锁车")
+        self.assertEqual(normalize_command("请打开车窗了", strip_trailing_fillers=False), "打开车窗了")
+
+    def test_fillers_do_not_change_table_commands(self):
+        # No command of CommandParameters.json loses characters to the filler patterns
+        from CommandTable import DEFAULT_COMMAND_PARAMETERS_PATH
+        with open(DEFAULT_COMMAND_PARAMETERS_PATH, 'r', encoding='utf-8') as f:
+            commands = [item["command"] for item in json.load(f)]
+        for command in commands:
+            self.assertEqual(normalize_command(command), normalize_command(command, strip_trailing_fillers=False))
+            self.assertEqual(self.table.match(command)["match_type"], "exact", command)
+
+    def test_parse_parameter_spec(self):
+        self.assertEqual(parse_parameter_spec("action:str='open'"), ("action", "str", True, "open"))
+        self.assertEqual(parse_parameter_spec("temperature:float=22.0"), ("temperature", "float", True, 22.0))
+        self.assertEqual(parse_parameter_spec("value:int"), ("value", "int", False, None))
+
+    def test_exact_match_with_risk_decision(self):
+        command = self.table.match("打开车窗")
+        self.assertEqual(command["api_name"], "window_control")
+        self.assertEqual(command["parameters"], {"action": "open", "window_part": "all"})
+        self.assertEqual(command["risk_level"], "L1")
+        self.assertEqual(command["action"], "HIGH_RISK_FORBIDDEN")
+        self.assertEqual(command["match_type"], "exact")
+
+        command = self.table.match("远程锁车")
+        self.assertEqual(command["parameters"], {"operation": "lock_doors"})
+        self.assertEqual(command["action"], "DIRECT_ALLOW")
+
+    def test_missing_parameters_and_aliases(self):
+        command = self.table.match("切换驾驶模式")
+        self.assertEqual(command["api_name"], "switch_driving_mode")
+        self.assertEqual(command["missing_parameters"], ["mode"])
+        self.assertEqual(command["action"], "REQUIRES_CONFIRMATION")
+
+    def test_fuzzy_match(self):
+        command = self.table.match("查看电池余量")
+        self.assertEqual(command["api_name"], "get_vehicle_status")
+        self.assertEqual((command["match_type"], command["distance"]), ("fuzzy", 1))
+        # Trailing particles are only dropped for exact matches
+        self.assertEqual(self.table.match("查看电池电量吧")["match_type"], "exact")
+        self.assertIsNone(self.table.match("查看电池余量了"))
+
+    def test_fuzzy_match_keeps_the_leading_verb(self):
+        # One substitution away from "调整自动驾驶跟车距离", but the opposite request
+        self.assertIsNone(self.table.match("关闭自动驾驶跟车距离"))
+        self.assertIsNone(self.table.match("打开座椅加热"))
+        # Edits after the verb are still tolerated
+        command = self.table.match("调整自动驾驶跟车距里")
+        self.assertEqual((command["api_name"], command["match_type"]), ("adjust_autopilot_setting", "fuzzy"))
+
+    def test_short_and_unknown_inputs_not_fuzzy_matched(self):
+        self.assertIsNone(self.table.match("打开车门"))
+        self.assertIsNone(self.table.match("讲个笑话"))
+        self.assertIsNone(self.table.match(""))
+
+    def test_ambiguous_fuzzy_match(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "CommandParameters.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([{"command": "调整座椅加热档位", "API_calling": "set_seat_heating", "parameters": []},
+                           {"command": "调整座椅通风档位", "API_calling": "set_seat_ventilation", "parameters": []}],
+                          f, ensure_ascii=False)
+            table = CommandTable(path, None, fuzzy_thresholds=((6, 2),))
+            self.assertEqual(table.match("调整座椅加热档位")["risk_level"], "L3")
+            self.assertIsNone(table.match("调整座椅制冷档位"))
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_stats_and_risk_mapping_update(self):
+        self.table.match("远程锁车")
+        self.table.match("查看电池余量")
+        self.table.match("你好")
+        stats = self.table.get_stats()
+        self.assertEqual((stats["exact"], stats["fuzzy"], stats["misses"]), (1, 1, 1))
+        self.assertAlmostEqual(stats["served_rate"], 2 / 3)
+
+        self.table.update_risk_mapping({"L5": "REQUIRES_CONFIRMATION"})
+        self.assertEqual(self.table.match("远程锁车")["action"], "REQUIRES_CONFIRMATION")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Retry rate of LLM-style function arguments with and without argument coercion
+Every call rejected by parameter validation is sent back to the LLM, so the
+rejection rate p costs p / (1 - p) extra generations per command when the
+retried generation fails at the same rate.
+
+Usage:
+    python SystemTest/benchmark_argument_coercion.py
+"""
+
+import sys
+import os
+import timeit
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ChatBots.FunctionCalling_router import function_calling_interface
+
+# Argument dictionaries in the shapes local models produce for the registry functions
+LLM_CALLS = [
+    ("set_cabin_temperature", {"temperature": 22.5, "zone": "driver"}),
+    ("set_cabin_temperature", {"temperature": "25", "zone": "driver"}),
+    ("set_cabin_temperature", {"temperature": "二十五度", "zone": "all"}),
+    ("set_cabin_temperature", {"temperature": 24, "zone": "passenger"}),
+    ("set_cabin_temperature", {"temperature": "22.5℃", "zone": "driver"}),
+    ("set_cabin_temperature", {"temperature": "warm", "zone": "driver"}),
+    ("activate_climate_preconditioning", {"enable": True, "target_temp": 21.0, "departure_time": "07:30"}),
+    ("activate_climate_preconditioning", {"enable": "true", "target_temp": "21", "departure_time": "07:30"}),
+    ("activate_climate_preconditioning", {"enable": "是", "target_temp": "二十一度", "departure_time": "8点"}),
+    ("activate_climate_preconditioning", {"enable": 1, "target_temp": 20, "departure_time": "06:45"}),
+    ("set_destination", {"location": "北京南站", "waypoints": []}),
+    ("set_destination", {"location": "公司", "waypoints": '["加油站", "咖啡店"]'}),
+    ("set_destination", {"location": "机场", "waypoints": "[]"}),
+    ("find_charging_stations", {"radius_km": 10, "filter_by": {"fast_charging": True}}),
+    ("find_charging_stations", {"radius_km": "5", "filter_by": '{"fast_charging": true}'}),
+    ("find_charging_stations", {"radius_km": "五公里", "filter_by": {}}),
+    ("find_charging_stations", {"radius_km": 10.0, "filter_by": "{}"}),
+    ("adjust_volume", {"level": 30}),
+    ("adjust_volume", {"level": "30"}),
+    ("adjust_volume", {"level": "三十"}),
+    ("adjust_volume", {"level": "50%"}),
+    ("adjust_volume", {"level": "louder"}),
+    ("play_media", {"media_type": "music", "source": "local", "content_id": 12}),
+    ("play_media", {"media_type": "podcast", "source": "online", "content_id": "ep-3"}),
+    ("get_driving_statistics", {"time_period": "week"}),
+    ("set_driving_mode", {"mode": "eco"}),
+]
+
+
+def measure(router):
+    for function_name, params in LLM_CALLS:
+        func_info = router.registry.get_function_by_name(function_name)
+        params = router._coerce_parameters(func_info, params)
+        valid, _ = router._validate_parameters(func_info, params)
+        router.validation_stats['calls'] += 1
+        if not valid:
+            router.validation_stats['rejected'] += 1
+    return router.get_validation_stats()
+
+
+def run_benchmark(number: int = 20000):
+    print("=== Argument Coercion: LLM Retry Rate ===")
+    print(f"Commands: {len(LLM_CALLS)}")
+    for label, coerce in (("Without coercion", False), ("With coercion", True)):
+        stats = measure(function_calling_interface(coerce_arguments=coerce))
+        p = stats['retry_rate']
+        print(f"{label:18s} rejected {stats['rejected']:2d}  retry rate {p:6.1%}  "
+              f"extra LLM calls/command {p / (1 - p):.3f}  coerced {stats['coerced']}")
+
+    router = function_calling_interface()
+    func_info = router.registry.get_function_by_name("activate_climate_preconditioning")
+    clean = {"enable": True, "target_temp": 21.0, "departure_time": "07:30"}
+    dirty = {"enable": "true", "target_temp": "二十一度", "departure_time": "07:30"}
+    coercer = func_info['coercer']
+    clean_time = timeit.timeit(lambda: coercer(clean), number=number) / number
+    dirty_time = timeit.timeit(lambda: coercer(dirty), number=number) / number
+    print(f"Coercion cost, nothing to convert: {clean_time * 1e6:6.2f} us")
+    print(f"Coercion cost, two conversions:    {dirty_time * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark()
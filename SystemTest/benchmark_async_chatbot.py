@@ -0,0 +1,85 @@
+"""
+Throughput of a LangChain chain (prompt | LocalChatBot) under concurrent ainvoke calls
+REQUESTS chain calls are awaited with at most `concurrency` in flight, once through
+LangChain's default Runnable.ainvoke (invoke() in an executor thread per call, each
+call decoding on its own with generate()) and once through LocalChatBot's native
+ainvoke (one generation worker decoding all in-flight calls together). Reported: total
+time, requests/s and mean latency per call; every call is greedy with MAX_TOKENS new
+tokens at most, so both variants generate the same replies.
+
+Without arguments a randomly initialized Qwen3-0.6B-shaped model (int8) is built (see
+tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_async_chatbot.py [model_path]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPTS = ["打开车窗", "今天天气怎么样？", "讲一个睡前故事", "附近有加油站吗",
+           "介绍一下杭州西湖", "把空调调到22度", "还能开多少公里", "播放周杰伦的歌"]
+REQUESTS = 16
+CONCURRENCY = (1, 4, 8)
+MAX_TOKENS = 32
+
+
+async def run_level(chatbot, chain, concurrency: int, native: bool):
+    from langchain_core.runnables import Runnable
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def call(index: int):
+        async with gate:
+            prompt_value = await chain.ainvoke({"question": PROMPTS[index % len(PROMPTS)]})
+            config = {"max_tokens": MAX_TOKENS}
+            start = time.perf_counter()
+            if native:
+                await chatbot.ainvoke(prompt_value, config)
+            else:
+                # LangChain's fallback: invoke() in an executor thread
+                await Runnable.ainvoke(chatbot, prompt_value, config)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(index) for index in range(REQUESTS)))
+    seconds = time.perf_counter() - start
+    label = "native ainvoke" if native else "executor thread"
+    print(f"{label:16s} {concurrency:11d} {seconds:8.1f} {REQUESTS / seconds:7.2f} "
+          f"{sum(latencies) / len(latencies):10.2f}")
+
+
+def run_benchmark(model_path: str = None):
+    from langchain_core.prompts import ChatPromptTemplate
+    from ChatBots.LocalChatBot import LocalChatBot
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-random"), "0.6b")
+        chatbot = LocalChatBot(model_path, quantize=True)
+        chatbot.model.generation_config.do_sample = False
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+        chain = ChatPromptTemplate.from_messages([("user", "{question}")])
+
+        print("=== Async LocalChatBot ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']}), {REQUESTS} chain calls per level, "
+              f"greedy, {MAX_TOKENS} new tokens")
+        print(f"{'ainvoke':16s} {'concurrency':>11s} {'total s':>8s} {'req/s':>7s} {'latency s':>10s}")
+        for native in (False, True):
+            for concurrency in CONCURRENCY:
+                asyncio.run(run_level(chatbot, chain, concurrency, native))
+        stats = chatbot.async_engine.get_stats()
+        print(f"worker: {stats['steps']} decode steps, mean batch size {stats['mean_batch_size']:.2f}")
+        chatbot.disable_continuous_batching()
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,73 @@
+"""
+Padding waste and throughput of LocalChatBot.batch: arrival order vs. length buckets
+A mixed workload of short car commands and a few long requests (sharing the
+daily_chat system prompt) is run through batch() twice:
+- arrival order: slices of batch_size in the order the inputs came in (previous behavior)
+- length buckets: sorted by length, batches closed before padding exceeds 25%
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built (see
+tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_batching.py [model_path] [batch_size] [max_tokens]
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SHORT = ["打开车窗", "关闭空调", "播放音乐", "查看电量", "锁车", "打开座椅加热", "调低音量", "导航回家",
+         "打开大灯", "关闭车窗", "下一首", "打开天窗", "查看胎压"]
+LONG = [
+    "我下午三点要到杭州东站接人，路上还想找一家评分高一点的咖啡店坐一会儿，"
+    "请帮我规划一条路线，顺便告诉我沿途有哪些充电站，以及现在的电量够不够跑个来回。",
+    "帮我写一段给家人的消息，说我今天晚上加班可能要九点以后才能到家，让他们先吃饭不用等我，"
+    "另外提醒他们明天早上八点要带孩子去医院复查，记得把病历本放在门口的柜子上。",
+    "请详细解释一下这辆车的能量回收有几个档位，每个档位在城市拥堵和高速巡航时分别有什么优缺点，"
+    "以及在冬天低温环境下应该怎么设置才能让续航里程尽可能长一些。",
+]
+
+
+def workload():
+    # Long requests arrive spread among the short commands
+    inputs = list(SHORT)
+    for position, text in zip((2, 7, 11), LONG):
+        inputs.insert(position, text)
+    return inputs
+
+
+def run_benchmark(model_path: str = None, batch_size: int = 8, max_tokens: int = 16):
+    from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        chatbot = LocalChatBot(model_path, quantize=True)
+        system_prompt = load_prompt("daily_chat")
+        inputs = [{"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": text}]}
+                  for text in workload()]
+        chatbot.invoke(inputs[0], {"max_tokens": 2})  # warm-up, fills the prefix cache
+
+        print("=== LocalChatBot.batch Padding and Throughput ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']} on {chatbot.device}), "
+              f"{len(inputs)} inputs, batch_size={batch_size}, max_tokens={max_tokens}")
+        print(f"{'batching':16s} {'batches':>7s} {'padding':>8s} {'seconds':>8s} {'tok/s':>7s}")
+        outputs = {}
+        for label, bucketing in [("arrival order", False), ("length buckets", True)]:
+            config = {"max_tokens": max_tokens, "batch_size": batch_size, "length_bucketing": bucketing}
+            outputs[label] = chatbot.batch(inputs, config)
+            stats = chatbot.last_batch_stats
+            print(f"{label:16s} {stats['batches']:7d} {stats['padding_ratio'] * 100:7.1f}% "
+                  f"{stats['seconds']:8.1f} {stats['tokens_per_second']:7.2f}")
+        same = sum(a == b for a, b in zip(outputs["arrival order"], outputs["length buckets"]))
+        print(f"Identical replies: {same}/{len(inputs)}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+                  int(sys.argv[3]) if len(sys.argv) > 3 else 16)
@@ -0,0 +1,72 @@
+"""
+Per-turn latency of a growing conversation: LocalChatBot sessions vs. resending history
+Each turn is answered twice:
+- invoke: the whole message history is sent again (system prompt from the prefix cache)
+- session: ChatSession keeps the KV cache and prefills only the new turn
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built (see
+tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_chat_session.py [model_path] [turns] [reply_tokens]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TURNS = [
+    "我现在在杭州，给我介绍一下这座城市吧",
+    "刚才说的西湖附近有什么好吃的？",
+    "继续说说晚上有什么活动",
+    "帮我把导航设置到你刚才说的第一家餐厅",
+    "路上大概要多长时间？",
+    "车里有点热，把空调调到二十二度",
+    "再播放一首轻松的音乐",
+    "刚才那家餐厅几点关门？",
+    "好的，继续导航吧",
+    "到了之后提醒我找充电桩",
+    "附近充电站的价格是多少？",
+    "谢谢，今天就到这里",
+]
+
+
+def run_benchmark(model_path: str = None, turns: int = 12, reply_tokens: int = 24):
+    from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        chatbot = LocalChatBot(model_path, quantize=True)
+        system_prompt = load_prompt("daily_chat")
+        config = {"max_tokens": reply_tokens}
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+
+        session = chatbot.create_session(system_prompt)
+        messages = [{"role": "system", "content": system_prompt}]
+
+        print("=== Multi-turn Conversation Latency ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']} on {chatbot.device}), {reply_tokens} tokens per reply")
+        print(f"{'turn':>4s} {'history tok':>11s} {'invoke ms':>10s} {'session ms':>11s} {'prefilled tok':>14s}")
+        for turn, text in enumerate(TURNS[:turns], 1):
+            messages.append({"role": "user", "content": text})
+            start = time.perf_counter()
+            reply = chatbot.invoke({"messages": messages}, config)
+            invoke_ms = (time.perf_counter() - start) * 1000
+            messages.append({"role": "assistant", "content": reply["content"]})
+
+            session.invoke(text, config)
+            print(f"{turn:4d} {session.last_turn['prompt_tokens']:11d} {invoke_ms:10.0f} "
+                  f"{session.last_turn['latency_ms']:11.0f} {session.last_turn['prefilled_tokens']:14d}")
+        print(chatbot.get_session_stats())
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 12,
+                  int(sys.argv[3]) if len(sys.argv) > 3 else 24)
@@ -0,0 +1,72 @@
+"""
+Share of requests served by the command table fast path
+Replays the rule engine test utterances plus spoken variants of the CarCommands
+entries and reports how many the CommandTable answers without the rule engine or
+the LLM, how many of those need no LLM at all (all parameters known), and the
+lookup latency compared with the rule engine.
+
+Usage:
+    python SystemTest/benchmark_command_table.py
+"""
+
+import ast
+import sys
+import os
+import timeit
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RuleBaseEngine.CommandTable import CommandTable
+from RuleBaseEngine.RuleBaseEngine import RuleEngine
+
+RULE_ENGINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RuleBaseEngine")
+
+# Spoken forms of the CarCommands entries
+COMMAND_VARIANTS = [
+    "打开车窗", "请关闭车窗", "帮我打开车窗吧", "紧急避让操作", "修改行驶路线",
+    "切换驾驶模式", "查询实时路况", "查一下实时路况", "语音搜索附近餐厅", "调整空调温度",
+    "设置导航目的地", "播放音乐", "查看电池电量", "查看电池余量", "远程启动空调",
+    "远程锁车", "帮我远程锁车", "调整座椅加热", "调整氛围灯颜色", "观看车载视频",
+]
+
+
+def load_rule_engine_utterances():
+    """Utterance lists (*_tests) of RuleBaseEngine/test_rulebase_engine.py"""
+    with open(os.path.join(RULE_ENGINE_DIR, "test_rulebase_engine.py"), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    utterances = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and node.targets[0].id.endswith("_tests"):
+            utterances.extend(ast.literal_eval(node.value))
+    return utterances
+
+
+def run_benchmark(number: int = 2000):
+    rule_traffic = load_rule_engine_utterances()
+    traffic = rule_traffic + COMMAND_VARIANTS
+
+    table = CommandTable()
+    served = [table.match(text) for text in traffic]
+    matched = [command for command in served if command is not None]
+    executable = [command for command in matched
+                  if command["action"] != "DIRECT_ALLOW" or not command["missing_parameters"]]
+    stats = table.get_stats()
+
+    print("=== Command Table Fast Path ===")
+    print(f"Requests replayed:              {len(traffic)} ({len(rule_traffic)} rule engine tests, "
+          f"{len(COMMAND_VARIANTS)} command variants)")
+    print(f"Served by the table:            {len(matched)} ({stats['served_rate']:.1%}), "
+          f"exact {stats['exact']}, fuzzy {stats['fuzzy']}")
+    print(f"Of the rule engine tests:       {sum(c is not None for c in served[:len(rule_traffic)])}")
+    print(f"Answered without any LLM call:  {len(executable)} ({len(executable) / len(traffic):.1%})")
+
+    engine = RuleEngine(os.path.join(RULE_ENGINE_DIR, "Rules.json"))
+    table_time = timeit.timeit(lambda: [table.match(text) for text in traffic], number=number // 100) / (number // 100) / len(traffic)
+    rule_time = timeit.timeit(lambda: [engine.process_input(text) for text in traffic], number=number // 100) / (number // 100) / len(traffic)
+    print(f"Command table lookup:           {table_time * 1e6:8.2f} us/request")
+    print(f"Rule engine classification:     {rule_time * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    run_benchmark()
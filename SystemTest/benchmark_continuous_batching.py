@@ -0,0 +1,119 @@
+"""
+Continuous batching vs. static generate() batches with mixed output lengths
+A burst of short device confirmations (few tokens) mixed with long chat replies is served
+two ways:
+- generate(): static batches of max_batch_size in arrival order; a batch runs until its
+  longest reply is finished, so every request in it completes at that time
+- engine: ContinuousBatchingEngine; each request leaves the batch after its own last token
+  and waiting requests take its slot at the next step
+
+Replies end at their max_new_tokens (random weights rarely produce an end-of-sequence
+token), which models confirmations that end early next to long answers.
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built (see
+tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_continuous_batching.py [model_path] [max_batch_size]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import torch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SHORT = ["打开车窗", "关闭空调", "播放音乐", "查看电量", "锁车", "打开座椅加热", "调低音量", "导航回家",
+         "打开大灯", "关闭车窗", "下一首", "打开天窗"]
+LONG = ["给我介绍一下杭州有什么好玩的地方", "讲一个适合小朋友听的睡前故事", "解释一下能量回收的原理", "帮我规划明天的行程"]
+SHORT_TOKENS, LONG_TOKENS = 8, 64
+
+
+def workload():
+    """(text, max_new_tokens) with one long reply in every four requests"""
+    requests = []
+    for i, text in enumerate(SHORT):
+        if i % 3 == 0 and LONG:
+            requests.append((LONG[i // 3], LONG_TOKENS))
+        requests.append((text, SHORT_TOKENS))
+    return requests
+
+
+def summarize(label, latencies, requests, elapsed):
+    short = [latency for latency, (_, tokens) in zip(latencies, requests) if tokens == SHORT_TOKENS]
+    long = [latency for latency, (_, tokens) in zip(latencies, requests) if tokens == LONG_TOKENS]
+    useful_tokens = sum(tokens for _, tokens in requests)
+    print(f"{label:12s} {elapsed:8.1f} {useful_tokens / elapsed:7.2f} {statistics.mean(short):12.1f} "
+          f"{max(short):11.1f} {statistics.mean(long):11.1f}")
+
+
+def run_static(chatbot, requests, max_batch_size):
+    """Arrival-order batches through model.generate"""
+    latencies = [0.0] * len(requests)
+    start = time.perf_counter()
+    for first in range(0, len(requests), max_batch_size):
+        indices = list(range(first, min(first + max_batch_size, len(requests))))
+        encoded = [chatbot._tokenize(requests[j][0]) for j in indices]
+        model_inputs = chatbot._build_inputs([ids for ids, _ in encoded])
+        with torch.no_grad():
+            chatbot.model.generate(**model_inputs, do_sample=False, pad_token_id=chatbot.tokenizer.pad_token_id,
+                                   max_new_tokens=max(requests[j][1] for j in indices))
+        for j in indices:
+            latencies[j] = time.perf_counter() - start
+    return latencies, time.perf_counter() - start
+
+
+def run_engine(chatbot, requests, max_batch_size):
+    engine = chatbot.enable_continuous_batching(max_batch_size=max_batch_size)
+    latencies = [0.0] * len(requests)
+    start = time.perf_counter()
+
+    def record(j):
+        def done(_future):
+            latencies[j] = time.perf_counter() - start
+        return done
+
+    futures = []
+    for j, (text, max_new_tokens) in enumerate(requests):
+        ids, prefix_length = chatbot._tokenize(text)
+        future = engine.submit(ids, max_new_tokens, prefix_length)
+        future.add_done_callback(record(j))
+        futures.append(future)
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    stats = engine.get_stats()
+    chatbot.disable_continuous_batching()
+    return latencies, elapsed, stats
+
+
+def run_benchmark(model_path: str = None, max_batch_size: int = 8):
+    from ChatBots.LocalChatBot import LocalChatBot
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        chatbot = LocalChatBot(model_path, quantize=True)
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+        requests = workload()
+
+        print("=== Continuous Batching vs generate() ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']} on {chatbot.device}), {len(requests)} requests, "
+              f"{SHORT_TOKENS}/{LONG_TOKENS} new tokens, max_batch_size={max_batch_size}")
+        print(f"{'serving':12s} {'total s':>8s} {'tok/s':>7s} {'short avg s':>12s} {'short max s':>11s} {'long avg s':>11s}")
+        latencies, elapsed = run_static(chatbot, requests, max_batch_size)
+        summarize("generate()", latencies, requests, elapsed)
+        latencies, elapsed, stats = run_engine(chatbot, requests, max_batch_size)
+        summarize("engine", latencies, requests, elapsed)
+        print(f"Engine: {stats['steps']} decode steps, mean batch size {stats['mean_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 8)
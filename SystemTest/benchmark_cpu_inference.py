@@ -0,0 +1,111 @@
+"""
+CPU inference benchmark for LocalChatBot load paths
+Measures load time, resident memory and decode speed (tokens/sec) for fp32, bf16
+and dynamic int8 weights, plus the startup time when the quantized model is read
+from a saved checkpoint. Every configuration runs in its own process so memory
+numbers do not overlap.
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built
+(see tiny_qwen3_checkpoint.py); speed and memory do not depend on the weight values.
+
+Usage:
+    python SystemTest/benchmark_cpu_inference.py [model_path] [new_tokens]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIGURATIONS = [
+    ("fp32", {"dtype": "fp32"}),
+    ("bf16", {"dtype": "bf16"}),
+    ("int8 dynamic", {"quantize": True}),
+    ("int8 from saved checkpoint", {"quantize": True}),
+]
+
+PROMPT = "请帮我把空调温度调到二十二度，然后播放一首轻松的音乐。"
+
+
+def resident_memory_mb() -> float:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_configuration(model_path: str, options: dict, new_tokens: int) -> dict:
+    """Load one configuration and time greedy decoding of a fixed number of tokens"""
+    import torch
+    from ChatBots.LocalChatBot import LocalChatBot
+
+    baseline = resident_memory_mb()
+    chatbot = LocalChatBot(model_path, device="cpu", **options)
+    loaded = resident_memory_mb()
+
+    ids, _ = chatbot._tokenize(PROMPT)
+    inputs = chatbot._build_inputs([ids])
+    generate_options = dict(max_new_tokens=new_tokens, min_new_tokens=new_tokens, do_sample=False,
+                            use_cache=True, pad_token_id=chatbot.tokenizer.pad_token_id)
+    with torch.no_grad():
+        chatbot.model.generate(**inputs, max_new_tokens=2, do_sample=False, pad_token_id=chatbot.tokenizer.pad_token_id)
+        start = time.perf_counter()
+        chatbot.model.generate(**inputs, max_new_tokens=1, do_sample=False, pad_token_id=chatbot.tokenizer.pad_token_id)
+        first_token = time.perf_counter() - start
+        start = time.perf_counter()
+        chatbot.model.generate(**inputs, **generate_options)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "load_seconds": chatbot.load_info["load_seconds"],
+        "source": chatbot.load_info["source"],
+        "threads": chatbot.load_info["threads"],
+        "model_mb": loaded - baseline,
+        "peak_rss_mb": resident_memory_mb(),
+        "first_token_ms": first_token * 1000,
+        "tokens_per_second": new_tokens / elapsed,
+        "prompt_tokens": inputs.input_ids.shape[1],
+    }
+
+
+def run_benchmark(model_path: str = None, new_tokens: int = 32):
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        checkpoint = os.path.join(work_dir, "quantized.pt")
+
+        print("=== LocalChatBot CPU Inference ===")
+        print(f"Model: {model_path}, {new_tokens} new tokens, greedy")
+        print(f"{'configuration':28s} {'load s':>7s} {'model MB':>9s} {'RSS MB':>8s} {'TTFT ms':>8s} {'tok/s':>7s}")
+        for label, options in CONFIGURATIONS:
+            if options.get("quantize"):
+                options = dict(options, quantized_checkpoint=checkpoint)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", model_path, json.dumps(options), str(new_tokens)],
+                capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{label:28s} failed: {output.stderr.strip().splitlines()[-1] if output.stderr else ''}")
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{label:28s} {result['load_seconds']:7.2f} {result['model_mb']:9.0f} {result['peak_rss_mb']:8.0f} "
+                  f"{result['first_token_ms']:8.0f} {result['tokens_per_second']:7.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        print(json.dumps(run_configuration(sys.argv[2], json.loads(sys.argv[3]), int(sys.argv[4]))))
+    else:
+        run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                      int(sys.argv[2]) if len(sys.argv) > 2 else 32)
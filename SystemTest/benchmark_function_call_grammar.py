@@ -0,0 +1,177 @@
+"""
+Function-call extraction with and without the registry grammar
+Every request is answered under the function-calling system prompt of
+function_call_grammar.py, once free-form and once with the reply constrained to the
+registry grammar (invoke config "function_call"). Reported per configuration: mean
+generated tokens and latency, replies that do not parse into a valid call (not JSON,
+unknown function, arguments rejected by the router's coercion and validation) and calls
+of the expected function.
+
+With a real checkpoint pass its path; the model answers on its own. Without arguments a
+randomly initialized Qwen3-0.6B-shaped model with STAND_IN_LAYERS decoder layers is
+built (see tiny_qwen3_checkpoint.py). Random weights do not write JSON, so a forward hook
+imitates a small instruction-tuned model: each request has a scripted free-form reply
+with the mistakes such models make (prose around the JSON, code fences, invented or
+misspelled function names, Python quotes, missing arguments), and the hook strongly
+prefers the next token of that script. Under the grammar the preferred token is often
+masked; the hook then prefers the script a few bytes further on, then tokens that close
+the current string, object or number, and otherwise the random weights pick among the
+allowed tokens.
+
+Usage:
+    python SystemTest/benchmark_function_call_grammar.py [model_path]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (request, expected function, scripted free-form reply of the stand-in)
+REQUESTS = [
+    ("把空调调到22度", "climate_module.set_cabin_temperature",
+     '好的，我来帮你把空调调到22度。\n{"name": "climate_module.set_cabin_temperature", '
+     '"arguments": {"temperature": 22.0, "zone": "all"}}'),
+    ("查看电池电量", "battery_module.get_battery_status",
+     '{"name": "battery_module.get_battery_status", "arguments": {}}'),
+    ("音量调到8", "media_module.adjust_volume",
+     '{"name": "media_module.adjust_volume", "arguments": {"level": "8"}}'),
+    ("导航到西湖", "navigation_module.set_destination",
+     '```json\n{"name": "navigation_module.set_destination", "arguments": {"location": "西湖", "waypoints": []}}\n```\n'
+     '已为您设置导航。'),
+    ("切换到运动模式", "driving_module.set_driving_mode",
+     '{"name": "driving_module.set_driving_mode", "arguments": {"mode": "sport"}}'),
+    ("找10公里内的快充桩", "navigation_module.find_charging_stations",
+     '{"name": "navigation_module.find_charging_stations", "arguments": {"radius_km": 10, '
+     '"filter_by": {"fast_charging": true}}}'),
+    ("出发前把车内预热到24度", "climate_module.activate_climate_preconditioning",
+     '{"name": "climate_module.activate_climate_preconditioning", "arguments": {"enable": true, '
+     '"target_temp": 24, "departure_time": "07:30"}}'),
+    ("播放周杰伦的歌", "media_module.play_media",
+     '{"name": "media_module.play_media", "arguments": {"media_type": "music", "source": "QQ音乐", '
+     '"content_id": "周杰伦"}}'),
+    ("这周开了多少公里", "driving_module.get_driving_statistics",
+     '{"name": "driving_module.get_driving_stats", "arguments": {"time_period": "week"}}'),
+    ("把温度调低一点", "climate_module.set_cabin_temperature",
+     "{'name': 'climate_module.set_cabin_temperature', 'arguments': {'temperature': 20.0, 'zone': 'all'}}"),
+    ("导航回家，途经超市", "navigation_module.set_destination",
+     '{"name": "navigation_module.set_destination", "arguments": {"location": "家", "waypoints": ["超市"]}}\n'
+     '我已经为您规划好路线，途经超市后回家。'),
+    ("导航到公司", "navigation_module.set_destination",
+     '{"name": "navigation_module.set_destination", "arguments": {"location": "公司"}}'),
+    ("静音", "media_module.adjust_volume",
+     '{"name": "media_module.adjust_volume", "arguments": {"level": 0}}'),
+    ("今天开了多久", "driving_module.get_driving_statistics",
+     '根据您的需求，应该调用 driving_module.get_driving_statistics，参数 time_period 为 "today"。'),
+]
+MAX_TOKENS = 160
+STAND_IN_LAYERS = 4
+LOOKAHEAD = 4  # Bytes of the script the stand-in may skip when its next token is masked
+FALLBACK = (b'"', b"}", b"]", b".", b"0")  # Preferred after the script: close strings, objects and numbers
+
+
+class StandInExtractor:
+    """Forward hook making a random model follow a scripted reply as far as it is allowed to"""
+
+    def __init__(self, tokenizer, eos_token_id: int):
+        from ChatBots.function_call_grammar import TokenVocabulary
+
+        self.vocabulary = TokenVocabulary(tokenizer)
+        self.token_ids = {self.vocabulary.token_bytes(token_id): token_id for token_id in range(len(tokenizer))
+                          if self.vocabulary.token_bytes(token_id) is not None}
+        self.longest = max(len(data) for data in self.token_ids)
+        self.eos_token_id = eos_token_id
+        self.reset("")
+
+    def reset(self, script: str):
+        self.script, self.position, self.step = script.encode("utf-8"), 0, 0
+
+    def _next_token(self, position: int) -> int:
+        """Token with the longest bytes the script continues with at position"""
+        for length in range(min(self.longest, len(self.script) - position), 0, -1):
+            token_id = self.token_ids.get(self.script[position:position + length])
+            if token_id is not None:
+                return token_id
+        return self.eos_token_id
+
+    def __call__(self, module, args, kwargs, output):
+        if self.step > 0:
+            # Align the generated bytes to the script, skipping script bytes the reply left out
+            for byte in self.vocabulary.token_bytes(int(kwargs.get("input_ids")[0, -1])) or b"":
+                found = self.script.find(byte, self.position)
+                if found >= 0:
+                    self.position = found + 1
+        self.step += 1
+        logits = output.logits[:, -1, :]
+        top = logits.max()
+        for data in FALLBACK:
+            logits[:, self.token_ids[data]] = top + 50.0
+        if self.position >= len(self.script):
+            logits[:, self.eos_token_id] = top + 100.0
+            return output
+        # The script's next token first, then the tokens a few bytes further on
+        for skip in reversed(range(LOOKAHEAD)):
+            if self.position + skip < len(self.script):
+                logits[:, self._next_token(self.position + skip)] = top + 100.0 * (LOOKAHEAD - skip)
+        return output
+
+
+def run(chatbot, stand_in, label, function_call):
+    from ChatBots.function_call_grammar import function_call_prompt, registry_functions
+
+    grammar = chatbot._function_call_grammar(True)
+    system_prompt = function_call_prompt(registry_functions())
+    tokens, seconds, invalid, expected = 0, 0.0, 0, 0
+    for request, function_name, script in REQUESTS:
+        if stand_in is not None:
+            stand_in.reset(script)
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": request}]
+        config = {"max_tokens": MAX_TOKENS, "logprobs": True, **({"function_call": True} if function_call else {})}
+        start = time.perf_counter()
+        reply = chatbot.invoke({"messages": messages}, config)
+        seconds += time.perf_counter() - start
+        tokens += reply["new_tokens"]
+        try:
+            name, _ = grammar.parse(reply["content"])
+            expected += name == function_name
+        except ValueError:
+            invalid += 1
+    n = len(REQUESTS)
+    print(f"{label:12s} {tokens / n:11.1f} {seconds / n:8.2f} {invalid / n:8.0%} {expected / n:9.0%}")
+
+
+def run_benchmark(model_path: str = None):
+    from ChatBots.LocalChatBot import LocalChatBot
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stand_in = None
+        random_weights = model_path is None
+        if random_weights:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-random"), "0.6b",
+                                          num_hidden_layers=STAND_IN_LAYERS)
+        chatbot = LocalChatBot(model_path, quantize=True)
+        chatbot.model.generation_config.do_sample = False
+        if random_weights:
+            stand_in = StandInExtractor(chatbot.tokenizer, chatbot.tokenizer.eos_token_id)
+            chatbot.model.register_forward_hook(stand_in, with_kwargs=True)
+        start = time.perf_counter()
+        chatbot._function_call_grammar(True)
+        compile_seconds = time.perf_counter() - start
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+
+        print("=== Function Call Grammar ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']}), {len(REQUESTS)} requests, "
+              f"max {MAX_TOKENS} new tokens, greedy; grammar compiled in {compile_seconds * 1000:.0f} ms")
+        print(f"{'decoding':12s} {'new tokens':>11s} {'mean s':>8s} {'invalid':>8s} {'expected':>9s}")
+        run(chatbot, stand_in, "free-form", False)
+        run(chatbot, stand_in, "grammar", True)
+        grammar = chatbot._function_call_grammar(True)
+        print(f"token masks: {grammar.stats['mask_misses']} computed, {grammar.stats['mask_hits']} from cache")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
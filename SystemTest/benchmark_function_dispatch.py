@@ -0,0 +1,68 @@
+"""
+Benchmark for per-call dispatch cost in function_calling_interface._execute_function
+Compares the cached callable lookup with importing the plugin module on every call.
+
+Usage:
+    python SystemTest/benchmark_function_dispatch.py
+"""
+
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ChatBots.FunctionCalling_router import function_calling_interface
+
+PLUGIN_SOURCE = '''
+import json
+import datetime
+
+VEHICLE_STATE = {"battery": 80, "range_km": 320}
+
+def get_battery_status():
+    return dict(VEHICLE_STATE)
+'''
+
+
+def legacy_execute(func_info, params_dict):
+    """Per-call import as previously done in _execute_function"""
+    spec = importlib.util.spec_from_file_location(func_info['module_name'], func_info['module_path'])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[func_info['module_name']] = module
+    spec.loader.exec_module(module)
+    return getattr(module, func_info['function_name'])(**params_dict)
+
+
+def run_benchmark(number: int = 2000):
+    test_dir = tempfile.mkdtemp()
+    try:
+        module_path = os.path.join(test_dir, "bench_battery_module.py")
+        with open(module_path, "w", encoding="utf-8") as f:
+            f.write(PLUGIN_SOURCE)
+
+        func_info = {
+            'module_name': 'bench_battery_module',
+            'module_path': module_path,
+            'function_name': 'get_battery_status',
+            'parameters': []
+        }
+        router = function_calling_interface()
+
+        legacy = timeit.timeit(lambda: legacy_execute(func_info, {}), number=number) / number
+        cached = timeit.timeit(lambda: router._execute_function(func_info, {}), number=number * 50) / (number * 50)
+
+        print("=== Function Dispatch Benchmark ===")
+        print(f"Import per call:      {legacy * 1e6:10.2f} us")
+        print(f"Cached callable:      {cached * 1e6:10.2f} us (includes mtime check)")
+        print(f"Speed-up:             {legacy / cached:10.1f}x")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,96 @@
+"""
+Benchmark for fuzzy function search on a large synthetic catalog
+Compares rebuilding the search targets on every query (previous behaviour),
+single-query search over the precomputed corpus, and the vectorized batch API.
+
+Usage:
+    python SystemTest/benchmark_function_search.py [function_count] [query_count]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ChatBots import FunctionCalling_router as router_module
+from ChatBots.FunctionCalling_router import FunctionRegistry
+
+MODULES = ["battery", "climate", "navigation", "media", "driving", "seat", "window", "light", "phone", "weather"]
+VERBS = ["get", "set", "adjust", "activate", "find", "play", "open", "close", "toggle", "query"]
+NOUNS = ["status", "temperature", "destination", "volume", "mode", "position", "level", "station",
+         "statistics", "schedule", "contact", "forecast", "brightness", "heating", "route"]
+
+
+def build_catalog(function_count: int) -> dict:
+    """Generate registry data with function_count functions spread over synthetic modules"""
+    rng = random.Random(42)
+    modules = {}
+    for i in range(function_count):
+        module_name = f"{MODULES[i % len(MODULES)]}_module_{i // 500}"
+        function_name = f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}_{i}"
+        modules.setdefault(module_name, []).append({"function_name": function_name, "parameters": []})
+    return {"modules": [
+        {"module_name": name, "module_path": f"/vehicle/systems/{name}.py", "functions": functions}
+        for name, functions in modules.items()
+    ]}
+
+
+def legacy_search(registry, query, limit=1):
+    """Per-query corpus rebuild as previously done in semantic_search"""
+    search_targets = []
+    for idx, func_info in enumerate(registry.function_index):
+        search_targets.extend([(func_info['function_name'], idx),
+                               (func_info['search_text'], idx),
+                               (func_info['module_name'], idx)])
+    return router_module.process.extract(query, [target[0] for target in search_targets],
+                                         scorer=router_module.fuzz.WRatio, limit=limit * 3)
+
+
+def run_benchmark(function_count: int = 50000, query_count: int = 64):
+    registry = FunctionRegistry()
+    registry.registry_data = build_catalog(function_count)
+
+    start = time.perf_counter()
+    registry._build_function_index()
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(7)
+    queries = [f"{rng.choice(VERBS)} {rng.choice(NOUNS)}" for _ in range(query_count)]
+
+    start = time.perf_counter()
+    for query in queries:
+        legacy_search(registry, query, limit=5)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        registry.semantic_search(query, limit=5)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = registry.batch_semantic_search(queries, limit=5)
+    batch_time = time.perf_counter() - start
+
+    if router_module.RAPIDFUZZ_AVAILABLE and router_module.NUMPY_AVAILABLE:
+        backend = "rapidfuzz cdist"
+    elif router_module.NUMPY_AVAILABLE:
+        backend = "NumPy fallback"
+    else:
+        backend = "pure Python fallback"
+
+    print("=== Function Search Benchmark ===")
+    print(f"Catalog: {function_count} functions ({len(registry.search_corpus)} targets), {query_count} queries")
+    print(f"Batch backend: {backend}")
+    print(f"Index + corpus build (once):   {build_time * 1000:10.1f} ms")
+    print(f"Rebuild per query:             {legacy_time / query_count * 1000:10.2f} ms/query")
+    print(f"Precomputed corpus:            {single_time / query_count * 1000:10.2f} ms/query")
+    print(f"Batch search:                  {batch_time / query_count * 1000:10.2f} ms/query")
+    print(f"Example: '{queries[0]}' -> {[item['full_name'] for item in results[0]]}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run_benchmark(*args)
@@ -0,0 +1,116 @@
+"""
+LocalChatBot on each inference backend: load time, TTFT, decode speed and memory on CPU
+Every configuration runs in its own process, so the resident memory is that of one model:
+it loads LocalChatBot with the configuration's options, streams the same requests
+(daily_chat system prompt, greedy, MAX_TOKENS new tokens) and reports the median
+time-to-first-token, decode tokens/sec after the first token, and the process's resident
+memory after loading and its peak. Backends whose package or model file is missing are
+listed as skipped with the reason.
+
+With a real checkpoint pass its directory; put the GGUF conversion (llama.cpp's
+convert_hf_to_gguf.py, e.g. q8_0) and the ONNX export (models/llm/model2onnx.py) in it,
+or the ONNX backend exports on its first load. Without arguments a randomly initialized
+Qwen3-0.6B-shaped checkpoint is built (see tiny_qwen3_checkpoint.py), which only the
+transformers and ONNX backends can load.
+
+Usage:
+    python SystemTest/benchmark_inference_backends.py [model_path]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIGURATIONS = [
+    ("transformers fp32", {}),
+    ("transformers bf16", {"dtype": "bf16"}),
+    ("transformers int8", {"quantize": True}),
+    ("llama_cpp", {"backend": "llama_cpp"}),
+    ("onnxruntime", {"backend": "onnxruntime"}),
+]
+PROMPTS = ["打开车窗", "今天天气怎么样？", "讲一个睡前故事", "附近有加油站吗", "介绍一下杭州西湖"]
+MAX_TOKENS = 32
+
+
+def process_memory_mb():
+    """Resident and peak resident memory of this process in MB (Linux)"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS", "VmHWM")):
+                name, value = line.split(":")
+                values[name] = int(value.split()[0]) / 1024
+    return values.get("VmRSS", 0.0), values.get("VmHWM", 0.0)
+
+
+def measure(model_path: str, options: dict) -> dict:
+    """Load one configuration and stream PROMPTS (runs in the child process)"""
+    from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+
+    start = time.perf_counter()
+    chatbot = LocalChatBot(model_path, **options)
+    load_seconds = time.perf_counter() - start
+    loaded_mb, _ = process_memory_mb()
+    chatbot.model.generation_config.do_sample = False
+    system_prompt = load_prompt("daily_chat")
+    chatbot.invoke("warm-up", {"max_tokens": 2})
+
+    ttft, decode_rates, tokens = [], [], 0
+    for prompt in PROMPTS:
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+        for _ in chatbot.stream({"messages": messages}, {"max_tokens": MAX_TOKENS}):
+            pass
+        stats = chatbot.get_stream_stats()
+        ttft.append(stats["ttft_ms"])
+        tokens += stats["tokens"]
+        if stats["tokens"] > 1:
+            decode_rates.append((stats["tokens"] - 1) / ((stats["total_ms"] - stats["ttft_ms"]) / 1000))
+    _, peak_mb = process_memory_mb()
+    return {"load_s": load_seconds, "ttft_ms": statistics.median(ttft),
+            "tokens_per_second": statistics.median(decode_rates) if decode_rates else 0.0,
+            "tokens": tokens / len(PROMPTS), "rss_mb": loaded_mb, "peak_rss_mb": peak_mb,
+            "model": chatbot.load_info["source"]}
+
+
+def run_configuration(model_path: str, options: dict) -> dict:
+    """measure() in a fresh process; {"skipped": reason} when it fails"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", model_path, json.dumps(options)],
+                               capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        errors = [line for line in completed.stderr.strip().splitlines() if line.strip()]
+        return {"skipped": errors[-1] if errors else f"exit code {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+def run_benchmark(model_path: str = None):
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-random"), "0.6b")
+
+        print("=== Inference Backends ===")
+        print(f"Model: {model_path}, {len(PROMPTS)} streamed requests with the daily_chat system prompt, "
+              f"greedy, max {MAX_TOKENS} new tokens, one process per configuration")
+        print(f"{'configuration':18s} {'load s':>7s} {'TTFT ms':>8s} {'tok/s':>7s} {'RSS MB':>7s} {'peak MB':>8s}")
+        for label, options in CONFIGURATIONS:
+            result = run_configuration(model_path, options)
+            if "skipped" in result:
+                print(f"{label:18s} skipped: {result['skipped']}")
+                continue
+            print(f"{label:18s} {result['load_s']:7.1f} {result['ttft_ms']:8.0f} {result['tokens_per_second']:7.1f} "
+                  f"{result['rss_mb']:7.0f} {result['peak_rss_mb']:8.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(sys.argv[2], json.loads(sys.argv[3]))))
+    else:
+        run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
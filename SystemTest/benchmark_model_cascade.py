@@ -0,0 +1,120 @@
+"""
+Confidence-based model cascade: escalation rate vs. latency and quality
+Every prompt is answered by the small and the large model alone (greedy), recording the
+small model's confidence (exp of the mean token log-prob) and both latencies. The
+threshold is calibrated on the first half of the prompts (the lowest threshold whose
+answers match the large model on at least TARGET_AGREEMENT of them) and the trade-off is
+reported on the held-out second half: for thresholds at quantiles of the small model's
+confidence from the per-model measurements, then for the calibrated threshold from an
+actual ModelCascade run. Quality is agreement with the large model's reply.
+
+With real checkpoints pass the small and the large model (model2file.json names or
+directories, e.g. Qwen3-0.6B Qwen3-4B). Without arguments the random stand-ins of
+benchmark_speculative_decoding.py are used: a Qwen3-0.6B-shaped model with damped deep
+layers as the large model and its first DRAFT_LAYERS layers as the small model.
+
+Usage:
+    python SystemTest/benchmark_model_cascade.py [small] [large]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPTS = [
+    "打开车窗", "今天天气怎么样？", "播放周杰伦的歌", "把空调调到22度", "导航到最近的充电站", "查看电池电量",
+    "讲一个笑话", "明天早上八点提醒我开会", "关闭座椅加热", "解释一下能量回收的原理", "附近有什么好吃的", "远程锁车",
+    "打开天窗", "现在几点了？", "播放新闻", "把音量调小一点", "导航回家", "还能开多少公里",
+    "讲一个睡前故事", "后天下雨吗", "打开驾驶座座椅通风", "介绍一下杭州西湖", "找一个停车场", "关闭车内灯",
+    "打开后备箱", "今天限行吗？", "播放轻音乐", "把温度调高两度", "导航到公司", "轮胎气压正常吗",
+    "推荐一部电影", "下午三点提醒我充电", "打开方向盘加热", "什么是自动驾驶", "附近有加油站吗", "关闭车窗",
+    "打开雨刷", "周末适合去哪里玩？", "下一首歌", "把风量调到最大",
+]
+MAX_TOKENS = 8
+TARGET_AGREEMENT = 0.9
+DRAFT_LAYERS = 4
+DAMPING = 0.05
+
+
+def measure(pool, model, prompts, options):
+    """(content, confidence, seconds) of a model's greedy reply to each prompt"""
+    import math
+
+    results = []
+    with pool.lease(model, **options) as chatbot:
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+        for prompt in prompts:
+            start = time.perf_counter()
+            reply = chatbot.invoke(prompt, {"max_tokens": MAX_TOKENS, "do_sample": False, "logprobs": True})
+            results.append((reply["content"], math.exp(reply["mean_logprob"]), time.perf_counter() - start))
+    return results
+
+
+def replay(small, large, threshold):
+    """Escalation rate, mean latency and agreement of a cascade replayed from per-model measurements"""
+    escalated = [confidence < threshold for _, confidence, _ in small]
+    seconds = [s[2] + (l[2] if up else 0.0) for s, l, up in zip(small, large, escalated)]
+    agree = [up or s[0] == l[0] for s, l, up in zip(small, large, escalated)]
+    n = len(small)
+    return sum(escalated) / n, sum(seconds) / n, sum(agree) / n
+
+
+def calibrate(small, large):
+    """Lowest threshold reaching TARGET_AGREEMENT"""
+    for threshold in sorted({confidence for _, confidence, _ in small}) + [float("inf")]:
+        if replay(small, large, threshold)[2] >= TARGET_AGREEMENT:
+            return threshold
+    return float("inf")
+
+
+def run_benchmark(small_model: str = None, large_model: str = None):
+    from ChatBots.model_cascade import ModelCascade
+    from ChatBots.model_pool import ModelPool
+
+    options = {"quantize": True}
+    with tempfile.TemporaryDirectory() as work_dir:
+        if small_model is None:
+            from benchmark_speculative_decoding import damp_deep_layers, truncated_draft
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            large_model = damp_deep_layers(build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b"),
+                                           DRAFT_LAYERS, DAMPING)
+            small_model = truncated_draft(large_model, os.path.join(work_dir, "small"), DRAFT_LAYERS)
+        pool = ModelPool(idle_timeout=None)
+        for model in (small_model, large_model):
+            with pool.lease(model, **options) as chatbot:
+                chatbot.model.generation_config.do_sample = False
+
+        half = len(PROMPTS) // 2
+        small = measure(pool, small_model, PROMPTS, options)
+        large = measure(pool, large_model, PROMPTS, options)
+        threshold = calibrate(small[:half], large[:half])
+        held_small, held_large = small[half:], large[half:]
+
+        print("=== Model Cascade ===")
+        print(f"Small: {small_model}, large: {large_model} (int8), {len(PROMPTS) - half} held-out prompts "
+              f"({half} for calibration), max {MAX_TOKENS} new tokens, greedy")
+        print(f"{'configuration':30s} {'escalated':>10s} {'mean s':>8s} {'agreement':>10s}")
+        confidences = sorted(confidence for _, confidence, _ in held_small)
+        for quantile in (0.0, 0.25, 0.5, 0.75):
+            cut = confidences[int(quantile * len(confidences))] if quantile else 0.0
+            escalation, seconds, agreement = replay(held_small, held_large, cut)
+            label = f"threshold {cut:.2e} (replayed)" if quantile else "small model only"
+            print(f"{label:30s} {escalation:10.0%} {seconds:8.2f} {agreement:10.0%}")
+        print(f"{'large model only':30s} {'-':>10s} {sum(l[2] for l in held_large) / len(held_large):8.2f} {1:10.0%}")
+
+        cascade = ModelCascade([small_model, large_model], threshold=threshold, pool=pool, **options)
+        results = [cascade.invoke(prompt, {"max_tokens": MAX_TOKENS}) for prompt in PROMPTS[half:]]
+        stats = cascade.get_stats()
+        agreement = sum(result["content"] == l[0] for result, l in zip(results, held_large)) / len(results)
+        label = f"cascade, calibrated {threshold:.2e}"
+        print(f"{label:30s} {stats['escalation_rate']:10.0%} {stats['mean_seconds']:8.2f} {agreement:10.0%}")
+        pool.clear()
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  sys.argv[2] if len(sys.argv) > 2 else None)
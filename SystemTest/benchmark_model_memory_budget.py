@@ -0,0 +1,100 @@
+"""
+Switching between models under a memory budget (ModelPool memory_budget_mb)
+A request stream alternates between a small, a medium and a large model. Each budget is
+run on the same stream, and loads, hits, evictions, total time and peak weight memory
+are reported. A second table compares loading the large model memory-mapped (bf16, the
+stored dtype) with converting it to fp32.
+
+With real checkpoints pass three model2file.json names or directories (e.g. Qwen3-0.6B
+Qwen3-1.7B Qwen3-4B). Without arguments, Qwen3-0.6B-shaped random checkpoints with 7,
+14 and 28 decoder layers stand in for them (see tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_model_memory_budget.py [small] [medium] [large]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Request stream: model index per request
+WORKLOAD = [0, 1, 0, 2, 0, 1, 0, 0, 2, 1, 0, 2]
+MAX_TOKENS = 4
+DTYPE = "bf16"
+
+
+def rss_mb():
+    """Anonymous and file-backed resident memory of this process in MB (Linux)"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                name, value = line.split(":")
+                values[name] = int(value.split()[0]) / 1024
+    return values.get("RssAnon", 0.0), values.get("RssFile", 0.0)
+
+
+def run_workload(models, budget_mb):
+    from ChatBots.model_pool import ModelPool
+
+    pool = ModelPool(idle_timeout=None, memory_budget_mb=budget_mb)
+    peak_mb = 0.0
+    start = time.perf_counter()
+    for index in WORKLOAD:
+        with pool.lease(models[index], dtype=DTYPE) as chatbot:
+            chatbot.invoke("打开车窗", {"max_tokens": MAX_TOKENS})
+        peak_mb = max(peak_mb, pool.get_stats()["memory_mb"])
+    seconds = time.perf_counter() - start
+    stats = pool.get_stats()
+    pool.clear()
+    return stats, seconds, peak_mb
+
+
+def compare_load_dtypes(model_path):
+    from ChatBots.model_loader import load_causal_lm, model_memory_bytes
+
+    print(f"{'load dtype':12s} {'load s':>7s} {'weights MB':>11s} {'anon RSS +MB':>13s}")
+    for dtype in (DTYPE, "fp32"):
+        gc.collect()
+        anon_before, _ = rss_mb()
+        _, model, info = load_causal_lm(model_path, dtype=dtype)
+        anon_after, _ = rss_mb()
+        print(f"{dtype:12s} {info['load_seconds']:7.2f} {model_memory_bytes(model) / 2 ** 20:11.0f} "
+              f"{anon_after - anon_before:13.0f}")
+        del model
+        gc.collect()
+
+
+def run_benchmark(models=None):
+    from ChatBots.model_loader import estimate_model_bytes, resolve_model_path
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if not models:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            models = [build_tiny_qwen3(os.path.join(work_dir, f"qwen3-{layers}-layers"), "0.6b", seed=layers,
+                                       num_hidden_layers=layers)
+                      for layers in (7, 14, 28)]
+        models = [resolve_model_path(model) for model in models]
+        sizes = [estimate_model_bytes(model, dtype=DTYPE) / 2 ** 20 for model in models]
+        budgets = [None, sizes[1] + sizes[2], sizes[2]]
+
+        print("=== Model Memory Budget ===")
+        print(f"Models ({DTYPE}): " + ", ".join(f"{os.path.basename(m)} {s:.0f} MB" for m, s in zip(models, sizes)))
+        print(f"{len(WORKLOAD)} requests, {MAX_TOKENS} new tokens each")
+        print(f"{'budget MB':>10s} {'loads':>6s} {'hits':>5s} {'evictions':>10s} {'peak MB':>8s} {'total s':>8s}")
+        for budget in budgets:
+            stats, seconds, peak_mb = run_workload(models, budget)
+            label = f"{budget:.0f}" if budget is not None else "none"
+            print(f"{label:>10s} {stats['loads']:6d} {stats['hits']:5d} {stats['evictions']:10d} "
+                  f"{peak_mb:8.0f} {seconds:8.2f}")
+        print()
+        compare_load_dtypes(models[2])
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1:4] or None)
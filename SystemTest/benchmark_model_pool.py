@@ -0,0 +1,70 @@
+"""
+Per-query latency of call_local-style requests with and without the model pool
+- new LocalChatBot: what call_local did, a full model load for every query
+- model pool: shared_model_pool.lease, the model is loaded by the first query only
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built (see
+tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_model_pool.py [model_path] [queries]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = ["打开车窗", "今天天气怎么样？", "播放音乐", "导航到最近的充电站", "关闭空调"]
+MAX_TOKENS = 8
+
+
+def run_benchmark(model_path: str = None, queries: int = 5):
+    from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+    from ChatBots.model_pool import ModelPool
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        system_prompt = load_prompt("daily_chat")
+        requests = [QUERIES[i % len(QUERIES)] for i in range(queries)]
+
+        def ask(chatbot, query):
+            messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": query}]
+            chatbot.invoke({"messages": messages}, {"max_tokens": MAX_TOKENS})
+
+        fresh = []
+        for query in requests:
+            start = time.perf_counter()
+            ask(LocalChatBot(model_path), query)
+            fresh.append(time.perf_counter() - start)
+            # Free the discarded copy (LocalChatBot and its SessionManager reference each other)
+            gc.collect()
+
+        pool = ModelPool()
+        pooled = []
+        for query in requests:
+            start = time.perf_counter()
+            with pool.lease(model_path) as chatbot:
+                ask(chatbot, query)
+            pooled.append(time.perf_counter() - start)
+
+        print("=== Model Pool ===")
+        print(f"Model: {model_path}, {queries} queries, {MAX_TOKENS} new tokens each")
+        print(f"{'query':>5s} {'new LocalChatBot s':>19s} {'model pool s':>13s}")
+        for i, (fresh_s, pooled_s) in enumerate(zip(fresh, pooled), 1):
+            print(f"{i:5d} {fresh_s:19.2f} {pooled_s:13.2f}")
+        later = slice(1, None)
+        print(f"Mean after the first query: {sum(fresh[later]) / max(1, queries - 1):.2f} s vs "
+              f"{sum(pooled[later]) / max(1, queries - 1):.2f} s; pool stats: loads={pool.get_stats()['loads']}, "
+              f"hits={pool.get_stats()['hits']}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark for per-call parameter validation
+Compares the compiled validators (built once at registry load) with the previous
+approach of re-deriving parameter sets and type maps on every call.
+
+Usage:
+    python SystemTest/benchmark_parameter_validation.py
+"""
+
+import sys
+import os
+import timeit
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RegistryModule.parameter_validator import compile_validator
+
+
+def legacy_validate(func_info, params_dict):
+    """Per-call validation as previously done in function_calling_interface._validate_parameters"""
+    type_mapping = {
+        'str': str, 'int': int, 'float': float, 'bool': bool,
+        'list': list, 'dict': dict, 'tuple': tuple, 'None': type(None)
+    }
+    expected_params = func_info.get('parameters', [])
+    required_param_names = {param['name'] for param in expected_params}
+    provided_param_names = set(params_dict.keys())
+    if required_param_names - provided_param_names:
+        return (False, "missing")
+    if provided_param_names - required_param_names:
+        return (False, "unexpected")
+    for param in expected_params:
+        param_name = param['name']
+        expected_type = param['type']
+        if param_name in params_dict and expected_type in type_mapping:
+            provided_value = params_dict[param_name]
+            if expected_type == 'None' and provided_value is not None:
+                return (False, "type")
+            elif expected_type != 'None' and not isinstance(provided_value, type_mapping[expected_type]):
+                return (False, "type")
+    return (True, None)
+
+
+def run_benchmark(number: int = 200000):
+    func_info = {
+        'function_name': 'activate_climate_preconditioning',
+        'parameters': [
+            {'name': 'enable', 'type': 'bool'},
+            {'name': 'target_temp', 'type': 'float'},
+            {'name': 'departure_time', 'type': 'str'}
+        ]
+    }
+    params = {'enable': True, 'target_temp': 22.5, 'departure_time': '07:30'}
+
+    compile_time = timeit.timeit(lambda: compile_validator(func_info['parameters']), number=1000) / 1000
+    validator = compile_validator(func_info['parameters'])
+
+    legacy = timeit.timeit(lambda: legacy_validate(func_info, params), number=number) / number
+    compiled = timeit.timeit(lambda: validator(params), number=number) / number
+
+    print("=== Parameter Validation Micro-benchmark ===")
+    print(f"Calls per measurement: {number}")
+    print(f"One-off compile cost:   {compile_time * 1e6:8.2f} us")
+    print(f"Legacy per-call:        {legacy * 1e6:8.2f} us")
+    print(f"Compiled per-call:      {compiled * 1e6:8.2f} us")
+    print(f"Speed-up:               {legacy / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,83 @@
+"""
+Prefill time saved by the system prompt prefix cache of LocalChatBot
+Measures time-to-first-token (invoke with max_tokens=1, i.e. the prefill) with and
+without the prefix cache for two system prompts:
+- daily_chat: load_prompt("daily_chat")
+- function_calling: a system prompt listing the functions of RegistryModule/registry.json
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built (see
+tiny_qwen3_checkpoint.py). Its small tokenizer splits Chinese text into more tokens than
+the Qwen3 tokenizer; the token counts are printed next to the timings.
+
+Usage:
+    python SystemTest/benchmark_prefix_cache.py [model_path]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = ["打开车窗", "今天天气怎么样？", "导航到最近的充电站", "把空调调到二十二度", "播放一首轻松的音乐"]
+
+
+def function_calling_prompt() -> str:
+    registry_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "RegistryModule", "registry.json")
+    with open(registry_path, 'r', encoding='utf-8') as f:
+        functions = [
+            {"name": func["function_name"], "description": func["description"], "parameters": func["parameters"]}
+            for module in json.load(f)["modules"] for func in module["functions"]
+        ]
+    return ("You are the in-car assistant. Call one of the following functions when the user asks for "
+            "a vehicle operation and answer in JSON.\n" + json.dumps(functions, ensure_ascii=False))
+
+
+def median_prefill_ms(chatbot, system_prompt: str, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": query}]
+            start = time.perf_counter()
+            chatbot.invoke({"messages": messages}, {"max_tokens": 1})
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(model_path: str = None, rounds: int = 3):
+    from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+    from ChatBots.prefix_cache import PrefixKVCache
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        chatbot = LocalChatBot(model_path, quantize=True, prefix_cache=False)
+
+        print("=== System Prompt Prefix Cache ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']} on {chatbot.device})")
+        print(f"{'system prompt':18s} {'prompt tok':>10s} {'no cache ms':>12s} {'cache ms':>9s} {'saved':>7s}")
+        for name, system_prompt in [("daily_chat", load_prompt("daily_chat")),
+                                    ("function_calling", function_calling_prompt())]:
+            chatbot.prefix_cache = None
+            chatbot.invoke(QUERIES[0], {"max_tokens": 1})  # warm-up
+            uncached = median_prefill_ms(chatbot, system_prompt, rounds)
+
+            chatbot.prefix_cache = PrefixKVCache()
+            cached = median_prefill_ms(chatbot, system_prompt, rounds)
+            stats = chatbot.get_prefix_cache_stats()
+
+            ids, prefix_length = chatbot._tokenize(
+                {"messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": QUERIES[0]}]})
+            print(f"{name:18s} {f'{prefix_length}/{len(ids)}':>10s} {uncached:12.1f} {cached:9.1f} "
+                  f"{(1 - cached / uncached) * 100:6.1f}%   (saved_prefill_ms={stats['saved_prefill_ms']:.0f} "
+                  f"over {stats['hits']} hits)")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,93 @@
+"""
+Prompt lookup cost: filesystem walk per call vs. the in-memory PromptRegistry
+- filesystem: what load_prompt did on every request before the registry (find the project
+  root, list ExtendMaterial/Prompts, check and read the prompt file, print debug lines)
+- registry: load_prompt served from memory
+- system prefix: rendering and tokenizing the system message for the prefix cache, per
+  request vs. the registry's cached token ids (tokenizer of the given model, or the tiny
+  test tokenizer)
+
+Usage:
+    python SystemTest/benchmark_prompt_registry.py [model_path] [calls]
+"""
+
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def filesystem_lookup(start: Path) -> str:
+    """The per-call steps of the former load_prompt("daily_chat")"""
+    current = start
+    while not (current / "ExtendMaterial" / "Prompts").exists() and current.parent != current:
+        current = current.parent
+    prompts_dir = current / "ExtendMaterial" / "Prompts"
+    print(f"Project root: {current}")
+    print(f"Prompts directory: {prompts_dir}")
+    print(f"Prompts directory exists: {prompts_dir.exists()}")
+    print(f"Directory contents: {[f.name for f in prompts_dir.iterdir()]}")
+    prompt_path = prompts_dir / "DailyChat.md"
+    print(f"Selected prompt path: {prompt_path}")
+    print(f"File exists: {prompt_path.is_file()}")
+    prompt = prompt_path.read_text(encoding="utf-8")
+    print(f"Successfully read prompt file: {len(prompt)} characters")
+    return prompt
+
+
+def per_call_us(function, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run_benchmark(model_path: str = None, calls: int = 2000):
+    from ChatBots.LocalChatBot import load_prompt
+    from ChatBots.prefix_cache import split_prefix
+    from ChatBots.prompt_registry import default_registry
+
+    if model_path:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+    else:
+        from tiny_qwen3_checkpoint import build_tokenizer
+        tokenizer = build_tokenizer()
+
+    start_dir = Path(__file__).resolve().parent.parent / "ChatBots"
+    stdout = io.StringIO()
+    with redirect_stdout(stdout):
+        filesystem_us = per_call_us(lambda: filesystem_lookup(start_dir), calls)
+    registry_us = per_call_us(lambda: load_prompt("daily_chat"), calls)
+
+    system_prompt = load_prompt("daily_chat")
+    messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": "打开车窗"}]
+    text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+
+    def render_prefix():
+        prefix_text = tokenizer.apply_chat_template(messages[:1], tokenize=False, add_generation_prompt=False)
+        return split_prefix(tokenizer, text, prefix_text)
+
+    def cached_prefix():
+        prefix_text, prefix_ids = default_registry().chat_prefix(tokenizer, system_prompt)
+        return split_prefix(tokenizer, text, prefix_text, prefix_ids)
+
+    render_us = per_call_us(render_prefix, calls // 10)
+    cached_us = per_call_us(cached_prefix, calls // 10)
+
+    print("=== Prompt Registry ===")
+    print(f"{'step':34s} {'per call':>12s}")
+    print(f"{'load_prompt, filesystem walk':34s} {filesystem_us:9.1f} us  ({len(stdout.getvalue()) / calls:.0f} bytes printed)")
+    print(f"{'load_prompt, registry':34s} {registry_us:9.1f} us  (nothing printed)")
+    print(f"{'system prefix, rendered per call':34s} {render_us:9.1f} us")
+    print(f"{'system prefix, registry':34s} {cached_us:9.1f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,63 @@
+"""
+Per-call overhead of running a plugin function in a SandboxPool worker
+Compares in-process execution, a warm pre-forked worker and a fresh process per call.
+
+Usage:
+    python SystemTest/benchmark_sandbox_pool.py
+"""
+
+import sys
+import os
+import tempfile
+import timeit
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RegistryModule.sandbox_pool import SandboxPool, _load_module
+
+PLUGIN_SOURCE = '''
+def set_volume(level, app="music"):
+    return {"status": "success", "app": app, "volume": level}
+'''
+
+
+def _process_per_call(plugin_path, kwargs):
+    """Baseline isolation: a new process for every call"""
+    pool = SandboxPool(num_workers=1, preload=[plugin_path], memory_limit_mb=None)
+    try:
+        return pool.call(plugin_path, "set_volume", kwargs)
+    finally:
+        pool.close()
+
+
+def run_benchmark(number: int = 2000):
+    with tempfile.TemporaryDirectory() as test_dir:
+        plugin_path = os.path.join(test_dir, "volume_plugin.py")
+        with open(plugin_path, 'w') as f:
+            f.write(PLUGIN_SOURCE)
+        kwargs = {"level": 40, "app": "music"}
+
+        func = _load_module(plugin_path, {}).set_volume
+        in_process = timeit.timeit(lambda: func(**kwargs), number=number) / number
+
+        with SandboxPool(num_workers=2, preload=[plugin_path], max_calls_per_worker=0) as pool:
+            pool.call(plugin_path, "set_volume", kwargs)
+            pooled = timeit.timeit(lambda: pool.call(plugin_path, "set_volume", kwargs), number=number) / number
+
+        with SandboxPool(num_workers=2, preload=[plugin_path], max_calls_per_worker=100) as pool:
+            recycling = timeit.timeit(lambda: pool.call(plugin_path, "set_volume", kwargs), number=number) / number
+
+        fresh_runs = max(number // 100, 5)
+        fresh = timeit.timeit(lambda: _process_per_call(plugin_path, kwargs), number=fresh_runs) / fresh_runs
+
+    print("=== Sandbox Pool Per-call Overhead ===")
+    print(f"Calls per measurement: {number}")
+    print(f"In-process:                    {in_process * 1e6:10.2f} us")
+    print(f"Warm worker:                   {pooled * 1e6:10.2f} us  (+{(pooled - in_process) * 1e6:.2f} us)")
+    print(f"Recycled every 100 calls:      {recycling * 1e6:10.2f} us")
+    print(f"Process per call:              {fresh * 1e6:10.2f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,129 @@
+"""
+Speculative decoding vs. plain decoding on chat prompts
+Each prompt is answered by LocalChatBot.invoke with the target model alone and with a
+draft model proposing tokens (LocalChatBot.enable_speculative_decoding); tokens/sec and
+the draft acceptance rate are reported.
+
+With real checkpoints pass the target and the draft (a model2file.json name or a
+directory), e.g. Qwen3-4B with Qwen3-0.6B. Without arguments a randomly initialized
+Qwen3-0.6B-shaped target is built (see tiny_qwen3_checkpoint.py). Separately initialized
+random models never agree, so two stand-in drafts are used:
+- "first N layers": the target truncated to its first N decoder layers. The residual
+  outputs of the target's deeper layers are scaled by DAMPING, so the full target mostly
+  (but not always) agrees with its cheap truncation, like a trained draft would
+- "unrelated": an independently initialized model the target never agrees with; shows
+  the cost of the fallback to plain decoding
+
+Usage:
+    python SystemTest/benchmark_speculative_decoding.py [target] [draft] [num_speculative_tokens]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPTS = [
+    "打开车窗",
+    "今天天气怎么样？",
+    "请帮我导航到最近的充电站",
+    "给我介绍一下杭州有什么好玩的地方",
+    "讲一个适合小朋友听的睡前故事",
+    "解释一下能量回收的原理",
+]
+MAX_TOKENS = 48
+DRAFT_LAYERS = 4
+DAMPING = 0.05
+
+
+def damp_deep_layers(model_path: str, first_layer: int, factor: float) -> str:
+    """Scale the attention and MLP outputs of the decoder layers from first_layer on"""
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    model = AutoModelForCausalLM.from_pretrained(model_path, dtype="auto")
+    with torch.no_grad():
+        for layer in model.model.layers[first_layer:]:
+            layer.self_attn.o_proj.weight.mul_(factor)
+            layer.mlp.down_proj.weight.mul_(factor)
+    model.save_pretrained(model_path)
+    return model_path
+
+
+def truncated_draft(model_path: str, output_path: str, num_layers: int) -> str:
+    """Checkpoint with the embeddings, first num_layers decoder layers and head of a model"""
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+
+    config = AutoConfig.from_pretrained(model_path)
+    config.num_hidden_layers = num_layers
+    if getattr(config, "layer_types", None):
+        config.layer_types = config.layer_types[:num_layers]
+    model = AutoModelForCausalLM.from_pretrained(model_path, config=config, dtype="auto")
+    model.save_pretrained(output_path)
+    AutoTokenizer.from_pretrained(model_path).save_pretrained(output_path)
+    return output_path
+
+
+def run(chatbot, label):
+    """Answer every prompt, print tokens/sec and draft counters; returns the replies"""
+    tokens, seconds, replies = 0, 0.0, []
+    for prompt in PROMPTS:
+        start = time.perf_counter()
+        replies.append(chatbot.invoke(prompt, {"max_tokens": MAX_TOKENS}))
+        seconds += time.perf_counter() - start
+        if chatbot.speculative is not None:
+            tokens += chatbot.speculative.last_generation["new_tokens"]
+        else:
+            tokens += MAX_TOKENS  # replies run to max_tokens (random weights rarely end early)
+    stats = chatbot.get_speculative_stats()
+    acceptance = f"{stats['acceptance_rate']:.1%}" if stats else "-"
+    steps = f"{stats['tokens_per_step']:.2f}" if stats else "1.00"
+    fallbacks = f"{stats['fallbacks']}/{stats['generations']}" if stats else "-"
+    skipped = f"{stats['skipped']}/{stats['generations']}" if stats else "-"
+    print(f"{label:24s} {tokens / seconds:8.2f} {acceptance:>11s} {steps:>11s} {fallbacks:>10s} {skipped:>8s}")
+    return replies
+
+
+def run_benchmark(target: str = None, draft: str = None, num_speculative_tokens: int = 4):
+    from ChatBots.LocalChatBot import LocalChatBot
+    from ChatBots.model_loader import resolve_model_path
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if target is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            target = damp_deep_layers(build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b"),
+                                      DRAFT_LAYERS, DAMPING)
+            drafts = [
+                (f"first {DRAFT_LAYERS} layers",
+                 truncated_draft(target, os.path.join(work_dir, "draft-truncated"), DRAFT_LAYERS)),
+                ("unrelated", build_tiny_qwen3(os.path.join(work_dir, "draft-unrelated"), "0.6b", seed=1,
+                                               num_hidden_layers=DRAFT_LAYERS)),
+            ]
+        else:
+            drafts = [(draft or "Qwen3-0.6B", draft or "Qwen3-0.6B")]
+        chatbot = LocalChatBot(resolve_model_path(target), quantize=True)
+        chatbot.model.generation_config.do_sample = False
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+
+        print("=== Speculative Decoding ===")
+        print(f"Target: {target} ({chatbot.load_info['dtype']} on {chatbot.device}), {len(PROMPTS)} prompts, "
+              f"max {MAX_TOKENS} new tokens, greedy, num_speculative_tokens={num_speculative_tokens}")
+        print(f"{'decoding':24s} {'tok/s':>8s} {'acceptance':>11s} {'tokens/step':>11s} {'fallbacks':>10s} {'skipped':>8s}")
+        baseline = run(chatbot, "target alone")
+        for label, draft_path in drafts:
+            chatbot.enable_speculative_decoding(draft_path, num_speculative_tokens=num_speculative_tokens)
+            replies = run(chatbot, f"draft: {label}")
+            same = sum(reply == expected for reply, expected in zip(replies, baseline))
+            # int8 activations are quantized per forward pass, so verifying several tokens at
+            # once can change a near-tie; fp32/bf16 replies are identical
+            print(f"{'':24s} {same}/{len(PROMPTS)} replies identical to the target alone")
+            chatbot.disable_speculative_decoding()
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  sys.argv[2] if len(sys.argv) > 2 else None,
+                  int(sys.argv[3]) if len(sys.argv) > 3 else 4)
@@ -0,0 +1,67 @@
+"""
+Time-to-first-token benchmark for LocalChatBot.stream
+Compares the latency of invoke() (the whole reply at once, which is also what the old
+stream() yielded) with the time until the first chunk of the token-level stream
+arrives at the consumer.
+
+Without a model path a randomly initialized Qwen3-0.6B-shaped checkpoint is built
+(see tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_streaming.py [model_path] [max_tokens]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPTS = ["请帮我把空调温度调到二十二度", "今天天气怎么样？", "导航到最近的充电站"]
+
+
+def run_benchmark(model_path: str = None, max_tokens: int = 64, rounds: int = 3):
+    from ChatBots.LocalChatBot import LocalChatBot
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-0.6b-random"), "0.6b")
+        chatbot = LocalChatBot(model_path, quantize=chatbot_device_is_cpu())
+        config = {"max_tokens": max_tokens}
+        chatbot.invoke(PROMPTS[0], {"max_tokens": 2})  # warm-up
+
+        invoke_ms, first_chunk_ms, stream_ms, ttft_ms = [], [], [], []
+        for _ in range(rounds):
+            for prompt in PROMPTS:
+                start = time.perf_counter()
+                chatbot.invoke(prompt, config)
+                invoke_ms.append((time.perf_counter() - start) * 1000)
+
+                start, first = time.perf_counter(), None
+                for _chunk in chatbot.stream(prompt, config):
+                    if first is None:
+                        first = time.perf_counter()
+                first_chunk_ms.append((first - start) * 1000)
+                stream_ms.append((time.perf_counter() - start) * 1000)
+                ttft_ms.append(chatbot.get_stream_stats()["ttft_ms"])
+
+    print("=== LocalChatBot Streaming Latency ===")
+    print(f"Model: {model_path} ({chatbot.load_info['dtype']} on {chatbot.device}), {max_tokens} max tokens")
+    print(f"invoke (reply at once):          {statistics.median(invoke_ms):8.1f} ms")
+    print(f"stream, first token generated:   {statistics.median(ttft_ms):8.1f} ms")
+    print(f"stream, first chunk received:    {statistics.median(first_chunk_ms):8.1f} ms")
+    print(f"stream, complete:                {statistics.median(stream_ms):8.1f} ms")
+
+
+def chatbot_device_is_cpu() -> bool:
+    import torch
+    return not torch.cuda.is_available()
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 64)
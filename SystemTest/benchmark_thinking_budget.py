@@ -0,0 +1,130 @@
+"""
+Latency distribution of thinking-mode replies with and without thinking budgets
+Requests of three intent types are answered by LocalChatBot.invoke with thinking=True,
+once unbounded and once with per-intent budgets (config["intent"]); p50/p90/max latency,
+reasoning tokens and replies cut off by max_tokens are reported.
+
+With a real checkpoint pass its path; the model reasons and answers on its own.
+Without arguments a randomly initialized Qwen3-0.6B-shaped model with STAND_IN_LAYERS
+decoder layers is built (see tiny_qwen3_checkpoint.py). Random weights neither close
+their reasoning nor end their answer, so a forward hook imitates a reasoning model: each
+prompt reasons for a long-tailed number of tokens (log-normal around REASONING_MEDIAN,
+seeded per prompt), then answers in ANSWER_TOKENS tokens. The budget is enforced on top
+of the hook's logits exactly as for a real model.
+
+Usage:
+    python SystemTest/benchmark_thinking_budget.py [model_path]
+"""
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REQUESTS = [
+    ("device_control", "打开车窗"), ("device_control", "把空调调到22度"),
+    ("device_control", "关闭座椅加热"), ("device_control", "打开后备箱"),
+    ("info_query", "今天天气怎么样？"), ("info_query", "还能开多少公里"),
+    ("info_query", "附近有加油站吗"), ("info_query", "后天下雨吗"),
+    ("daily_chat", "讲一个睡前故事"), ("daily_chat", "解释一下能量回收的原理"),
+    ("daily_chat", "介绍一下杭州西湖"), ("daily_chat", "周末适合去哪里玩？"),
+]
+BUDGETS = {"device_control": 0, "info_query": 48, "daily_chat": 96}
+MAX_TOKENS = 256
+STAND_IN_LAYERS = 4
+REASONING_MEDIAN = 80
+ANSWER_TOKENS = 16
+
+
+class StandInReasoning:
+    """Forward hook making a random model reason for reasoning_length tokens, then answer briefly"""
+
+    def __init__(self, think_end_id: int, eos_token_id: int):
+        self.think_end_id = think_end_id
+        self.eos_token_id = eos_token_id
+        self.reasoning_length = 0
+        self.step = 0
+        self.closed_at = None
+
+    def reset(self, reasoning_length: int):
+        self.reasoning_length, self.step, self.closed_at = reasoning_length, 0, None
+
+    def __call__(self, module, args, kwargs, output):
+        input_ids = kwargs.get("input_ids")
+        if self.step > 0 and self.closed_at is None and int(input_ids[0, -1]) == self.think_end_id:
+            self.closed_at = self.step
+        forced = None
+        if self.closed_at is None and self.step >= self.reasoning_length:
+            forced = self.think_end_id
+        elif self.closed_at is not None and self.step - self.closed_at >= ANSWER_TOKENS:
+            forced = self.eos_token_id
+        elif self.closed_at is None:
+            # Keep the model from ending while it reasons
+            output.logits[:, -1, self.eos_token_id] = float("-inf")
+            output.logits[:, -1, self.think_end_id] = float("-inf")
+        if forced is not None:
+            output.logits[:, -1, :] = float("-inf")
+            output.logits[:, -1, forced] = 0.0
+        self.step += 1
+        return output
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+
+def run(chatbot, stand_in, label, config_of):
+    latencies, thinking_tokens, cut_off = [], [], 0
+    for index, (intent, prompt) in enumerate(REQUESTS):
+        if stand_in is not None:
+            stand_in.reset(int(random.Random(index).lognormvariate(math.log(REASONING_MEDIAN), 0.8)))
+        config = {"thinking": True, "max_tokens": MAX_TOKENS, **config_of(intent)}
+        start = time.perf_counter()
+        reply = chatbot.invoke(prompt, config)
+        latencies.append(time.perf_counter() - start)
+        if stand_in is not None:
+            # Tokens before </think>: exact for the stand-in, re-tokenized text for real models
+            thinking_tokens.append(stand_in.closed_at - 1 if stand_in.closed_at else MAX_TOKENS)
+        else:
+            thinking_tokens.append(len(chatbot.tokenizer(reply["thinking"])["input_ids"]))
+        if not reply["content"]:
+            cut_off += 1
+    print(f"{label:22s} {percentile(latencies, 0.5):7.2f} {percentile(latencies, 0.9):7.2f} {max(latencies):7.2f} "
+          f"{sum(latencies) / len(latencies):7.2f} {sum(thinking_tokens) / len(thinking_tokens):9.0f} {cut_off:8d}")
+
+
+def run_benchmark(model_path: str = None):
+    from ChatBots.LocalChatBot import LocalChatBot
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stand_in = None
+        random_weights = model_path is None
+        if random_weights:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-random"), "0.6b",
+                                          num_hidden_layers=STAND_IN_LAYERS)
+        chatbot = LocalChatBot(model_path, quantize=True)
+        chatbot.model.generation_config.do_sample = False
+        if random_weights:
+            stand_in = StandInReasoning(chatbot.think_end_id, chatbot.tokenizer.eos_token_id)
+            chatbot.model.register_forward_hook(stand_in, with_kwargs=True)
+        chatbot.invoke("warm-up", {"max_tokens": 2})
+
+        print("=== Thinking Budget ===")
+        print(f"Model: {model_path} ({chatbot.load_info['dtype']}), {len(REQUESTS)} requests, thinking=True, "
+              f"max {MAX_TOKENS} new tokens, budgets {BUDGETS}")
+        print(f"{'configuration':22s} {'p50 s':>7s} {'p90 s':>7s} {'max s':>7s} {'mean s':>7s} "
+              f"{'thinking':>9s} {'cut off':>8s}")
+        run(chatbot, stand_in, "unbounded", lambda intent: {})
+        chatbot.thinking_budgets = dict(BUDGETS)
+        run(chatbot, stand_in, "per-intent budgets", lambda intent: {"intent": intent})
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,103 @@
+"""
+First-request and steady-state latency of LocalChatBot with and without startup warm-up
+Every configuration runs in its own process, so the first request really is the first one
+after loading: it loads LocalChatBot with the configuration's options, then sends the same
+requests (daily_chat system prompt, greedy, MAX_TOKENS new tokens) with invoke and reports
+the load time (including the warm-up), the latency of the first request and the median
+latency of the following ones. The torch.compile configurations share one compile cache
+directory: the first of them starts with an empty cache, the second finds the kernels the
+first one compiled, as after a restart. Their static KV cache is sized for these requests
+(COMPILE_MAX_LENGTH tokens); the attention of every decode step covers the whole cache.
+
+Without arguments a randomly initialized Qwen3-0.6B-shaped checkpoint is built (see
+tiny_qwen3_checkpoint.py).
+
+Usage:
+    python SystemTest/benchmark_warmup.py [model_path or -] [load options as JSON, default {"quantize": true}]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIGURATIONS = [
+    ("no warm-up", {}),
+    ("warm-up", {"warmup": True}),
+    ("compile, empty cache", {"warmup": True, "torch_compile": True}),
+    ("compile, saved cache", {"warmup": True, "torch_compile": True}),
+]
+DEFAULT_OPTIONS = {"quantize": True}
+COMPILE_MAX_LENGTH = 256
+PROMPTS = ["打开车窗", "今天天气怎么样？", "讲一个睡前故事", "附近有加油站吗", "介绍一下杭州西湖", "把空调调到22度"]
+MAX_TOKENS = 32
+
+
+def measure(model_path: str, options: dict) -> dict:
+    """Load one configuration and send PROMPTS (runs in the child process)"""
+    from ChatBots.LocalChatBot import LocalChatBot, load_prompt
+
+    start = time.perf_counter()
+    chatbot = LocalChatBot(model_path, **options)
+    load_seconds = time.perf_counter() - start
+    chatbot.model.generation_config.do_sample = False
+    system_prompt = load_prompt("daily_chat")
+
+    latencies = []
+    for prompt in PROMPTS:
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+        start = time.perf_counter()
+        chatbot.invoke({"messages": messages}, {"max_tokens": MAX_TOKENS})
+        latencies.append(time.perf_counter() - start)
+    warmup = chatbot.warmup_stats
+    return {"load_s": load_seconds, "warmup_s": warmup["total_seconds"] if warmup else 0.0,
+            "first_ms": latencies[0] * 1000, "steady_ms": statistics.median(latencies[1:]) * 1000}
+
+
+def run_configuration(model_path: str, options: dict) -> dict:
+    """measure() in a fresh process; {"skipped": reason} when it fails"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", model_path, json.dumps(options)],
+                               capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        errors = [line for line in completed.stderr.strip().splitlines() if line.strip()]
+        return {"skipped": errors[-1] if errors else f"exit code {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+def run_benchmark(model_path: str = None, base_options: dict = None):
+    with tempfile.TemporaryDirectory() as work_dir:
+        if model_path is None:
+            from tiny_qwen3_checkpoint import build_tiny_qwen3
+            model_path = build_tiny_qwen3(os.path.join(work_dir, "qwen3-random"), "0.6b")
+        compile_cache_dir = os.path.join(work_dir, "compile-cache")
+        base_options = DEFAULT_OPTIONS if base_options is None else base_options
+
+        print("=== Startup Warm-up ===")
+        print(f"Model: {model_path} ({base_options}), {len(PROMPTS)} requests with the daily_chat system prompt, "
+              f"greedy, max {MAX_TOKENS} new tokens, one process per configuration")
+        print(f"{'configuration':22s} {'load s':>7s} {'warm-up s':>9s} {'first ms':>9s} {'steady ms':>9s}")
+        for label, options in CONFIGURATIONS:
+            options = {**base_options, **options}
+            if options.get("torch_compile"):
+                options.update(compile_cache_dir=compile_cache_dir, compile_max_length=COMPILE_MAX_LENGTH)
+            result = run_configuration(model_path, options)
+            if "skipped" in result:
+                print(f"{label:22s} skipped: {result['skipped']}")
+                continue
+            print(f"{label:22s} {result['load_s']:7.1f} {result['warmup_s']:9.1f} {result['first_ms']:9.0f} "
+                  f"{result['steady_ms']:9.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(sys.argv[2], json.loads(sys.argv[3]))))
+    else:
+        run_benchmark(sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] != "-" else None,
+                      json.loads(sys.argv[2]) if len(sys.argv) > 2 else None)
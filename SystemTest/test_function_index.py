@@ -0,0 +1,219 @@
+"""
+Function retrieval index tests
+Tests RAGmodule/FunctionIndex.py with a deterministic character n-gram encoder in place of
+Qwen3-Embedding-0.6B, so the index logic runs without model weights.
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import zlib
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RAGmodule.FunctionIndex import FunctionEmbeddingIndex, QUERY_INSTRUCTION
+
+
+class NgramEncoder:
+    """Hashes character bigrams into a fixed-size vector and counts encoded texts"""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = text.replace(QUERY_INSTRUCTION, "").lower()
+            for i in range(len(text) - 1):
+                vectors[row, zlib.crc32(text[i:i + 2].encode("utf-8")) % self.dim] += 1.0
+        return vectors
+
+
+class TestFunctionEmbeddingIndex(unittest.TestCase):
+    """Tests for building and querying the function embedding index"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.registry_path = os.path.join(self.test_dir, "registry.json")
+        self.commands_path = os.path.join(self.test_dir, "CommandParameters.json")
+        self.categories_path = os.path.join(self.test_dir, "voice2command.json")
+
+        self._write_registry([
+            ("climate_module", "set_cabin_temperature", "设置车内空调温度"),
+            ("media_module", "play_media", "播放音乐或视频"),
+        ])
+        with open(self.commands_path, 'w', encoding='utf-8') as f:
+            json.dump([
+                {"command": "播放音乐", "API_calling": "play_media", "parameters": ["media_type:str='music'"]},
+                {"command": "打开车窗", "API_calling": "window_control", "parameters": ["action:str='open'"]},
+            ], f, ensure_ascii=False)
+        with open(self.categories_path, 'w', encoding='utf-8') as f:
+            json.dump([{"command": "打开车窗", "window_operation": "window", "danger_level": 1}], f, ensure_ascii=False)
+
+        self.encoder = NgramEncoder()
+        self.index = FunctionEmbeddingIndex(
+            encoder=self.encoder,
+            registry_path=self.registry_path,
+            command_paths=[self.commands_path, self.categories_path],
+            cache_path=os.path.join(self.test_dir, "function_index.npz")
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_registry(self, functions):
+        modules = {}
+        for module_name, function_name, description in functions:
+            modules.setdefault(module_name, []).append(
+                {"function_name": function_name, "description": description, "parameters": []})
+        with open(self.registry_path, 'w', encoding='utf-8') as f:
+            json.dump({"modules": [
+                {"module_name": name, "module_path": f"/vehicle/systems/{name}.py", "functions": funcs}
+                for name, funcs in modules.items()
+            ]}, f, ensure_ascii=False)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(self.registry_path)
+        os.utime(self.registry_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_matrix_is_normalized(self):
+        norms = np.linalg.norm(self.index.matrix, axis=1)
+        self.assertTrue(np.allclose(norms, 1.0, atol=1e-5))
+        self.assertEqual(self.index.matrix.dtype, np.float32)
+
+    def test_registry_and_command_table_functions(self):
+        names = [function['full_name'] for function in self.index.functions]
+        # play_media from the command table is merged into the registry function
+        self.assertEqual(names, ["climate_module.set_cabin_temperature", "media_module.play_media", "window_control"])
+
+        results = self.index.search("把空调温度调低", limit=1)
+        self.assertEqual(results[0]['full_name'], "climate_module.set_cabin_temperature")
+        self.assertIn('score', results[0])
+
+        results = self.index.search("打开车窗", limit=2)
+        self.assertEqual(results[0]['full_name'], "window_control")
+        self.assertEqual(results[0]['parameters'], [{"name": "action", "type": "str"}])
+
+    def test_batch_search_top_k(self):
+        results = self.index.search_batch(["播放音乐", "空调温度高一点"], limit=2, threshold=0.0)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0]['full_name'], "media_module.play_media")
+        self.assertTrue(all(len(ranked) == 2 for ranked in results))
+        self.assertGreaterEqual(results[0][0]['score'], results[0][1]['score'])
+        self.assertEqual(self.index.search("播放音乐", limit=5, threshold=1.01), [])
+
+    def test_default_threshold_drops_unrelated_functions(self):
+        self.assertEqual(self.index.search("今天股市怎么样"), [])
+        results = self.index.search("播放音乐")
+        self.assertEqual([result['full_name'] for result in results], ["media_module.play_media"])
+
+    def test_command_table_only_apis_are_not_callable(self):
+        results = self.index.search("打开车窗", limit=3, threshold=0.0)
+        window = [result for result in results if result['full_name'] == "window_control"]
+        self.assertEqual(len(window), 1)
+        self.assertFalse(window[0]['callable'])
+        self.assertTrue(all(result['callable'] for result in results if result is not window[0]))
+
+        results = self.index.search("打开车窗", limit=3, threshold=0.0, callable_only=True)
+        self.assertNotIn("window_control", [result['full_name'] for result in results])
+        self.assertEqual(len(results), 2)
+
+    def test_incremental_rebuild(self):
+        encoded_before = len(self.encoder.encoded)
+        self.assertFalse(self.index.refresh())
+
+        self._write_registry([
+            ("climate_module", "set_cabin_temperature", "设置车内空调温度"),
+            ("media_module", "play_media", "播放音乐或视频"),
+            ("battery_module", "get_battery_status", "查看电池电量"),
+        ])
+        self.assertTrue(self.index.refresh())
+
+        # Only the new function's documents are embedded
+        new_texts = self.encoder.encoded[encoded_before:]
+        self.assertEqual(sorted(new_texts), sorted(["battery module: get battery status", "查看电池电量"]))
+        self.assertEqual(self.index.search("电池电量", limit=1)[0]['full_name'], "battery_module.get_battery_status")
+
+        # Embeddings of removed documents are dropped
+        self._write_registry([("battery_module", "get_battery_status", "查看电池电量")])
+        self.assertTrue(self.index.refresh())
+        self.assertNotIn("设置车内空调温度", self.index._embedding_cache)
+        self.assertEqual(len(self.index._embedding_cache), len(self.index.matrix))
+
+    def test_embeddings_persisted(self):
+        encoder = NgramEncoder()
+        FunctionEmbeddingIndex(
+            encoder=encoder,
+            registry_path=self.registry_path,
+            command_paths=[self.commands_path, self.categories_path],
+            cache_path=os.path.join(self.test_dir, "function_index.npz")
+        )
+        # Only the document embedded again to check the dimension
+        self.assertEqual(len(encoder.encoded), 1)
+
+    def test_cache_discarded_for_another_encoder(self):
+        def make_index(encoder, **kwargs):
+            return FunctionEmbeddingIndex(
+                encoder=encoder,
+                registry_path=self.registry_path,
+                command_paths=[self.commands_path, self.categories_path],
+                cache_path=os.path.join(self.test_dir, "function_index.npz"),
+                **kwargs
+            )
+
+        # Same encoder class with another embedding dimension
+        encoder = NgramEncoder(dim=256)
+        index = make_index(encoder)
+        self.assertEqual(len(encoder.encoded), 1 + len(self.index.matrix))
+        self.assertEqual(index.matrix.shape, (len(self.index.matrix), 256))
+        self.assertTrue(index.search("播放音乐"))
+
+        # Another encoder with the same dimension
+        encoder = NgramEncoder(dim=256)
+        make_index(encoder, encoder_id="another-model")
+        self.assertEqual(len(encoder.encoded), len(self.index.matrix))
+        encoder = NgramEncoder(dim=256)
+        make_index(encoder, encoder_id="another-model")
+        self.assertEqual(len(encoder.encoded), 1)
+
+
+class TestProjectRegistryRetrieval(unittest.TestCase):
+    """
+    Retrieval over the project's registry.json with queries that appear nowhere in it.
+    The n-gram encoder only sees shared characters; matching requests that share none with
+    the description (e.g. a complaint about the heat) is left to Qwen3-Embedding.
+    """
+
+    QUERIES = {
+        "电量还剩多少": "battery_module.get_battery_status",
+        "把空调温度调到二十二度": "climate_module.set_cabin_temperature",
+        "附近哪里有充电站": "navigation_module.find_charging_stations",
+        "音量调小一点": "media_module.adjust_volume",
+        "换成运动模式": "driving_module.set_driving_mode",
+        "导航到机场": "navigation_module.set_destination",
+    }
+
+    def test_unseen_queries_find_their_function(self):
+        registry_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "RegistryModule", "registry.json")
+        with open(registry_path, 'r', encoding='utf-8') as f:
+            registry_text = f.read()
+        # Wide enough that bigrams of the English descriptions do not collide with the Chinese ones
+        index = FunctionEmbeddingIndex(encoder=NgramEncoder(dim=1 << 16), registry_path=registry_path,
+                                       command_paths=[])
+
+        for query, expected in self.QUERIES.items():
+            self.assertNotIn(query, registry_text)
+            results = index.search(query, limit=1, threshold=0.0)
+            self.assertEqual(results[0]['full_name'], expected, query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Randomly initialized Qwen3-architecture checkpoints for CPU tests and benchmarks
+The real Qwen3 weights are several GB and not available on CI runners. Speed and
+memory depend only on the architecture, so tests and benchmarks build a checkpoint
+with the Qwen3 layer layout, a small byte-level BPE tokenizer and a Qwen-style chat
+template (<|im_start|>, <think>...</think>, enable_thinking). Generated text is
+meaningless; only shapes, speed and code paths are exercised.
+
+Usage:
+    python SystemTest/tiny_qwen3_checkpoint.py /tmp/tiny-qwen3 [tiny|0.6b]
+"""
+
+import os
+import sys
+from typing import Any, Dict
+
+# Qwen-style chat template understood by LocalChatBot._tokenize
+CHAT_TEMPLATE = (
+    "{%- for message in messages %}"
+    "{{- '<|im_start|>' + message['role'] + '\\n' + message['content'] + '<|im_end|>\\n' }}"
+    "{%- endfor %}"
+    "{%- if add_generation_prompt %}"
+    "{{- '<|im_start|>assistant\\n' }}"
+    "{%- if enable_thinking is defined and enable_thinking is false %}"
+    "{{- '<think>\\n\\n</think>\\n\\n' }}"
+    "{%- endif %}"
+    "{%- endif %}"
+)
+
+SPECIAL_TOKENS = ["<|endoftext|>", "<|im_start|>", "<|im_end|>", "<think>", "</think>"]
+
+TRAINING_TEXT = [
+    "You are a helpful AI assistant for the car. 你是车载智能助手。",
+    "打开车窗 关闭车窗 调整空调温度 播放音乐 查看电池电量 设置导航目的地 远程锁车",
+    "What is the weather today? 今天天气怎么样？ 请帮我导航到最近的充电站。",
+    "set_cabin_temperature(temperature=22.5, zone='driver') {\"function\": \"adjust_volume\"}",
+    "0123456789 零一二三四五六七八九十百千万 度 公里 分钟",
+]
+
+# Architectures: "tiny" for unit tests, "0.6b" matches Qwen3-0.6B (random weights)
+CONFIGS: Dict[str, Dict[str, Any]] = {
+    "tiny": dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=4,
+                 num_key_value_heads=2, head_dim=16, max_position_embeddings=2048),
+    "0.6b": dict(hidden_size=1024, intermediate_size=3072, num_hidden_layers=28, num_attention_heads=16,
+                 num_key_value_heads=8, head_dim=128, max_position_embeddings=40960, vocab_size=151936,
+                 tie_word_embeddings=True),
+}
+
+
+def build_tokenizer(vocab_size: int = 512):
+    """Train a byte-level BPE tokenizer with the Qwen special tokens"""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=vocab_size, special_tokens=SPECIAL_TOKENS,
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tokenizer.train_from_iterator(TRAINING_TEXT, trainer=trainer)
+
+    fast_tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        eos_token="<|im_end|>",
+        pad_token="<|endoftext|>",
+        additional_special_tokens=["<|im_start|>", "<think>", "</think>"],
+    )
+    fast_tokenizer.chat_template = CHAT_TEMPLATE
+    return fast_tokenizer
+
+
+def build_tiny_qwen3(path: str, size: str = "tiny", seed: int = 0, **config_overrides) -> str:
+    """
+    Write a randomly initialized Qwen3 checkpoint with tokenizer to a directory
+
+    Args:
+        path: Output directory
+        size: Key of CONFIGS ("tiny" or "0.6b")
+        seed: Random seed for the weights
+        **config_overrides: Qwen3Config values replacing the preset
+
+    Returns:
+        str: The output directory
+    """
+    import torch
+    from transformers import Qwen3Config, Qwen3ForCausalLM
+
+    tokenizer = build_tokenizer()
+    settings = dict(CONFIGS[size])
+    settings.setdefault("vocab_size", len(tokenizer))
+    settings.update(config_overrides)
+    config = Qwen3Config(
+        bos_token_id=tokenizer.convert_tokens_to_ids("<|endoftext|>"),
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+        **settings
+    )
+
+    torch.manual_seed(seed)
+    model = Qwen3ForCausalLM(config).eval()
+    if config.vocab_size > len(tokenizer):
+        # Zero logits for ids the small tokenizer cannot decode, so greedy decoding
+        # (whose best logit is positive) produces printable text
+        with torch.no_grad():
+            model.get_output_embeddings().weight[len(tokenizer):] = 0
+    if size != "tiny":
+        # Stored in bf16 like the released Qwen3 checkpoints
+        model = model.to(torch.bfloat16)
+    os.makedirs(path, exist_ok=True)
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else "tiny-qwen3"
+    preset = sys.argv[2] if len(sys.argv) > 2 else "tiny"
+    print(f"Checkpoint written to {build_tiny_qwen3(output, preset)}")
@@ -18,13 +18,20 @@ def test_llama_cpp_functional():
             print(f"Found binary at {binary}, but failed to run it:", e)
             return False
     return True
+# Llama objects by model file, loaded once instead of on every call
+# (LocalChatBot(model_dir, backend="llama_cpp") serves GGUF files with the chat template)
+_llama_models = {}
+def load_llama(llm_model:str):
+    if llm_model not in _llama_models:
+        _llama_models[llm_model] = Llama(
+            llm_model,
+            n_gpu_layers=-1, # For GPU acceleration
+            n_ctx=4096 # Define context length
+        )
+    return _llama_models[llm_model]
 def llm_analysation(llm_model:str, back_ground:str="", user_query:str=""):
     SamplePrompt = """# 角色 \n 你是一个智能车载语音助手，你应当尽力回答用户的问题: ## 用户的问题 \n"""
-    llm = Llama(
-        llm_model,
-        n_gpu_layers=-1, # For GPU acceleration
-        n_ctx=4096 # Define context length
-    )
+    llm = load_llama(llm_model)
     # print(llm.metadata)
     user_query = SamplePrompt + "\n" + user_query
     user_query.strip()
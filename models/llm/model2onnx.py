@@ -1,21 +1,12 @@
-from transformers.onnx import export, FeaturesManager
-from transformers import AutoTokenizer, AutoModel
 import os
+import sys
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-model_name = os.path.join(current_dir, "Qwen3-0.6B")
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModel.from_pretrained(model_name)
-task = "text-generation"  # 根据模型类型调整
-model_kind, model_onnx_config = FeaturesManager.check_supported_model_or_raise(model, feature=task)
-onnx_config = model_onnx_config(model.config)
-# 导出 ONNX 模型
-onnx_path = os.path.join(current_dir, "qwen3_0.6b.onnx")
-export(
-    preprocessor= tokenizer,              # Hugging Face tokenizer
-    model= model,
-    config= onnx_config,                  # Hugging Face 模型对象
-    output= onnx_path,              # 输出路径
-    opset=15,
-    legacy=False 
-)
+sys.path.insert(0, os.path.dirname(os.path.dirname(current_dir)))
+from ChatBots.inference_backends import export_onnx
+
+# transformers.onnx 已被移除，改用 optimum 导出（带 KV cache 的 decoder，可直接用于生成）
+# 导出到 Qwen3-0.6B/onnx，LocalChatBot(model_name, backend="onnxruntime") 会自动找到它
+model_name = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, "Qwen3-0.6B")
+onnx_path = export_onnx(model_name)
+print(f"ONNX model saved to {onnx_path}")